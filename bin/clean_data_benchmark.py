@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""Benchmarks the clean up of cluster data against a reference image."""
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+import numba as nb
+
+# Add parent SPINE directory to the python path
+current_directory = os.path.dirname(os.path.abspath(__file__))
+current_directory = os.path.dirname(current_directory)
+sys.path.insert(0, current_directory)
+
+from spine import Meta
+from spine.utils.globals import SHAPE_COL, SHAPE_PREC
+from spine.io.parse.clean_data import (
+        clean_sparse_data, filter_duplicate_voxels_ref, filter_voxels_ref)
+
+
+def legacy_clean_sparse_data(cluster_voxels, cluster_data, sparse_voxels):
+    """Cleans up cluster data by lexicographically sorting both voxel sets
+    and scanning them sequentially, as was done before the key-based
+    implementation.
+
+    Parameters
+    ----------
+    cluster_voxels : np.ndarray
+        (N, 3) Matrix of voxel coordinates in the cluster3d tensor
+    cluster_data : np.ndarray
+        (N, F) Matrix of voxel values corresponding to each voxel
+    sparse_voxels: np.ndarray
+        (M, 3) Matrix of voxel coordinates in the reference sparse tensor
+
+    Returns
+    -------
+    cluster_voxels: np.ndarray
+        (M, 3) Ordered and filtered set of voxel coordinates
+    cluster_data: np.ndarray
+        (M, F) Ordered and filtered set of voxel values
+    """
+    perm = np.lexsort(cluster_voxels.T)
+    cluster_voxels, cluster_data = cluster_voxels[perm], cluster_data[perm]
+    sparse_voxels = sparse_voxels[np.lexsort(sparse_voxels.T)]
+
+    index = np.where(filter_duplicate_voxels_ref(
+        cluster_voxels, cluster_data[:, SHAPE_COL],
+        nb.typed.List(SHAPE_PREC)))[0]
+    cluster_voxels, cluster_data = cluster_voxels[index], cluster_data[index]
+
+    index = np.where(filter_voxels_ref(cluster_voxels, sparse_voxels))[0]
+
+    return cluster_voxels[index], cluster_data[index]
+
+
+def generate_event(num_voxels, count, duplicate_fraction, seed):
+    """Generates a synthetic set of cluster voxels and its reference image.
+
+    Parameters
+    ----------
+    num_voxels : int
+        Number of voxels in the reference image
+    count : int
+        Number of voxels along each axis of the image
+    duplicate_fraction : float
+        Fraction of the voxels which appear in more than one cluster
+    seed : int
+        Random number generator seed
+
+    Returns
+    -------
+    np.ndarray
+        (N, 3) Cluster voxel coordinates
+    np.ndarray
+        (N, 2) Cluster voxel features ([value, shape])
+    np.ndarray
+        (M, 3) Reference image voxel coordinates
+    """
+    rng = np.random.RandomState(seed)
+    ids = np.unique(rng.randint(0, count**3, size=num_voxels))
+    sparse_voxels = np.stack(np.unravel_index(
+        ids, (count, count, count), order='F'), axis=1).astype(np.int32)
+    sparse_voxels = sparse_voxels[rng.permutation(len(sparse_voxels))]
+
+    num_extra = int(duplicate_fraction*len(sparse_voxels))
+    extra = sparse_voxels[rng.randint(0, len(sparse_voxels), size=num_extra)]
+    cluster_voxels = np.vstack([sparse_voxels, extra])
+    cluster_voxels = cluster_voxels[rng.permutation(len(cluster_voxels))]
+    shapes = rng.choice(SHAPE_PREC, size=len(cluster_voxels))
+    cluster_data = np.column_stack(
+            [rng.rand(len(cluster_voxels)), shapes]).astype(np.float32)
+
+    return cluster_voxels, cluster_data, sparse_voxels
+
+
+def main(sizes, count, duplicate_fraction, num_repeat):
+    """Cleans up the same synthetic events with the legacy and the current
+    implementations and reports the time taken by each of them.
+
+    Parameters
+    ----------
+    sizes : List[int]
+        Number of voxels in the reference image of each event
+    count : int
+        Number of voxels along each axis of the image
+    duplicate_fraction : float
+        Fraction of the voxels which appear in more than one cluster
+    num_repeat : int
+        Number of times each event is cleaned up
+    """
+    meta = Meta(lower=np.zeros(3), upper=np.full(3, count*0.3),
+                size=np.full(3, 0.3), count=np.full(3, count))
+    funcs = [('legacy', lambda *args: legacy_clean_sparse_data(*args)),
+             ('current', lambda *args: clean_sparse_data(*args, meta))]
+
+    print(f"\nCleaning up events with {100*duplicate_fraction:.0f}% "
+          f"duplicated voxels:")
+    for i, size in enumerate(sizes):
+        # Generate the event, check that both implementations agree
+        event = generate_event(size, count, duplicate_fraction, i)
+        ref, res = [func(*event) for _, func in funcs]
+        np.testing.assert_array_equal(res[0], ref[0])
+        np.testing.assert_array_equal(res[1], ref[1])
+
+        # Time each implementation
+        print(f"- {size:>8} voxels:", end='')
+        for name, func in funcs:
+            start = time.time()
+            for _ in range(num_repeat):
+                func(*event)
+            duration = (time.time() - start)/num_repeat
+            print(f"  {name} {1e3*duration:>9.2f} ms", end='')
+        print()
+
+
+if __name__ == "__main__":
+    # Parse the command-line arguments
+    parser = argparse.ArgumentParser(
+            description="Benchmark the clean up of cluster data")
+
+    parser.add_argument('--sizes', '-s',
+                        help='Number of voxels in the image of each event',
+                        type=int, nargs='+',
+                        default=[10000, 100000, 1000000])
+    parser.add_argument('--count',
+                        help='Number of voxels along each axis of the image',
+                        type=int, default=768)
+    parser.add_argument('--duplicate-fraction',
+                        help='Fraction of the voxels shared between clusters',
+                        type=float, default=0.1)
+    parser.add_argument('--num-repeat', '-n',
+                        help='Number of times each event is cleaned up',
+                        type=int, default=5)
+
+    args = parser.parse_args()
+
+    # Execute the main function
+    main(args.sizes, args.count, args.duplicate_fraction, args.num_repeat)
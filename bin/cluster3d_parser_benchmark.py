@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""Benchmarks the 3D cluster parser on synthetic stand-ins of LArCV objects.
+
+The stand-ins mimic the interface of the LArCV objects used by the parser
+(`EventClusterVoxel3D`, `EventParticle`, `Voxel3DMeta`, etc.), such that the
+parser can be benchmarked without LArCV or a LArCV file.
+"""
+
+import os
+import sys
+import time
+import types
+import argparse
+
+import numpy as np
+
+# Add parent SPINE directory to the python path
+current_directory = os.path.dirname(os.path.abspath(__file__))
+current_directory = os.path.dirname(current_directory)
+sys.path.insert(0, current_directory)
+
+from spine import Meta
+from spine.utils.ppn import image_coordinates
+from spine.utils.particles import process_particle_event
+from spine.io.parse import cluster
+from spine.io.parse.cluster import Cluster3DParser
+
+
+class StandInVector(list):
+    """Stand-in for a C++ vector."""
+
+    def size(self):
+        """Returns the number of elements in the vector."""
+        return len(self)
+
+
+class StandInPoint:
+    """Stand-in for a `larcv.Point3D` object."""
+
+    def __init__(self, pos):
+        self._pos = pos
+
+    def x(self):
+        """Returns the x coordinate."""
+        return self._pos[0]
+
+    def y(self):
+        """Returns the y coordinate."""
+        return self._pos[1]
+
+    def z(self):
+        """Returns the z coordinate."""
+        return self._pos[2]
+
+
+class StandInParticle:
+    """Stand-in for a `larcv.Particle` object. Each getter returns the value
+    of the attribute of the same name."""
+
+    def __init__(self, **attrs):
+        for key, value in attrs.items():
+            setattr(self, key, (lambda v: lambda: v)(value))
+
+
+class StandInMeta:
+    """Stand-in for a `larcv.Voxel3DMeta` object."""
+    pos_z = None
+
+    def __init__(self, count, size):
+        self.count, self.size = count, size
+
+    def min_x(self): return 0.
+    def min_y(self): return 0.
+    def min_z(self): return 0.
+    def max_x(self): return self.count*self.size
+    def max_y(self): return self.count*self.size
+    def max_z(self): return self.count*self.size
+    def size_voxel_x(self): return self.size
+    def size_voxel_y(self): return self.size
+    def size_voxel_z(self): return self.size
+    def num_voxel_x(self): return self.count
+    def num_voxel_y(self): return self.count
+    def num_voxel_z(self): return self.count
+
+
+class StandInVoxelSet:
+    """Stand-in for a `larcv.VoxelSet` object."""
+
+    def __init__(self, voxels, values):
+        self.voxels, self.values = voxels, values
+
+    def as_vector(self):
+        """Returns the list of voxels (only its size is used)."""
+        return StandInVector(range(len(self.values)))
+
+
+class StandInEvent:
+    """Stand-in for a `larcv.EventClusterVoxel3D` or a `larcv.EventParticle`
+    object."""
+
+    def __init__(self, objects, meta=None):
+        self._objects, self._meta = StandInVector(objects), meta
+
+    def meta(self):
+        """Returns the image metadata."""
+        return self._meta
+
+    def as_vector(self):
+        """Returns the list of objects."""
+        return self._objects
+
+    def size(self):
+        """Returns the number of objects."""
+        return len(self._objects)
+
+
+def as_flat_arrays(voxel_set, meta, x, y, z, value):
+    """Stand-in for `larcv.as_flat_arrays`: fills the voxel coordinates and
+    values of a voxel set into the provided arrays."""
+    x[:], y[:], z[:] = voxel_set.voxels.T
+    value[:] = voxel_set.values
+
+
+def generate_event(num_clusters, num_voxels, count, seed):
+    """Generates a synthetic event of 3D clusters and their particles.
+
+    Parameters
+    ----------
+    num_clusters : int
+        Number of clusters in the event
+    num_voxels : int
+        Average number of voxels per cluster
+    count : int
+        Number of voxels along each axis of the image
+    seed : int
+        Random number generator seed
+
+    Returns
+    -------
+    StandInEvent
+        Cluster event
+    StandInEvent
+        Particle event
+    """
+    rng = np.random.RandomState(seed)
+    meta = StandInMeta(count, 0.3)
+    clusters, particles = [], []
+    num_inters = max(num_clusters//50, 1)
+    for i, size in enumerate(rng.poisson(num_voxels, size=num_clusters)):
+        voxels = rng.randint(0, count, size=(size, 3))
+        clusters.append(StandInVoxelSet(voxels, rng.rand(size)))
+
+        inter_id = i%num_inters
+        anc_pos = StandInPoint(rng.rand(3)*count*0.3)
+        particles.append(StandInParticle(
+            id=i, group_id=i, interaction_id=inter_id, shape=i%5,
+            ancestor_track_id=inter_id, ancestor_creation_process='primary',
+            ancestor_pdg_code=13, ancestor_position=anc_pos,
+            position=anc_pos, pdg_code=13, t=0., p=rng.rand()))
+
+    return StandInEvent(clusters, meta), StandInEvent(particles)
+
+
+class LegacyCluster3DParser(Cluster3DParser):
+    """3D cluster parser which converts the clusters one at a time, as was
+    done before the bulk implementation (no clean up support)."""
+
+    def process(self, cluster_event, particle_event=None):
+        meta = cluster_event.meta()
+        num_clusters = cluster_event.as_vector().size()
+        labels = {'cluster': np.arange(num_clusters)}
+        num_particles = num_clusters
+        if self.add_particle_info:
+            num_particles = particle_event.size()
+            particles = list(particle_event.as_vector())
+            (inter_ids, nu_ids, group_primaries,
+             inter_primaries, types_) = process_particle_event(particle_event)
+
+            labels['cluster'] = [p.id() for p in particles]
+            labels['part']    = [p.id() for p in particles]
+            labels['group']   = [p.group_id() for p in particles]
+            labels['inter']   = inter_ids
+            labels['nu']      = nu_ids
+            labels['type']    = types_
+            labels['pgroup']  = group_primaries
+            labels['pinter']  = inter_primaries
+            anc_pos = np.empty((len(particles), 3), dtype=self.ftype)
+            for i, p in enumerate(particles):
+                anc_pos[i] = image_coordinates(meta, p.ancestor_position())
+            labels['vtx_x']   = anc_pos[:, 0]
+            labels['vtx_y']   = anc_pos[:, 1]
+            labels['vtx_z']   = anc_pos[:, 2]
+            labels['p']       = [p.p() for p in particles]
+            labels['shape']   = [p.shape() for p in particles]
+
+        clusters_voxels, clusters_features = [], []
+        for i in range(num_clusters):
+            voxel_set = cluster_event.as_vector()[i]
+            num_points = voxel_set.as_vector().size()
+            if num_points > 0:
+                x = np.empty(num_points, dtype=self.itype)
+                y = np.empty(num_points, dtype=self.itype)
+                z = np.empty(num_points, dtype=self.itype)
+                value = np.empty(num_points, dtype=self.ftype)
+                cluster.larcv.as_flat_arrays(voxel_set, meta, x, y, z, value)
+                clusters_voxels.append(np.stack([x, y, z], axis=1))
+
+                features = [value]
+                for l in labels.values():
+                    val = l[i] if i < num_particles else -1
+                    features.append(
+                            np.full(num_points, val, dtype=self.ftype))
+                clusters_features.append(np.column_stack(features))
+
+        return (np.concatenate(clusters_voxels),
+                np.concatenate(clusters_features), Meta.from_larcv(meta))
+
+
+def main(num_events, num_clusters, num_voxels, add_particle_info):
+    """Parses the same synthetic events with the legacy and the current
+    parser and reports the throughput of each of them.
+
+    Parameters
+    ----------
+    num_events : int
+        Number of events to parse
+    num_clusters : int
+        Number of clusters per event
+    num_voxels : int
+        Average number of voxels per cluster
+    add_particle_info : bool
+        Whether to add the particle information to the cluster labels
+    """
+    # Substitute the LArCV conversion function
+    cluster.larcv = types.SimpleNamespace(as_flat_arrays=as_flat_arrays)
+
+    # Generate the data once
+    events = [generate_event(num_clusters, num_voxels, 768, i)
+              for i in range(num_events)]
+
+    # Initialize the parsers, check that they agree
+    kwargs = {'dtype': 'float32', 'cluster_event': 'cluster3d',
+              'add_particle_info': add_particle_info}
+    if add_particle_info:
+        kwargs['particle_event'] = 'particle'
+    parsers = [('legacy', LegacyCluster3DParser(**kwargs)),
+               ('current', Cluster3DParser(**kwargs))]
+    for cluster_event, particle_event in events:
+        ref, res = [parser.process(cluster_event, particle_event)
+                    for _, parser in parsers]
+        np.testing.assert_array_equal(res[0], ref[0])
+        np.testing.assert_array_equal(res[1], ref[1])
+
+    # Time each parser
+    print(f"\nParsing {num_events} events of {num_clusters} clusters "
+          f"(~{num_voxels} voxels each):")
+    for name, parser in parsers:
+        start = time.time()
+        for cluster_event, particle_event in events:
+            parser.process(cluster_event, particle_event)
+        duration = time.time() - start
+
+        print(f"- {name:<8}: {num_events/duration:>9.1f} events/s, "
+              f"{1e3*duration/num_events:>8.2f} ms/event")
+
+
+if __name__ == "__main__":
+    # Parse the command-line arguments
+    parser = argparse.ArgumentParser(
+            description="Benchmark the 3D cluster parser")
+
+    parser.add_argument('--num-events', '-n',
+                        help='Number of events to parse',
+                        type=int, default=20)
+    parser.add_argument('--num-clusters',
+                        help='Number of clusters per event',
+                        type=int, default=2000)
+    parser.add_argument('--num-voxels',
+                        help='Average number of voxels per cluster',
+                        type=int, default=50)
+    parser.add_argument('--add-particle-info',
+                        help='Add the particle information to the labels',
+                        action='store_true')
+
+    args = parser.parse_args()
+
+    # Execute the main function
+    main(args.num_events, args.num_clusters, args.num_voxels,
+         args.add_particle_info)
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""Benchmarks the collation of sparse tensors split by detector module."""
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+# Add parent SPINE directory to the python path
+current_directory = os.path.dirname(os.path.abspath(__file__))
+current_directory = os.path.dirname(current_directory)
+sys.path.insert(0, current_directory)
+
+from spine import Meta
+from spine.io.collate import CollateAll
+
+
+def legacy_closest_module_indexes(geo, points):
+    """Finds the points closest to each module with one set of boundary
+    masks per module, as was done before the single-pass implementation.
+
+    Parameters
+    ----------
+    geo : Geometry
+        Detector geometry
+    points : np.ndarray
+        (N, 3) Set of point coordinates
+
+    Returns
+    -------
+    List[np.ndarray]
+        List of index of points that belong to each module
+    """
+    module_ids = np.full(len(points), -1, dtype=np.int32)
+    for module_id, c in enumerate(geo.centers):
+        dists = geo.centers - c
+        lower_pad = np.zeros(dists.shape)
+        upper_pad = np.zeros(dists.shape)
+        lower_pad[dists >= 0], upper_pad[dists <= 0] = np.inf, np.inf
+        lower = c + np.max(dists - lower_pad, axis=0) / 2
+        upper = c + np.min(dists + upper_pad, axis=0) / 2
+        mask = np.all(points > lower, axis=1) & np.all(points < upper, axis=1)
+        module_ids[mask] = module_id
+
+    return [np.where(module_ids == m)[0] for m in range(geo.num_modules)]
+
+
+def legacy_split(collate_fn, batch, key):
+    """Splits one sparse tensor of a batch by module with one mask per
+    module, as was done before the single-pass implementation.
+
+    Parameters
+    ----------
+    collate_fn : CollateAll
+        Collate function (provides the geometry and the target module)
+    batch : List[dict]
+        One dictionary of data per entry in the batch
+    key : str
+        Sparse tensor key
+
+    Returns
+    -------
+    np.ndarray
+        Batched tensor
+    np.ndarray
+        Number of rows in each [batch, volume] pair
+    """
+    geo = collate_fn.geo
+    voxels_v, features_v = [], []
+    counts = np.empty(len(batch)*geo.num_modules, dtype=np.int64)
+    for s, sample in enumerate(batch):
+        voxels, features, meta = sample[key]
+        voxels_wrapped = meta.to_cm(voxels.reshape(-1, 3), center=True)
+        module_indexes = legacy_closest_module_indexes(geo, voxels_wrapped)
+        for module_id, module_index in enumerate(module_indexes):
+            if module_id != collate_fn.target_id:
+                voxels_wrapped[module_index] = geo.translate(
+                        voxels_wrapped[module_index], module_id,
+                        collate_fn.target_id)
+        voxels_wrapped = meta.to_px(voxels_wrapped, floor=True)
+        voxels = voxels_wrapped.reshape(-1, voxels.shape[1])
+
+        if voxels.shape[1] > 3:
+            num_points = voxels.shape[1]//3
+            free = np.ones(len(voxels), dtype=bool)
+            for m, module_index in enumerate(module_indexes):
+                mask = np.zeros(len(voxels_wrapped), dtype=bool)
+                mask[module_index] = True
+                mask = mask.reshape(-1, num_points).any(axis=1)
+                module_indexes[m] = np.where(free & mask)[0]
+                free[module_indexes[m]] = False
+
+        for m, module_index in enumerate(module_indexes):
+            voxels_v.append(voxels[module_index])
+            features_v.append(features[module_index])
+            counts[geo.num_modules*s + m] = len(module_index)
+
+    batch_ids = np.repeat(np.arange(len(counts)), counts)
+    tensor = np.hstack([batch_ids[:, None], np.concatenate(voxels_v),
+                        np.concatenate(features_v)])
+
+    return tensor, counts
+
+
+def generate_batch(collate_fn, batch_size, num_voxels, num_points, seed):
+    """Generates a dummy batch of sparse tensors spanning the detector.
+
+    Parameters
+    ----------
+    collate_fn : CollateAll
+        Collate function (provides the geometry)
+    batch_size : int
+        Number of entries in the batch
+    num_voxels : int
+        Average number of rows per entry
+    num_points : int
+        Number of points per row
+    seed : int
+        Random number generator seed
+
+    Returns
+    -------
+    List[dict]
+        One dictionary of data per entry in the batch
+    """
+    boundaries = collate_fn.geo.boundaries
+    lower = np.min(boundaries[..., 0], axis=(0, 1))
+    upper = np.max(boundaries[..., 1], axis=(0, 1))
+    size = np.full(3, 0.3)
+    count = np.ceil((upper - lower)/size).astype(np.int64)
+    meta = Meta(lower=lower, upper=lower + count*size, size=size, count=count)
+
+    rng = np.random.RandomState(seed)
+    batch = []
+    for size in rng.poisson(num_voxels, size=batch_size):
+        voxels = np.floor(rng.rand(size, 3*num_points)*np.tile(
+            meta.count, num_points)).astype(np.float32)
+        features = rng.rand(size, 2).astype(np.float32)
+        batch.append({'data': (voxels, features, meta)})
+
+    return batch
+
+
+def main(detector, num_batches, batch_size, num_voxels, num_points):
+    """Collates the same dummy batches with the legacy and the current split
+    implementations and reports the throughput of each of them.
+
+    Parameters
+    ----------
+    detector : str
+        Name of the detector to split the tensors by module
+    num_batches : int
+        Number of batches to collate
+    batch_size : int
+        Number of entries per batch
+    num_voxels : int
+        Average number of rows per entry
+    num_points : int
+        Number of points per row
+    """
+    # Generate the data once
+    collate_fn = CollateAll(split=True, detector=detector)
+    batches = [generate_batch(collate_fn, batch_size, num_voxels,
+                              num_points, i) for i in range(num_batches)]
+
+    # Check that both implementations agree
+    for batch in batches:
+        tensor, counts = legacy_split(collate_fn, batch, 'data')
+        result = collate_fn(batch)['data']
+        np.testing.assert_array_equal(result.counts, counts)
+        np.testing.assert_array_equal(
+                result.data, tensor.astype(result.data.dtype))
+
+    # Time each implementation
+    num_entries = num_batches*batch_size
+    print(f"\nSplitting {num_entries} entries ({num_batches} batches) "
+          f"across {collate_fn.geo.num_modules} modules:")
+    funcs = [('legacy', lambda batch: legacy_split(collate_fn, batch, 'data')),
+             ('current', collate_fn)]
+    for name, func in funcs:
+        start = time.time()
+        for batch in batches:
+            func(batch)
+        duration = time.time() - start
+
+        print(f"- {name:<8}: {num_entries/duration:>9.1f} entries/s, "
+              f"{1e3*duration/num_batches:>8.2f} ms/batch")
+
+
+if __name__ == "__main__":
+    # Parse the command-line arguments
+    parser = argparse.ArgumentParser(
+            description="Benchmark the split collation of sparse tensors")
+
+    parser.add_argument('--detector', '-d',
+                        help='Name of the detector to split the tensors by',
+                        type=str, default='icarus')
+    parser.add_argument('--num-batches', '-n',
+                        help='Number of batches to collate',
+                        type=int, default=20)
+    parser.add_argument('--batch-size', '-b',
+                        help='Number of entries per batch',
+                        type=int, default=4)
+    parser.add_argument('--num-voxels',
+                        help='Average number of rows per entry',
+                        type=int, default=100000)
+    parser.add_argument('--num-points',
+                        help='Number of points per row',
+                        type=int, default=1)
+
+    args = parser.parse_args()
+
+    # Execute the main function
+    main(args.detector, args.num_batches, args.batch_size, args.num_voxels,
+         args.num_points)
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""Benchmarks the lattice DBSCAN against sklearn's DBSCAN on voxel sets."""
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+from sklearn.cluster import DBSCAN
+
+# Add parent SPINE directory to the python path
+current_directory = os.path.dirname(os.path.abspath(__file__))
+current_directory = os.path.dirname(current_directory)
+sys.path.insert(0, current_directory)
+
+from spine.utils.dbscan import LatticeDBSCAN
+from spine.utils.point_break_clustering import PointBreakClusterer
+
+
+def generate_event(num_voxels, count, seed):
+    """Generates a synthetic set of voxels made up of straight segments
+    (tracks) and their end points.
+
+    Parameters
+    ----------
+    num_voxels : int
+        Approximate number of voxels in the event
+    count : int
+        Number of voxels along each axis of the image
+    seed : int
+        Random number generator seed
+
+    Returns
+    -------
+    np.ndarray
+        (N, 3) Voxel coordinates
+    np.ndarray
+        (P, 3) Segment end points
+    """
+    rng = np.random.RandomState(seed)
+    voxels, points = [], []
+    total = 0
+    while total < num_voxels:
+        # Draw a segment, voxelize it with some transverse spread
+        start = rng.uniform(0, count, size=3)
+        direction = rng.normal(size=3)
+        direction /= np.linalg.norm(direction)
+        length = rng.uniform(10, count/4)
+        steps = np.arange(0, length, 0.5)[:, None]
+        segment = start + steps*direction + rng.normal(0, 0.5, (len(steps), 3))
+        segment = np.unique(np.clip(
+            np.round(segment), 0, count - 1).astype(np.int64), axis=0)
+
+        voxels.append(segment)
+        points.extend([start, start + length*direction])
+        total += len(segment)
+
+    voxels = np.unique(np.vstack(voxels), axis=0).astype(np.float32)
+    voxels = voxels[rng.permutation(len(voxels))]
+    points = np.clip(np.vstack(points), 0, count - 1).astype(np.float32)
+
+    return voxels, points
+
+
+def main(sizes, count, eps, min_samples, num_repeat, skip_break):
+    """Clusters the same synthetic events with sklearn's and the lattice
+    DBSCAN implementations and reports the time taken by each of them.
+
+    Parameters
+    ----------
+    sizes : List[int]
+        Number of voxels in each event
+    count : int
+        Number of voxels along each axis of the image
+    eps : float
+        DBSCAN neighborhood radius
+    min_samples : int
+        Minimum number of neighbors of a core voxel
+    num_repeat : int
+        Number of times each event is clustered
+    skip_break : bool
+        If `True`, do not benchmark the point-masked clustering
+    """
+    sklearn = DBSCAN(eps=eps, min_samples=min_samples)
+    lattice = LatticeDBSCAN(eps=eps, min_samples=min_samples)
+    funcs = [('sklearn', lambda x, _: sklearn.fit(x).labels_),
+             ('lattice', lambda x, _: lattice.fit_predict(x))]
+    if not skip_break:
+        for algorithm in ['sklearn', 'lattice']:
+            clusterer = PointBreakClusterer(
+                    eps=eps, min_samples=min_samples, algorithm=algorithm)
+            funcs.append((f'break_{algorithm}', clusterer))
+
+    print(f"\nClustering events with eps={eps}, min_samples={min_samples}:")
+    for i, size in enumerate(sizes):
+        # Generate the event, check that both implementations agree
+        voxels, points = generate_event(size, count, i)
+        ref, res = [func(voxels, points) for _, func in funcs[:2]]
+        np.testing.assert_array_equal(res, ref)
+
+        # Time each implementation
+        print(f"- {len(voxels):>8} voxels:", end='')
+        for name, func in funcs:
+            start = time.time()
+            for _ in range(num_repeat):
+                func(voxels, points)
+            duration = (time.time() - start)/num_repeat
+            print(f"  {name} {1e3*duration:>9.2f} ms", end='')
+        print()
+
+
+if __name__ == "__main__":
+    # Parse the command-line arguments
+    parser = argparse.ArgumentParser(
+            description="Benchmark the lattice DBSCAN implementation")
+
+    parser.add_argument('--sizes', '-s',
+                        help='Number of voxels in each event',
+                        type=int, nargs='+',
+                        default=[10000, 100000, 1000000])
+    parser.add_argument('--count',
+                        help='Number of voxels along each axis of the image',
+                        type=int, default=768)
+    parser.add_argument('--eps',
+                        help='DBSCAN neighborhood radius',
+                        type=float, default=1.8)
+    parser.add_argument('--min-samples',
+                        help='Minimum number of neighbors of a core voxel',
+                        type=int, default=1)
+    parser.add_argument('--num-repeat', '-n',
+                        help='Number of times each event is clustered',
+                        type=int, default=3)
+    parser.add_argument('--skip-break',
+                        help='Do not benchmark the point-masked clustering',
+                        action='store_true')
+
+    args = parser.parse_args()
+
+    # Execute the main function
+    main(args.sizes, args.count, args.eps, args.min_samples,
+         args.num_repeat, args.skip_break)
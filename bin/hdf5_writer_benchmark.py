@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""Benchmarks the throughput of the HDF5 writer for several configurations."""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+import numpy as np
+
+# Add parent SPINE directory to the python path
+current_directory = os.path.dirname(os.path.abspath(__file__))
+current_directory = os.path.dirname(current_directory)
+sys.path.insert(0, current_directory)
+
+from spine.data import ObjectList, Particle
+from spine.io.write import HDF5Writer
+
+# List of (name, writer configuration) pairs to benchmark
+CONFIGS = [
+    ('unbuffered', {}),
+    ('buffered', {'buffer_size': 256}),
+    ('buffered_lzf', {'buffer_size': 256, 'compression': 'lzf'}),
+    ('buffered_gzip', {'buffer_size': 256, 'compression': 'gzip',
+                       'compression_opts': 4})
+]
+
+
+def generate_batch(batch_size, num_voxels, num_objects, seed):
+    """Generates a dummy batch of data similar to the output of the chain.
+
+    Parameters
+    ----------
+    batch_size : int
+        Number of entries in the batch
+    num_voxels : int
+        Average number of voxels per entry
+    num_objects : int
+        Average number of objects per entry
+    seed : int
+        Random number generator seed
+
+    Returns
+    -------
+    dict
+        Dictionary of data products
+    """
+    rng = np.random.RandomState(seed)
+    sizes = rng.poisson(num_voxels, size=batch_size)
+    counts = rng.poisson(num_objects, size=batch_size)
+
+    data = {'index': np.arange(seed*batch_size, (seed + 1)*batch_size)}
+    data['data'] = [rng.rand(s, 5).astype(np.float32) for s in sizes]
+    data['clusts'] = [ObjectList(
+        np.array_split(np.arange(s), max(c, 1)),
+        np.empty(0, dtype=np.int64)) for s, c in zip(sizes, counts)]
+    data['particles'] = [ObjectList(
+        [Particle(id=i) for i in range(c)], Particle()) for c in counts]
+
+    return data
+
+
+def main(num_batches, batch_size, num_voxels, num_objects):
+    """Writes the same dummy batches with each writer configuration and
+    reports the throughput of each of them.
+
+    Parameters
+    ----------
+    num_batches : int
+        Number of batches to write
+    batch_size : int
+        Number of entries per batch
+    num_voxels : int
+        Average number of voxels per entry
+    num_objects : int
+        Average number of objects per entry
+    """
+    # Generate the data once
+    batches = [generate_batch(
+        batch_size, num_voxels, num_objects, i) for i in range(num_batches)]
+    num_entries = num_batches*batch_size
+
+    # Loop over the writer configurations
+    print(f"\nWriting {num_entries} entries ({num_batches} batches):")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name, cfg in CONFIGS:
+            file_name = os.path.join(tmp_dir, f'{name}.h5')
+            writer = HDF5Writer(file_name, **cfg)
+
+            start = time.time()
+            for data in batches:
+                writer(dict(data))
+            writer.close()
+            duration = time.time() - start
+
+            size = os.path.getsize(file_name)/1e6
+            print(f"- {name:<15}: {num_entries/duration:>9.1f} entries/s, "
+                  f"{size:>8.2f} MB")
+
+
+if __name__ == "__main__":
+    # Parse the command-line arguments
+    parser = argparse.ArgumentParser(description="Benchmark the HDF5 writer")
+
+    parser.add_argument('--num-batches', '-n',
+                        help='Number of batches to write',
+                        type=int, default=100)
+    parser.add_argument('--batch-size', '-b',
+                        help='Number of entries per batch',
+                        type=int, default=4)
+    parser.add_argument('--num-voxels',
+                        help='Average number of voxels per entry',
+                        type=int, default=10000)
+    parser.add_argument('--num-objects',
+                        help='Average number of objects per entry',
+                        type=int, default=20)
+
+    args = parser.parse_args()
+
+    # Execute the main function
+    main(args.num_batches, args.batch_size, args.num_voxels, args.num_objects)
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""Fills the cache of parsed entries of a LArCV dataset."""
+
+import os
+import sys
+import argparse
+
+import yaml
+import numpy as np
+
+# Add parent SPINE directory to the python path
+current_directory = os.path.dirname(os.path.abspath(__file__))
+current_directory = os.path.dirname(current_directory)
+sys.path.insert(0, current_directory)
+
+from spine.io.factories import dataset_factory
+
+
+def main(config, cache_dir, num_workers, max_shard_size, size_key=None,
+         size_file=None):
+    """Parses every entry of the dataset of a configuration and stores them
+    in the cache directory of the dataset.
+
+    If requested, also stores the number of rows of one of the parsed data
+    products in each entry to a `.npy` file, to be used as the `size_file`
+    of the :class:`BucketBatchSampler`.
+
+    Parameters
+    ----------
+    config : str
+        Path to the configuration file
+    cache_dir : str
+        Directory in which to store the parsed entries. If not specified,
+        uses the `cache_dir` of the dataset configuration.
+    num_workers : int
+        Number of processes used to parse the entries
+    max_shard_size : int
+        Maximum number of entries per cache shard
+    size_key : str, optional
+        Name of the data product to count the rows of in each entry
+    size_file : str, optional
+        Path to the `.npy` file in which to store the size of each entry
+    """
+    # Load the configuration file
+    with open(config, 'r', encoding='utf-8') as cfg_yaml:
+        cfg = yaml.safe_load(cfg_yaml)
+
+    # Fetch the dataset configuration, set the cache directory
+    assert 'loader' in cfg.get('io', {}), (
+            "Must provide an `io.loader` block in the configuration.")
+    dataset_cfg = cfg['io']['loader']['dataset']
+    dataset_cfg.pop('prefetch', None)
+    if cache_dir is not None:
+        dataset_cfg['cache_dir'] = cache_dir
+    assert dataset_cfg.get('cache_dir', None) is not None, (
+            "Must provide a cache directory, either in the dataset "
+            "configuration or on the command line.")
+
+    # Initialize the dataset, fill its cache
+    dtype = cfg.get('base', {}).get('dtype', 'float32')
+    dataset = dataset_factory(dataset_cfg, dtype=dtype)
+    num_cached = len(dataset.cache)
+    print(f"Found {num_cached} cached entries in {dataset.cache.path}")
+
+    dataset.cache.fill(dataset, num_workers, max_shard_size)
+    print(f"Cached {len(dataset.cache) - num_cached} new entries")
+
+    # If requested, store the size of each entry in the input files (the
+    # entries which are not part of the dataset are given a size of -1)
+    if size_key is not None:
+        assert size_file is not None, (
+                "Must provide a `size_file` to store the sizes in.")
+        sizes = np.full(dataset.reader.num_entries, -1, dtype=np.int64)
+        sizes[dataset.reader.entry_index] = dataset.get_sizes(size_key)
+        np.save(size_file, sizes)
+        print(f"Stored the size of `{size_key}` in each entry to {size_file}")
+
+
+if __name__ == "__main__":
+    # Parse the command-line arguments
+    parser = argparse.ArgumentParser(
+            description="Fill the cache of parsed entries of a dataset")
+
+    parser.add_argument('--config', '-c',
+                        help='Path to the configuration file',
+                        type=str, required=True)
+    parser.add_argument('--cache-dir', '-d',
+                        help='Directory in which to store the parsed entries',
+                        type=str)
+    parser.add_argument('--num-workers', '-j',
+                        help='Number of processes used to parse the entries',
+                        type=int)
+    parser.add_argument('--max-shard-size',
+                        help='Maximum number of entries per cache shard',
+                        type=int, default=1000)
+    parser.add_argument('--size-key',
+                        help='Data product to count the rows of in each entry',
+                        type=str)
+    parser.add_argument('--size-file',
+                        help='Path to the file in which to store the sizes',
+                        type=str, default='sizes.npy')
+
+    args = parser.parse_args()
+
+    # Execute the main function
+    main(args.config, args.cache_dir, args.num_workers, args.max_shard_size,
+         args.size_key, args.size_file)
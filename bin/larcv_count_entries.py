@@ -1,13 +1,21 @@
 #!/usr/bin/env python3
 """Counts the number of events in a LArCV dataset."""
 
+import os
+import sys
 import argparse
 
-from ROOT import TFile # pylint: disable=E0611
+# Add parent SPINE directory to the python path
+current_directory = os.path.dirname(os.path.abspath(__file__))
+current_directory = os.path.dirname(current_directory)
+sys.path.insert(0, current_directory)
+
 from larcv import larcv # pylint: disable=W0611
 
+from spine.io.read.larcv_index import get_file_index
+
 
-def main(tree_name, source, source_list):
+def main(tree_name, source, source_list, cache_dir, num_workers):
     """Checks the number of entries in a file/list of files.
 
     Parameters
@@ -18,22 +26,26 @@ def main(tree_name, source, source_list):
         Path or list of paths to the input files
     source_list : str
         Path to a text file containing a list of data file paths
+    cache_dir : str
+        Directory in which to cache the entry counts of each file
+    num_workers : int
+        Number of processes used to scan the files
     """
     # If using source list, read it in
     if source_list is not None:
         with open(source_list, 'r', encoding='utf-8') as f:
             source = f.read().splitlines()
 
-    # Loop over the list of files in the input
-    total_entries = 0
+    # Count the entries in the trees of each file (in parallel, or from cache)
     print(f"\nCounting entries in {len(source)} file(s):")
-    for file_path in source:
-        # Count the number of entries in this file
-        f = TFile(file_path, 'r')
-        num_entries = getattr(f, f'{tree_name}_tree').GetEntries()
-        f.Close()
+    index = get_file_index(
+            source, cache_dir=cache_dir, num_workers=num_workers)
 
+    # Loop over the list of files in the input
+    total_entries = 0
+    for file_path, info in zip(source, index):
         # Dump number for this file, increment
+        num_entries = info['counts'][tree_name]
         print(f"- Counted {num_entries} entries in {file_path}")
         total_entries += num_entries
 
@@ -56,7 +68,15 @@ if __name__ == "__main__":
                        help='Path to a text file of data file paths',
                        type=str)
 
+    parser.add_argument('--cache-dir', '-c',
+                        help='Directory in which to cache the entry counts',
+                        type=str)
+    parser.add_argument('--num-workers', '-j',
+                        help='Number of processes used to scan the files',
+                        type=int)
+
     args = parser.parse_args()
 
     # Execture the main function
-    main(args.tree_name, args.source, args.source_list)
+    main(args.tree_name, args.source, args.source_list, args.cache_dir,
+         args.num_workers)
@@ -25,7 +25,8 @@ if os.getenv('FMATCH_BUILDDIR') is not None:
 from spine.main import run
 
 
-def main(config, source, source_list, output, n, nskip, detect_anomaly):
+def main(config, source, source_list, output, n, nskip, detect_anomaly,
+         num_procs):
     """Main driver for training/validation/inference/analysis.
 
     Performs these basic functions:
@@ -48,6 +49,8 @@ def main(config, source, source_list, output, n, nskip, detect_anomaly):
         Number of iterations to skip
     detect_anomaly : bool
         Whether to turn on anomaly detection in torch
+    num_procs : int
+        Number of CPU processes to split the entries between (inference only)
     """
     # Try to find configuration file using the absolute path or under
     # the 'config' directory of the parent SPINE repository
@@ -113,7 +116,7 @@ def main(config, source, source_list, output, n, nskip, detect_anomaly):
         cfg['base']['gpus'] = os.environ.get('CUDA_VISIBLE_DEVICES')
 
     # Execute train/validation process
-    run(cfg)
+    run(cfg, num_procs)
 
 
 if __name__ == '__main__':
@@ -149,8 +152,13 @@ if __name__ == '__main__':
                         help='Turns on autograd.detect_anomaly for debugging',
                         action='store_const', const=True)
 
+    parser.add_argument('--num-procs', '-j',
+                        help='Number of CPU processes to split the entries '
+                             'between (inference only, one output per process)',
+                        type=int)
+
     args = parser.parse_args()
 
     # Execute the main function
     main(args.config, args.source, args.source_list, args.output, args.n,
-         args.nskip, args.detect_anomaly)
+         args.nskip, args.detect_anomaly, args.num_procs)
@@ -3,7 +3,7 @@
 from abc import ABC, abstractmethod
 from warnings import warn
 
-from spine.io.write import CSVWriter
+from spine.io.write import CSVWriter, ParquetWriter
 
 
 class AnaBase(ABC):
@@ -37,7 +37,8 @@ class AnaBase(ABC):
     _run_modes = ('reco', 'truth', 'both', 'all')
 
     def __init__(self, obj_type=None, run_mode=None, append=False,
-                 overwrite=False, output_prefix=None):
+                 overwrite=False, output_prefix=None, output_format='csv',
+                 buffer_size=None):
         """Initialize default anlysis script object properties.
 
         Parameters
@@ -54,6 +55,14 @@ class AnaBase(ABC):
             If True and an output CSV file exists, overwrite it
         output_prefix : str, default None
             Name to prefix every output CSV file with
+        output_format : str, default 'csv'
+            Format of the output files ('csv' or 'parquet')
+        buffer_size : int, optional
+            Number of rows to hold in memory before writing them to file. If
+            not specified, uses the default of the writer (every row is
+            written as it comes for CSV files, 10000 rows per row group for
+            Parquet files). Larger buffers write faster, but the buffered
+            rows are lost if the process is killed before they are written
         """
         # Initialize default keys
         self.keys = {
@@ -107,11 +116,18 @@ class AnaBase(ABC):
         self.overwrite_file = overwrite
 
         # Initialize a writer dictionary to be filled by the children classes
+        assert output_format in ('csv', 'parquet'), (
+                f"`output_format` not recognized: {output_format}. Must be "
+                 "one of 'csv' or 'parquet'.")
+        assert output_format == 'csv' or not append, (
+                "Parquet files cannot be appended.")
         self.output_prefix = output_prefix
+        self.output_format = output_format
+        self.buffer_size = buffer_size
         self.writers = {}
 
     def initialize_writer(self, name):
-        """Adds a CSV writer to the list of writers for this script.
+        """Adds a writer to the list of writers for this script.
 
         Parameters
         ----------
@@ -120,14 +136,27 @@ class AnaBase(ABC):
         """
         # Define the name of the file to write to
         assert len(name) > 0, "Must provide a non-empty name."
-        file_name = f'{self.name}_{name}.csv'
+        file_name = f'{self.name}_{name}.{self.output_format}'
         if self.output_prefix is not None:
-            file_name = f'{self.output_prefix}_{file_name}.csv'
+            file_name = f'{self.output_prefix}_{file_name}'
 
         # Initialize the writer
-        self.writers[name] = CSVWriter(
-                file_name, append=self.append_file,
-                overwrite=self.overwrite_file)
+        kwargs = {}
+        if self.buffer_size is not None:
+            kwargs['buffer_size'] = self.buffer_size
+        if self.output_format == 'csv':
+            self.writers[name] = CSVWriter(
+                    file_name, append=self.append_file,
+                    overwrite=self.overwrite_file, **kwargs)
+        else:
+            self.writers[name] = ParquetWriter(
+                    file_name, overwrite=self.overwrite_file, **kwargs)
+
+    def close(self):
+        """Writes the rows buffered by the writers of this script to file and
+        closes them."""
+        for writer in self.writers.values():
+            writer.close()
 
     def get_base_dict(self, data):
         """Builds the entry information dictionary.
@@ -47,6 +47,21 @@ class AnaManager:
             # Append
             self.modules[k] = ana_script_factory(k, cfg[k], parent_path)
 
+    @property
+    def keys(self):
+        """Set of data products used by the analysis scripts.
+
+        Returns
+        -------
+        Set[str]
+            Set of data product keys
+        """
+        keys = set()
+        for module in self.modules.values():
+            keys.update(module.keys)
+
+        return keys
+
     def __call__(self, data):
         """Pass one batch of data through the analysis scripts
 
@@ -82,3 +97,9 @@ class AnaManager:
                                 f"The number {key} ({len(val)}) does not match "
                                 f"the number of entries ({num_entries}).")
                     data[key] = val
+
+    def close(self):
+        """Writes the rows buffered by the analysis scripts to file and closes
+        the output files."""
+        for module in self.modules.values():
+            module.close()
@@ -134,6 +134,30 @@ class BuildManager:
 
                 data.update(**match_dict)
 
+    @property
+    def keys(self):
+        """Set of data products the builders may use to build or to load
+        the representations.
+
+        Returns
+        -------
+        Set[str]
+            Set of data product keys
+        """
+        keys = {'index', 'meta'}
+        for alt_keys in self.sources.values():
+            keys.update(alt_keys)
+
+        for name, builder in self.builders.items():
+            keys.update([f'{name}_start_points', f'{name}_end_points'])
+            for mode, avoid in [('reco', 'truth'), ('truth', 'reco')]:
+                if builder.mode != avoid:
+                    keys.add(f'{mode}_{name}s')
+                    keys.update(getattr(builder, f'build_{mode}_keys'))
+                    keys.update(getattr(builder, f'load_{mode}_keys'))
+
+        return keys
+
     def build_sources(self, data, entry=None):
         """Construct the reference coordinate and value tensors used by
         all the representations built by the module.
@@ -199,19 +223,19 @@ class BuildManager:
             assert 'meta' in data, (
                     "Must provide metadata to build objects in cm.")
 
+            # The points extracted from the source tensors above are copies,
+            # convert them in place. The stored points must not be modified.
             meta = data['meta'][entry] if entry is not None else data['meta']
             for key in update:
-                if 'points' in key and key in update:
-                    if key in update:
-                        update[key] = meta.to_cm(
-                                np.copy(update[key]), center=True)
+                if 'points' in key:
+                    inplace = not key.endswith(('_start_points', '_end_points'))
+                    update[key] = meta.to_cm(
+                            update[key], center=True, inplace=inplace)
 
             for key in ['particles', 'neutrinos']:
                 if key in sources:
                     update[key] = sources[key]
-                    for obj in sources[key]:
-                         if obj.units != self.units:
-                             obj.to_cm(meta)
+                    meta.objects_to_cm(sources[key])
 
         return update
 
@@ -10,3 +10,5 @@ from .trigger import *
 from .meta import *
 from .run_info import *
 from .list import *
+from .codec import *
+from .table import *
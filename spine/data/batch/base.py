@@ -205,5 +205,10 @@ class BatchBase:
     def _to_numpy(self, x):
         return x.cpu().detach().numpy()
 
-    def _to_tensor(self, x, dtype=None, device=None):
-        return torch.as_tensor(x, dtype=dtype, device=device)
+    def _to_tensor(self, x, dtype=None, device=None, non_blocking=False):
+        if not non_blocking:
+            return torch.as_tensor(x, dtype=dtype, device=device)
+
+        # Copy to page-locked memory, from which the copy can be asynchronous
+        return torch.as_tensor(x).pin_memory().to(
+                device=device, dtype=dtype, non_blocking=True)
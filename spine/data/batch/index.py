@@ -214,6 +214,21 @@ class IndexBatch(BatchBase):
 
             return self._as_long(full_counts)
 
+    @property
+    def single_edges(self):
+        """Returns the boundaries of each index in the full index.
+
+        Together with :meth:`full_index`, this provides a compressed sparse
+        row (CSR) representation of the index list: the elements of index `i`
+        are `full_index[single_edges[i]:single_edges[i+1]]`.
+
+        Returns
+        -------
+        Union[np.ndarray, torch.Tensor]
+            (I + 1) Boundaries of each index in the full index
+        """
+        return self.get_edges(self.single_counts)
+
     @property
     def batch_ids(self):
         """Returns the batch ID of each index in the list.
@@ -175,7 +175,7 @@ class TensorBatch(BatchBase):
                            has_batch_col=self.has_batch_col, 
                            coord_cols=self.coord_cols)
 
-    def to_tensor(self, dtype=None, device=None):
+    def to_tensor(self, dtype=None, device=None, non_blocking=False):
         """Cast underlying tensor to a `torch.tensor` and return a new instance.
 
         Parameters
@@ -184,6 +184,9 @@ class TensorBatch(BatchBase):
             Data type of the tensor to create
         device : torch.device, optional
             Device on which to put the tensor
+        non_blocking : bool, default False
+            If `True`, pin the host memory and copy it to the device
+            asynchronously with respect to the host
 
         Returns
         -------
@@ -194,8 +197,8 @@ class TensorBatch(BatchBase):
         if not self.is_numpy:
             return self
 
-        data = self._to_tensor(self.data, dtype, device)
-        counts = self._to_tensor(self.counts, dtype, device)
+        data = self._to_tensor(self.data, dtype, device, non_blocking)
+        counts = self._to_tensor(self.counts, dtype, device, non_blocking)
 
         return TensorBatch(data, counts, 
                            has_batch_col=self.has_batch_col, 
@@ -0,0 +1,128 @@
+"""Module with a class which converts lists of data objects to and from
+structured arrays, one column per object attribute.
+
+This is the format in which objects are stored in HDF5 files.
+"""
+
+from operator import attrgetter
+
+import numpy as np
+
+from .list import LazyObjectList
+
+__all__ = ['ObjectCodec']
+
+
+class ObjectCodec:
+    """Columnar codec for one data class.
+
+    Packs a whole list of objects into a structured array in one go and
+    unpacks structured arrays into lists of objects which are only built
+    when they are accessed.
+
+    Attributes
+    ----------
+    obj_class : type
+        Data class to encode/decode
+    dtype : np.dtype
+        Structured data type of the stored objects
+    names : List[str]
+        Names of the stored attributes
+    default : object
+        Default object used to type empty object lists
+    """
+
+    def __init__(self, obj_class, dtype):
+        """Initialize the codec.
+
+        Parameters
+        ----------
+        obj_class : type
+            Data class to encode/decode
+        dtype : Union[np.dtype, list]
+            Structured data type of the stored objects, or list of
+            (key, dtype) pairs to build it from
+        """
+        # Store the class and the data type
+        self.obj_class = obj_class
+        self.dtype = np.dtype(dtype)
+        self.names = self.dtype.names
+        self.default = obj_class()
+
+        # Build a getter which fetches all the stored attributes at once
+        self._getter = attrgetter(*self.names)
+
+        # Identify the columns which must be filled one element at a time
+        # (variable-length arrays and strings are stored as objects)
+        self._object_names = [
+                name for name in self.names if self.dtype[name].kind == 'O']
+
+    def encode(self, objects):
+        """Packs a list of objects into a structured array.
+
+        Parameters
+        ----------
+        objects : List[object]
+            (N) List of objects to pack
+
+        Returns
+        -------
+        np.ndarray
+            (N) Structured array with one row per object
+        """
+        # Fetch the attributes of every object
+        array = np.empty(len(objects), dtype=self.dtype)
+        if not len(objects):
+            return array
+
+        if len(self.names) > 1:
+            columns = zip(*[self._getter(obj) for obj in objects])
+        else:
+            columns = [[self._getter(obj) for obj in objects]]
+
+        # Fill the structured array column by column. Object columns are
+        # filled element-wise to avoid broadcasting arrays of equal lengths.
+        for name, column in zip(self.names, columns):
+            if name in self._object_names:
+                target = array[name]
+                for i, value in enumerate(column):
+                    target[i] = value
+            else:
+                array[name] = column
+
+        return array
+
+    def decode(self, array):
+        """Unpacks a structured array into a list of objects.
+
+        The objects are not built until they are accessed.
+
+        Parameters
+        ----------
+        array : np.ndarray
+            (N) Structured array with one row per object
+
+        Returns
+        -------
+        LazyObjectList
+            (N) List of objects
+        """
+        return LazyObjectList(array, self.build, self.default)
+
+    def build(self, columns, index):
+        """Builds one object from the columns of a structured array.
+
+        Parameters
+        ----------
+        columns : List[np.ndarray]
+            List of columns of the structured array, one per attribute
+        index : int
+            Index of the row corresponding to the object to build
+
+        Returns
+        -------
+        object
+            Object instance
+        """
+        return self.obj_class(
+                **{name: col[index] for name, col in zip(self.names, columns)})
@@ -1,6 +1,6 @@
 """Module with a class object which represent object lists."""
 
-__all__ = ['ObjectList']
+__all__ = ['ObjectList', 'LazyObjectList']
 
 
 class ObjectList(list):
@@ -27,3 +27,213 @@ class ObjectList(list):
 
         # Store the default object class
         self.default = default
+
+
+class LazyObjectList(ObjectList):
+    """Object list which builds its elements when they are first accessed.
+
+    The list is backed by a structured array with one row per object. Any
+    operation which modifies the list or inspects all of its elements at
+    once builds all the objects first.
+
+    Until an object is built, the underlying list holds a placeholder which
+    builds it on attribute access. Code which reads the underlying list
+    directly (e.g. `list.__getitem__`) therefore still sees usable objects.
+
+    Attributes
+    ----------
+    array : np.ndarray
+        (N) Structured array with one row per object
+    builder : callable
+        Function which builds one object from the columns of the array
+    """
+
+    def __init__(self, array, builder, default):
+        """Initialize the list, the underlying array and the default value.
+
+        Parameters
+        ----------
+        array : np.ndarray
+            (N) Structured array with one row per object
+        builder : callable
+            Function which builds one object given the list of columns of
+            the array and the index of the row to build it from
+        default : object
+            Default object class to use to type the list, if it is empty
+        """
+        # Initialize the underlying list with placeholders
+        super().__init__(
+                [_LazyObject(self, i) for i in range(len(array))], default)
+
+        # Store the array and the builder
+        self.array = array
+        self.builder = builder
+        self._columns = None
+        self._built = [False]*len(array)
+        self._num_built = 0
+
+    def build(self, index):
+        """Builds one object of the list, if it is not built yet.
+
+        Parameters
+        ----------
+        index : int
+            Index of the object to build
+
+        Returns
+        -------
+        object
+            Object instance
+        """
+        if not self._built[index]:
+            if self._columns is None:
+                self._columns = [
+                        self.array[name] for name in self.array.dtype.names]
+            super().__setitem__(index, self.builder(self._columns, index))
+            self._built[index] = True
+            self._num_built += 1
+
+        return super().__getitem__(index)
+
+    @property
+    def materialized(self):
+        """Whether all the objects in the list have been built or not.
+
+        Returns
+        -------
+        bool
+            `True` if all the objects of the list are built
+        """
+        return self._num_built == len(self._built)
+
+    def materialize(self):
+        """Builds all the objects of the list."""
+        if not self.materialized:
+            for i in range(len(self._built)):
+                self.build(i)
+
+    def __getitem__(self, index):
+        """Fetch one object (or a slice of objects) of the list."""
+        if isinstance(index, slice):
+            if self.materialized:
+                return ObjectList(super().__getitem__(index), self.default)
+
+            return ObjectList(
+                    [self.build(i) for i in range(*index.indices(len(self)))],
+                    self.default)
+
+        if self.materialized:
+            return super().__getitem__(index)
+
+        return self.build(range(len(self))[index])
+
+    def __iter__(self):
+        """Iterate over the objects of the list."""
+        if self.materialized:
+            return super().__iter__()
+
+        return (self.build(i) for i in range(len(self)))
+
+    def __radd__(self, other):
+        self.materialize()
+        return other + list.copy(self)
+
+    def __reversed__(self):
+        self.materialize()
+        return super().__reversed__()
+
+    def __reduce__(self):
+        self.materialize()
+        return ObjectList, (list.copy(self), self.default)
+
+    def __reduce_ex__(self, protocol):
+        return self.__reduce__()
+
+    def __copy__(self):
+        self.materialize()
+        return ObjectList(list.copy(self), self.default)
+
+    def copy(self):
+        return self.__copy__()
+
+
+class _LazyObject:
+    """Placeholder of an object of a :class:`LazyObjectList` which is not
+    built yet.
+
+    Accessing (or setting) any attribute of the placeholder builds the object
+    in the list and forwards the access to it.
+    """
+    __slots__ = ('_list', '_index')
+
+    def __init__(self, lazy_list, index):
+        """Stores the list the object belongs to and its position in it.
+
+        Parameters
+        ----------
+        lazy_list : LazyObjectList
+            List the object belongs to
+        index : int
+            Index of the object in the list
+        """
+        object.__setattr__(self, '_list', lazy_list)
+        object.__setattr__(self, '_index', index)
+
+    @property
+    def _obj(self):
+        """Object this placeholder stands for, built on first access."""
+        return self._list.build(self._index)
+
+    @property
+    def __class__(self):
+        return type(self._obj)
+
+    def __getattr__(self, name):
+        return getattr(self._obj, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._obj, name, value)
+
+    def __delattr__(self, name):
+        delattr(self._obj, name)
+
+    def __eq__(self, other):
+        return self._obj == other
+
+    def __ne__(self, other):
+        return self._obj != other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(self._obj)
+
+    def __reduce_ex__(self, protocol):
+        return self._obj.__reduce_ex__(protocol)
+
+
+def _materialize_first(name):
+    """Wraps a list method so that all the objects are built beforehand.
+
+    Parameters
+    ----------
+    name : str
+        Name of the list method to wrap
+    """
+    method = getattr(list, name)
+    def wrapper(self, *args, **kwargs):
+        self.materialize()
+        return method(self, *args, **kwargs)
+
+    wrapper.__name__ = name
+    wrapper.__doc__ = method.__doc__
+
+    return wrapper
+
+
+for _name in ['__setitem__', '__delitem__', '__iadd__', '__imul__',
+              '__add__', '__mul__', '__rmul__', '__eq__', '__ne__', '__lt__',
+              '__le__', '__gt__', '__ge__', '__contains__', '__repr__',
+              'append', 'extend', 'insert', 'pop', 'remove', 'clear',
+              'sort', 'reverse', 'index', 'count']:
+    setattr(LazyObjectList, _name, _materialize_first(_name))
@@ -82,7 +82,7 @@ class Meta(DataBase):
 
         return np.dot(coords, mult).astype(np.int64)
 
-    def to_cm(self, coords, center=False):
+    def to_cm(self, coords, center=False, inplace=False):
         """Converts pixel coordinates to detector coordinates in cm.
 
         Parameters
@@ -92,15 +92,25 @@ class Meta(DataBase):
         center : bool, default False
             If `True`, offset the input coordinates by half a pixel size. This
             makes sense to provide unbiased coordinates when converting indexes.
+        inplace : bool, default False
+            If `True`, overwrite the input coordinates (must be floats) rather
+            than allocating a new array
 
         Returns
         -------
         np.ndarray
             Detector coordinates in cm
         """
+        if inplace:
+            if center:
+                coords += .5
+            coords *= self.size
+            coords += self.lower
+            return coords
+
         return self.lower + (coords + .5*center)*self.size
 
-    def to_px(self, coords, floor=False):
+    def to_px(self, coords, floor=False, inplace=False):
         """Converts detector coordinates in cm to pixel coordinates.
 
         Parameters
@@ -109,17 +119,103 @@ class Meta(DataBase):
             (N, 2/3) Input detector coordinates
         floor : bool, default False
             If `True`, converts pixel coordinates to indexes (floor function)
+        inplace : bool, default False
+            If `True`, overwrite the input coordinates (must be floats) rather
+            than allocating a new array
 
         Returns
         -------
         np.ndarray
             Pixel coordinates
         """
+        if inplace:
+            coords -= self.lower
+            coords /= self.size
+            if floor:
+                np.floor(coords, out=coords)
+            return coords
+
         if floor:
             return np.floor((coords - self.lower)/self.size)
 
         return (coords - self.lower)/self.size
 
+    def objects_to_cm(self, objects):
+        """Converts the positional attributes of a list of objects to cm.
+
+        Objects which are already expressed in cm are left untouched.
+
+        Parameters
+        ----------
+        objects : Union[List[PosDataBase], ObjectTable]
+            List of objects with positional attributes
+        """
+        self.convert_objects(objects, 'cm')
+
+    def objects_to_px(self, objects):
+        """Converts the positional attributes of a list of objects to pixels.
+
+        Objects which are already expressed in pixels are left untouched.
+
+        Parameters
+        ----------
+        objects : Union[List[PosDataBase], ObjectTable]
+            List of objects with positional attributes
+        """
+        self.convert_objects(objects, 'px')
+
+    def convert_objects(self, objects, units):
+        """Converts the positional attributes of a list of objects.
+
+        The objects are grouped by class. The values of each positional
+        attribute are converted for all the objects of a class at once.
+
+        Parameters
+        ----------
+        objects : Union[List[PosDataBase], ObjectTable]
+            List of objects with positional attributes
+        units : str
+            Units to convert the positional attributes to, one of 'cm' or 'px'
+        """
+        assert units in ['cm', 'px'], "Units can only be `cm` or `px`."
+        func = self.to_cm if units == 'cm' else self.to_px
+
+        # If the objects are stored in a table, convert its columns
+        if hasattr(objects, 'convert'):
+            index = np.where(objects.array['units'] != units)[0]
+            if len(index):
+                objects.convert(func, units, index)
+            return
+
+        # Group the objects to convert by class
+        groups = {}
+        for obj in objects:
+            if obj.units != units:
+                groups.setdefault(type(obj), []).append(obj)
+
+        # Convert each positional attribute of each class at once
+        for obj_class, group in groups.items():
+            for attr in obj_class._pos_attrs:
+                values = [getattr(obj, attr) for obj in group]
+                if all(np.shape(v) == (self.dimension,) for v in values):
+                    # Single point per object, convert them as one array
+                    for obj, point in zip(group, func(np.array(values))):
+                        setattr(obj, attr, point)
+
+                else:
+                    # Multiple points per object, convert their concatenation
+                    sizes = [np.size(v)//self.dimension for v in values]
+                    coords = func(np.concatenate(
+                        [np.reshape(v, (-1, self.dimension)) for v in values]))
+                    offsets = np.cumsum([0] + sizes)
+                    for i, obj in enumerate(group):
+                        setattr(obj, attr, coords[
+                            offsets[i]:offsets[i+1]].reshape(
+                                np.shape(values[i])))
+
+            for obj in group:
+                obj.units = units
+
     @classmethod
     def from_larcv(cls, meta):
         """Builds and returns a Meta object from a LArCV 2D metadata object.
@@ -0,0 +1,300 @@
+"""Module with classes which store lists of data objects column by column.
+
+An object table holds one array per object attribute (fixed-length attributes
+such as positions are stored as (N, 3) arrays) instead of one Python object
+per element. It can be filled and modified column by column, while still
+behaving like a list of objects for the code which expects one: each object
+is only built when it is first accessed.
+"""
+
+from warnings import warn
+
+import numpy as np
+
+from .list import LazyObjectList
+from .codec import ObjectCodec
+from .particle import Particle
+
+__all__ = ['ObjectTable', 'ParticleTable']
+
+
+class ObjectTable(LazyObjectList):
+    """Columnar list of data objects of one class.
+
+    The columns are the fields of a structured array with one row per object.
+    Objects built from the table (on access) share their fixed-length
+    attributes with the table. Column-wise operations are reflected onto
+    the objects which have already been built.
+
+    Attributes
+    ----------
+    obj_class : type
+        Data class of the objects stored in the table
+    """
+    obj_class = None
+
+    def __init__(self, array):
+        """Initialize the table from its underlying structured array.
+
+        Parameters
+        ----------
+        array : np.ndarray
+            (N) Structured array with one row per object
+        """
+        codec = self.get_codec()
+        super().__init__(array, codec.build, codec.default)
+
+    @classmethod
+    def get_codec(cls):
+        """Returns the codec which converts objects to and from table rows.
+
+        The codec is built once per table class.
+
+        Returns
+        -------
+        ObjectCodec
+            Object codec
+        """
+        if '_codec' not in cls.__dict__:
+            cls._codec = ObjectCodec(cls.obj_class, cls.get_dtype())
+
+        return cls._codec
+
+    @classmethod
+    def get_dtype(cls):
+        """Builds the structured data type of the table from the attributes
+        of a default object.
+
+        Strings and variable-length arrays are stored as objects.
+
+        Returns
+        -------
+        List[tuple]
+            List of (key, dtype) or (key, dtype, shape) pairs
+        """
+        obj = cls.obj_class()
+        dtype = []
+        for key, val in obj.as_dict().items():
+            if key in obj.fixed_length_attrs:
+                dtype.append((key, val.dtype, len(val)))
+            elif isinstance(val, (str, np.ndarray)):
+                dtype.append((key, object))
+            else:
+                dtype.append((key, type(val)))
+
+        return dtype
+
+    @classmethod
+    def empty(cls, size):
+        """Builds a table of default objects.
+
+        Parameters
+        ----------
+        size : int
+            Number of objects in the table
+
+        Returns
+        -------
+        ObjectTable
+            Table of default objects
+        """
+        codec = cls.get_codec()
+        array = np.empty(size, dtype=codec.dtype)
+        array[:] = codec.encode([codec.default])[0]
+
+        return cls(array)
+
+    @classmethod
+    def from_objects(cls, objects):
+        """Builds a table from a list of objects.
+
+        Parameters
+        ----------
+        objects : List[object]
+            List of objects
+
+        Returns
+        -------
+        ObjectTable
+            Table of objects
+        """
+        return cls(cls.get_codec().encode(objects))
+
+    @property
+    def built_index(self):
+        """Index of the rows which have been built as objects.
+
+        Returns
+        -------
+        np.ndarray
+            Index of the built rows
+        """
+        return np.where(self._built)[0]
+
+    def sync(self):
+        """Writes the objects which have been built back into the table,
+        in case they were modified."""
+        # If objects were added to or removed from the list (which builds all
+        # of them first), rebuild the table from scratch
+        if len(self) != len(self.array):
+            self.array = self.get_codec().encode(list(list.__iter__(self)))
+            self._columns = None
+            self._built = [True]*len(self)
+            self._num_built = len(self)
+            return
+
+        index = self.built_index
+        if len(index):
+            objects = [list.__getitem__(self, i) for i in index]
+            self.array[index] = self.get_codec().encode(objects)
+
+    def set_column(self, name, values, index=None):
+        """Sets the value of one attribute for a subset of the objects.
+
+        Parameters
+        ----------
+        name : str
+            Name of the attribute
+        values : Union[np.ndarray, object]
+            Values of the attribute
+        index : np.ndarray, optional
+            Index of the rows to modify. If not specified, modifies all rows
+        """
+        index = slice(None) if index is None else index
+        self.array[name][index] = values
+
+        # Propagate the values to the objects which are already built
+        built_index = self.built_index
+        if len(built_index):
+            rows = np.zeros(len(self), dtype=bool)
+            rows[index] = True
+            column = self.array[name]
+            for i in built_index[rows[built_index]]:
+                setattr(list.__getitem__(self, i), name, column[i])
+
+    def to_cm(self, meta, index=None):
+        """Converts the coordinates of the positional attributes to cm.
+
+        Parameters
+        ----------
+        meta : Meta
+            Metadata information about the rasterized image
+        index : np.ndarray, optional
+            Index of the rows to convert. If not specified, converts all rows
+        """
+        self.convert(meta.to_cm, 'cm', index)
+
+    def to_px(self, meta, index=None):
+        """Converts the coordinates of the positional attributes to pixel.
+
+        Parameters
+        ----------
+        meta : Meta
+            Metadata information about the rasterized image
+        index : np.ndarray, optional
+            Index of the rows to convert. If not specified, converts all rows
+        """
+        self.convert(meta.to_px, 'px', index)
+
+    def convert(self, func, units, index=None):
+        """Converts the coordinates of the positional attributes, one
+        attribute at a time.
+
+        Parameters
+        ----------
+        func : callable
+            Function which converts an array of coordinates
+        units : str
+            Units in which the coordinates are converted
+        index : np.ndarray, optional
+            Index of the rows to convert. If not specified, converts all rows
+        """
+        # Make sure the rows are not already expressed in the target units
+        self.sync()
+        index = slice(None) if index is None else index
+        assert np.all(self.array['units'][index] != units), (
+                f"Units already expressed in {units}")
+
+        # Convert all the relevant attributes
+        for attr in self.obj_class._pos_attrs:
+            self.set_column(attr, func(self.array[attr][index]), index)
+        self.set_column('units', units, index)
+
+    def __reduce__(self):
+        """Pickles the table column by column, rather than object by object."""
+        self.sync()
+        return self.__class__, (self.array,)
+
+    def __copy__(self):
+        self.sync()
+        return self.__class__(self.array.copy())
+
+
+class ParticleTable(ObjectTable):
+    """Columnar list of :class:`Particle` objects."""
+    obj_class = Particle
+
+    @classmethod
+    def from_larcv(cls, particles, skip_empty=False):
+        """Builds a table from a list of LArCV Particle objects.
+
+        Parameters
+        ----------
+        particles : List[larcv.Particle]
+            List of LArCV-format particle objects
+        skip_empty : bool, default False
+            Do not read the truth information corresponding to empty
+            particles (keep a default row in their place)
+
+        Returns
+        -------
+        ParticleTable
+            Table of particle objects
+        """
+        # Initialize a table of default particles
+        table = cls.empty(len(particles))
+        if not len(particles):
+            return table
+
+        # List the attributes to load, check that they are available
+        keys = [prefix + key for prefix in ['', 'parent_', 'ancestor_']
+                for key in ['track_id', 'pdg_code', 'creation_process', 't']]
+        for key in ['id', 'gen_id', 'group_id', 'interaction_id', 'parent_id',
+                    'mct_index', 'mcst_index', 'num_voxels', 'shape',
+                    'energy_init', 'energy_deposit', 'distance_travel',
+                    'momentum', 'end_momentum']:
+            if not hasattr(particles[0], key):
+                warn(f"The LArCV Particle object is missing the {key} "
+                      "attribute. It will miss from the Particle object.")
+            elif 'momentum' not in key:
+                keys.append(key)
+
+        mom_keys = [prefix for prefix in ['', 'end_']
+                    if hasattr(particles[0], f'{prefix}momentum')]
+
+        # Fill the columns, one particle at a time
+        columns = {name: table.array[name] for name in table.array.dtype.names}
+        for i, particle in enumerate(particles):
+            if (skip_empty and particle.num_voxels() < 1 and
+                particle.id() != particle.group_id()):
+                continue
+
+            for key in keys:
+                columns[key][i] = getattr(particle, key)()
+            for key in Particle._pos_attrs:
+                vector = getattr(particle, key)()
+                columns[key][i] = vector.x(), vector.y(), vector.z()
+            for prefix in mom_keys:
+                columns[f'{prefix}momentum'][i] = (
+                        getattr(particle, f'{prefix}px')(),
+                        getattr(particle, f'{prefix}py')(),
+                        getattr(particle, f'{prefix}pz')())
+            columns['children_id'][i] = np.asarray(
+                    particle.children_id(), dtype=int)
+
+        # Compute the derived attributes
+        for prefix in ['', 'end_']:
+            columns[f'{prefix}p'][:] = np.linalg.norm(
+                    columns[f'{prefix}momentum'], axis=1)
+
+        return table
@@ -22,7 +22,10 @@ import numpy as np
 import torch
 
 from .io import loader_factory, reader_factory, writer_factory
-from .io.write import CSVWriter
+from .io.write import CSVWriter, BackgroundWriter
+from .io.read import PrefetchReader
+from .io.sample import set_loader_epoch
+from .model.transfer import StagedIterator
 
 from .utils.logger import logger
 from .utils.numba_local import seed as numba_seed
@@ -134,6 +137,43 @@ class Driver:
             self.watch.initialize('ana')
             self.ana = AnaManager(ana)
 
+        # If requested, restrict the data products loaded by the reader
+        if self.auto_keys:
+            self.reader.process_keys(self.get_used_keys(io.get('writer')))
+
+    def get_used_keys(self, writer=None):
+        """Gathers the data products used by the builders, post-processors,
+        analysis scripts and the writer.
+
+        Parameters
+        ----------
+        writer : dict, optional
+            Writer configuration dictionary
+
+        Returns
+        -------
+        Set[str]
+            Set of data product keys
+        """
+        # Writers which store every key need the reader to load everything
+        assert writer is None or writer.get('keys', None) is not None, (
+                "Cannot derive the list of keys to load automatically if the "
+                "writer stores every data product. Provide a list of `keys` "
+                "to the writer.")
+
+        # Fetch the keys
+        keys = {'index', 'file_index', 'file_entry_index', 'run_info'}
+        for module in [self.builder, self.post, self.ana]:
+            if module is not None:
+                keys.update(module.keys)
+        if writer is not None:
+            keys.update(writer['keys'])
+
+        logger.info("Only loading the following keys from file: %s\n",
+                    ', '.join(sorted(keys)))
+
+        return keys
+
     def __len__(self):
         """Returns the number of events in the underlying reader object."""
         return len(self.reader)
@@ -309,6 +349,7 @@ class Driver:
         self.unwrap = unwrap
         self.seed = seed
         self.log_step = log_step
+        self.shard_id = None
 
         return train
 
@@ -320,9 +361,14 @@ class Driver:
         loader : dict, optional
             PyTorch DataLoader configuration dictionary
         reader : dict, optional
-            Reader configuration dictionary
+            Reader configuration dictionary. If it contains `keys: auto`,
+            the reader only loads the data products used by the builders,
+            post-processors, analysis scripts and writer. If it contains
+            `prefetch`, the next entries are read ahead in background threads.
         writer : dict, optional
-            Writer configuration dictionary
+            Writer configuration dictionary. If it contains
+            `asynchronous: true`, the writer is run in a background thread
+            which is fed through a queue of at most `queue_size` batches.
         """
         # Make sure that we have either a data loader or a reader, not both
         assert (loader is not None) ^ (reader is not None), (
@@ -330,6 +376,8 @@ class Driver:
 
         # Initialize the data loader/reader
         self.loader = None
+        self.loader_iter = None
+        self.auto_keys = False
         if loader is not None:
             # Initialize the torch data loader
             self.watch.initialize('load')
@@ -337,7 +385,6 @@ class Driver:
                     **loader, rank=self.rank, dtype=self.dtype,
                     world_size=self.world_size, distributed=self.distributed)
 
-            self.loader_iter = None
             self.iter_per_epoch = len(self.loader)
             self.reader = self.loader.dataset.reader
 
@@ -352,9 +399,19 @@ class Driver:
                 self.unwrapper = Unwrapper(geometry=geo)
 
         else:
-            # Initialize the reader
+            # Initialize the reader. If the keys to load are to be derived
+            # automatically, load everything until the modules are known
             self.watch.initialize('read')
+            reader = dict(reader)
+            if reader.get('keys', None) == 'auto':
+                reader.pop('keys')
+                self.auto_keys = True
+            prefetch = reader.pop('prefetch', None)
             self.reader = reader_factory(reader)
+            if prefetch is not None:
+                if not isinstance(prefetch, dict):
+                    prefetch = {'num_prefetch': prefetch}
+                self.reader = PrefetchReader(self.reader, **prefetch)
             self.iter_per_epoch = len(self.reader)
 
         # Initialize the data writer, if provided
@@ -362,8 +419,15 @@ class Driver:
         if writer is not None:
             assert self.loader is None or self.unwrap, (
                     "Must unwrap the model output to write it to file.")
-            self.watch.initialize('write')
+            writer = dict(writer)
+            asynchronous = writer.pop('asynchronous', False)
+            queue_size = writer.pop('queue_size', 4)
             self.writer = writer_factory(writer)
+            if not asynchronous:
+                self.watch.initialize('write')
+            else:
+                self.watch.initialize('write_wait')
+                self.writer = BackgroundWriter(self.writer, queue_size)
 
         # If requested, extract the name of the input file to prefix logs
         if self.prefix_log:
@@ -403,6 +467,11 @@ class Driver:
         if self.prefix_log:
             log_name = f'{self.log_prefix}_{log_name}'
 
+        # If this driver processes one shard of the entries, tag its log
+        if self.shard_id is not None:
+            stem, ext = os.path.splitext(log_name)
+            log_name = f'{stem}_rank{self.shard_id}{ext}'
+
         # Initialize the log
         log_path = os.path.join(self.log_dir, log_name)
         self.logger = CSVWriter(log_path, overwrite=self.overwrite_log)
@@ -422,29 +491,70 @@ class Driver:
             start_iteration = self.model.start_iteration
 
         # Loop and process each iteration
-        for iteration in range(start_iteration, self.iterations):
-            # When switching to a new epoch, reset the loader iterator
-            if (self.loader is not None and
-                (self.loader_iter is None or
-                 iteration%self.iter_per_epoch == 0)):
-                if self.distributed:
-                    epoch_cnt = iteration//self.iter_per_epoch
-                    self.loader.sampler.set_epoch(epoch_cnt)
-                self.loader_iter = iter(self.loader)
-
-            # Update the epoch counter, record the execution date/time
-            epoch = (iteration + 1)/self.iter_per_epoch
-            tstamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-
-            # Process one batch/entry of data
-            entry = iteration if self.loader is None else None
-            data = self.process(entry=entry, iteration=iteration)
-
-            # Log the output
-            self.log(data, tstamp, iteration, epoch)
-
-            # Release the memory for the next iteration
-            data = None
+        try:
+            for iteration in range(start_iteration, self.iterations):
+                # When switching to a new epoch, reset the loader iterator
+                if (self.loader is not None and
+                    (self.loader_iter is None or
+                     iteration%self.iter_per_epoch == 0)):
+                    if self.distributed:
+                        epoch_cnt = iteration//self.iter_per_epoch
+                        set_loader_epoch(self.loader, epoch_cnt)
+                    self.reset_loader_iter()
+
+                # Update the epoch counter, record the execution date/time
+                epoch = (iteration + 1)/self.iter_per_epoch
+                tstamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+                # Process one batch/entry of data
+                entry = iteration if self.loader is None else None
+                data = self.process(entry=entry, iteration=iteration)
+
+                # Log the output
+                self.log(data, tstamp, iteration, epoch)
+
+                # Release the memory for the next iteration
+                data = None
+
+        except BaseException:
+            # Close the outputs even if the loop was interrupted, but let
+            # the error of the loop through
+            self.close(raise_errors=False)
+            raise
+
+        self.close()
+
+    def close(self, raise_errors=True):
+        """Writes the events left in the output buffers/queues to file, closes
+        the output files and stops the loader iterator.
+
+        Every resource is closed, even if closing one of them fails.
+
+        Parameters
+        ----------
+        raise_errors : bool, default True
+            If `True`, re-raise the first error raised while closing the
+            resources, once they are all closed. Otherwise, only log them.
+        """
+        closers = []
+        if self.writer is not None:
+            closers.append(self.writer.close)
+        if self.ana is not None:
+            closers.append(self.ana.close)
+        if self.loader is not None:
+            closers.append(self.close_loader_iter)
+
+        errors = []
+        for closer in closers:
+            try:
+                closer()
+            except Exception as err: # pylint: disable=W0718
+                if not raise_errors:
+                    logger.error("Failed to close an output: %s", repr(err))
+                errors.append(err)
+
+        if raise_errors and errors:
+            raise errors[0]
 
     def process(self, entry=None, run=None, event=None, iteration=None):
         """Process one entry or a batch of entries.
@@ -512,9 +622,16 @@ class Driver:
 
         # 7. Write output to file, if requested
         if self.writer is not None:
-            self.watch.start('write')
-            self.writer(data, self.cfg)
-            self.watch.stop('write')
+            if not isinstance(self.writer, BackgroundWriter):
+                self.watch.start('write')
+                self.writer(data, self.cfg)
+                self.watch.stop('write')
+            else:
+                # Only record the time spent waiting for a slot in the queue,
+                # the write itself is timed by the background thread
+                self.watch.start('write_wait')
+                self.writer(data, self.cfg)
+                self.watch.stop('write_wait')
 
         # Stop the iteration timer
         self.watch.stop('iteration')
@@ -551,7 +668,7 @@ class Driver:
 
             # Initialize the loader, if necessary
             if self.loader_iter is None:
-                self.loader_iter = iter(self.loader)
+                self.reset_loader_iter()
 
             # Load the next batch
             self.watch.start('load')
@@ -601,6 +718,52 @@ class Driver:
                 run_event_list, skip_run_event_list)
 
         # Reset the iterator
+        self.close_loader_iter()
+
+    def apply_shard(self, shard_id, num_shards):
+        """Restricts the entries processed by this driver to one of
+        `num_shards` contiguous shards of the current entry selection.
+
+        Parameters
+        ----------
+        shard_id : int
+            Index of the shard processed by this driver
+        num_shards : int
+            Number of shards the entries are split into
+        """
+        # Sharding only makes sense if every entry is processed once
+        assert self.model is None or not self.model.train, (
+                "Cannot shard the entries of a training process.")
+        assert self.iterations == self.iter_per_epoch, (
+                "Can only shard a process which goes through the selected "
+                "entries once (`iterations: -1`). Select entries with "
+                "`n_entry`/`entry_list` instead.")
+
+        # Restrict the entries of the reader, update the iteration counts
+        self.reader.apply_shard(shard_id, num_shards)
+        self.shard_id = shard_id
+        if self.loader is not None:
+            self.close_loader_iter()
+            self.iter_per_epoch = len(self.loader)
+        else:
+            self.iter_per_epoch = len(self.reader)
+        self.iterations, self.epochs = self.iter_per_epoch, 1.
+
+    def reset_loader_iter(self):
+        """Initializes a new iterator over the data loader.
+
+        If the model prefetches its input, the iterator stages the next
+        batch on the model device while the current batch is processed.
+        """
+        self.close_loader_iter()
+        self.loader_iter = iter(self.loader)
+        if self.model is not None and self.model.prefetch:
+            self.loader_iter = self.model.stager.iterate(self.loader_iter)
+
+    def close_loader_iter(self):
+        """Stops the current iterator over the data loader, if any."""
+        if isinstance(self.loader_iter, StagedIterator):
+            self.loader_iter.close()
         self.loader_iter = None
 
     def log(self, data, tstamp, iteration, epoch=None):
@@ -647,6 +810,27 @@ class Driver:
             log_dict[f'{key}{suff}_sum'] = time_sum.wall
             log_dict[f'{key}{suff}_sum_cpu'] = time_sum.cpu
 
+        # If the writer runs in the background, fetch its times and backlog
+        if isinstance(self.writer, BackgroundWriter):
+            time, time_sum = self.writer.time, self.writer.time_sum
+            log_dict[f'write{suff}'] = time.wall
+            log_dict[f'write{suff}_cpu'] = time.cpu
+            log_dict[f'write{suff}_sum'] = time_sum.wall
+            log_dict[f'write{suff}_sum_cpu'] = time_sum.cpu
+            log_dict['write_queue_depth'] = self.writer.queue_depth
+
+        # If the model input is prefetched, fetch the staging thread times
+        if isinstance(self.loader_iter, StagedIterator):
+            time, time_sum = self.loader_iter.time, self.loader_iter.time_sum
+            log_dict[f'stage{suff}'] = time.wall
+            log_dict[f'stage{suff}_cpu'] = time.cpu
+            log_dict[f'stage{suff}_sum'] = time_sum.wall
+            log_dict[f'stage{suff}_sum_cpu'] = time_sum.cpu
+
+        # If the reader reads entries ahead, fetch its backlog
+        if isinstance(self.reader, PrefetchReader):
+            log_dict['read_queue_depth'] = self.reader.num_pending
+
         # Fetch all the scalar outputs and append them to a dictionary
         for key in data:
             if np.isscalar(data[key]):
@@ -0,0 +1,310 @@
+"""Contains a disk cache of the parsed entries of a dataset.
+
+Parsing an entry of a LArCV file (decoding the ROOT objects and running the
+parsers) yields the same result at every epoch. This module stores the parsed
+entries on disk, so that they can be loaded back without touching the LArCV
+files at all.
+
+The cache of a dataset lives in a subdirectory of the cache directory named
+after a hash of the dataset schema, of the data type and of the input files
+(paths, sizes and modification times). Any change to these yields a new,
+empty cache. Within it, the entries are stored in shards. Each shard is
+a binary file which contains the parsed entries, pickled with their
+arrays stored out-of-band (aligned raw buffers), and a small index file
+which locates each entry in the binary file. Entries are loaded by
+memory-mapping their span of the shard, such that arrays are views into the
+shard rather than copies.
+"""
+
+import os
+import glob
+import json
+import pickle
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+__all__ = ['ParserCache']
+
+
+class ParserCache:
+    """Disk cache of the parsed entries of a dataset, keyed by entry.
+
+    Attributes
+    ----------
+    path : str
+        Directory which contains the shards of this cache
+    entry_map : Dict[int, Tuple[int, int]]
+        Maps each cached entry onto its shard and its row in the shard index
+    """
+    alignment = 64
+
+    def __init__(self, cache_dir, schema, dtype, file_paths):
+        """Locates the cache of a dataset and loads its index.
+
+        Parameters
+        ----------
+        cache_dir : str
+            Directory in which the caches are stored
+        schema : dict
+            Dataset schema (parser names and arguments)
+        dtype : str
+            Data type the parsed data is cast to
+        file_paths : List[str]
+            List of input files
+        """
+        # Locate the cache of this dataset
+        key = self.get_key(schema, dtype, file_paths)
+        self.path = os.path.join(cache_dir, key)
+        os.makedirs(self.path, exist_ok=True)
+
+        # Load the index of the existing shards
+        self.load_index()
+
+    @staticmethod
+    def get_key(schema, dtype, file_paths):
+        """Hashes the parameters which determine the content of the cache.
+
+        Parameters
+        ----------
+        schema : dict
+            Dataset schema (parser names and arguments)
+        dtype : str
+            Data type the parsed data is cast to
+        file_paths : List[str]
+            List of input files
+
+        Returns
+        -------
+        str
+            Hash of the dataset parameters
+        """
+        files = []
+        for path in file_paths:
+            stat = os.stat(path)
+            files.append((os.path.abspath(path), stat.st_size,
+                          stat.st_mtime_ns))
+
+        config = json.dumps(
+                {'schema': schema, 'dtype': str(dtype), 'files': files},
+                sort_keys=True, default=str)
+
+        return hashlib.sha1(config.encode()).hexdigest()
+
+    def load_index(self):
+        """Loads the index of each shard of the cache."""
+        self.shards, self.indexes = [], []
+        self.entry_map = {}
+        for index_path in sorted(glob.glob(f'{self.path}/shard_*.npz')):
+            with np.load(index_path) as index:
+                index = dict(index)
+            name = os.path.splitext(os.path.basename(index_path))[0]
+            shard = len(self.indexes)
+            self.shards.append(int(name.split('_')[-1]))
+            self.indexes.append(index)
+            for row, entry in enumerate(index['entries'].tolist()):
+                self.entry_map[entry] = (shard, row)
+
+    def __len__(self):
+        """Returns the number of entries in the cache.
+
+        Returns
+        -------
+        int
+            Number of cached entries
+        """
+        return len(self.entry_map)
+
+    def __contains__(self, entry):
+        """Checks whether an entry is cached.
+
+        Parameters
+        ----------
+        entry : int
+            Entry index in the input files
+
+        Returns
+        -------
+        bool
+            `True` if the entry is cached
+        """
+        return int(entry) in self.entry_map
+
+    def get(self, entry):
+        """Loads one parsed entry from the cache.
+
+        Parameters
+        ----------
+        entry : int
+            Entry index in the input files
+
+        Returns
+        -------
+        dict
+            Parsed entry
+        """
+        # Locate the entry in its shard
+        shard, row = self.entry_map[int(entry)]
+        index = self.indexes[shard]
+        lower, upper = index['buffer_ptr'][row:row+2]
+        bounds = index['buffer_bounds'][lower:upper]
+        start, stop = index['pickle_bounds'][row]
+
+        # Memory-map the entry. The mapping is private and copy-on-write:
+        # the arrays can be modified without affecting the file or any
+        # other load of the same entry
+        offset = bounds[0, 0] if len(bounds) else start
+        data = np.memmap(
+                self.get_shard_path(self.shards[shard]), dtype=np.uint8,
+                mode='c', offset=offset, shape=(stop - offset,))
+
+        # Rebuild the entry with its arrays pointing to the mapping
+        buffers = [data[lo - offset:hi - offset] for lo, hi in bounds]
+
+        return pickle.loads(data[start - offset:stop - offset], buffers=buffers)
+
+    def get_shard_path(self, shard):
+        """Path to the binary file of a shard.
+
+        Parameters
+        ----------
+        shard : int
+            Shard ID
+
+        Returns
+        -------
+        str
+            Path to the shard
+        """
+        return os.path.join(self.path, f'shard_{shard:05d}.bin')
+
+    def write(self, shard, entries, data_list):
+        """Writes a list of parsed entries to a new shard.
+
+        Parameters
+        ----------
+        shard : int
+            Shard ID
+        entries : List[int]
+            Entry index of each parsed entry in the input files
+        data_list : Iterable[dict]
+            Parsed entries
+        """
+        # Write the entries to a temporary file first, such that no reader
+        # ever sees a partial shard
+        shard_path = self.get_shard_path(shard)
+        tmp_path = f'{shard_path}.{os.getpid()}.tmp'
+        pickle_bounds = np.empty((len(entries), 2), dtype=np.int64)
+        buffer_ptr = np.zeros(len(entries) + 1, dtype=np.int64)
+        buffer_bounds = []
+        with open(tmp_path, 'wb') as out_file:
+            for i, data in enumerate(data_list):
+                # Pickle the entry, setting its contiguous buffers aside
+                buffers = []
+                payload = pickle.dumps(
+                        data, protocol=5, buffer_callback=buffers.append)
+
+                # Write each buffer at an aligned position
+                for buffer in buffers:
+                    raw = buffer.raw()
+                    start = self.align(out_file)
+                    out_file.write(raw)
+                    buffer_bounds.append((start, start + raw.nbytes))
+                buffer_ptr[i + 1] = len(buffer_bounds)
+
+                # Write the pickled entry
+                start = out_file.tell()
+                out_file.write(payload)
+                pickle_bounds[i] = start, start + len(payload)
+
+        # Write the index of the shard, then move the shard in place
+        buffer_bounds = np.array(
+                buffer_bounds, dtype=np.int64).reshape(-1, 2)
+        index_path = os.path.join(self.path, f'shard_{shard:05d}.npz')
+        with open(f'{index_path}.tmp', 'wb') as out_file:
+            np.savez(out_file, entries=np.asarray(entries, dtype=np.int64),
+                     pickle_bounds=pickle_bounds, buffer_ptr=buffer_ptr,
+                     buffer_bounds=buffer_bounds)
+
+        os.replace(tmp_path, shard_path)
+        os.replace(f'{index_path}.tmp', index_path)
+
+    def align(self, out_file):
+        """Pads a file up to the next aligned position.
+
+        Parameters
+        ----------
+        out_file : io.BufferedWriter
+            Open file
+
+        Returns
+        -------
+        int
+            Aligned position in the file
+        """
+        position = out_file.tell()
+        padding = -position%self.alignment
+        if padding:
+            out_file.write(b'\0'*padding)
+
+        return position + padding
+
+    def fill(self, dataset, num_workers=None, max_shard_size=1000):
+        """Parses the entries of a dataset which are missing from the cache
+        and stores them, in parallel.
+
+        Parameters
+        ----------
+        dataset : LArCVDataset
+            Dataset to cache the entries of
+        num_workers : int, optional
+            Number of processes used to parse the entries. If not specified,
+            uses as many processes as there are CPUs.
+        max_shard_size : int, default 1000
+            Maximum number of entries per shard
+        """
+        # List the dataset entries which are missing from the cache
+        entry_index = dataset.reader.entry_index
+        missing = [idx for idx in range(len(entry_index))
+                   if entry_index[idx] not in self]
+        if not missing:
+            return
+
+        # Split the missing entries into shards, parse and write each of them
+        num_chunks = -(-len(missing)//max_shard_size)
+        if num_workers is not None:
+            num_chunks = max(num_chunks, num_workers)
+        chunks = np.array_split(missing, min(num_chunks, len(missing)))
+        first = max(self.shards) + 1 if self.shards else 0
+        shards = range(first, first + len(chunks))
+        if num_workers == 1:
+            for shard, chunk in zip(shards, chunks):
+                fill_shard(dataset, self, shard, chunk)
+        else:
+            with ProcessPoolExecutor(max_workers=num_workers) as executor:
+                list(executor.map(
+                        fill_shard, [dataset]*len(chunks), [self]*len(chunks),
+                        shards, chunks))
+
+        # Reload the index
+        self.load_index()
+
+
+def fill_shard(dataset, cache, shard, indices):
+    """Parses a list of dataset entries and writes them to a cache shard.
+
+    Parameters
+    ----------
+    dataset : LArCVDataset
+        Dataset to parse the entries of
+    cache : ParserCache
+        Cache to write the shard to
+    shard : int
+        Shard ID
+    indices : List[int]
+        List of dataset indexes to parse
+    """
+    entries = [int(dataset.reader.entry_index[idx]) for idx in indices]
+    data_list = (dataset.load(idx) for idx in indices)
+    cache.write(shard, entries, data_list)
@@ -5,9 +5,11 @@ to :class:`torch.utils.data.DataLoader` as the `collate_fn` argumement.
 """
 
 import numpy as np
+from torch.utils.data import get_worker_info
 
 from spine import TensorBatch, IndexBatch, EdgeIndexBatch
 from spine.utils.geo import Geometry
+from spine.utils.torch_local import shared_empty
 
 __all__ = ['CollateAll']
 
@@ -21,11 +23,18 @@ class CollateAll:
     2. Simple feature tensor which gets merged into a single tensor with
        rows [batch_id, *features]
     3. Scalars/list/objects which simply get put in a single list
+
+    The batched tensors are written directly into a buffer preallocated
+    from the total number of rows. If `shared_memory` is set and the
+    collation runs in a DataLoader worker, the buffers are allocated in
+    shared memory so that only a handle to each of them is sent to the main
+    process, instead of a pickled copy of the data.
     """
     name = 'all'
 
     def __init__(self, split=False, target_id=0, detector=None,
-                 boundary=None, overlay=None, source=None):
+                 boundary=None, overlay=None, source=None,
+                 shared_memory=False):
         """Initialize the collation parameters.
 
         Parameters
@@ -44,6 +53,9 @@ class CollateAll:
         source : dict, optional
             Dictionary which maps keys to their corresponding sources. This can
             be used to split tensors without having to check the geometry
+        shared_memory : bool, default False
+            If `True`, allocate the batched tensors in shared memory when
+            running in a DataLoader worker process
         """
         # Initialize the geometry, if required
         self.split = split
@@ -59,6 +71,9 @@ class CollateAll:
         if overlay is not None:
             self.process_overlay_config(**overlay)
 
+        # Store the memory allocation mode
+        self.shared_memory = shared_memory
+
     def process_overlay_config(self, mode='const', size=2):
         """Process the image overlay configuration
 
@@ -97,7 +112,6 @@ class CollateAll:
           an identical list of keys
         """
         # Loop over the data keys, merge all events in a batch
-        batch_size = len(batch)
         data = {}
         for key in batch[0].keys():
             # Fetch the reference object
@@ -115,57 +129,55 @@ class CollateAll:
                 # are provided, along with the metadata information
                 if not self.split:
                     # If not split, simply stack everything
-                    voxels    = np.vstack([sample[key][0] for sample in batch])
-                    features  = np.vstack([sample[key][1] for sample in batch])
-                    counts    = [len(sample[key][0]) for sample in batch]
-                    batch_ids = np.repeat(
-                            np.arange(batch_size, dtype=voxels.dtype), counts)
+                    voxels_v = [sample[key][0] for sample in batch]
+                    features_v = [sample[key][1] for sample in batch]
+                    counts = [len(voxels) for voxels in voxels_v]
 
                 else:
                     # If split, must shift the voxel coordinates and create
                     # one batch ID per [batch, volume] pair
-                    voxels_v, features_v, batch_ids_v = [], [], []
-                    counts = np.empty(
-                            batch_size*self.geo.num_modules, dtype=np.int64)
-                    for s, sample in enumerate(batch):
+                    voxels_v, features_v, module_ids_v = [], [], []
+                    for sample in batch:
                         # Identify which point belongs to which module
                         voxels, features, meta = sample[key]
-                        voxels_wrapped, module_indexes = self.geo.split(
+                        voxels_wrapped, module_ids = self.geo.migrate(
                                 voxels.reshape(-1, 3),
                                 self.target_id, meta=meta)
-                        voxels = voxels_wrapped.reshape(-1, voxels.shape[1])
+                        voxels_v.append(
+                                voxels_wrapped.reshape(-1, voxels.shape[1]))
+                        features_v.append(features)
 
                         # If there are more than one point per row and they
                         # are in separate volumes, the choice is arbitrary
                         if voxels.shape[1] > 3:
-                            num_points = voxels.shape[1]//3
-                            free = np.ones(len(voxels), dtype=bool)
-                            for m, module_index in enumerate(module_indexes):
-                                mask = np.zeros(len(voxels_wrapped), dtype=bool)
-                                mask[module_index] = True
-                                mask = mask.reshape(-1, num_points).any(axis=1)
-                                module_indexes[m] = np.where(free & mask)[0]
-                                free[module_indexes[m]] = False
-
-                        # Assign a different batch ID to each volume
-                        for m, module_index in enumerate(module_indexes):
-                            voxels_v.append(voxels[module_index])
-                            features_v.append(features[module_index])
-                            idx = self.geo.num_modules * s + m
-                            batch_ids_v.append(np.full(len(module_index),
-                                               idx, dtype=voxels.dtype))
-                            counts[idx] = len(module_index)
-
-                    voxels = np.vstack(voxels_v)
-                    features = np.vstack(features_v)
-                    batch_ids = np.concatenate(batch_ids_v)
-
-                # Stack the coordinates with the features
-                tensor = np.hstack([batch_ids[:, None], voxels, features])
-                coord_cols = np.arange(1, 1+voxels.shape[1])
+                            module_ids = self.get_row_module_ids(
+                                    module_ids, voxels.shape[1]//3)
+                        module_ids_v.append(module_ids)
+
+                    # Order the rows by [batch, volume] pair at once
+                    perm, counts = self.get_module_order(module_ids_v)
+                    voxels_v = [np.concatenate(voxels_v)[perm]]
+                    features_v = [np.concatenate(features_v)[perm]]
+
+                # Write the batch IDs, the coordinates and the features of
+                # each block directly into the batched tensor
+                num_coords = voxels_v[0].shape[1]
+                num_features = features_v[0].shape[1]
+                tensor = self.empty(
+                        (np.sum(counts), 1 + num_coords + num_features),
+                        features_v[0].dtype)
+                tensor[:, 0] = np.repeat(np.arange(len(counts)), counts)
+                start = 0
+                for voxels, features in zip(voxels_v, features_v):
+                    end = start + len(voxels)
+                    tensor[start:end, 1:1+num_coords] = voxels
+                    tensor[start:end, 1+num_coords:] = features
+                    start = end
+
+                coord_cols = np.arange(1, 1+num_coords)
                 data[key] = TensorBatch(
-                        tensor.astype(features.dtype), counts,
-                        has_batch_col=True, coord_cols=coord_cols)
+                        tensor, counts, has_batch_col=True,
+                        coord_cols=coord_cols)
 
             elif isinstance(ref_obj, tuple) and len(ref_obj) == 2:
                 # Case where an index and an offset is provided per entry.
@@ -185,23 +197,20 @@ class CollateAll:
                 # Case where there is a simple feature tensor returned per
                 # entry. Stack the features, do not add a batch column
                 if not self.split or sources is None:
-                    tensor = np.concatenate([sample[key] for sample in batch])
-                    counts = [len(sample[key]) for sample in batch]
+                    features_v = [sample[key] for sample in batch]
+                    counts = [len(features) for features in features_v]
 
                 else:
-                    features_v = []
-                    counts = np.empty(
-                            batch_size*self.geo.num_modules, dtype=np.int64)
-                    for s, sample in enumerate(batch):
-                        features = sample[key]
-                        for m in range(self.geo.num_modules):
-                            module_index = np.where(sources[s][:, 0] == m)[0]
-                            features_v.append(features[module_index])
-                            idx = self.geo.num_modules * s + m
-                            counts[idx] = len(module_index)
-
-                    tensor = np.vstack(features_v)
-
+                    # Order the rows by [batch, volume] pair at once
+                    perm, counts = self.get_module_order(
+                            [source[:, 0] for source in sources])
+                    features = np.concatenate([sample[key] for sample in batch])
+                    features_v = [features[perm]]
+
+                # Concatenate the features directly into the batched tensor
+                tensor = self.empty(
+                        (np.sum(counts), *ref_obj.shape[1:]), ref_obj.dtype)
+                np.concatenate(features_v, out=tensor)
                 data[key] = TensorBatch(tensor, counts)
 
             else:
@@ -209,3 +218,88 @@ class CollateAll:
                 data[key] = [sample[key] for sample in batch]
 
         return data
+
+    def get_row_module_ids(self, module_ids, num_points):
+        """Assigns each row of multiple points to a single module.
+
+        A row is assigned to the lowest module ID among its points.
+
+        Parameters
+        ----------
+        module_ids : np.ndarray
+            (N*P) Module ID of each point (-1 if it belongs to no module)
+        num_points : int
+            Number of points per row, P
+
+        Returns
+        -------
+        np.ndarray
+            (N) Module ID of each row (-1 if no point belongs to a module)
+        """
+        num_modules = self.geo.num_modules
+        module_ids = np.where(module_ids > -1, module_ids, num_modules)
+        module_ids = np.min(module_ids.reshape(-1, num_points), axis=1)
+        module_ids[module_ids == num_modules] = -1
+
+        return module_ids
+
+    def get_module_order(self, module_ids_v):
+        """Orders the rows of a batch by [batch, volume] pair.
+
+        The rows are ordered in a single stable sort of the [batch, volume]
+        pair index, such that the order of the rows is preserved within each
+        pair. Rows which belong to no volume are dropped.
+
+        Parameters
+        ----------
+        module_ids_v : List[np.ndarray]
+            (N_b) Module ID of each row (-1 if it belongs to no module), one
+            array per entry in the batch
+
+        Returns
+        -------
+        np.ndarray
+            (N) Permutation which orders the concatenated rows of the batch
+        np.ndarray
+            (B*M) Number of rows in each [batch, volume] pair
+        """
+        # Build the [batch, volume] pair index, shifted by one such that the
+        # rows which belong to no module are sorted first
+        num_modules = self.geo.num_modules
+        pair_ids = np.concatenate([
+            np.where((module_ids > -1) & (module_ids < num_modules),
+                     num_modules*b + module_ids + 1, 0)
+            for b, module_ids in enumerate(module_ids_v)])
+
+        # Sort the rows, count them in each pair. The pair index is cast to
+        # the smallest integer type that fits, for which numpy uses a radix sort
+        num_pairs = len(module_ids_v)*num_modules + 1
+        pair_ids = pair_ids.astype(np.min_scalar_type(num_pairs))
+        perm = np.argsort(pair_ids, kind='stable')
+        counts = np.bincount(pair_ids, minlength=num_pairs)
+
+        return perm[counts[0]:], counts[1:]
+
+    def empty(self, shape, dtype):
+        """Allocates the buffer of a batched tensor.
+
+        The buffer is allocated in shared memory if requested and if the
+        collation runs in a DataLoader worker process.
+
+        Parameters
+        ----------
+        shape : Tuple[int]
+            Shape of the batched tensor
+        dtype : np.dtype
+            Data type of the batched tensor
+
+        Returns
+        -------
+        np.ndarray
+            Uninitialized buffer
+        """
+        if (self.shared_memory and np.prod(shape) > 0 and
+            get_worker_info() is not None):
+            return shared_empty(shape, dtype)
+
+        return np.empty(shape, dtype=dtype)
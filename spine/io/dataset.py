@@ -1,11 +1,13 @@
 """Contains dataset classes to be used by the model."""
 
+import numpy as np
 from torch.utils.data import Dataset
 
 from spine.utils.factory import module_dict, instantiate
 
 from . import parse
-from .read import LArCVReader
+from .read import LArCVReader, PrefetchReader
+from .cache import ParserCache
 
 PARSER_DICT  = module_dict(parse)
 
@@ -28,7 +30,7 @@ class LArCVDataset(Dataset):
     """
     name = 'larcv'
 
-    def __init__(self, schema, dtype, **kwargs):
+    def __init__(self, schema, dtype, prefetch=None, cache_dir=None, **kwargs):
         """Instantiates the LArCVDataset.
 
         Parameters
@@ -42,6 +44,13 @@ class LArCVDataset(Dataset):
                 names and their values
         dtype : str
             Data type to cast the input data to (to match the downstream model)
+        prefetch : Union[int, dict], optional
+            If specified, entries are read and parsed ahead in background
+            threads. Either the number of entries to read ahead or a
+            dictionary of :class:`PrefetchReader` parameters
+        cache_dir : str, optional
+            If specified, parsed entries found in the :class:`ParserCache`
+            under this directory are loaded from it rather than parsed
         **kwargs : dict, optional
             Additional arguments to pass to the LArCVReader class
         """
@@ -61,6 +70,25 @@ class LArCVDataset(Dataset):
         # Instantiate the reader
         self.reader = LArCVReader(tree_keys=tree_keys, **kwargs)
 
+        # If requested, load the cache of parsed entries
+        self.cache = None
+        if cache_dir is not None:
+            self.cache = ParserCache(
+                    cache_dir, schema, dtype, self.reader.file_paths)
+
+        # If requested, wrap the reader to read and parse entries ahead. The
+        # ROOT objects are only valid until the next read, parse them first.
+        # If all the entries are cached, there is nothing to read ahead.
+        if (self.cache is not None and
+            all(entry in self.cache for entry in self.reader.entry_index)):
+            prefetch = None
+        self.prefetch = prefetch is not None
+        if self.prefetch:
+            if not isinstance(prefetch, dict):
+                prefetch = {'num_prefetch': prefetch}
+            self.reader = PrefetchReader(
+                    self.reader, process=self.parse, **prefetch)
+
     def __len__(self):
         """Returns the lenght of the dataset (in number of batches).
 
@@ -84,9 +112,48 @@ class LArCVDataset(Dataset):
         dict
             Dictionary of data product names and their associated data
         """
-        # Read in a specific entry
-        data_dict = self.reader[idx]
+        # If the entry is cached, do not read the input files at all
+        if self.cache is not None:
+            entry_idx = self.reader.entry_index[idx]
+            if entry_idx in self.cache:
+                return self.cache.get(entry_idx)
+
+        return self.load(idx)
+
+    def load(self, idx):
+        """Reads and parses one element of the dataset from the input files.
+
+        Parameters
+        ----------
+        idx : int
+            Index of the dataset entry to load
+
+        Returns
+        -------
+        dict
+            Dictionary of data product names and their associated data
+        """
+        # If the entries are prefetched, they are already parsed
+        if self.prefetch:
+            return self.reader[idx]
+
+        return self.parse(self.reader[idx], idx)
+
+    def parse(self, data_dict, idx):
+        """Runs the parsers on one entry of the reader.
+
+        Parameters
+        ----------
+        data_dict : dict
+            Dictionary of LArCV data products of the entry
+        idx : int
+            Index of the dataset entry
 
+        Returns
+        -------
+        dict
+            Dictionary of data product names and their associated data
+        """
         # Get the index
         entry_idx = self.reader.entry_index[idx]
         file_idx = self.reader.get_file_index(idx)
@@ -104,6 +171,35 @@ class LArCVDataset(Dataset):
 
         return result
 
+    def get_sizes(self, key):
+        """Fetches the number of rows of a parsed data product in each entry.
+
+        The entries found in the parser cache are loaded from it, the others
+        are read and parsed. To avoid parsing the whole dataset every time,
+        fill the cache first or store the sizes in a file (see
+        `bin/larcv_cache.py`).
+
+        Parameters
+        ----------
+        key : str
+            Name of the data product (e.g. `data`)
+
+        Returns
+        -------
+        np.ndarray
+            (N) Number of rows of the data product in each entry
+        """
+        assert key in self.parsers, (
+                f"Cannot fetch the sizes of `{key}`, it is not produced by "
+                 "any of the parsers of the dataset.")
+
+        sizes = np.empty(len(self), dtype=np.int64)
+        for idx in range(len(self)):
+            value = self[idx][key]
+            sizes[idx] = len(value[0] if isinstance(value, tuple) else value)
+
+        return sizes
+
     def data_keys(self):
         """Returns a list of data product names.
 
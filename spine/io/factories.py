@@ -2,7 +2,7 @@
 
 from warnings import warn
 
-from torch.utils.data import DataLoader
+from torch.utils.data import DataLoader, RandomSampler, SequentialSampler
 
 from spine.utils.factory import module_dict, instantiate
 
@@ -75,14 +75,30 @@ def loader_factory(dataset, dtype, batch_size=None, minibatch_size=None,
         sampler = sampler_factory(
                 sampler, dataset, batch_size, distributed, world_size, rank)
 
+    # If the dataset reads entries ahead in the main process, forward it the
+    # order in which the entries are sampled
+    if getattr(dataset, 'prefetch', False) and num_workers == 0:
+        if sampler is None:
+            sampler = (RandomSampler(dataset) if shuffle
+                       else SequentialSampler(dataset))
+            shuffle = False
+        sampler = sample.PrefetchProxySampler(sampler, dataset.reader)
+
     # Initialize the collate function
     if collate_fn is not None:
         collate_fn = collate_factory(collate_fn)
 
-    # Initialize the loader
-    loader = DataLoader(
-            dataset, batch_size=minibatch_size, shuffle=shuffle,
-            sampler=sampler, num_workers=num_workers, collate_fn=collate_fn)
+    # Initialize the loader. If the sampler forms the batches itself (e.g.
+    # under a size budget), use it as a batch sampler
+    if getattr(sampler, 'batched', False):
+        loader = DataLoader(
+                dataset, batch_sampler=sampler, num_workers=num_workers,
+                collate_fn=collate_fn)
+    else:
+        loader = DataLoader(
+                dataset, batch_size=minibatch_size, shuffle=shuffle,
+                sampler=sampler, num_workers=num_workers,
+                collate_fn=collate_fn)
 
     return loader
 
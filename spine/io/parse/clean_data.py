@@ -11,14 +11,18 @@ import numba as nb
 from spine.utils.globals import SHAPE_COL, SHAPE_PREC
 
 
-def clean_sparse_data(cluster_voxels, cluster_data, sparse_voxels):
+def clean_sparse_data(cluster_voxels, cluster_data, sparse_voxels, meta=None):
     """Helper that factorizes common cleaning operations required when trying
     to match cluster3d data products to sparse3d data products.
 
     This function does the following:
-    1. Lexicographically sort group data (images are lexicographically sorted)
-    2. Remove voxels from group data that are not in image
-    3. Choose only one group per voxel (by lexicographic order)
+    1. Remove voxels from group data that are not in image
+    2. Choose only one group per voxel (by order of shape precedence)
+    3. Lexicographically sort group data (images are lexicographically sorted)
+
+    The voxel coordinates are linearized into a single integer key, such that
+    the group voxels are ordered with a single sort and matched to the image
+    voxels with a single sorted search.
 
     The set of sparse voxels must be a subset of the set of cluster voxels and
     it must not contain any duplicates.
@@ -32,6 +36,9 @@ def clean_sparse_data(cluster_voxels, cluster_data, sparse_voxels):
         in the cluster3d tensor
     sparse_voxels: np.ndarray
         (M, 3) Matrix of voxel coordinates in the reference sparse tensor
+    meta : Meta, optional
+        Metadata of the image. If provided, the voxel keys are computed from
+        the image size, otherwise from the extent of the voxel coordinates.
 
     Returns
     -------
@@ -40,29 +47,101 @@ def clean_sparse_data(cluster_voxels, cluster_data, sparse_voxels):
     cluster_data: np.ndarray
         (M, F) Ordered and filtered set of voxel values
     """
-    # Lexicographically sort cluster and sparse data
-    perm = np.lexsort(cluster_voxels.T)
-    cluster_voxels = cluster_voxels[perm]
-    cluster_data = cluster_data[perm]
-
-    perm = np.lexsort(sparse_voxels.T)
-    sparse_voxels = sparse_voxels[perm]
-
-    # Remove duplicates
-    duplicate_mask = filter_duplicate_voxels_ref(
-            cluster_voxels, cluster_data[:, SHAPE_COL],
-            nb.typed.List(SHAPE_PREC))
-    duplicate_index = np.where(duplicate_mask)[0]
-    cluster_voxels = cluster_voxels[duplicate_index]
-    cluster_data = cluster_data[duplicate_index]
-
-    # Remove voxels not present in the sparse matrix
-    non_ref_mask = filter_voxels_ref(cluster_voxels, sparse_voxels)
-    non_ref_index = np.where(non_ref_mask)[0]
-    cluster_voxels = cluster_voxels[non_ref_index]
-    cluster_data = cluster_data[non_ref_index]
-
-    return cluster_voxels, cluster_data
+    # Linearize the voxel coordinates into a single key, which preserves
+    # the lexicographic order of the voxels
+    if meta is not None:
+        lower, count = np.zeros(3, dtype=np.int64), meta.count
+    else:
+        voxels = np.vstack([cluster_voxels, sparse_voxels])
+        lower = np.min(voxels, axis=0, initial=0).astype(np.int64)
+        count = np.max(voxels, axis=0, initial=0) - lower + 1
+
+    keys = get_voxel_keys(cluster_voxels, lower, count)
+    ref_keys = np.sort(get_voxel_keys(sparse_voxels, lower, count))
+    if not len(ref_keys):
+        return cluster_voxels[:0], cluster_data[:0]
+
+    # Sort the cluster voxels by key
+    index = np.argsort(keys)
+    keys = keys[index]
+
+    # Remove voxels not present in the sparse matrix (the sorted keys make
+    # the search of the reference keys cache-friendly)
+    ref_index = np.searchsorted(ref_keys, keys)
+    ref_index[ref_index == len(ref_keys)] = 0
+    mask = ref_keys[ref_index] == keys
+    index, keys = index[mask], keys[mask]
+
+    # Remove duplicates. Only the voxels which share their coordinates with
+    # another one are reordered, by shape precedence. If multiple voxels
+    # with the same precedence share voxel coordinates, the last one is picked
+    same = keys[1:] == keys[:-1]
+    if np.any(same):
+        dup_mask = np.zeros(len(keys), dtype=bool)
+        dup_mask[1:] |= same
+        dup_mask[:-1] |= same
+        dup_index = np.where(dup_mask)[0]
+        dup_keys, dup_ids = keys[dup_index], index[dup_index]
+        ranks = get_precedence_ranks(cluster_data[dup_ids, SHAPE_COL])
+        perm = np.lexsort((-dup_ids, ranks, dup_keys))
+
+        first = np.ones(len(perm), dtype=bool)
+        first[1:] = dup_keys[perm[1:]] != dup_keys[perm[:-1]]
+        keep = ~dup_mask
+        keep[dup_index[perm[first]]] = True
+        index = index[keep]
+
+    return cluster_voxels[index], cluster_data[index]
+
+
+def get_voxel_keys(voxels, lower, count):
+    """Linearizes voxel coordinates into a single integer key.
+
+    The key order matches the lexicographic order of the voxels (as given
+    by `np.lexsort(voxels.T)`, i.e. with the last coordinate first).
+
+    Parameters
+    ----------
+    voxels : np.ndarray
+        (N, 3) Matrix of voxel coordinates
+    lower : np.ndarray
+        (3) Lowest voxel coordinate along each axis
+    count : np.ndarray
+        (3) Number of voxels along each axis
+
+    Returns
+    -------
+    np.ndarray
+        (N) Key of each voxel
+    """
+    keys = voxels[:, 2].astype(np.int64) - lower[2]
+    for axis in (1, 0):
+        keys *= count[axis]
+        keys += voxels[:, axis] - lower[axis]
+
+    return keys
+
+
+def get_precedence_ranks(shapes):
+    """Gets the rank of each shape label in order of precedence.
+
+    Shape labels which do not appear in the precedence list are ranked last.
+
+    Parameters
+    ----------
+    shapes : np.ndarray
+        (N) Array of shape labels
+
+    Returns
+    -------
+    np.ndarray
+        (N) Rank of each shape label
+    """
+    ranks = np.full(len(shapes), len(SHAPE_PREC), dtype=np.int64)
+    for rank, shape in enumerate(SHAPE_PREC):
+        ranks[shapes == shape] = rank
+
+    return ranks
 
 
 @nb.njit(cache=True)
@@ -259,10 +259,16 @@ class Cluster3DParser(ParserBase):
              inter_primaries, types) = process_particle_event(
                         particle_event, particle_mpv_event, neutrino_event)
 
+            # Fetch the particle attributes in a single pass
+            attrs = np.empty((len(particles), 7), dtype=self.ftype)
+            for i, p in enumerate(particles):
+                attrs[i, :3] = image_coordinates(meta, p.ancestor_position())
+                attrs[i, 3:] = p.id(), p.group_id(), p.p(), p.shape()
+
             # Store the cluster ID information
-            labels['cluster'] = [p.id() for p in particles]
-            labels['part']    = [p.id() for p in particles]
-            labels['group']   = [p.group_id() for p in particles]
+            labels['cluster'] = attrs[:, 3]
+            labels['part']    = attrs[:, 3]
+            labels['group']   = attrs[:, 4]
             labels['inter']   = inter_ids
             labels['nu']      = nu_ids
 
@@ -272,16 +278,13 @@ class Cluster3DParser(ParserBase):
             labels['pinter']  = inter_primaries
 
             # Store the vertex and momentum
-            anc_pos = np.empty((len(particles), 3), dtype=self.ftype)
-            for i, p in enumerate(particles):
-                anc_pos[i] = image_coordinates(meta, p.ancestor_position())
-            labels['vtx_x']   = anc_pos[:, 0]
-            labels['vtx_y']   = anc_pos[:, 1]
-            labels['vtx_z']   = anc_pos[:, 2]
-            labels['p']       = [p.p() for p in particles]
+            labels['vtx_x']   = attrs[:, 0]
+            labels['vtx_y']   = attrs[:, 1]
+            labels['vtx_z']   = attrs[:, 2]
+            labels['p']       = attrs[:, 5]
 
             # Store the shape last (consistent with semantics tensor)
-            labels['shape']   = [p.shape() for p in particles]
+            labels['shape']   = attrs[:, 6]
 
             # If requested, give invalid labels to a subset of particles
             if not self.type_include_secondary:
@@ -298,46 +301,54 @@ class Cluster3DParser(ParserBase):
                     labels['pinter'] = np.asarray(labels['pinter'])
                     labels['pinter'][mpr_mask] = -1
 
-        # Loop over clusters, store information
-        clusters_voxels, clusters_features = [], []
-        id_offset = 0
+        # Count the voxels in each cluster, preallocate the output buffers
+        clusters = cluster_event.as_vector()
+        sizes = np.empty(num_clusters, dtype=np.int64)
         for i in range(num_clusters):
-            cluster = cluster_event.as_vector()[i]
-            num_points = cluster.as_vector().size()
-            if num_points > 0:
-                # Get the position and pixel value from EventSparseTensor3D
-                x = np.empty(num_points, dtype=self.itype)
-                y = np.empty(num_points, dtype=self.itype)
-                z = np.empty(num_points, dtype=self.itype)
-                value = np.empty(num_points, dtype=self.ftype)
-                larcv.as_flat_arrays(cluster, meta, x, y, z, value)
-                voxels = np.stack([x, y, z], axis=1)
-                clusters_voxels.append(voxels)
-
-                # Append the cluster-wise information
-                features = [value]
-                for l in labels.values():
-                    val = l[i] if i < num_particles else -1
-                    features.append(
-                            np.full(num_points, val, dtype=self.ftype))
-
-                # If requested, break cluster into detached pieces
-                if self.break_clusters:
-                    frag_labels = dbscan(
-                            voxels, self.break_eps, self.break_metric)
-                    features[1] = id_offset + frag_labels
-                    id_offset += max(frag_labels) + 1
-
-                clusters_features.append(np.column_stack(features))
+            sizes[i] = clusters[i].as_vector().size()
 
-        # If there are no non-empty clusters, return. Concatenate otherwise
-        if not clusters_voxels:
+        num_voxels = np.sum(sizes)
+        if not num_voxels:
+            # If there are no non-empty clusters, return
             return (np.empty((0, 3), dtype=self.itype),
                     np.empty((0, len(labels) + 1), dtype=self.ftype),
                     Meta.from_larcv(meta))
 
-        np_voxels   = np.concatenate(clusters_voxels, axis=0)
-        np_features = np.concatenate(clusters_features, axis=0)
+        offsets = np.zeros(num_clusters + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(sizes)
+        coords = np.empty((3, num_voxels), dtype=self.itype)
+        values = np.empty(num_voxels, dtype=self.ftype)
+
+        # Fill the position and pixel value of each voxel, one cluster at a
+        # time, directly into the buffers
+        for i in np.where(sizes > 0)[0]:
+            start, end = offsets[i], offsets[i+1]
+            larcv.as_flat_arrays(
+                    clusters[int(i)], meta, coords[0, start:end],
+                    coords[1, start:end], coords[2, start:end],
+                    values[start:end])
+
+        np_voxels = np.ascontiguousarray(coords.T)
+
+        # Broadcast the cluster-wise information to each voxel. Clusters
+        # beyond the list of particles (catch-all cluster) get -1 labels
+        np_features = np.empty((num_voxels, len(labels) + 1), dtype=self.ftype)
+        np_features[:, 0] = values
+        for j, l in enumerate(labels.values()):
+            column = np.full(num_clusters, -1, dtype=self.ftype)
+            column[:num_particles] = l
+            np_features[:, j + 1] = np.repeat(column, sizes)
+
+        # If requested, break cluster into detached pieces
+        if self.break_clusters:
+            id_offset = 0
+            for i in np.where(sizes > 0)[0]:
+                start, end = offsets[i], offsets[i+1]
+                frag_labels = dbscan(
+                        np_voxels[start:end], self.break_eps,
+                        self.break_metric)
+                np_features[start:end, 1] = id_offset + frag_labels
+                id_offset += max(frag_labels) + 1
 
         # If requested, remove duplicate voxels (cluster overlaps) and
         # match the semantics to those of the provided reference
@@ -356,8 +367,8 @@ class Cluster3DParser(ParserBase):
                     "Need to provide a semantics tensor to clean up output.")
             sem_voxels, sem_features, _ = (
                     self.sparse_parser.process(sparse_semantics_event))
-            np_voxels, np_features = (
-                    clean_sparse_data(np_voxels, np_features, sem_voxels))
+            np_voxels, np_features = clean_sparse_data(
+                    np_voxels, np_features, sem_voxels, Meta.from_larcv(meta))
 
             # Match the semantic column to the reference tensor
             np_features[:, -1] = sem_features[:, -1]
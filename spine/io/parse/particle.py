@@ -12,7 +12,7 @@ Contains the following parsers:
 
 import numpy as np
 
-from spine import Meta, Particle, Neutrino, ObjectList
+from spine import Meta, Particle, Neutrino, ObjectList, ParticleTable
 from spine.utils.globals import TRACK_SHP, PDG_TO_PID, PID_MASSES
 from spine.utils.particles import process_particles
 from spine.utils.ppn import get_ppn_labels, image_coordinates
@@ -38,11 +38,12 @@ class ParticleParser(ParserBase):
             asis: False
             pixel_coordinates: True
             post_process: True
+            columnar: False
     """
     name = 'particle'
 
     def __init__(self, pixel_coordinates=True, post_process=True,
-                 skip_empty=False, asis=False, **kwargs):
+                 skip_empty=False, asis=False, columnar=False, **kwargs):
         """Initialize the parser.
 
         Parameters
@@ -59,6 +60,10 @@ class ParticleParser(ParserBase):
             object in place of empty particles, to preserve list size and typing.
         asis : bool, default False
             Load the objects as larcv objects, do not build local data class
+        columnar : bool, default False
+            Load the particles into a :class:`ParticleTable`, which stores
+            each attribute as an array and only builds `Particle` objects
+            when they are accessed
         **kwargs : dict, optional
             Data product arguments to be passed to the `process` function
         """
@@ -70,6 +75,7 @@ class ParticleParser(ParserBase):
         self.post_process = post_process
         self.skip_empty = skip_empty
         self.asis = asis
+        self.columnar = columnar
 
     def __call__(self, trees):
         """Parse one entry.
@@ -102,7 +108,7 @@ class ParticleParser(ParserBase):
 
         Returns
         -------
-        List[Particle]
+        Union[List[Particle], ParticleTable]
             List of true particle objects
         """
         # If asis is true, return larcv objects
@@ -117,15 +123,18 @@ class ParticleParser(ParserBase):
 
             return ObjectList(particle_list, larcv.Particle())
 
-        # Convert to a list of particle objects
-        particles = []
-        for p in particle_list:
-            if (not self.skip_empty or
-                p.num_voxels() > 0 or
-                p.id() == p.group_id()):
-                particles.append(Particle.from_larcv(p))
-            else:
-                particles.append(Particle())
+        # Convert to a list (or a table) of particle objects
+        if self.columnar:
+            particles = ParticleTable.from_larcv(particle_list, self.skip_empty)
+        else:
+            particles = []
+            for p in particle_list:
+                if (not self.skip_empty or
+                    p.num_voxels() > 0 or
+                    p.id() == p.group_id()):
+                    particles.append(Particle.from_larcv(p))
+                else:
+                    particles.append(Particle())
 
         # If requested, post-process the particle list
         if self.post_process:
@@ -143,9 +152,13 @@ class ParticleParser(ParserBase):
             meta = Meta.from_larcv(ref_event.meta())
 
             # Convert all the relevant attributes
-            for p in particles:
-                if p.id > -1:
-                    p.to_px(meta)
+            if self.columnar:
+                particles.to_px(meta, np.where(particles.array['id'] > -1)[0])
+            else:
+                meta.objects_to_px([p for p in particles if p.id > -1])
+
+        if self.columnar:
+            return particles
 
         return ObjectList(particles, Particle())
 
@@ -236,8 +249,7 @@ class NeutrinoParser(ParserBase):
             meta = Meta.from_larcv(ref_event.meta())
 
             # Convert all the relevant attributes
-            for n in neutrinos:
-                n.to_px(meta)
+            meta.objects_to_px(neutrinos)
 
         return ObjectList(neutrinos, Neutrino())
 
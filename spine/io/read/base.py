@@ -10,6 +10,8 @@ from warnings import warn
 
 import numpy as np
 
+from .run_index import RunEventIndex
+
 
 class ReaderBase:
     """Parent reader class which provides common functions between all readers.
@@ -36,9 +38,11 @@ class ReaderBase:
         Offsets between the global index and each individual file start index
     file_index : List[int]
         Index of the file each entry in entry_index lives in
-    run_info : List[Tuple[int]]
-        (run, event) pairs associated with each entry in the file list
-    run_map : Dict[Type[int], int]
+    run_info : np.ndarray
+        (N, 2) (run, event) pairs associated with each entry in the file list
+    run_index : RunEventIndex
+        Maps each (run, event) pair onto a global entry index
+    run_map : RunEventIndex
         Maps each available (run, event) pair onto an entry_index index
     """
     name = ''
@@ -48,6 +52,7 @@ class ReaderBase:
     file_offsets = None
     file_index = None
     run_info = None
+    run_index = None
     run_map = None
 
     def __len__(self):
@@ -140,21 +145,19 @@ class ReaderBase:
     def process_run_info(self):
         """Process the run information.
 
-        Check the run information for duplicates and initialize a dictionary
-        which map [run, event] pairs onto entry index.
+        Check the run information for duplicates and initialize an index
+        which maps [run, event] pairs onto entry index.
         """
-        # Check for duplicates
+        # If run_info is set, flip it into a map from info to entry
+        self.run_index, self.run_map = None, None
         if self.run_info is not None:
             assert len(self.run_info) == self.num_entries
-            has_duplicates = not np.all(np.unique(self.run_info,
-                axis = 0, return_counts=True)[-1] == 1)
-            if has_duplicates:
-                warn("There are duplicated (run, event) pairs.")
+            self.run_index = RunEventIndex(self.run_info)
+            self.run_map = self.run_index
 
-        # If run_info is set, flip it into a map from info to entry
-        self.run_map = None
-        if self.run_info is not None:
-            self.run_map = {tuple(v):i for i, v in enumerate(self.run_info)}
+            # Check for duplicates
+            if self.run_index.num_duplicates:
+                warn("There are duplicated (run, event) pairs.")
 
     def process_entry_list(self, n_entry=None, n_skip=None, entry_list=None,
                            skip_entry_list=None, run_event_list=None,
@@ -223,9 +226,7 @@ class ReaderBase:
 
         elif run_event_list:
             run_event_list = self.parse_run_event_list(run_event_list)
-            entry_list = np.empty(len(run_event_list), dtype=np.int64)
-            for i, (r, e) in enumerate(run_event_list):
-                entry_list[i] = self.get_run_event_index(r, e)
+            entry_list = self.get_run_event_entries(run_event_list)
 
         elif skip_entry_list or skip_run_event_list:
             if skip_entry_list:
@@ -236,10 +237,8 @@ class ReaderBase:
             else:
                 skip_run_event_list = self.parse_run_event_list(
                         skip_run_event_list)
-                skip_entry_list = np.empty(
-                        len(skip_run_event_list), dtype=np.int64)
-                for i, (r, e) in enumerate(skip_run_event_list):
-                    skip_entry_list[i] = self.get_run_event_index(r, e)
+                skip_entry_list = self.get_run_event_entries(
+                        skip_run_event_list)
 
             entry_mask = np.ones(self.num_entries, dtype=bool)
             entry_mask[skip_entry_list] = False
@@ -251,8 +250,7 @@ class ReaderBase:
             entry_index = entry_index[entry_list]
 
             if self.run_info is not None:
-                run_info = self.run_info[entry_list]
-                self.run_map = {tuple(v):i for i, v in enumerate(run_info)}
+                self.run_map = RunEventIndex(self.run_info[entry_list])
 
         assert len(entry_index), "Must at least have one entry to load."
 
@@ -260,6 +258,30 @@ class ReaderBase:
 
         self.entry_index = entry_index
 
+    def apply_shard(self, shard_id, num_shards):
+        """Restricts the list of entries to one of `num_shards` contiguous
+        shards of the current list of entries.
+
+        Parameters
+        ----------
+        shard_id : int
+            Index of the shard to keep
+        num_shards : int
+            Number of shards to split the list of entries into
+        """
+        # Make sure the parameters are sensible
+        assert 0 <= shard_id < num_shards, (
+                f"The shard index ({shard_id}) must be positive and smaller "
+                f"than the number of shards ({num_shards}).")
+        assert num_shards <= len(self.entry_index), (
+                f"Cannot split {len(self.entry_index)} entries into "
+                f"{num_shards} shards.")
+
+        # Keep the entries of this shard
+        self.entry_index = np.array_split(self.entry_index, num_shards)[shard_id]
+        if self.run_info is not None:
+            self.run_map = RunEventIndex(self.run_info[self.entry_index])
+
     def get_run_event(self, run, event):
         """Returns an entry corresponding to a specific (run, event) pair.
 
@@ -292,11 +314,28 @@ class ReaderBase:
         # Get the appropriate entry index
         assert self.run_map is not None, (
                 "Must build a run map to get entries by [run, event].")
-        assert (run, event) in self.run_map, (
-                f"Could not find (run={run}, event={event}) pair.")
 
         return self.run_map[(run, event)]
 
+    def get_run_event_entries(self, run_event_list):
+        """Returns the global entry indexes corresponding to a list of
+        (run, event) pairs, irrespective of the current entry selection.
+
+        Parameters
+        ----------
+        run_event_list : np.ndarray
+            (N, 2) List of (run, event) pairs
+
+        Returns
+        -------
+        np.ndarray
+            (N) Global entry index of each (run, event) pair
+        """
+        assert self.run_index is not None, (
+                "Must build a run map to get entries by [run, event].")
+
+        return self.run_index.index(run_event_list[:, 0], run_event_list[:, 1])
+
     def get_file_path(self, idx):
         """Returns the path to the file corresponding to a specific entry.
 
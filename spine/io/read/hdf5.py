@@ -1,13 +1,23 @@
 """Contains a reader class dedicated to loading data from HDF5 files."""
 
+import os
+import ast
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import List, Union
+
 import h5py
 import numpy as np
 
 import spine.data
+from spine.data import ObjectCodec
 
 from spine.utils.decorators import inherit_docstring
 
 from .base import ReaderBase
+from .run_index import RunEventIndex
+from .lazy import LazyArray
 
 __all__ = ['HDF5Reader']
 
@@ -29,7 +39,9 @@ class HDF5Reader(ReaderBase):
                  n_entry=None, n_skip=None, entry_list=None,
                  skip_entry_list=None, run_event_list=None,
                  skip_run_event_list=None, create_run_map=False,
-                 build_classes=True, run_info_key='run_info'):
+                 build_classes=True, run_info_key='run_info',
+                 keep_open=False, max_open_files=16, lazy_keys=None,
+                 keys=None, skip_keys=None, event_filter=None):
         """Initalize the HDF5 file reader.
 
         Parameters
@@ -56,9 +68,35 @@ class HDF5Reader(ReaderBase):
             Initialize a map between [run, event] pairs and entries. For large
             files, this can be quite expensive (must load every entry).
         build_classes : bool, default True
-            If the stored object is a class, build it back
+            If the stored object is a class, build it back (lazily, when each
+            object is first accessed). Otherwise, return the structured array
+            of stored attributes, which can be accessed column-wise by name
         run_info_key : str, default 'run_info'
             Name of the data product which contains the run info of the event
+        keep_open : bool, default False
+            If `True`, keep a pool of open file handles rather than opening
+            the file for every entry. The datasets and their attributes are
+            cached per file.
+        max_open_files : int, default 16
+            Maximum number of file handles to keep open at once, if the handle
+            pool is used (least recently used handles are closed first)
+        lazy_keys : Union[bool, List[str]], optional
+            Tensors to load lazily. If `True`, applies to all the tensors
+            stored in simple datasets. Lazy tensors are returned as
+            :class:`LazyArray` proxies which only read the rows and columns
+            that are accessed. This is meant for analysis passes which only
+            use a subset of the stored tensors.
+        keys : List[str], optional
+            List of data product keys to load. Keys which do not appear in
+            the file are ignored. If not specified, load everything
+        skip_keys : List[str], optional
+            List of data product keys not to load
+        event_filter : str, optional
+            Expression which selects the entries to load, evaluated on the
+            event table before any data product is loaded. It may refer to
+            `run`, `subrun`, `event` (from `run_info_key`) and to any scalar
+            data product stored in the file, as numpy arrays (combine
+            conditions with `&`, `|` and `~`), e.g. `(run == 1) & (event < 10)`
         """
         # Process the list of files
         self.process_file_paths(file_keys, limit_num_files, max_print_files)
@@ -105,13 +143,168 @@ class HDF5Reader(ReaderBase):
         # Process the run information
         self.process_run_info()
 
+        # If requested, evaluate the event filter on every entry
+        self.event_mask = None
+        if event_filter is not None:
+            self.event_mask = self.get_event_mask(event_filter, run_info_key)
+
         # Process the entry list
         self.process_entry_list(
                 n_entry, n_skip, entry_list, skip_entry_list,
                 run_event_list, skip_run_event_list)
 
+        # Process the list of data products to load
+        self.process_keys(keys, skip_keys)
+
         # Store other attributes
         self.build_classes = build_classes
+        self.lazy_keys = lazy_keys
+
+        # Initialize the pool of open file handles and the format cache
+        assert max_open_files > 0, (
+                "The maximum number of open files must be strictly positive.")
+        self.keep_open = keep_open
+        self.max_open_files = max_open_files
+        self._handles = OrderedDict()
+        self._nodes = {}
+        self._formats = {}
+        self._pid = os.getpid()
+
+    def process_keys(self, keys=None, skip_keys=None):
+        """Sets the list of data products to load from the file(s).
+
+        Parameters
+        ----------
+        keys : List[str], optional
+            List of data product keys to load. If not specified, load everything
+        skip_keys : List[str], optional
+            List of data product keys not to load
+        """
+        # Check that the keys make sense
+        assert keys is None or skip_keys is None, (
+                "Must not specify both `keys` or `skip_keys`.")
+
+        # Store them, always load the index
+        self.keys = None if keys is None else {'index', *keys}
+        self.skip_keys = None if skip_keys is None else set(skip_keys)
+        assert self.skip_keys is None or 'index' not in self.skip_keys, (
+                "The `index` must always be loaded, cannot skip it.")
+
+    def process_entry_list(self, *args, **kwargs):
+        """Create a list of entries that can be accessed by :meth:`__getitem__`.
+
+        Applies the event filter, if there is one, to the list of entries
+        produced by :meth:`ReaderBase.process_entry_list`.
+
+        Parameters
+        ----------
+        *args : list
+            Arguments of :meth:`ReaderBase.process_entry_list`
+        **kwargs : dict
+            Keyword arguments of :meth:`ReaderBase.process_entry_list`
+        """
+        # Create the base list of entries
+        super().process_entry_list(*args, **kwargs)
+
+        # Only keep the entries which pass the event filter
+        if self.event_mask is not None:
+            self.entry_index = self.entry_index[
+                    self.event_mask[self.entry_index]]
+            if self.run_info is not None:
+                self.run_map = RunEventIndex(self.run_info[self.entry_index])
+
+            assert len(self.entry_index), (
+                    "No entry passes the event filter.")
+
+            print("Total number of entries which pass the event filter: "
+                  f"{len(self.entry_index)}\n")
+
+    def get_event_mask(self, event_filter, run_info_key='run_info'):
+        """Evaluates an event filter expression on every entry.
+
+        Only the datasets the expression refers to are read.
+
+        Parameters
+        ----------
+        event_filter : str
+            Filter expression
+        run_info_key : str, default 'run_info'
+            Name of the data product which contains the run info of the event
+
+        Returns
+        -------
+        np.ndarray
+            (N) Boolean mask of entries which pass the filter
+        """
+        # Parse the expression, find the variables it depends on
+        tree = ast.parse(event_filter, mode='eval')
+        names = {node.id for node in ast.walk(tree)
+                 if isinstance(node, ast.Name) and node.id != 'np'}
+        code = compile(tree, '<event_filter>', 'eval')
+
+        # Loop over the files, evaluate the expression on each of them
+        mask = np.empty(self.num_entries, dtype=bool)
+        for i, path in enumerate(self.file_paths):
+            with h5py.File(path, 'r') as in_file:
+                # Fetch the value of each variable for every event
+                events = in_file['events']
+                columns = {}
+                for name in names:
+                    key, field = name, None
+                    if name not in events.dtype.names:
+                        assert (name in ['run', 'subrun', 'event'] and
+                                run_info_key in events.dtype.names), (
+                                f"Cannot filter on `{name}`, it is not a "
+                                 "data product stored in the file.")
+                        key, field = run_info_key, name
+
+                    dataset = in_file[key]
+                    assert (isinstance(dataset, h5py.Dataset) and
+                            dataset.attrs.get('scalar', False)), (
+                            f"Cannot filter on `{key}`, it is not a scalar.")
+                    starts = self.get_bounds(dataset, events[key])[:, 0]
+                    values = dataset[()][starts]
+                    columns[name] = values if field is None else values[field]
+
+                # Evaluate the filter
+                result = eval( # pylint: disable=W0123
+                        code, {'__builtins__': {}, 'np': np}, columns)
+                offset, num_entries = self.file_offsets[i], len(events)
+                mask[offset:offset + num_entries] = np.broadcast_to(
+                        result, num_entries)
+
+        return mask
+
+    @dataclass
+    class DataFormat:
+        """Data structure to hold the format of a stored data product.
+
+        Attributes
+        ----------
+        group : bool, default False
+            Whether the data product is stored as a group of datasets
+        merge : bool, default False
+            Whether the elements of a group are merged into a single dataset
+        scalar : bool, default False
+            Whether the data is a scalar object or not
+        width : Union[int, List[int]], default 0
+            Width of the stored tensor(s), if it is a tensor
+        obj_class : type, optional
+            Class of the stored objects, if the dataset contains objects
+        codec : ObjectCodec, optional
+            Codec used to rebuild the stored objects, if the dataset
+            contains objects
+        offset : int, optional
+            Offset of the dataset in the file, if it is stored contiguously
+            (not chunked, not compressed) and can be memory-mapped
+        """
+        group: bool = False
+        merge: bool = False
+        scalar: bool = False
+        width: Union[int, List[int]] = 0
+        obj_class: type = None
+        codec: ObjectCodec = None
+        offset: int = None
 
     def get(self, idx):
         """Returns a specific entry in the file.
@@ -126,80 +319,467 @@ class HDF5Reader(ReaderBase):
         data : dict
             Ditionary of data products corresponding to one event
         """
-        # Get the appropriate entry index
-        assert idx < len(self.entry_index)
-        file_idx  = self.get_file_index(idx)
-        entry_idx = self.get_file_entry_index(idx)
+        return self.get_batch([idx])[0]
 
-        # Use the event tree to find out what needs to be loaded
-        data = {'file_index': file_idx}
-        with h5py.File(self.file_paths[file_idx], 'r') as in_file:
-            event = in_file['events'][entry_idx]
-            for key in event.dtype.names:
-                self.load_key(in_file, event, data, key)
+    def get_batch(self, indices):
+        """Returns a list of entries from the file(s).
 
-        return data
+        The requested entries are grouped by file. Within a file, the event
+        table is read in one go and the region references of each data
+        product are resolved block-wise: contiguous regions are fetched with
+        a single slice per dataset.
 
-    def load_key(self, in_file, event, data, key):
-        """Fetch a specific key for a specific event.
+        Parameters
+        ----------
+        indices : List[int]
+            List of integer entry IDs to access
+
+        Returns
+        -------
+        List[dict]
+            List of dictionaries of data products, one per requested entry
+        """
+        # Get the appropriate file and entry indexes
+        indices = np.asarray(indices, dtype=np.int64)
+        assert np.all(indices < len(self.entry_index))
+        entry_index = self.entry_index[indices]
+        file_index  = self.file_index[entry_index]
+        entry_index = entry_index - self.file_offsets[file_index]
+
+        # Loop over the files which contain the requested entries
+        batch = [None]*len(indices)
+        for file_idx in np.unique(file_index):
+            # Fetch the unique (sorted) list of entries to load in this file
+            batch_ids = np.where(file_index == file_idx)[0]
+            entries, inverse = np.unique(
+                    entry_index[batch_ids], return_inverse=True)
+
+            # Use the event tree to find out what needs to be loaded
+            file_data = [{'file_index': file_idx} for _ in entries]
+            with self.open_file(file_idx) as in_file:
+                events = self.get_node(in_file, file_idx, 'events')
+                keys = self.get_keys(events.dtype.names)
+                if len(keys) < len(events.dtype.names):
+                    events = events.fields(keys)[entries]
+                else:
+                    events = events[entries]
+                for key in keys:
+                    values = self.load_key(in_file, file_idx, events[key], key)
+                    for i, value in enumerate(values):
+                        file_data[i][key] = value
+
+            # Dispatch the entries in the order they were requested
+            for batch_id, i in zip(batch_ids, inverse.flatten()):
+                batch[batch_id] = file_data[i]
+
+        return batch
+
+    def get_sizes(self, key):
+        """Fetches the number of rows of a data product in each entry.
+
+        The sizes are obtained from the region references stored in the event
+        table, without reading the data product itself.
+
+        Parameters
+        ----------
+        key : str
+            Name of the data product (must be stored as a simple dataset)
+
+        Returns
+        -------
+        np.ndarray
+            (N) Number of rows of the data product in each entry of the
+            `entry_index`
+        """
+        sizes = np.empty(self.num_entries, dtype=np.int64)
+        for file_idx, offset in enumerate(self.file_offsets):
+            with self.open_file(file_idx) as in_file:
+                assert isinstance(in_file[key], h5py.Dataset), (
+                        f"Cannot fetch the sizes of `{key}`, it is not stored "
+                         "as a simple dataset.")
+                region_refs = in_file['events'].fields(key)[:]
+                bounds = self.get_bounds(in_file[key], region_refs)
+                sizes[offset:offset + len(bounds)] = bounds[:, 1] - bounds[:, 0]
+
+        return sizes[self.entry_index]
+
+    def get_keys(self, names):
+        """Selects the data products to load among those stored in a file.
+
+        Parameters
+        ----------
+        names : List[str]
+            List of data products stored in the file
+
+        Returns
+        -------
+        List[str]
+            List of data products to load
+        """
+        return [name for name in names if
+                (self.keys is None or name in self.keys) and
+                (self.skip_keys is None or name not in self.skip_keys)]
+
+    @contextmanager
+    def open_file(self, file_idx):
+        """Provides an open handle to one of the input files.
+
+        If the handle pool is not used, the file is opened for the duration of
+        the context and closed on exit. Otherwise, the handle is fetched from
+        (or added to) the pool of open handles and is left open.
+
+        Parameters
+        ----------
+        file_idx : int
+            Index of the file in the file list
+
+        Yields
+        ------
+        h5py.File
+            HDF5 file instance
+        """
+        if not self.keep_open:
+            with h5py.File(self.file_paths[file_idx], 'r') as in_file:
+                yield in_file
+
+        else:
+            yield self.get_handle(file_idx)
+
+    def get_handle(self, file_idx):
+        """Fetches a file handle from the pool of open files.
+
+        The pool is bounded to `max_open_files` handles. When it is full, the
+        least recently used handle is closed to make room for the new one.
+
+        Parameters
+        ----------
+        file_idx : int
+            Index of the file in the file list
+
+        Returns
+        -------
+        h5py.File
+            HDF5 file instance
+        """
+        # If the process was forked since the pool was last used (e.g. by a
+        # DataLoader worker), the inherited handles must not be used
+        if self._pid != os.getpid():
+            self._handles = OrderedDict()
+            self._nodes = {}
+            self._pid = os.getpid()
+
+        # If the file is already open, mark it as the most recently used
+        if file_idx in self._handles:
+            self._handles.move_to_end(file_idx)
+            return self._handles[file_idx]
+
+        # If the pool is full, close the least recently used file
+        if len(self._handles) >= self.max_open_files:
+            old_idx, old_file = self._handles.popitem(last=False)
+            self._nodes.pop(old_idx)
+            old_file.close()
+
+        # Open the file, add it to the pool
+        in_file = h5py.File(self.file_paths[file_idx], 'r')
+        self._handles[file_idx] = in_file
+        self._nodes[file_idx] = {}
+
+        return in_file
+
+    def close(self):
+        """Closes all the file handles currently held in the pool."""
+        if self._pid == os.getpid():
+            for in_file in self._handles.values():
+                in_file.close()
+
+        self._handles = OrderedDict()
+        self._nodes = {}
+
+    def __getstate__(self):
+        """Returns the variables to be pickled.
+
+        Open file handles cannot be pickled (e.g. to be sent to a spawned
+        DataLoader worker). Each process opens its own handles instead.
+
+        Returns
+        -------
+        dict
+            Dictionary representation of the object
+        """
+        state = self.__dict__.copy()
+        state['_handles'] = OrderedDict()
+        state['_nodes'] = {}
+        state['_pid'] = None
+
+        return state
+
+    def get_node(self, in_file, file_idx, name):
+        """Fetches a dataset or a group from a file.
+
+        When the handle pool is used, the node objects are cached per file
+        to avoid resolving the path of each node at every entry.
 
         Parameters
         ----------
         in_file : h5py.File
             HDF5 file instance
-        event : dict
-            Dictionary of objects that make up one event
-        data : dict
-            Dictionary of data products corresponding to one event
+        file_idx : int
+            Index of the file in the file list
+        name : str
+            Path to the node in the file
+
+        Returns
+        -------
+        Union[h5py.Dataset, h5py.Group]
+            Dataset or group object
+        """
+        if not self.keep_open:
+            return in_file[name]
+
+        nodes = self._nodes[file_idx]
+        if name not in nodes:
+            nodes[name] = in_file[name]
+
+        return nodes[name]
+
+    def get_format(self, in_file, file_idx, key):
+        """Fetches the format of a data product stored in a file.
+
+        The format (which depends on the attributes and the shape of the
+        stored datasets) is only parsed once per file and cached.
+
+        Parameters
+        ----------
+        in_file : h5py.File
+            HDF5 file instance
+        file_idx : int
+            Index of the file in the file list
         key: str
             Name of the dataset in the entry
+
+        Returns
+        -------
+        DataFormat
+            Format of the stored data product
         """
-        # The event-level information is a region reference: fetch it
-        region_ref = event[key]
-        if isinstance(in_file[key], h5py.Dataset):
-            if not in_file[key].dtype.names:
-                # If the reference points at a simple dataset, return
-                data[key] = in_file[key][region_ref]
-                if in_file[key].attrs['scalar']:
-                    data[key] = data[key][0]
-                if len(in_file[key].shape) > 1:
-                    data[key] = data[key].reshape(-1, in_file[key].shape[1])
+        # If the format has already been parsed, nothing to do
+        formats = self._formats.setdefault(file_idx, {})
+        if key in formats:
+            return formats[key]
+
+        # Parse the attributes and the shape of the node
+        node = self.get_node(in_file, file_idx, key)
+        fmt = self.DataFormat(scalar=bool(node.attrs.get('scalar', False)))
+        if isinstance(node, h5py.Dataset):
+            # Simple dataset, check its width and if it contains objects
+            if len(node.shape) > 1:
+                fmt.width = node.shape[1]
+            if node.dtype.names:
+                fmt.obj_class = getattr(spine.data, node.attrs['class_name'])
+                fmt.codec = ObjectCodec(fmt.obj_class, node.dtype)
+            if node.chunks is None and node.compression is None:
+                fmt.offset = node.id.get_offset()
 
+        else:
+            # Group of datasets, check how the elements are stored
+            fmt.group = True
+            fmt.merge = 'elements' in node
+            if fmt.merge:
+                names = ['elements']
             else:
-                # If the dataset has multiple attributes, it contains an object.
-                # Start by fetching the appropriate class to rebuild
-                array = in_file[key][region_ref]
-                class_name = in_file[key].attrs['class_name']
-                obj_class = getattr(spine.data, class_name)
-
-                # Load the object
-                names = array.dtype.names
-                data[key] = []
-                for i, el in enumerate(array):
-                    obj_dict = dict(zip(names, el))
-                    if self.build_classes:
-                        data[key].append(obj_class(**obj_dict))
-                    else:
-                        data[key].append(obj_dict)
-                if in_file[key].attrs['scalar']:
-                    data[key] = data[key][0]
+                names = [f'element_{i}' for i in range(node['index'].shape[1])]
 
-        else:
-            # If the reference points at a group, unpack
-            el_refs = in_file[key]['index'][region_ref].flatten()
-            if len(in_file[key]['index'].shape) == 1:
-                ret = np.empty(len(el_refs), dtype=np.object)
-                ret[:] = [in_file[key]['elements'][r] for r in el_refs]
-                if len(in_file[key]['elements'].shape) > 1:
-                    for i in range(len(el_refs)):
-                        ret[i] = ret[i].reshape(
-                                -1, in_file[key]['elements'].shape[1])
+            fmt.width = []
+            for name in names:
+                shape = node[name].shape
+                fmt.width.append(shape[1] if len(shape) > 1 else 0)
+
+        formats[key] = fmt
+
+        return fmt
+
+    def load_key(self, in_file, file_idx, region_refs, key):
+        """Fetch a specific key for a list of events.
+
+        Parameters
+        ----------
+        in_file : h5py.File
+            HDF5 file instance
+        file_idx : int
+            Index of the file in the file list
+        region_refs : np.ndarray
+            (E) Region references to the data product, one per event
+        key: str
+            Name of the dataset in the entry
+
+        Returns
+        -------
+        list
+            List of data products, one per event
+        """
+        # Fetch the format of the data product
+        fmt = self.get_format(in_file, file_idx, key)
+        if not fmt.group:
+            # If the reference points at a simple tensor which is to be
+            # loaded lazily, only fetch the location of each region
+            dataset = self.get_node(in_file, file_idx, key)
+            if (fmt.obj_class is None and not fmt.scalar and
+                self.lazy_keys is not None and
+                (self.lazy_keys is True or key in self.lazy_keys)):
+                bounds = self.get_bounds(dataset, region_refs)
+                return [LazyArray(
+                    self, file_idx, key, start, stop, fmt.width,
+                    dataset.dtype, fmt.offset) for start, stop in bounds]
+
+            # Otherwise, read the regions
+            arrays = self.read_regions(dataset, region_refs)
+
+            if fmt.obj_class is None:
+                # If the dataset contains simple arrays, return them
+                values = arrays
+                if fmt.scalar:
+                    values = [array[0] for array in values]
+                if fmt.width:
+                    values = [v.reshape(-1, fmt.width) for v in values]
 
             else:
-                ret = [in_file[key][f'element_{i}'][r] for i, r in enumerate(el_refs)]
-                for i in range(len(el_refs)):
-                    if len(in_file[key][f'element_{i}'].shape) > 1:
-                        ret[i] = ret[i].reshape(
-                                -1, in_file[key][f'element_{i}'].shape[1])
+                # If the dataset has multiple attributes, it contains objects
+                values = [self.load_objects(fmt, array) for array in arrays]
+                if fmt.scalar:
+                    values = [v[0] for v in values]
+
+            return values
+
+        # If the reference points at a group, unpack. Start by loading the
+        # list of element references of each event
+        index = self.get_node(in_file, file_idx, f'{key}/index')
+        el_refs = [r.flatten() for r in self.read_regions(index, region_refs)]
+
+        values = []
+        if fmt.merge:
+            # All elements are stored in a single dataset
+            counts = [len(r) for r in el_refs]
+            elements = self.get_node(in_file, file_idx, f'{key}/elements')
+            flat_refs = np.empty(np.sum(counts, dtype=np.int64), dtype=object)
+            if len(flat_refs):
+                flat_refs[:] = np.concatenate(el_refs)
+            arrays = self.read_regions(elements, flat_refs)
+
+            offset = 0
+            for count in counts:
+                ret = np.empty(count, dtype=object)
+                for i in range(count):
+                    ret[i] = arrays[offset + i]
+                    if fmt.width[0]:
+                        ret[i] = ret[i].reshape(-1, fmt.width[0])
+                offset += count
+                values.append(ret)
+
+        else:
+            # Each element is stored in its own dataset
+            values = [[] for _ in el_refs]
+            for i, width in enumerate(fmt.width):
+                dataset = self.get_node(in_file, file_idx, f'{key}/element_{i}')
+                arrays = self.read_regions(dataset, [r[i] for r in el_refs])
+                for j, array in enumerate(arrays):
+                    if width:
+                        array = array.reshape(-1, width)
+                    values[j].append(array)
+
+        return values
+
+    def load_objects(self, fmt, array):
+        """Rebuilds a list of objects from a structured array.
+
+        Parameters
+        ----------
+        fmt : DataFormat
+            Format of the stored data product
+        array : np.ndarray
+            Structured array with one row per object
+
+        Returns
+        -------
+        Union[LazyObjectList, np.ndarray]
+            List of objects, built on access (or the structured array itself
+            if classes are not built)
+        """
+        if self.build_classes:
+            return fmt.codec.decode(array)
 
-            data[key] = ret
+        return array
+
+    @staticmethod
+    def get_bounds(dataset, region_refs):
+        """Fetches the bounds of the regions of a dataset pointed to by a list
+        of references, along the first axis of the dataset.
+
+        Parameters
+        ----------
+        dataset : h5py.Dataset
+            Dataset the regions refer to
+        region_refs : List[h5py.RegionReference]
+            (R) List of region references
+
+        Returns
+        -------
+        np.ndarray
+            (R, 2) Start and stop of each region (empty regions are [0, 0])
+        """
+        bounds = np.zeros((len(region_refs), 2), dtype=np.int64)
+        for i, region_ref in enumerate(region_refs):
+            space = h5py.h5r.get_region(region_ref, dataset.id)
+            if space is not None and space.get_select_npoints() > 0:
+                lower, upper = space.get_select_bounds()
+                bounds[i] = lower[0], upper[0] + 1
+
+        return bounds
+
+    @staticmethod
+    def read_regions(dataset, region_refs):
+        """Reads the regions of a dataset pointed to by a list of references.
+
+        Rather than dereferencing each region independently, this function
+        computes the bounds of each region and reads each block of contiguous
+        regions with a single slice of the dataset.
+
+        Parameters
+        ----------
+        dataset : h5py.Dataset
+            Dataset the regions refer to
+        region_refs : List[h5py.RegionReference]
+            (R) List of region references to read
+
+        Returns
+        -------
+        List[np.ndarray]
+            (R) List of arrays, one per region reference
+        """
+        # Fetch the bounds of each region along the first axis
+        num_refs = len(region_refs)
+        bounds = HDF5Reader.get_bounds(dataset, region_refs)
+
+        # Initialize the output with empty arrays (covers empty regions)
+        empty = np.empty((0, *dataset.shape[1:]), dtype=dataset.dtype)
+        arrays = [empty]*num_refs
+
+        # Read each block of contiguous (or overlapping) regions at once
+        valid = np.where(bounds[:, 1] > bounds[:, 0])[0]
+        valid = valid[np.argsort(bounds[valid, 0], kind='stable')]
+        block_start = 0
+        while block_start < len(valid):
+            block_end = block_start + 1
+            lower, upper = bounds[valid[block_start]]
+            while (block_end < len(valid) and
+                   bounds[valid[block_end], 0] <= upper):
+                upper = max(upper, bounds[valid[block_end], 1])
+                block_end += 1
+
+            block = dataset[lower:upper]
+            for i in valid[block_start:block_end]:
+                start, stop = bounds[i] - lower
+                arrays[i] = block[start:stop]
+
+            block_start = block_end
+
+        return arrays
@@ -6,6 +6,7 @@ import ROOT
 from spine.utils.decorators import inherit_docstring
 
 from .base import ReaderBase
+from .larcv_index import get_file_index
 
 __all__ = ['LArCVReader']
 
@@ -33,7 +34,7 @@ class LArCVReader(ReaderBase):
                  max_print_files=10, n_entry=None, n_skip=None,
                  entry_list=None, skip_entry_list=None, run_event_list=None,
                  skip_run_event_list=None, create_run_map=False,
-                 run_info_key=None):
+                 run_info_key=None, index_cache=None, num_index_workers=None):
         """Initialize the LArCV file reader.
 
         Parameters
@@ -63,6 +64,13 @@ class LArCVReader(ReaderBase):
             files, this can be quite expensive (must load every entry).
         run_info_key : str, optional
             Key of the tree in the file to get the run information from
+        index_cache : str, optional
+            Directory in which to cache the entry counts and the run
+            information of each file. Cached values are reused as long as
+            the size and modification time of the file are unchanged.
+        num_index_workers : int, optional
+            Number of processes used to scan the files which are not cached
+            (or to build the run map). Defaults to the number of CPUs.
         """
         # Process the file_paths
         self.process_file_paths(file_keys, limit_num_files, max_print_files)
@@ -71,34 +79,51 @@ class LArCVReader(ReaderBase):
         if run_event_list is not None or skip_run_event_list is not None:
             create_run_map = True
 
-        # Prepare TTrees and load files
-        self.trees = {}
-        self.trees_ready = False
-        self.file_offsets = np.empty(len(self.file_paths), dtype=np.int64)
-        file_counts = []
-        for key in tree_keys:
-            # Check data TTree exists, and entries are identical across all
-            # trees. Do not register these TTrees in yet in order to support
-            # > 1 workers by the DataLoader object downstrean.
-            print("Loading tree", key)
-            chain = ROOT.TChain(f'{key}_tree') # pylint: disable=E1101
-            for i, f in enumerate(self.file_paths):
-                self.file_offsets[i] = chain.GetEntries()
-                chain.AddFile(f)
-                if key == tree_keys[0]:
-                    count = chain.GetEntries() - self.file_offsets[i]
-                    file_counts.append(count)
+        # If requested, check that the run information can be fetched
+        if create_run_map:
+            assert run_info_key is not None and run_info_key in tree_keys, (
+                    "Must provide the `run_info_key` if a run maps is needed. "
+                    "The key must appear in the list of `tree_keys`")
 
-            if self.num_entries is not None:
-                assert self.num_entries == chain.GetEntries(), (
+        # Count the entries in each tree. Do not register the TTrees yet in
+        # order to support > 1 workers by the DataLoader object downstream.
+        self.trees = {key: None for key in tree_keys}
+        self.trees_ready = False
+        if index_cache is None and not create_run_map:
+            # Load the files into one TChain per tree
+            file_counts = self.count_entries(tree_keys)
+
+        else:
+            # Scan the files in parallel (or fetch their cached scan)
+            index = get_file_index(
+                    self.file_paths, run_info_key if create_run_map else None,
+                    index_cache, num_index_workers)
+
+            counts = np.empty((len(tree_keys), len(index)), dtype=np.int64)
+            for i, key in enumerate(tree_keys):
+                for j, info in enumerate(index):
+                    assert key in info['counts'], (
+                            f"The tree `{key}_tree` is missing from "
+                            f"{self.file_paths[j]}.")
+                    counts[i, j] = info['counts'][key]
+
+            totals = np.sum(counts, axis=1)
+            for key, total in zip(tree_keys, totals):
+                assert total == totals[0], (
                         f"Mismatch between the number of entries for {key} "
-                        f"({chain.GetEntries()}) and the number of entries "
-                        f"in other data products ({self.num_entries}).")
-            else:
-                self.num_entries = chain.GetEntries()
+                        f"({total}) and the number of entries in other data "
+                        f"products ({totals[0]}).")
 
-            self.trees[key] = None
-        print("")
+            file_counts = counts[0]
+            self.num_entries = int(totals[0])
+
+            # Fetch the [run, event] pair of each entry
+            if create_run_map:
+                self.run_info = np.concatenate(
+                        [info['run_info'][:, [0, 2]] for info in index])
+
+        self.file_offsets = np.zeros(len(self.file_paths), dtype=np.int64)
+        self.file_offsets[1:] = np.cumsum(file_counts)[:-1]
 
         # Dump the number of entries to load
         print(f"Total number of entries in the file(s): {self.num_entries}\n")
@@ -107,23 +132,6 @@ class LArCVReader(ReaderBase):
         self.file_index = np.repeat(
                 np.arange(len(self.file_paths)), file_counts)
 
-        # If requested, must extract the run information for each entry
-        if create_run_map:
-            # Initialize the TChain object
-            assert run_info_key is not None and run_info_key in tree_keys, (
-                    "Must provide the `run_info_key` if a run maps is needed. "
-                    "The key must appear in the list of `tree_keys`")
-            chain = ROOT.TChain(f'{run_info_key}_tree') # pylint: disable=E1101
-            for f in self.file_paths:
-                chain.AddFile(f)
-
-            # Loop over entries
-            self.run_info = np.empty((self.num_entries, 2), dtype=np.int64)
-            for i in range(self.num_entries):
-                chain.GetEntry(i)
-                source = getattr(chain, f'{run_info_key}_branch')
-                self.run_info[i] = [source.run(), source.event()]
-
         # Process the run information
         self.process_run_info()
 
@@ -132,6 +140,42 @@ class LArCVReader(ReaderBase):
                 n_entry, n_skip, entry_list, skip_entry_list,
                 run_event_list, skip_run_event_list)
 
+    def count_entries(self, tree_keys):
+        """Counts the entries in each file by loading them into TChains.
+
+        Parameters
+        ----------
+        tree_keys : List[str]
+            List of data keys to load from the LArCV files
+
+        Returns
+        -------
+        List[int]
+            Number of entries in each file
+        """
+        file_counts = []
+        for key in tree_keys:
+            # Check data TTree exists, and entries are identical across all
+            # trees
+            print("Loading tree", key)
+            chain = ROOT.TChain(f'{key}_tree') # pylint: disable=E1101
+            for f in self.file_paths:
+                offset = chain.GetEntries()
+                chain.AddFile(f)
+                if key == tree_keys[0]:
+                    file_counts.append(chain.GetEntries() - offset)
+
+            if self.num_entries is not None:
+                assert self.num_entries == chain.GetEntries(), (
+                        f"Mismatch between the number of entries for {key} "
+                        f"({chain.GetEntries()}) and the number of entries "
+                        f"in other data products ({self.num_entries}).")
+            else:
+                self.num_entries = chain.GetEntries()
+        print("")
+
+        return file_counts
+
     def get(self, idx):
         """Returns a specific entry in the file.
 
@@ -169,6 +213,23 @@ class LArCVReader(ReaderBase):
 
         return data
 
+    def __getstate__(self):
+        """Returns the variables to be pickled.
+
+        ROOT chains cannot be copied or pickled (e.g. to be sent to a
+        prefetching thread). Each copy instantiates its own chains instead.
+
+        Returns
+        -------
+        dict
+            Dictionary representation of the object
+        """
+        state = self.__dict__.copy()
+        state['trees'] = {key: None for key in self.trees}
+        state['trees_ready'] = False
+
+        return state
+
     @staticmethod
     def list_data(file_path):
         """Dumps top-level information about the contents of a LArCV root file.
@@ -0,0 +1,229 @@
+"""Contains functions to index the content of LArCV files.
+
+Scanning a LArCV file to count the entries in its trees and to fetch the
+run information of every entry requires opening the file and, for the latter,
+walking through every entry. For long file lists, this dominates the start-up
+time of the reader. The functions in this module scan files in parallel and
+store the result of each scan in a small NumPy file in a cache directory,
+keyed on the path of the scanned file. The cached scan of a file is reused
+as long as the size and the modification time of the file are unchanged.
+"""
+
+import os
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import ROOT
+
+__all__ = ['get_file_index', 'scan_file']
+
+
+def get_file_index(file_paths, run_info_key=None, cache_dir=None,
+                   num_workers=None):
+    """Fetches the entry counts and the run information of a list of files.
+
+    Parameters
+    ----------
+    file_paths : List[str]
+        List of paths to the LArCV files
+    run_info_key : str, optional
+        Key of the tree to get the run information from. If not specified,
+        the run information is not fetched.
+    cache_dir : str, optional
+        Directory in which to store the scan of each file. If not specified,
+        the files are scanned every time.
+    num_workers : int, optional
+        Number of processes used to scan files. If not specified, uses as many
+        processes as there are CPUs.
+
+    Returns
+    -------
+    List[dict]
+        One dictionary per file which maps each tree name onto its number of
+        entries (`counts`) and, if requested, contains the (run, subrun,
+        event) triplet of each entry (`run_info`)
+    """
+    # Load the cached scans which are still valid
+    index = [None]*len(file_paths)
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        for i, path in enumerate(file_paths):
+            index[i] = load_cache(path, run_info_key, cache_dir)
+
+    # Scan the files which are not cached, in parallel
+    missing = [i for i, info in enumerate(index) if info is None]
+    if len(missing):
+        paths = [file_paths[i] for i in missing]
+        keys = [run_info_key]*len(missing)
+        if len(missing) > 1 and num_workers != 1:
+            with ProcessPoolExecutor(max_workers=num_workers) as executor:
+                scans = list(executor.map(scan_file, paths, keys))
+        else:
+            scans = [scan_file(p, k) for p, k in zip(paths, keys)]
+
+        for i, info in zip(missing, scans):
+            index[i] = info
+            if cache_dir is not None:
+                store_cache(file_paths[i], run_info_key, info, cache_dir)
+
+    return index
+
+
+def scan_file(file_path, run_info_key=None):
+    """Counts the number of entries in each tree of a LArCV file and, if
+    requested, fetches the run information of each entry.
+
+    Parameters
+    ----------
+    file_path : str
+        Path to the LArCV file
+    run_info_key : str, optional
+        Key of the tree to get the run information from
+
+    Returns
+    -------
+    dict
+        Dictionary with the number of entries in each tree (`counts`) and,
+        if requested, the (run, subrun, event) triplet of each entry
+        (`run_info`)
+    """
+    # Count the entries in each tree
+    in_file = ROOT.TFile.Open(file_path, 'r') # pylint: disable=E1101
+    counts = {}
+    for key in in_file.GetListOfKeys():
+        name = key.GetName()
+        if name.endswith('_tree'):
+            counts[name[:-5]] = in_file.Get(name).GetEntries()
+
+    # If requested, fetch the run information of each entry
+    run_info = None
+    if run_info_key is not None:
+        assert run_info_key in counts, (
+                f"The run info tree `{run_info_key}_tree` is missing from "
+                f"{file_path}.")
+        tree = in_file.Get(f'{run_info_key}_tree')
+        run_info = np.empty((counts[run_info_key], 3), dtype=np.int64)
+        for i in range(len(run_info)):
+            tree.GetEntry(i)
+            source = getattr(tree, f'{run_info_key}_branch')
+            run_info[i] = source.run(), source.subrun(), source.event()
+
+    in_file.Close()
+
+    return {'counts': counts, 'run_info': run_info}
+
+
+def get_cache_path(file_path, cache_dir):
+    """Path to the cached scan of a file.
+
+    Parameters
+    ----------
+    file_path : str
+        Path to the LArCV file
+    cache_dir : str
+        Cache directory
+
+    Returns
+    -------
+    str
+        Path to the cache file
+    """
+    key = hashlib.sha1(os.path.abspath(file_path).encode()).hexdigest()
+
+    return os.path.join(cache_dir, f'{key}.npz')
+
+
+def get_signature(file_path):
+    """Signature of a file used to invalidate its cached scan.
+
+    Parameters
+    ----------
+    file_path : str
+        Path to the LArCV file
+
+    Returns
+    -------
+    np.ndarray
+        (2) File size and modification time (in ns)
+    """
+    stat = os.stat(file_path)
+
+    return np.array([stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+
+
+def load_cache(file_path, run_info_key, cache_dir):
+    """Loads the cached scan of a file, if it exists and is still valid.
+
+    Parameters
+    ----------
+    file_path : str
+        Path to the LArCV file
+    run_info_key : str
+        Key of the tree to get the run information from
+    cache_dir : str
+        Cache directory
+
+    Returns
+    -------
+    Union[dict, None]
+        Scan of the file, if it is available
+    """
+    # Check that a cached scan exists
+    cache_path = get_cache_path(file_path, cache_dir)
+    if not os.path.isfile(cache_path):
+        return None
+
+    # Check that it matches the file and contains the run info, if needed
+    try:
+        with np.load(cache_path) as cache:
+            if (str(cache['path']) != os.path.abspath(file_path) or
+                not np.array_equal(cache['signature'],
+                                   get_signature(file_path))):
+                return None
+
+            run_info = None
+            if run_info_key is not None:
+                if str(cache['run_info_key']) != run_info_key:
+                    return None
+                run_info = cache['run_info']
+
+            counts = dict(zip(cache['names'].tolist(),
+                              cache['counts'].tolist()))
+
+    except (OSError, KeyError, ValueError):
+        return None
+
+    return {'counts': counts, 'run_info': run_info}
+
+
+def store_cache(file_path, run_info_key, info, cache_dir):
+    """Stores the scan of a file in the cache directory.
+
+    Parameters
+    ----------
+    file_path : str
+        Path to the LArCV file
+    run_info_key : str
+        Key of the tree the run information was fetched from
+    info : dict
+        Scan of the file
+    cache_dir : str
+        Cache directory
+    """
+    # Write to a temporary file first so that an interrupted write (or a
+    # concurrent reader) never sees a partial cache file
+    cache_path = get_cache_path(file_path, cache_dir)
+    tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+    run_info = info['run_info']
+    with open(tmp_path, 'wb') as out_file:
+        np.savez(
+                out_file, path=os.path.abspath(file_path),
+                signature=get_signature(file_path),
+                names=np.array(list(info['counts'].keys()), dtype=str),
+                counts=np.array(list(info['counts'].values()), dtype=np.int64),
+                run_info_key=run_info_key if run_info_key else '',
+                run_info=(run_info if run_info is not None
+                          else np.empty((0, 3), dtype=np.int64)))
+
+    os.replace(tmp_path, cache_path)
@@ -0,0 +1,277 @@
+"""Contains a proxy class which defers the loading of stored arrays."""
+
+import numpy as np
+from numpy.lib.mixins import NDArrayOperatorsMixin
+
+__all__ = ['LazyArray']
+
+
+class LazyArray(NDArrayOperatorsMixin):
+    """Proxy to a block of rows of an HDF5 dataset which is only read when
+    it is accessed.
+
+    Indexing the proxy with a slice of rows and/or a selection of columns
+    (e.g. `tensor[:, COORD_COLS]`) only reads the corresponding rows and
+    range of columns from the file. Any other operation (arithmetic, numpy
+    functions, array methods) reads the whole block once and caches it.
+
+    If the dataset is stored contiguously in the file (not chunked, not
+    compressed), the block is memory-mapped rather than read through h5py.
+
+    Attributes
+    ----------
+    reader : HDF5Reader
+        Reader which provides the file handles
+    file_idx : int
+        Index of the file in the file list of the reader
+    key : str
+        Name of the dataset in the file
+    start : int
+        Index of the first row of the block in the dataset
+    stop : int
+        Index of the row after the last row of the block in the dataset
+    width : int
+        Number of columns of the dataset (0 if it is one-dimensional)
+    dtype : np.dtype
+        Data type of the dataset
+    offset : int
+        Offset of the dataset in the file, if it is stored contiguously
+    """
+
+    def __init__(self, reader, file_idx, key, start, stop, width, dtype,
+                 offset=None):
+        """Stores the location of the block of data in the file.
+
+        Parameters
+        ----------
+        reader : HDF5Reader
+            Reader which provides the file handles
+        file_idx : int
+            Index of the file in the file list of the reader
+        key : str
+            Name of the dataset in the file
+        start : int
+            Index of the first row of the block in the dataset
+        stop : int
+            Index of the row after the last row of the block in the dataset
+        width : int
+            Number of columns of the dataset (0 if it is one-dimensional)
+        dtype : np.dtype
+            Data type of the dataset
+        offset : int, optional
+            Offset of the dataset in the file, if it is stored contiguously
+        """
+        self.reader = reader
+        self.file_idx = file_idx
+        self.key = key
+        self.start = int(start)
+        self.stop = int(stop)
+        self.width = width
+        self.dtype = np.dtype(dtype)
+        self.offset = offset
+        self._array = None
+
+    @property
+    def shape(self):
+        """Shape of the block of data."""
+        if self.width:
+            return (self.stop - self.start, self.width)
+
+        return (self.stop - self.start,)
+
+    @property
+    def ndim(self):
+        """Number of dimensions of the block of data."""
+        return len(self.shape)
+
+    @property
+    def size(self):
+        """Number of elements in the block of data."""
+        return int(np.prod(self.shape))
+
+    @property
+    def materialized(self):
+        """Whether the whole block has been read already or not."""
+        return self._array is not None
+
+    @property
+    def array(self):
+        """Reads the whole block of data from file (once).
+
+        Returns
+        -------
+        np.ndarray
+            Block of data
+        """
+        if self._array is None:
+            self._array = self.read(slice(0, len(self)), slice(None))
+
+        return self._array
+
+    def read(self, rows, cols):
+        """Reads a range of rows and columns from file.
+
+        Parameters
+        ----------
+        rows : slice
+            Range of rows to read, relative to the start of the block
+            (unit step only)
+        cols : slice
+            Range of columns to read (ignored for one-dimensional datasets)
+
+        Returns
+        -------
+        np.ndarray
+            Requested data
+        """
+        # Convert the row range to a range in the dataset
+        lower, upper, _ = rows.indices(len(self))
+        upper = max(lower, upper)
+        rows = slice(self.start + lower, self.start + upper)
+        key = (rows, cols) if self.width else rows
+        if upper == lower:
+            empty = np.empty((0, *self.shape[1:]), dtype=self.dtype)
+            return empty[:, cols] if self.width else empty
+
+        # If the dataset is stored contiguously, memory-map it
+        if self.offset is not None:
+            shape = (self.stop, self.width) if self.width else (self.stop,)
+            mmap = np.memmap(
+                    self.reader.file_paths[self.file_idx], dtype=self.dtype,
+                    mode='r', offset=self.offset, shape=shape)
+            return np.array(mmap[key])
+
+        # Otherwise, read it through h5py
+        with self.reader.open_file(self.file_idx) as in_file:
+            dataset = self.reader.get_node(in_file, self.file_idx, self.key)
+            return dataset[key]
+
+    def __len__(self):
+        """Number of rows in the block of data."""
+        return self.stop - self.start
+
+    def __getitem__(self, key):
+        """Reads a selection of the block of data.
+
+        Parameters
+        ----------
+        key : object
+            Any valid numpy index
+
+        Returns
+        -------
+        np.ndarray
+            Selected data
+        """
+        # If the data is already in memory, nothing to read
+        if self._array is not None:
+            return self._array[key]
+
+        # Split the row and column selections
+        full_key = key
+        if not isinstance(key, tuple):
+            key = (key,)
+        if (len(key) > self.ndim or
+            any(k is Ellipsis or k is None for k in key)):
+            return self.array[full_key]
+        rows, cols = key[0], (key[1] if len(key) > 1 else slice(None))
+
+        # Restrict the rows and the columns to read to the ranges spanned by
+        # the selection
+        row_range, rows = self.get_range(rows, len(self))
+        col_range = slice(None)
+        if self.width:
+            col_range, cols = self.get_range(cols, self.width)
+
+        # If the whole block is needed, read it once and cache it
+        if (row_range is None or col_range is None or
+            (row_range == slice(0, len(self)) and
+             col_range in (slice(None), slice(0, self.width)))):
+            return self.array[full_key]
+
+        # Otherwise, only read the required rows and columns
+        block = self.read(row_range, col_range)
+
+        return block[rows, cols] if self.width else block[rows]
+
+    @staticmethod
+    def get_range(index, length):
+        """Finds the contiguous range spanned by an index along one axis.
+
+        Parameters
+        ----------
+        index : object
+            Integer, slice, integer array or boolean mask along the axis
+        length : int
+            Length of the axis
+
+        Returns
+        -------
+        Union[slice, None]
+            Contiguous range to read along the axis (`None` if the whole
+            axis must be read)
+        object
+            Index to apply to the range to recover the selection
+        """
+        # Slices with a positive step only span a contiguous range
+        if isinstance(index, slice):
+            lower, upper, step = index.indices(length)
+            if step < 0:
+                return None, index
+
+            return slice(lower, max(lower, upper)), slice(None, None, step)
+
+        # Integers span a single element
+        if isinstance(index, (int, np.integer)):
+            index = range(length)[index]
+            return slice(index, index + 1), 0
+
+        # Arrays of indexes span the range between their extrema
+        index = np.asarray(index)
+        if index.dtype == bool:
+            if index.shape != (length,):
+                return None, index
+            index = np.where(index)[0]
+        if not index.size or index.dtype.kind not in 'iu':
+            return None, index
+
+        index = np.where(index < 0, index + length, index)
+        lower, upper = int(index.min()), int(index.max()) + 1
+
+        return slice(lower, upper), index - lower
+
+    def __array__(self, dtype=None, copy=None):
+        """Converts the proxy to a numpy array (reads the whole block)."""
+        if dtype is not None:
+            return self.array.astype(dtype)
+
+        return self.array
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        """Applies numpy universal functions to the underlying block."""
+        inputs = [x.array if isinstance(x, LazyArray) else x for x in inputs]
+        if 'out' in kwargs:
+            kwargs['out'] = tuple(
+                    x.array if isinstance(x, LazyArray) else x
+                    for x in kwargs['out'])
+
+        return getattr(ufunc, method)(*inputs, **kwargs)
+
+    def __getattr__(self, name):
+        """Forwards any other attribute request to the underlying block."""
+        if name.startswith('__') or name == '_array':
+            raise AttributeError(name)
+
+        return getattr(self.array, name)
+
+    def __reduce__(self):
+        """Pickles the proxy as the array it points to."""
+        return np.asarray, (self.array,)
+
+    def __repr__(self):
+        """Representation of the proxy."""
+        if self._array is not None:
+            return repr(self._array)
+
+        return (f"LazyArray(key={self.key}, shape={self.shape}, "
+                f"dtype={self.dtype})")
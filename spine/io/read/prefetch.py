@@ -0,0 +1,448 @@
+"""Contains a wrapper which reads entries ahead of their use."""
+
+import copy
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .lazy import LazyArray
+
+__all__ = ['PrefetchReader']
+
+
+class PrefetchReader:
+    """Reads the next entries of a reader in background threads, while the
+    current entry is being processed.
+
+    The upcoming entries are predicted in one of two ways:
+    - If an order was provided through :meth:`schedule` (e.g. the order in
+      which a sampler visits the dataset), the entries which follow the
+      current one in that order are read ahead;
+    - Otherwise, if the last two requested entries are consecutive, the
+      entries which follow the current one in the reader `entry_index` are
+      read ahead. Random access patterns do not trigger any read ahead.
+
+    Each worker thread reads from its own copy of the underlying reader, so
+    that no file handle is ever shared between threads. At most
+    `num_prefetch` entries are held in memory at once and no new entry is
+    read ahead while the entries already read occupy more than `max_memory`.
+
+    Readers which return views into volatile buffers (e.g. the LArCV reader,
+    which returns the ROOT branch objects of the current entry) must be
+    provided with a `process` function which consumes the raw data in the
+    worker thread, before the next entry is read.
+
+    This is enabled from the reader configuration block:
+
+    .. code-block:: yaml
+
+        io:
+          ...
+          reader:
+            name: hdf5
+            file_keys: input.h5
+            prefetch:
+              num_prefetch: 8
+              num_workers: 2
+              max_memory: 2.
+
+    Attributes
+    ----------
+    reader : object
+        Underlying reader
+    num_prefetch : int
+        Maximum number of entries read ahead
+    num_workers : int
+        Number of worker threads
+    max_memory : float
+        Memory budget of the entries read ahead (in GB)
+    process : callable
+        Function applied to each raw entry in the worker thread
+    """
+
+    def __init__(self, reader, num_prefetch=4, num_workers=1,
+                 max_memory=None, process=None):
+        """Stores the underlying reader and the read-ahead parameters.
+
+        Parameters
+        ----------
+        reader : object
+            Underlying reader (must be picklable without its open handles)
+        num_prefetch : int, default 4
+            Maximum number of entries read ahead
+        num_workers : int, default 1
+            Number of worker threads
+        max_memory : float, optional
+            Memory budget of the entries read ahead (in GB). If not
+            specified, only `num_prefetch` bounds the memory
+        process : callable, optional
+            Function applied to each raw entry in the worker thread, called
+            as `process(data, idx)`
+        """
+        # Check that the parameters are sensible
+        assert num_prefetch > 0, (
+                "The `num_prefetch` must be a positive non-zero integer.")
+        assert num_workers > 0, (
+                "The `num_workers` must be a positive non-zero integer.")
+        assert max_memory is None or max_memory > 0, (
+                "If provided, `max_memory` must be positive.")
+
+        # Store the parameters
+        self.reader = reader
+        self.num_prefetch = num_prefetch
+        self.num_workers = num_workers
+        self.max_memory = max_memory
+        self.process = process
+
+        # Initialize the read-ahead state
+        self.executor = None
+        self.local = threading.local()
+        self.pending = {}
+        self.order = None
+        self.cursor = 0
+        self.last = None
+        self.sequential = False
+
+    def __len__(self):
+        """Returns the number of entries in the underlying reader.
+
+        Returns
+        -------
+        int
+            Number of entries
+        """
+        return len(self.reader)
+
+    def __getitem__(self, idx):
+        """Returns a specific entry in the file(s).
+
+        Parameters
+        ----------
+        idx : int
+            Integer entry ID to access
+
+        Returns
+        -------
+        dict
+            One entry-worth of data from the loaded files
+        """
+        return self.get(idx)
+
+    def __getattr__(self, name):
+        """Forwards any other attribute request to the underlying reader."""
+        if name.startswith('__') or name == 'reader':
+            raise AttributeError(name)
+
+        return getattr(self.reader, name)
+
+    @property
+    def num_pending(self):
+        """Number of entries currently read ahead (or being read).
+
+        Returns
+        -------
+        int
+            Number of pending entries
+        """
+        return len(self.pending)
+
+    def get(self, idx):
+        """Returns a specific entry, from the read-ahead buffer if it is
+        available, and reads the next entries ahead.
+
+        Parameters
+        ----------
+        idx : int
+            Integer entry ID to access
+
+        Returns
+        -------
+        dict
+            One entry-worth of data from the loaded files
+        """
+        # Fetch the entry from the buffer or, if it was not predicted, read it
+        future = self.pending.pop(idx, None)
+        if future is not None:
+            data, _ = future.result()
+        else:
+            data, _ = self.load(idx)
+
+        # Update the prediction of the next entries and read them ahead
+        self.advance(idx)
+        self.fill()
+
+        return data
+
+    def get_run_event(self, run, event):
+        """Returns an entry corresponding to a specific (run, event) pair.
+
+        Parameters
+        ----------
+        run : int
+            Run number
+        event : int
+            Event number
+
+        Returns
+        -------
+        dict
+            One entry-worth of data from the loaded files
+        """
+        return self.get(self.reader.get_run_event_index(run, event))
+
+    def schedule(self, order):
+        """Provides the order in which the entries will be requested.
+
+        Parameters
+        ----------
+        order : List[int]
+            Ordered list of entry IDs which will be accessed next
+        """
+        self.order = np.asarray(order, dtype=np.int64)
+        self.cursor = 0
+        self.fill()
+
+    def process_entry_list(self, *args, **kwargs):
+        """Changes the list of entries of the underlying reader.
+
+        Drops the read-ahead buffer, which refers to the previous list.
+
+        Parameters
+        ----------
+        *args : list
+            Positional arguments of the reader `process_entry_list`
+        **kwargs : dict
+            Keyword arguments of the reader `process_entry_list`
+        """
+        self.reset()
+        return self.reader.process_entry_list(*args, **kwargs)
+
+    def apply_shard(self, *args, **kwargs):
+        """Restricts the list of entries of the underlying reader to a shard.
+
+        Drops the read-ahead buffer, which refers to the previous list.
+
+        Parameters
+        ----------
+        *args : list
+            Positional arguments of the reader `apply_shard`
+        **kwargs : dict
+            Keyword arguments of the reader `apply_shard`
+        """
+        self.reset()
+        return self.reader.apply_shard(*args, **kwargs)
+
+    def process_keys(self, *args, **kwargs):
+        """Changes the list of keys loaded by the underlying reader.
+
+        Drops the read-ahead buffer, which contains the previous keys.
+
+        Parameters
+        ----------
+        *args : list
+            Positional arguments of the reader `process_keys`
+        **kwargs : dict
+            Keyword arguments of the reader `process_keys`
+        """
+        self.reset()
+        return self.reader.process_keys(*args, **kwargs)
+
+    def advance(self, idx):
+        """Moves the read-ahead cursor past the entry which was just read.
+
+        Parameters
+        ----------
+        idx : int
+            Integer entry ID which was just accessed
+        """
+        # If the entry is the next one in the scheduled order, move on
+        if self.order is not None:
+            if (self.cursor < len(self.order) and
+                self.order[self.cursor] == idx):
+                self.cursor += 1
+            else:
+                self.order = None
+
+        # Otherwise, only read ahead if the access pattern is sequential
+        previous = -1 if self.last is None else self.last
+        self.sequential = idx == previous + 1
+        self.last = idx
+
+    def upcoming(self):
+        """Predicts which entries will be requested next.
+
+        Returns
+        -------
+        List[int]
+            Ordered list of entry IDs to read ahead
+        """
+        if self.order is not None:
+            return self.order[self.cursor:self.cursor+self.num_prefetch]
+
+        if not self.sequential:
+            return []
+
+        start = self.last + 1
+        stop = min(start + self.num_prefetch, len(self.reader))
+
+        return range(start, stop)
+
+    def fill(self):
+        """Submits the upcoming entries to the worker threads, within the
+        bounds of the read-ahead budget.
+        """
+        # Drop the entries which are no longer expected
+        upcoming = [int(i) for i in self.upcoming()]
+        for idx in list(self.pending):
+            if idx not in upcoming:
+                self.pending.pop(idx).cancel()
+
+        # Start the worker threads, if needed
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(
+                    max_workers=self.num_workers,
+                    thread_name_prefix='spine_prefetch')
+
+        # Submit the entries which are not already being read
+        for idx in upcoming:
+            if idx in self.pending:
+                continue
+            if len(self.pending) >= self.num_prefetch:
+                break
+            if self.max_memory is not None and self.memory >= self.max_memory:
+                break
+
+            self.pending[idx] = self.executor.submit(self.load, idx)
+
+    @property
+    def memory(self):
+        """Memory occupied by the entries already read ahead (in GB).
+
+        Returns
+        -------
+        float
+            Memory used by the read-ahead buffer
+        """
+        size = 0
+        for future in self.pending.values():
+            if future.done() and future.exception() is None:
+                size += future.result()[1]
+
+        return size/1e9
+
+    def load(self, idx):
+        """Loads one entry using the reader copy of the current thread.
+
+        Parameters
+        ----------
+        idx : int
+            Integer entry ID to access
+
+        Returns
+        -------
+        dict
+            One entry-worth of data from the loaded files
+        int
+            Size of the entry in memory (in bytes)
+        """
+        # Make a copy of the reader for this thread, if it does not exist
+        reader = getattr(self.local, 'reader', None)
+        if reader is None:
+            reader = copy.copy(self.reader)
+            self.local.reader = reader
+
+        # Read (and process) the entry
+        data = reader.get(idx)
+        if self.process is not None:
+            data = self.process(data, idx)
+
+        return data, self.get_size(data)
+
+    @staticmethod
+    def get_size(obj, seen=None):
+        """Estimates the memory occupied by the arrays in a data product.
+
+        Parameters
+        ----------
+        obj : object
+            Data product (dictionary, list, object, array, etc.)
+        seen : set, optional
+            Set of object IDs already accounted for
+
+        Returns
+        -------
+        int
+            Number of bytes occupied by the arrays in the data product
+        """
+        # Only count each object once
+        seen = set() if seen is None else seen
+        if id(obj) in seen:
+            return 0
+        seen.add(id(obj))
+
+        # Dispatch
+        if isinstance(obj, np.ndarray):
+            return obj.nbytes
+        if isinstance(obj, LazyArray):
+            return obj.nbytes if obj.materialized else 0
+        if isinstance(obj, dict):
+            return sum(PrefetchReader.get_size(v, seen) for v in obj.values())
+        if isinstance(obj, (list, tuple)):
+            return sum(PrefetchReader.get_size(v, seen) for v in obj)
+        if hasattr(obj, '__dict__'):
+            return PrefetchReader.get_size(vars(obj), seen)
+
+        return 0
+
+    def reset(self):
+        """Drops the read-ahead buffer and the reader copies.
+
+        Waits for the entries being read to avoid any thread reading from a
+        reader copy which is out of date.
+        """
+        for future in self.pending.values():
+            future.cancel()
+        self.pending = {}
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+        self.local = threading.local()
+        self.order = None
+        self.cursor = 0
+        self.last = None
+        self.sequential = False
+
+    def __getstate__(self):
+        """Returns the variables to be pickled.
+
+        Threads and pending reads cannot be pickled (e.g. to be sent to a
+        spawned DataLoader worker). Each process starts its own threads.
+
+        Returns
+        -------
+        dict
+            Dictionary representation of the object
+        """
+        state = self.__dict__.copy()
+        state['executor'] = None
+        state['local'] = None
+        state['pending'] = {}
+        state['order'] = None
+        state['cursor'] = 0
+        state['last'] = None
+        state['sequential'] = False
+
+        return state
+
+    def __setstate__(self, state):
+        """Restores the object from its pickled variables.
+
+        Parameters
+        ----------
+        state : dict
+            Dictionary representation of the object
+        """
+        self.__dict__.update(state)
+        self.local = threading.local()
@@ -0,0 +1,180 @@
+"""Contains a compact index of the (run, event) pairs of a list of entries.
+
+Each (run, event) pair is packed into a single 64-bit integer key (run in the
+upper 32 bits, event in the lower 32 bits). Event numbers are unsigned, unless
+some are negative (e.g. the -1 default of :class:`RunInfo`), in which case
+they are offset by 2**31 to fit in 32 bits. The keys are sorted once, such
+that any number of pairs can be looked up at once with a binary search. This
+costs 16 bytes per entry at most, instead of the hundreds of bytes taken by
+a dictionary of tuples, and it is built in a single NumPy sort.
+"""
+
+import numpy as np
+
+__all__ = ['RunEventIndex']
+
+
+class RunEventIndex:
+    """Maps (run, event) pairs onto the position of their entry in a list.
+
+    If a pair appears more than once, it is mapped onto its last occurrence.
+
+    Attributes
+    ----------
+    keys : np.ndarray
+        (N) Sorted packed (run, event) keys
+    offset : int
+        Offset applied to the event numbers to pack them
+    perm : np.ndarray
+        (N) Position of the entry corresponding to each sorted key
+    """
+
+    def __init__(self, run_info):
+        """Builds the index from the (run, event) pair of each entry.
+
+        Parameters
+        ----------
+        run_info : np.ndarray
+            (N, 2) Array of (run, event) pairs, one per entry
+        """
+        # Offset the event numbers if some of them are negative
+        run_info = np.asarray(run_info, dtype=np.int64).reshape(-1, 2)
+        self.offset = 0
+        if len(run_info) and np.min(run_info[:, 1]) < 0:
+            self.offset = 2**31
+
+        # Pack the pairs, sort them (stable, so that duplicates are ordered)
+        keys, valid = self.pack(run_info[:, 0], run_info[:, 1])
+        assert np.all(valid), (
+                "Run numbers must fit in 32-bit signed integers and event "
+                "numbers either in 32-bit signed or unsigned integers.")
+        perm = np.argsort(keys, kind='stable')
+
+        self.keys = keys[perm]
+        self.perm = perm.astype(
+                np.min_scalar_type(max(len(perm) - 1, 0)), copy=False)
+
+    def __len__(self):
+        """Returns the number of unique (run, event) pairs in the index.
+
+        Returns
+        -------
+        int
+            Number of unique (run, event) pairs
+        """
+        return len(self.keys) - self.num_duplicates
+
+    def __contains__(self, run_event):
+        """Checks whether a (run, event) pair is in the index.
+
+        Parameters
+        ----------
+        run_event : Tuple[int]
+            (run, event) pair
+
+        Returns
+        -------
+        bool
+            `True` if the pair is in the index
+        """
+        return self.find(*run_event)[0] > -1
+
+    def __getitem__(self, run_event):
+        """Returns the entry position corresponding to a (run, event) pair.
+
+        Parameters
+        ----------
+        run_event : Tuple[int]
+            (run, event) pair
+
+        Returns
+        -------
+        int
+            Position of the entry in the list
+        """
+        return int(self.index(*run_event)[0])
+
+    @property
+    def num_duplicates(self):
+        """Number of entries which share their (run, event) pair with a
+        previous entry.
+
+        Returns
+        -------
+        int
+            Number of duplicated entries
+        """
+        return int(np.sum(self.keys[1:] == self.keys[:-1]))
+
+    def pack(self, runs, events):
+        """Packs (run, event) pairs into 64-bit integer keys.
+
+        Parameters
+        ----------
+        runs : Union[int, np.ndarray]
+            Run number(s)
+        events : Union[int, np.ndarray]
+            Event number(s)
+
+        Returns
+        -------
+        np.ndarray
+            Packed key(s)
+        np.ndarray
+            Whether each pair fits in a key (the others cannot be indexed)
+        """
+        runs = np.atleast_1d(np.asarray(runs, dtype=np.int64))
+        events = np.atleast_1d(np.asarray(events, dtype=np.int64)) + self.offset
+        valid = ((runs >= -2**31) & (runs < 2**31) &
+                 (events >= 0) & (events < 2**32))
+
+        return np.where(valid, (runs << 32) | events, 0), valid
+
+    def find(self, runs, events):
+        """Finds the entry positions corresponding to (run, event) pairs.
+
+        Parameters
+        ----------
+        runs : Union[int, np.ndarray]
+            Run number(s)
+        events : Union[int, np.ndarray]
+            Event number(s)
+
+        Returns
+        -------
+        np.ndarray
+            Position of each entry in the list (-1 if a pair is missing)
+        """
+        keys, valid = self.pack(runs, events)
+        pos = np.searchsorted(self.keys, keys, side='right') - 1
+        valid &= pos > -1
+        valid[valid] = self.keys[pos[valid]] == keys[valid]
+
+        index = np.full(len(keys), -1, dtype=np.int64)
+        index[valid] = self.perm[pos[valid]]
+
+        return index
+
+    def index(self, runs, events):
+        """Returns the entry positions corresponding to (run, event) pairs,
+        which must all be present in the index.
+
+        Parameters
+        ----------
+        runs : Union[int, np.ndarray]
+            Run number(s)
+        events : Union[int, np.ndarray]
+            Event number(s)
+
+        Returns
+        -------
+        np.ndarray
+            Position of each entry in the list
+        """
+        index = self.find(runs, events)
+        missing = np.where(index < 0)[0]
+        assert not len(missing), (
+                f"Could not find (run={np.atleast_1d(runs)[missing[0]]}, "
+                f"event={np.atleast_1d(events)[missing[0]]}) pair.")
+
+        return index
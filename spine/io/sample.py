@@ -1,5 +1,6 @@
 """Used to define which dataset entries to load at each iteration"""
 
+import math
 import time
 
 import numpy as np
@@ -8,7 +9,7 @@ from torch.utils.data import Sampler
 from torch.utils.data.distributed import DistributedSampler
 
 __all__ = ['SequentialBatchSampler', 'RandomSequenceBatchSampler',
-           'BootstrapBatchSampler']
+           'BootstrapBatchSampler', 'BucketBatchSampler']
 
 
 class AbstractBatchSampler(Sampler):
@@ -36,11 +37,8 @@ class AbstractBatchSampler(Sampler):
             If `True`, drop the last batch to make the number of entries a
             multiple of the batch_size (if needed)
         """
-        # Initialize parent class
-        # TODO: `data_source` id deprecated, will need to remove with newer
-        # version of pytorch (2.2.0 and above)
-        super().__init__(data_source=None)
-
+        # The parent class initializer does nothing and its signature changes
+        # between versions of pytorch (`data_source` is deprecated), skip it
         # Initialize the random number generator with a seed
         if seed is None:
             seed = int(time.time())
@@ -153,6 +151,171 @@ class BootstrapBatchSampler(AbstractBatchSampler):
         return iter(np.concatenate(batches))
 
 
+class BucketBatchSampler(AbstractBatchSampler):
+    """Samples batches of entries of similar sizes, under a size budget.
+
+    The entries are sorted by size (e.g. number of voxels) and split into
+    `num_buckets` buckets which contain the same number of entries. Each
+    bucket is assigned a number of entries per batch, such that a batch of
+    its largest entries does not exceed `max_size` (and never exceeds
+    `batch_size` entries). At each epoch, the entries are shuffled within
+    their bucket, cut into batches and the batches of all buckets are
+    shuffled together. The number of batches is constant across epochs.
+
+    The size of each entry is read from a precomputed index (`size_file`,
+    a `.npy` file which provides the size of each entry in the input files,
+    see `bin/larcv_cache.py --size-key`) or fetched from the dataset
+    (`size_key`, the data product to count the rows of). For LArCV datasets,
+    the latter parses every entry which is not found in the parser cache.
+
+    Unlike the other samplers, this sampler yields batches of indexes.
+
+    .. code-block:: yaml
+
+        io:
+          loader:
+            ...
+            sampler:
+              name: bucket
+              size_key: data
+              max_size: 500000
+              num_buckets: 10
+    """
+    name = 'bucket'
+    batched = True
+
+    def __init__(self, dataset, batch_size, seed=None, drop_last=False,
+                 max_size=None, size_file=None, size_key=None, num_buckets=10):
+        """Check and store the values passed to the initializer, form the
+        buckets of entries.
+
+        Parameters
+        ----------
+        dataset : torch.utils.data.Dataset
+            Dataset to sampler from
+        batch_size : int
+            Maximum number of samples to load per iteration
+        seed : int, optional
+            Seed to use for random sampling
+        drop_last: bool, default False
+            If `True`, drop the last batch of each bucket if it is not full
+        max_size : int, optional
+            Maximum total size of the entries in a batch. If not specified,
+            each batch contains `batch_size` entries of similar sizes
+        size_file : str, optional
+            Path to a `.npy` file which contains the size of each entry in
+            the input files
+        size_key : str, optional
+            Name of the data product to count the rows of in each entry
+        num_buckets : int, default 10
+            Number of buckets to sort the entries into
+        """
+        # Initialize the parent class (drop_last is handled per bucket)
+        super().__init__(dataset, batch_size, seed, drop_last=False)
+        self.drop_last = drop_last
+
+        # Check the parameters
+        assert (size_file is not None) ^ (size_key is not None), (
+                "Must provide either `size_file` or `size_key`, not both.")
+        assert max_size is None or max_size > 0, (
+                "If provided, `max_size` must be positive.")
+        assert num_buckets > 0, (
+                "The `num_buckets` must be a positive non-zero integer.")
+
+        # Fetch the size of each entry in the dataset
+        self.sizes = self.get_sizes(dataset, size_file, size_key)
+        assert len(self.sizes) == self.num_samples, (
+                f"The number of sizes ({len(self.sizes)}) does not match the "
+                f"number of entries in the dataset ({self.num_samples}).")
+
+        # Sort the entries by size, split them into buckets of equal counts
+        order = np.argsort(self.sizes, kind='stable')
+        num_buckets = min(num_buckets, self.num_samples)
+        self.buckets = np.array_split(order, num_buckets)
+
+        # Find the number of entries per batch in each bucket
+        self.bucket_batch_sizes = np.full(num_buckets, batch_size, dtype=int)
+        if max_size is not None:
+            for b, bucket in enumerate(self.buckets):
+                max_bucket = max(int(self.sizes[bucket[-1]]), 1)
+                self.bucket_batch_sizes[b] = np.clip(
+                        max_size//max_bucket, 1, batch_size)
+
+        # Count the batches in each bucket
+        self.bucket_num_batches = np.empty(num_buckets, dtype=int)
+        for b, bucket in enumerate(self.buckets):
+            size = self.bucket_batch_sizes[b]
+            if drop_last:
+                self.bucket_num_batches[b] = len(bucket)//size
+            else:
+                self.bucket_num_batches[b] = -(-len(bucket)//size)
+
+    @staticmethod
+    def get_sizes(dataset, size_file=None, size_key=None):
+        """Fetches the size of each entry in the dataset.
+
+        Parameters
+        ----------
+        dataset : torch.utils.data.Dataset
+            Dataset to sampler from
+        size_file : str, optional
+            Path to a `.npy` file which contains the size of each entry in
+            the input files
+        size_key : str, optional
+            Name of the data product to count the rows of in each entry
+
+        Returns
+        -------
+        np.ndarray
+            (N) Size of each entry in the dataset
+        """
+        reader = getattr(dataset, 'reader', None)
+        if size_file is not None:
+            sizes = np.load(size_file)
+            entry_index = getattr(reader, 'entry_index', None)
+            if entry_index is not None:
+                sizes = sizes[entry_index]
+            assert np.all(sizes >= 0), (
+                    "The `size_file` does not provide the size of some of "
+                    "the entries of the dataset.")
+
+            return sizes
+
+        if hasattr(dataset, 'get_sizes'):
+            return dataset.get_sizes(size_key)
+
+        assert hasattr(reader, 'get_sizes'), (
+                "The dataset cannot provide the size of its entries, "
+                "provide a `size_file` instead.")
+
+        return reader.get_sizes(size_key)
+
+    def __len__(self):
+        """Provides the number of batches produced by the sampler.
+
+        Returns
+        -------
+        int
+            Number of batches per epoch
+        """
+        return int(np.sum(self.bucket_num_batches))
+
+    def __iter__(self):
+        """Iterates over batches of entries of similar sizes."""
+        # Shuffle the entries within each bucket, cut them into batches
+        batches = []
+        for b, bucket in enumerate(self.buckets):
+            bucket = self._random.permutation(bucket)
+            size = self.bucket_batch_sizes[b]
+            for i in range(self.bucket_num_batches[b]):
+                batches.append(bucket[i*size:(i + 1)*size].tolist())
+
+        # Shuffle the batches
+        order = self._random.permutation(len(batches))
+
+        return iter([batches[i] for i in order])
+
+
 class DistributedProxySampler(DistributedSampler):
     """Sampler that restricts data loading to a subset of input sampler indices.
 
@@ -176,10 +339,12 @@ class DistributedProxySampler(DistributedSampler):
 
         Notes
         -----
-        Input sampler is assumed to be of constant size.
+        Input sampler is assumed to be of constant size. If the input sampler
+        yields batches of indexes, whole batches are dealt to each replica.
         """
         # Make sure the batch_size is a multiple of the number of replicas
-        assert sampler.batch_size%num_replicas == 0, (
+        self.batched = getattr(sampler, 'batched', False)
+        assert self.batched or sampler.batch_size%num_replicas == 0, (
                 f"The `batch_size` ({sampler.batch_size}) must be a multiple "
                 f"of the number of replicas ({num_replicas}) in the "
                  "distributed training process.")
@@ -209,9 +374,15 @@ class DistributedProxySampler(DistributedSampler):
             else:
                 indices += (indices * math.ceil(
                         padding_size / len(indices)))[:padding_size]
+        else:
+            indices = indices[:self.total_size]
 
         assert len(indices) == self.total_size
 
+        # If the sampler yields batches, deal them to each replica in turn
+        if self.batched:
+            return iter(indices[self.rank::self.num_replicas])
+
         # Subsample by keeping the indices sequential between each minibatch.
         # This is crucial to preserve contiguousness in sequential samplers.
         minibatch_size = self.batch_size/self.num_replicas
@@ -221,3 +392,77 @@ class DistributedProxySampler(DistributedSampler):
         assert len(indices) == self.num_samples
 
         return iter(indices)
+
+
+class PrefetchProxySampler(Sampler):
+    """Sampler which forwards the order of the entries it samples to a
+    prefetching reader before yielding them.
+
+    This allows a :class:`spine.io.read.PrefetchReader` to read ahead the
+    entries in the order in which they are going to be requested, which is
+    not known to the reader otherwise (e.g. when shuffling).
+    """
+
+    def __init__(self, sampler, reader):
+        """Wraps a sampler.
+
+        Parameters
+        ----------
+        sampler : Sampler
+            Input torch sampler
+        reader : PrefetchReader
+            Prefetching reader to forward the order of the entries to
+        """
+        # Store the underlying sampler and the reader
+        self.sampler = sampler
+        self.reader = reader
+        self.batched = getattr(sampler, 'batched', False)
+
+    def __len__(self):
+        """Returns the number of entries sampled by the underlying sampler."""
+        return len(self.sampler)
+
+    def set_epoch(self, epoch):
+        """Forwards the epoch to the underlying sampler, if it uses it.
+
+        Parameters
+        ----------
+        epoch : int
+            Epoch number
+        """
+        if hasattr(self.sampler, 'set_epoch'):
+            self.sampler.set_epoch(epoch)
+
+    def __iter__(self):
+        """Fetches the order of the underlying sampler, forwards it to the
+        reader and iterates over it.
+        """
+        indices = list(self.sampler)
+        if self.batched:
+            self.reader.schedule(
+                    [idx for batch in indices for idx in batch])
+        else:
+            self.reader.schedule(indices)
+
+        return iter(indices)
+
+
+def set_loader_epoch(loader, epoch):
+    """Sets the epoch of the sampler of a data loader.
+
+    If the sampler forms the batches itself, it is used by the loader as a
+    batch sampler and the `sampler` attribute of the loader is the default
+    torch sampler instead.
+
+    Parameters
+    ----------
+    loader : torch.utils.data.DataLoader
+        Data loader
+    epoch : int
+        Epoch number
+    """
+    sampler = loader.sampler
+    if getattr(loader.batch_sampler, 'batched', False):
+        sampler = loader.batch_sampler
+
+    sampler.set_epoch(epoch)
@@ -2,3 +2,6 @@
 
 from .csv import *
 from .hdf5 import *
+from .background import *
+from .parquet import *
+from .merge import *
@@ -0,0 +1,191 @@
+"""Module with a wrapper which runs a writer in a background thread."""
+
+import queue
+import threading
+
+from spine.utils.stopwatch import StopwatchManager, Time
+
+__all__ = ['BackgroundWriter']
+
+
+class BackgroundWriter:
+    """Runs a writer in a dedicated thread so that output I/O overlaps with
+    the rest of the processing.
+
+    Batches are put in a bounded queue and written out by the thread in the
+    order in which they were received. When the queue is full, submitting a
+    new batch blocks until the thread catches up (backpressure), which bounds
+    the amount of memory held by pending batches.
+
+    Any exception raised by the underlying writer is re-raised in the calling
+    thread on every subsequent submission, flush or close. The failure is
+    sticky: the batches submitted after it are discarded rather than written
+    past the failed one.
+
+    This is enabled from the writer configuration block:
+
+    .. code-block:: yaml
+
+        io:
+          ...
+          writer:
+            name: hdf5
+            file_name: output.h5
+            asynchronous: true
+            queue_size: 4
+
+    Attributes
+    ----------
+    writer : object
+        Underlying writer
+    queue_size : int
+        Maximum number of batches waiting to be written
+    """
+
+    def __init__(self, writer, queue_size=4):
+        """Initializes the queue and starts the writing thread.
+
+        Parameters
+        ----------
+        writer : object
+            Underlying writer, called as `writer(data, cfg)`
+        queue_size : int, default 4
+            Maximum number of batches waiting to be written
+        """
+        # Check that the queue size is sensible
+        assert queue_size > 0, (
+                "The `queue_size` must be a positive non-zero integer.")
+
+        # Store the writer and initialize the queue
+        self.writer = writer
+        self.queue_size = queue_size
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.error = None
+
+        # Initialize the timers. The write time is only updated by the thread
+        # once a batch is written, so that it can be read at any time
+        self.watch = StopwatchManager()
+        self.watch.initialize('write')
+        self.lock = threading.Lock()
+        self._time = Time(0., 0.)
+        self._time_sum = Time(0., 0.)
+
+        # Start the writing thread
+        self.thread = None
+        self.start()
+
+    def start(self):
+        """Starts the writing thread, if it is not running."""
+        if self.thread is None:
+            self.thread = threading.Thread(
+                    target=self.work, name='spine_writer', daemon=True)
+            self.thread.start()
+
+    def __call__(self, data, cfg=None):
+        """Submits a batch of data to be written.
+
+        Blocks if the queue is full, until a slot is freed. The dictionary
+        is shallow-copied, as writers may modify it in place. If the writer
+        was closed, the writing thread is restarted.
+
+        Parameters
+        ----------
+        data : dict
+            Dictionary of data products
+        cfg : dict, optional
+            Dictionary containing the complete SPINE configuration
+        """
+        self.check()
+        self.start()
+        self.queue.put((dict(data), cfg))
+
+    @property
+    def queue_depth(self):
+        """Number of batches currently waiting to be written.
+
+        Returns
+        -------
+        int
+            Number of batches in the queue
+        """
+        return self.queue.qsize()
+
+    @property
+    def time(self):
+        """Time taken to write the last batch.
+
+        Returns
+        -------
+        Time
+            Execution time of the last write
+        """
+        with self.lock:
+            return self._time.copy()
+
+    @property
+    def time_sum(self):
+        """Time taken to write all the batches so far.
+
+        Returns
+        -------
+        Time
+            Execution time of all writes so far
+        """
+        with self.lock:
+            return self._time_sum.copy()
+
+    def work(self):
+        """Writes the batches in the queue, one at a time, until it receives
+        the `None` sentinel.
+        """
+        while True:
+            item = self.queue.get()
+            if item is None:
+                self.queue.task_done()
+                return
+
+            # Once a write failed, drain the queue without writing
+            if self.error is None:
+                self.watch.start('write')
+                try:
+                    self.writer(*item)
+                except Exception as err: # pylint: disable=W0718
+                    self.error = err
+                self.watch.stop('write')
+
+                with self.lock:
+                    self._time = self.watch.time('write').copy()
+                    self._time_sum = self.watch.time_sum('write').copy()
+
+            self.queue.task_done()
+
+    def check(self):
+        """Re-raises the exception raised in the writing thread, if any."""
+        if self.error is not None:
+            raise RuntimeError("The background writer failed.") from self.error
+
+    def flush(self):
+        """Waits until all the submitted batches are written, then flushes
+        the underlying writer.
+        """
+        self.queue.join()
+        self.check()
+        if hasattr(self.writer, 'flush'):
+            self.writer.flush()
+
+    def close(self):
+        """Writes all the pending batches, stops the thread and closes the
+        underlying writer.
+        """
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+
+        # Close the underlying writer even if a write failed, so that the
+        # batches written before the failure are not lost
+        try:
+            if hasattr(self.writer, 'close'):
+                self.writer.close()
+        finally:
+            self.check()
@@ -11,6 +11,13 @@ class CSVWriter:
     Builds a CSV file to store the output of the analysis tools. It can only be
     used to store relatively basic quantities (scalars, strings, etc.).
 
+    The file is kept open and rows are buffered in memory. They are written
+    out every `buffer_size` rows, when :meth:`flush` is called, or when the
+    writer is closed.
+
+    If missing keys are tolerated (`accept_missing`), their values are
+    written as `missing_value` (-1).
+
     Typical configuration should look like:
 
     .. code-block:: yaml
@@ -20,11 +27,13 @@ class CSVWriter:
           writer:
             name: csv
             file_name: output.csv
+            buffer_size: 100
     """
     name = 'csv'
+    missing_value = -1
 
     def __init__(self, file_name='output.csv', overwrite=False, append=False, 
-                 accept_missing=False):
+                 accept_missing=False, buffer_size=1):
         """Initialize the basics of the output file.
 
         Parameters
@@ -36,16 +45,25 @@ class CSVWriter:
         append : bool, default False
             If True, add more rows to an existing CSV file
         accept_missing : bool, default True
-            Tolerate missing keys
+            Tolerate missing keys, stored as `missing_value`
+        buffer_size : int, default 1
+            Number of rows to hold in memory before writing them to file
         """
         # Check that output file does not already exist, if requestes
         if not overwrite and os.path.isfile(file_name):
             raise FileExistsError(f"File with name {file_name} already exists.")
 
+        # Check that the buffer size is sensible
+        assert buffer_size > 0, (
+                "The `buffer_size` must be a positive non-zero integer.")
+
         # Store persistent attributes
         self.file_name = file_name
         self.append_file = append
         self.accept_missing = accept_missing
+        self.buffer_size = buffer_size
+        self.buffer = []
+        self.out_file = None
         self.result_keys = None
         if self.append_file:
             if not os.path.isfile(file_name):
@@ -54,8 +72,12 @@ class CSVWriter:
                          "`append=True` in CSVWriter, the file must exist at "
                          "the prescribed path before data is written to it.")
 
-            with open(self.file_name, 'r', encoding='utf-8') as out_file:
-                self.result_keys = out_file.readline().split(',')
+            self.read_header()
+
+    def read_header(self):
+        """Fetches the keys stored in an existing file from its header."""
+        with open(self.file_name, 'r', encoding='utf-8') as in_file:
+            self.result_keys = in_file.readline().rstrip('\n').split(',')
 
     def create(self, result_blob):
         """Initialize the header of the CSV file, record the keys to be stored.
@@ -69,9 +91,9 @@ class CSVWriter:
         self.result_keys = list(result_blob.keys())
 
         # Create a header and write it to file
-        with open(self.file_name, 'w', encoding='utf-8') as out_file:
-            header_str = ','.join(self.result_keys)
-            out_file.write(header_str + '\n')
+        self.out_file = open(self.file_name, 'w', encoding='utf-8')
+        header_str = ','.join(self.result_keys)
+        self.out_file.write(header_str + '\n')
 
     def append(self, result_blob):
         """Append the CSV file with the output.
@@ -104,16 +126,54 @@ class CSVWriter:
                              "present when the CSV file was initialized. "
                             f"Missing keys: {list(missing)}")
 
-                new_result_blob = {k:-1 for k in self.result_keys}
+                new_result_blob = {k:self.missing_value for k in self.result_keys}
                 for k, v in result_blob.items():
                     new_result_blob[k] = v
                 result_blob = new_result_blob
 
-        # Append file
-        with open(self.file_name, 'a', encoding='utf-8') as out_file:
-            result_str = ','.join(
-                    [str(result_blob[k]) for k in self.result_keys])
-            out_file.write(result_str + '\n')
+        # Buffer the row, write the buffer out if it is full
+        self.buffer.append(self.format(result_blob))
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def format(self, result_blob):
+        """Converts a row of output to the form in which it is buffered.
+
+        Parameters
+        ----------
+        result_blob : dict
+            Dictionary containing the output of the reconstruction chain
+
+        Returns
+        -------
+        str
+            Row of the CSV file
+        """
+        return ','.join([str(result_blob[k]) for k in self.result_keys])
+
+    def flush(self):
+        """Writes the buffered rows to file."""
+        if not self.buffer:
+            return
+
+        if self.out_file is None:
+            self.out_file = open(self.file_name, 'a', encoding='utf-8')
+
+        self.out_file.write('\n'.join(self.buffer) + '\n')
+        self.out_file.flush()
+        self.buffer = []
+
+    def close(self):
+        """Writes the buffered rows to file and closes it."""
+        self.flush()
+        if self.out_file is not None:
+            self.out_file.close()
+            self.out_file = None
+
+    def __del__(self):
+        """Makes sure no buffered row is lost when the writer is deleted."""
+        if hasattr(self, 'buffer'):
+            self.close()
 
     @staticmethod
     def array_diff(array_x, array_y):
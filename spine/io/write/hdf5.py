@@ -8,6 +8,7 @@ import h5py
 import numpy as np
 
 import spine.data
+from spine.data import ObjectCodec
 
 from spine.version import __version__
 
@@ -34,11 +35,28 @@ class HDF5Writer:
               - input_data
               - segmentation
               - ...
+
+    The output file is kept open for the lifetime of the writer. Events are
+    accumulated in memory and written out `buffer_size` events at a time,
+    with a single resize and write per dataset. The datasets can optionally
+    be chunked and compressed:
+
+    .. code-block:: yaml
+
+        io:
+          ...
+          writer:
+            name: hdf5
+            file_name: output.h5
+            buffer_size: 64
+            chunks: 1024
+            compression: lzf
     """
     name = 'hdf5'
 
     def __init__(self, file_name='output.h5', keys=None, skip_keys=None,
-                 dummy_ds=None, overwrite=False, append=False):
+                 dummy_ds=None, overwrite=False, append=False, buffer_size=1,
+                 chunks=None, compression=None, compression_opts=None):
         """Initializes the basics of the output file.
 
         Parameters
@@ -56,17 +74,42 @@ class HDF5Writer:
             If True, overwrite the output file if it already exists
         append : bool, default False
             If True, add new values to the end of an existing file
+        buffer_size : int, default 1
+            Minimum number of events to accumulate in memory before writing
+            them to file. Batches are never split, so the default writes every
+            batch to file as soon as it is received.
+        chunks : Union[bool, int], optional
+            Number of rows per chunk of each dataset. If `True` or not
+            specified, let `h5py` guess the chunk shape.
+        compression : str, optional
+            Compression filter to apply to the datasets (`gzip` or `lzf`)
+        compression_opts : int, optional
+            Compression level, if the `gzip` filter is used
         """
         # Check that output file does not already exist, if requestes
         if not overwrite and os.path.isfile(file_name):
             raise FileExistsError(f"File with name {file_name} already exists.")
 
+        # Check that the buffering and compression parameters are sensible
+        assert buffer_size > 0, (
+                "The `buffer_size` must be a positive non-zero integer.")
+        assert compression in [None, 'gzip', 'lzf'], (
+                f"Compression filter not recognized: {compression}. Must be "
+                 "one of `gzip` or `lzf`.")
+        assert compression_opts is None or compression == 'gzip', (
+                "The compression level can only be specified for `gzip`.")
+
         # Store persistent attributes
         self.file_name = file_name
         self.append = append
         self.ready = False
         self.object_dtypes = [] # TODO: make this a set
 
+        self.buffer_size = buffer_size
+        self.chunks = chunks
+        self.compression = compression
+        self.compression_opts = compression_opts
+
         self.keys = keys
         self.skip_keys = skip_keys
         self.dummy_ds = dummy_ds
@@ -80,6 +123,11 @@ class HDF5Writer:
         self.type_dict   = None
         self.event_dtype = None
 
+        # Initialize the output file handle and the event buffer
+        self.out_file = None
+        self.buffer = None
+        self.num_buffered = 0
+
     @dataclass
     class DataFormat:
         """Data structure to hold writing parameters.
@@ -96,12 +144,15 @@ class HDF5Writer:
             Whether to merge lists of arrays into a single dataset
         scalar : bool, default False
             Whether the data is a scalar object or not
+        codec : ObjectCodec, optional
+            Codec used to convert lists of objects to structured arrays
         """
         dtype: str = None
         class_name: str = None
         width: int = 0
         merge: bool = False
         scalar: bool = False
+        codec: ObjectCodec = None
 
     def create(self, data, cfg=None):
         """Create the output file structure based on the data dictionary.
@@ -121,20 +172,21 @@ class HDF5Writer:
         for key in self.keys:
             self.register_key(data, key)
 
-        # Initialize the output HDF5 file
-        with h5py.File(self.file_name, 'w') as out_file:
-            # Initialize the info dataset that stores environment parameters
-            if cfg is not None:
-                out_file.create_dataset(
-                        'info', (0,), maxshape=(None,), dtype=None)
-                out_file['info'].attrs['cfg'] = yaml.dump(cfg)
-                out_file['info'].attrs['version'] = __version__
+        # Initialize the output HDF5 file, keep it open
+        self.out_file = h5py.File(self.file_name, 'w')
 
-            # Initialize the event dataset and their reference array datasets
-            self.initialize_datasets(out_file)
+        # Initialize the info dataset that stores environment parameters
+        if cfg is not None:
+            self.out_file.create_dataset(
+                    'info', (0,), maxshape=(None,), dtype=None)
+            self.out_file['info'].attrs['cfg'] = yaml.dump(cfg)
+            self.out_file['info'].attrs['version'] = __version__
 
-            # Mark file as ready for use
-            self.ready = True
+        # Initialize the event dataset and their reference array datasets
+        self.initialize_datasets(self.out_file)
+
+        # Mark file as ready for use
+        self.ready = True
 
     def get_stored_keys(self, data):
         """Get the list of data product keys to store.
@@ -224,6 +276,8 @@ class HDF5Writer:
                 self.type_dict[key].dtype = object_dtype
                 self.type_dict[key].scalar = True
                 self.type_dict[key].class_name = data[key][0].__class__.__name__
+                self.type_dict[key].codec = ObjectCodec(
+                        type(data[key][0]), object_dtype)
 
             else:
                 # List containing a list/array of objects per batch ID
@@ -253,6 +307,8 @@ class HDF5Writer:
                     self.object_dtypes.append(object_dtype)
                     self.type_dict[key].dtype = object_dtype
                     self.type_dict[key].class_name = ref_obj.__class__.__name__
+                    self.type_dict[key].codec = ObjectCodec(
+                            type(ref_obj), object_dtype)
 
                 elif (not isinstance(ref_obj, list) and
                       not ref_obj.dtype == object):
@@ -348,10 +404,7 @@ class HDF5Writer:
             self.event_dtype.append((key, ref_dtype))
             if not isinstance(val.width, list):
                 # If the key contains a list of objects of identical shape
-                shape = (0, val.width) if val.width else (0,)
-                maxshape = (None, val.width) if val.width else (None,)
-                out_file.create_dataset(
-                        key, shape, maxshape=maxshape, dtype=val.dtype)
+                self.create_dataset(out_file, key, val.width, val.dtype)
 
                 # Store the class name to rebuild it later, if relevant
                 if val.class_name is not None:
@@ -364,16 +417,9 @@ class HDF5Writer:
                 group = out_file.create_group(key)
 
                 n_arrays = len(val.width)
-                shape, maxshape = (0, n_arrays), (None, n_arrays)
-                group.create_dataset(
-                        'index', shape, maxshape=maxshape, dtype=ref_dtype)
-
+                self.create_dataset(group, 'index', n_arrays, ref_dtype)
                 for i, w in enumerate(val.width):
-                    shape = (0, w) if w else (0,)
-                    maxshape = (None, w) if w else (None,)
-                    el = f'element_{i}'
-                    group.create_dataset(
-                            el, shape, maxshape=maxshape, dtype=val.dtype)
+                    self.create_dataset(group, f'element_{i}', w, val.dtype)
 
             else:
                 # If the  elements of the list are of equal width, store them
@@ -381,18 +427,44 @@ class HDF5Writer:
                 # to break it into individual elements downstream.
                 group = out_file.create_group(key)
 
-                shape = (0, val.width[0]) if val.width[0] else (0,)
-                maxshape = (None, val.width[0]) if val.width[0] else (None,)
-                group.create_dataset(
-                        'index', (0,), maxshape=(None,), dtype=ref_dtype)
-                group.create_dataset(
-                        'elements', shape, maxshape=maxshape, dtype=val.dtype)
+                self.create_dataset(group, 'index', 0, ref_dtype)
+                self.create_dataset(group, 'elements', val.width[0], val.dtype)
 
             # Give relevant attributes to the dataset
             out_file[key].attrs['scalar'] = val.scalar
 
-        out_file.create_dataset(
-                'events', (0,), maxshape=(None,), dtype=self.event_dtype)
+        self.create_dataset(out_file, 'events', 0, self.event_dtype)
+
+    def create_dataset(self, group, name, width, dtype):
+        """Create an empty, extendable dataset with the requested chunking
+        and compression parameters.
+
+        Parameters
+        ----------
+        group : Union[h5py.File, h5py.Group]
+            HDF5 file or group to create the dataset in
+        name : str
+            Name of the dataset
+        width : int
+            Width of the dataset (0 if it is one-dimensional)
+        dtype : type
+            Data type of the dataset
+        """
+        # Define the shape of the dataset
+        shape = (0, width) if width else (0,)
+        maxshape = (None, width) if width else (None,)
+
+        # Define the shape of the chunks, if requested
+        chunks = self.chunks
+        if chunks is None or isinstance(chunks, bool):
+            chunks = True
+        else:
+            chunks = (chunks, width) if width else (chunks,)
+
+        group.create_dataset(
+                name, shape, maxshape=maxshape, dtype=dtype, chunks=chunks,
+                compression=self.compression,
+                compression_opts=self.compression_opts)
 
     def __call__(self, data, cfg=None):
         """Append the HDF5 file with the content of a batch.
@@ -422,97 +494,168 @@ class HDF5Writer:
             self.create(data, cfg)
             self.ready = True
 
-        # Append file
-        with h5py.File(self.file_name, 'a') as out_file:
-            # Loop over batch IDs
-            for batch_id in range(batch_size):
-                # Initialize a new event
-                event = np.empty(1, self.event_dtype)
+        # If the file is not open yet (append mode), open it
+        if self.out_file is None:
+            self.out_file = h5py.File(self.file_name, 'a')
 
-                # Initialize a dictionary of references to be passed to the
-                # event dataset and store the input and result keys
-                for key in self.keys:
-                    self.append_key(out_file, event, data, key, batch_id)
+        # Fetch the data to be stored for each key. The buffer is only
+        # extended once the whole batch has been processed.
+        batch = {}
+        for key in self.keys:
+            batch[key] = [self.get_key(
+                data, key, batch_id) for batch_id in range(batch_size)]
 
-                # Append event
-                event_id = len(out_file['events'])
-                event_ds = out_file['events']
-                event_ds.resize(event_id + 1, axis=0) # pylint: disable=E1101
-                event_ds[event_id] = event
+        if self.buffer is None:
+            self.buffer = {key: [] for key in self.keys}
+        for key in self.keys:
+            self.buffer[key].extend(batch[key])
+        self.num_buffered += batch_size
 
-    def append_key(self, out_file, event, data, key, batch_id):
-        """Stores data key in a specific dataset of an HDF5 file.
+        # If enough events have been accumulated, write them to file
+        if self.num_buffered >= self.buffer_size:
+            self.flush()
+
+    def get_key(self, data, key, batch_id):
+        """Fetches the data to be stored for a specific key and batch ID.
 
         Parameters
         ----------
-        out_file : h5py.File
-            HDF5 file instance
-        event : dict
-            Dictionary of objects that make up one event
         data : dict
             Dictionary of data products
         key : string
             Dictionary key name
         batch_id : int
             Batch ID to be stored
+
+        Returns
+        -------
+        Union[np.ndarray, list]
+            Array, list of objects or list of arrays to store for this entry
         """
-        # Get the data type and store it
+        # Get the data type
         val = self.type_dict[key]
         if not val.merge and not isinstance(val.width, list):
             # Store single arrays
             if np.isscalar(data[key]):
                 # If a data product is a single scalar, use it for every entry
-                array = [data[key]]
+                return [data[key]]
 
-            else:
-                # Otherwise, get the data corresponding to the current entry
-                array = data[key][batch_id]
-                if val.scalar:
-                    array = [array]
+            # Otherwise, get the data corresponding to the current entry
+            array = data[key][batch_id]
+            if val.scalar:
+                array = [array]
+
+            return array
+
+        # Store the list of arrays for the current entry
+        return data[key][batch_id]
+
+    def flush(self):
+        """Writes all the events accumulated in the buffer to file.
+
+        Each dataset is resized and written to once for all buffered events.
+        """
+        # If there is nothing to write, nothing to do
+        if not self.num_buffered:
+            return
+
+        # Initialize the new events, fill their references key by key
+        events = np.empty(self.num_buffered, self.event_dtype)
+        for key in self.keys:
+            val = self.type_dict[key]
+            values = self.buffer[key]
+            if not val.merge and not isinstance(val.width, list):
+                # Store single arrays
+                if val.codec is not None:
+                    self.store_objects(
+                            self.out_file, events, key, values, val.codec)
+                else:
+                    self.store(self.out_file, events, key, values)
+
+            elif not val.merge:
+                # Store the array and its reference for each element in the list
+                self.store_jagged(self.out_file, events, key, values)
 
-            if val.dtype in self.object_dtypes:
-                self.store_objects(out_file, event, key, array, val.dtype)
             else:
-                self.store(out_file, event, key, array)
+                # Store one array of for all in the list and a index to break them
+                self.store_flat(self.out_file, events, key, values)
 
-        elif not val.merge:
-            # Store the array and its reference for each element in the list
-            array_list = data[key][batch_id]
-            self.store_jagged(out_file, event, key, array_list)
+            values.clear()
 
-        else:
-            # Store one array of for all in the list and a index to break them
-            array_list = data[key][batch_id]
-            self.store_flat(out_file, event, key, array_list)
+        # Append events
+        event_ds = self.out_file['events']
+        event_id = len(event_ds)
+        event_ds.resize(event_id + len(events), axis=0) # pylint: disable=E1101
+        event_ds[event_id:event_id + len(events)] = events
+
+        # Reset the buffer, make sure the file is up to date on disk
+        self.num_buffered = 0
+        self.out_file.flush()
+
+    def close(self):
+        """Writes the remaining buffered events and closes the output file."""
+        if self.out_file is not None:
+            self.flush()
+            self.out_file.close()
+            self.out_file = None
 
     @staticmethod
-    def store(out_file, event, key, array):
-        """Stores an `ndarray` in the file and stores its mapping in the event
-        dataset.
+    def merge_arrays(dataset, arrays):
+        """Merges a list of arrays into a single array which matches the
+        data type and the width of a dataset.
+
+        Parameters
+        ----------
+        dataset : h5py.Dataset
+            Dataset the arrays are to be stored in
+        arrays : List[Union[np.ndarray, list]]
+            List of arrays to merge
+
+        Returns
+        -------
+        np.ndarray
+            Merged array
+        np.ndarray
+            Offset of each array in the merged array (plus the total length)
+        """
+        offsets = np.zeros(len(arrays) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(array) for array in arrays])
+        merged = np.empty((offsets[-1], *dataset.shape[1:]), dtype=dataset.dtype)
+        for i, array in enumerate(arrays):
+            if offsets[i + 1] > offsets[i]:
+                merged[offsets[i]:offsets[i + 1]] = array
+
+        return merged, offsets
+
+    @classmethod
+    def store(cls, out_file, events, key, arrays):
+        """Stores a list of `ndarray` in the file and stores their mapping in
+        the event dataset.
 
         Parameters
         ----------
         out_file : h5py.File
             HDF5 file instance
-        event : dict
-            Dictionary of objects that make up one event
+        events : np.ndarray
+            (E) Array of events to store the references in
         key: str
             Name of the dataset in the file
-        array : np.ndarray
-            Array to be stored
+        arrays : List[np.ndarray]
+            (E) List of arrays to be stored, one per event
         """
-        # Extend the dataset, store array
+        # Extend the dataset, store all arrays at once
         dataset = out_file[key]
-        current_id = len(dataset)
-        dataset.resize(current_id + len(array), axis=0)
-        dataset[current_id:current_id + len(array)] = array
+        array, offsets = cls.merge_arrays(dataset, arrays)
+        offsets += len(dataset)
+        dataset.resize(offsets[-1], axis=0)
+        dataset[offsets[0]:offsets[-1]] = array
 
-        # Define region reference, store it at the event level
-        region_ref = dataset.regionref[current_id:current_id + len(array)]
-        event[key] = region_ref
+        # Define region references, store them at the event level
+        for i in range(len(events)):
+            events[key][i] = dataset.regionref[offsets[i]:offsets[i + 1]]
 
-    @staticmethod
-    def store_jagged(out_file, event, key, array_list):
+    @classmethod
+    def store_jagged(cls, out_file, events, key, array_lists):
         """Stores a jagged list of arrays in the file and stores an index
         mapping for each array element in the event dataset.
 
@@ -520,37 +663,40 @@ class HDF5Writer:
         ----------
         out_file : h5py.File
             HDF5 file instance
-        event : dict
-            Dictionary of objects that make up one event
+        events : np.ndarray
+            (E) Array of events to store the references in
         key: str
             Name of the dataset in the file
-        array_list : list(np.ndarray)
-            List of arrays to be stored
+        array_lists : List[List[np.ndarray]]
+            (E) List of lists of arrays to be stored, one per event
         """
-        # Extend the dataset, store combined array
-        region_refs = []
-        for i, array in enumerate(array_list):
+        # Extend the element datasets, store all arrays of an element at once
+        index = out_file[key]['index']
+        num_elements = index.shape[1]
+        region_refs = np.empty((len(events), num_elements), dtype=index.dtype)
+        for i in range(num_elements):
             dataset = out_file[key][f'element_{i}']
-            current_id = len(dataset)
-            dataset.resize(current_id + len(array), axis=0)
-            dataset[current_id:current_id + len(array)] = array
+            arrays = [array_list[i] for array_list in array_lists]
+            array, offsets = cls.merge_arrays(dataset, arrays)
+            offsets += len(dataset)
+            dataset.resize(offsets[-1], axis=0)
+            dataset[offsets[0]:offsets[-1]] = array
 
-            region_ref = dataset.regionref[current_id:current_id + len(array)]
-            region_refs.append(region_ref)
+            for j in range(len(events)):
+                region_refs[j, i] = dataset.regionref[offsets[j]:offsets[j + 1]]
 
-        # Define the index which stores a list of region_refs
-        index = out_file[key]['index']
-        current_id = len(dataset)
-        index.resize(current_id+1, axis=0)
-        index[current_id] = region_refs
+        # Define the index which stores a list of region_refs per event
+        current_id = len(index)
+        index.resize(current_id + len(events), axis=0)
+        index[current_id:current_id + len(events)] = region_refs
 
         # Define a region reference to all the references,
         # store it at the event level
-        region_ref = index.regionref[current_id:current_id+1]
-        event[key] = region_ref
+        for j in range(len(events)):
+            events[key][j] = index.regionref[current_id + j:current_id + j + 1]
 
-    @staticmethod
-    def store_flat(out_file, event, key, array_list):
+    @classmethod
+    def store_flat(cls, out_file, events, key, array_lists):
         """Stores a concatenated list of arrays in the file and stores its
         index mapping in the event dataset to break them.
 
@@ -558,38 +704,40 @@ class HDF5Writer:
         ----------
         out_file : h5py.File
             HDF5 file instance
-        event : dict
-            Dictionary of objects that make up one event
+        events : np.ndarray
+            (E) Array of events to store the references in
         key: str
             Name of the dataset in the file
-        array_list : list(np.ndarray)
-            List of arrays to be stored
+        array_lists : List[List[np.ndarray]]
+            (E) List of lists of arrays to be stored, one per event
         """
-        # Extend the dataset, store combined array
-        array = np.concatenate(array_list) if len(array_list) else []
+        # Extend the dataset, store combined array of all events
         dataset = out_file[key]['elements']
-        first_id = len(dataset)
-        dataset.resize(first_id + len(array), axis=0)
-        dataset[first_id:first_id + len(array)] = array
+        arrays = [array for array_list in array_lists for array in array_list]
+        array, offsets = cls.merge_arrays(dataset, arrays)
+        offsets += len(dataset)
+        dataset.resize(offsets[-1], axis=0)
+        dataset[offsets[0]:offsets[-1]] = array
 
         # Loop over arrays in the list, create a reference for each
         index = out_file[key]['index']
+        el_refs = np.empty(len(arrays), dtype=index.dtype)
+        for i in range(len(arrays)):
+            el_refs[i] = dataset.regionref[offsets[i]:offsets[i + 1]]
+
         current_id = len(index)
-        index.resize(current_id + len(array_list), axis=0)
-        last_id = first_id
-        for i, el in enumerate(array_list):
-            first_id = last_id
-            last_id += len(el)
-            el_ref = dataset.regionref[first_id:last_id]
-            index[current_id + i] = el_ref
+        index.resize(current_id + len(arrays), axis=0)
+        index[current_id:current_id + len(arrays)] = el_refs
 
-        # Define a region reference to all the references,
+        # Define a region reference to all the references of each event,
         # store it at the event level
-        region_ref = index.regionref[current_id:current_id + len(array_list)]
-        event[key] = region_ref
+        for j, array_list in enumerate(array_lists):
+            last_id = current_id + len(array_list)
+            events[key][j] = index.regionref[current_id:last_id]
+            current_id = last_id
 
     @staticmethod
-    def store_objects(out_file, event, key, array, obj_dtype):
+    def store_objects(out_file, events, key, object_lists, codec):
         """Stores a list of objects with understandable attributes in the file
         and stores its mapping in the event dataset.
 
@@ -597,26 +745,27 @@ class HDF5Writer:
         ----------
         out_file : h5py.File
             HDF5 file instance
-        event : dict
-            Dictionary of objects that make up one event
+        events : np.ndarray
+            (E) Array of events to store the references in
         key: str
             Name of the dataset in the file
-        array : np.ndarray
-            Array of objects or dictionaries to be stored
-        obj_dtype : list
-            List of (key, dtype) pairs which specify what's to store
+        object_lists : List[List[object]]
+            (E) List of lists of objects to be stored, one per event
+        codec : ObjectCodec
+            Codec which converts the objects to a structured array
         """
-        # Convert list of objects to list of storable objects
-        objects = np.empty(len(array), obj_dtype)
-        for i, obj in enumerate(array):
-            objects[i] = tuple(obj.as_dict().values())
+        # Convert list of objects to a structured array in one go
+        offsets = np.zeros(len(object_lists) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(array) for array in object_lists])
+        objects = codec.encode(
+                [obj for array in object_lists for obj in array])
 
         # Extend the dataset, store array
         dataset = out_file[key]
-        current_id = len(dataset)
-        dataset.resize(current_id + len(array), axis=0)
-        dataset[current_id:current_id + len(array)] = objects
+        offsets += len(dataset)
+        dataset.resize(offsets[-1], axis=0)
+        dataset[offsets[0]:offsets[-1]] = objects
 
-        # Define region reference, store it at the event level
-        region_ref = dataset.regionref[current_id:current_id + len(array)]
-        event[key] = region_ref
+        # Define region references, store them at the event level
+        for i in range(len(events)):
+            events[key][i] = dataset.regionref[offsets[i]:offsets[i + 1]]
@@ -0,0 +1,274 @@
+"""Module with functions which merge files produced by the writers.
+
+Each event of a file produced by :class:`HDF5Writer` refers to its data
+through region references into the datasets of that file. Merging files
+therefore requires appending the datasets of each file to those of the
+merged file and rewriting each region reference, shifted by the length of
+the datasets before the append.
+
+The rows of the CSV and Parquet files produced by :class:`CSVWriter` and
+:class:`ParquetWriter` are simply concatenated.
+"""
+
+import os
+
+import h5py
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ModuleNotFoundError:
+    pa, pq = None, None
+
+from spine.io.read.hdf5 import HDF5Reader
+
+__all__ = ['merge_hdf5', 'merge_csv', 'merge_parquet']
+
+# Maximum number of bytes of a dataset copied at once
+CHUNK_BYTES = 2**26
+
+
+def merge_hdf5(file_paths, file_name, overwrite=False):
+    """Concatenates the events of a list of HDF5 files into a single file.
+
+    The files must have been produced by writers storing the same keys (e.g.
+    the output shards of a multi-process run). The configuration stored in
+    the first file is kept.
+
+    Parameters
+    ----------
+    file_paths : List[str]
+        Paths to the files to merge, in order
+    file_name : str
+        Path to the merged file
+    overwrite : bool, default False
+        If `True`, overwrite the merged file if it already exists
+
+    Returns
+    -------
+    int
+        Number of events in the merged file
+    """
+    # Check that the output file can be written
+    assert overwrite or not os.path.isfile(file_name), (
+            f"File with the same name as the merged file already exists: "
+            f"{file_name}. Set `overwrite` to `True` to replace it.")
+
+    with h5py.File(file_name, 'w') as out_file:
+        for file_path in file_paths:
+            with h5py.File(file_path, 'r') as in_file:
+                # Copy the structure of the first file, with empty datasets
+                if 'events' not in out_file:
+                    copy_structure(in_file, out_file)
+
+                # Append the events of this file
+                append_file(in_file, out_file)
+
+        return len(out_file['events'])
+
+
+def merge_csv(file_paths, file_name, overwrite=False):
+    """Concatenates the rows of a list of CSV files into a single file.
+
+    The files must share the same header (e.g. the output shards of an
+    analysis script in a multi-process run).
+
+    Parameters
+    ----------
+    file_paths : List[str]
+        Paths to the files to merge, in order
+    file_name : str
+        Path to the merged file
+    overwrite : bool, default False
+        If `True`, overwrite the merged file if it already exists
+
+    Returns
+    -------
+    int
+        Number of rows in the merged file
+    """
+    # Check that the output file can be written
+    assert overwrite or not os.path.isfile(file_name), (
+            f"File with the same name as the merged file already exists: "
+            f"{file_name}. Set `overwrite` to `True` to replace it.")
+
+    num_rows, header = 0, None
+    with open(file_name, 'w', encoding='utf-8') as out_file:
+        for file_path in file_paths:
+            with open(file_path, 'r', encoding='utf-8') as in_file:
+                # Write the header of the first file, check the others
+                file_header = in_file.readline()
+                if header is None:
+                    header = file_header
+                    out_file.write(header)
+                assert file_header == header, (
+                        f"The header of {file_path} does not match that of "
+                        f"the other files to merge.")
+
+                # Append the rows of this file
+                for line in in_file:
+                    out_file.write(line)
+                    num_rows += 1
+
+    return num_rows
+
+
+def merge_parquet(file_paths, file_name, overwrite=False):
+    """Concatenates the rows of a list of Parquet files into a single file.
+
+    The schemas of the files are unified, such that a column stored with
+    different types in different files is stored with the widest one. The
+    row groups of each file are copied as is.
+
+    Parameters
+    ----------
+    file_paths : List[str]
+        Paths to the files to merge, in order
+    file_name : str
+        Path to the merged file
+    overwrite : bool, default False
+        If `True`, overwrite the merged file if it already exists
+
+    Returns
+    -------
+    int
+        Number of rows in the merged file
+    """
+    # Check that the backend is available and the output file can be written
+    if pa is None:
+        raise ImportError(
+                "The `pyarrow` package is required to merge Parquet files.")
+    assert overwrite or not os.path.isfile(file_name), (
+            f"File with the same name as the merged file already exists: "
+            f"{file_name}. Set `overwrite` to `True` to replace it.")
+
+    # Find a schema to which the schemas of all the files can be cast
+    schema = pa.unify_schemas(
+            [pq.read_schema(path) for path in file_paths],
+            promote_options='permissive')
+
+    # Copy the row groups of each file
+    num_rows = 0
+    with pq.ParquetWriter(file_name, schema) as out_file:
+        for file_path in file_paths:
+            in_file = pq.ParquetFile(file_path)
+            for i in range(in_file.num_row_groups):
+                table = in_file.read_row_group(i).cast(schema)
+                out_file.write_table(table)
+                num_rows += len(table)
+            in_file.close()
+
+    return num_rows
+
+
+def copy_structure(in_file, out_file):
+    """Creates empty copies of the datasets and groups of a file.
+
+    Parameters
+    ----------
+    in_file : h5py.File
+        File to copy the structure from
+    out_file : h5py.File
+        File to create the structure in
+    """
+    def copy(name, node):
+        if isinstance(node, h5py.Group):
+            group = out_file.create_group(name)
+            group.attrs.update(node.attrs)
+        else:
+            dataset = out_file.create_dataset(
+                    name, (0, *node.shape[1:]), maxshape=node.maxshape,
+                    dtype=node.dtype, chunks=node.chunks or True,
+                    compression=node.compression,
+                    compression_opts=node.compression_opts)
+            dataset.attrs.update(node.attrs)
+
+    in_file.visititems(copy)
+
+
+def append_file(in_file, out_file):
+    """Appends the events of a file to the merged file.
+
+    Parameters
+    ----------
+    in_file : h5py.File
+        File to append
+    out_file : h5py.File
+        Merged file
+    """
+    # Load the events, rewrite their references key by key
+    events = in_file['events'][:]
+    for key in events.dtype.names:
+        node = in_file[key]
+        if isinstance(node, h5py.Dataset):
+            # Simple dataset, the events refer to it directly
+            events[key] = append_dataset(node, out_file[key], events[key])
+            continue
+
+        # Group of datasets, the events refer to an index which refers
+        # to the element dataset(s)
+        index = node['index'][:]
+        if 'elements' in node:
+            index = append_dataset(
+                    node['elements'], out_file[key]['elements'], index)
+        else:
+            for i in range(index.shape[1]):
+                index[:, i] = append_dataset(
+                        node[f'element_{i}'], out_file[key][f'element_{i}'],
+                        index[:, i])
+
+        events[key] = append_dataset(
+                node['index'], out_file[key]['index'], events[key], index)
+
+    append_dataset(in_file['events'], out_file['events'], data=events)
+
+
+def append_dataset(in_dataset, out_dataset, region_refs=None, data=None):
+    """Appends a dataset to its merged counterpart and rewrites a list of
+    region references to the dataset so that they point to the merged one.
+
+    The content of the dataset is copied in blocks of at most `CHUNK_BYTES`,
+    such that large datasets are never loaded in memory at once.
+
+    Parameters
+    ----------
+    in_dataset : h5py.Dataset
+        Dataset to append
+    out_dataset : h5py.Dataset
+        Merged dataset
+    region_refs : np.ndarray, optional
+        (R) Region references to the dataset to append
+    data : np.ndarray, optional
+        Content of the dataset to append, if it has been modified
+
+    Returns
+    -------
+    np.ndarray
+        (R) Region references to the merged dataset
+    """
+    # Append the content of the dataset
+    offset = len(out_dataset)
+    length = len(data) if data is not None else len(in_dataset)
+    out_dataset.resize(offset + length, axis=0)
+    if data is not None:
+        out_dataset[offset:] = data
+    else:
+        row_bytes = in_dataset.dtype.itemsize*int(np.prod(in_dataset.shape[1:]))
+        step = max(CHUNK_BYTES//max(row_bytes, 1), 1)
+        for start in range(0, length, step):
+            stop = min(start + step, length)
+            out_dataset[offset + start:offset + stop] = in_dataset[start:stop]
+
+    # Shift the references. Regions with identical bounds (e.g. empty ones)
+    # share the same reference, which is only created once
+    if region_refs is None:
+        return None
+
+    bounds = HDF5Reader.get_bounds(in_dataset, region_refs) + offset
+    unique, inverse = np.unique(bounds, axis=0, return_inverse=True)
+    refs = np.empty(len(unique), dtype=region_refs.dtype)
+    for i, (start, stop) in enumerate(unique):
+        refs[i] = out_dataset.regionref[start:stop]
+
+    return refs[inverse.ravel()]
@@ -0,0 +1,168 @@
+"""Module to write analysis output to Parquet files."""
+
+import os
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ModuleNotFoundError:
+    pa, pq = None, None
+
+from .csv import CSVWriter
+
+__all__ = ['ParquetWriter']
+
+
+class ParquetWriter(CSVWriter):
+    """Writes data to an Apache Parquet file.
+
+    Exposes the same interface as :class:`CSVWriter`, but stores the rows in
+    a columnar file with a fixed schema. The column types are inferred from
+    each batch of rows written to file. If a batch requires a wider type than
+    the one stored so far (e.g. floats in a column of integers, strings in a
+    column of missing values), the schema is promoted and the rows already
+    written are rewritten to match it. Each batch of `buffer_size` rows is
+    stored as one row group.
+
+    Missing values are stored as nulls rather than -1, such that they can be
+    stored in columns of any type.
+
+    Requires the `pyarrow` package.
+
+    Typical configuration should look like:
+
+    .. code-block:: yaml
+
+        io:
+          ...
+          writer:
+            name: parquet
+            file_name: output.parquet
+            buffer_size: 10000
+    """
+    name = 'parquet'
+    missing_value = None
+
+    def __init__(self, file_name='output.parquet', overwrite=False,
+                 accept_missing=False, buffer_size=10000):
+        """Initialize the basics of the output file.
+
+        Parameters
+        ----------
+        file_name : str, default 'output.parquet'
+            Name of the output Parquet file
+        overwrite : bool, default False
+            If True, overwrite the output file if it already exists
+        accept_missing : bool, default True
+            Tolerate missing keys, stored as null values
+        buffer_size : int, default 10000
+            Number of rows to hold in memory before writing them to file
+        """
+        # Check that the backend is available
+        if pa is None:
+            raise ImportError(
+                    "The `pyarrow` package is required to write Parquet files.")
+
+        # Initialize the base class (Parquet files cannot be appended)
+        super().__init__(
+                file_name, overwrite=overwrite, accept_missing=accept_missing,
+                buffer_size=buffer_size)
+
+        # Initialize the schema, inferred from the batches of rows
+        self.schema = None
+
+    def create(self, result_blob):
+        """Record the keys to be stored.
+
+        Parameters
+        ----------
+        result_blob : dict
+            Dictionary containing the output of the reconstruction chain
+        """
+        self.result_keys = list(result_blob.keys())
+
+    def format(self, result_blob):
+        """Converts a row of output to the form in which it is buffered.
+
+        Parameters
+        ----------
+        result_blob : dict
+            Dictionary containing the output of the reconstruction chain
+
+        Returns
+        -------
+        List[object]
+            Values of the row, in the order of the columns
+        """
+        return [self.to_scalar(result_blob[k]) for k in self.result_keys]
+
+    @staticmethod
+    def to_scalar(value):
+        """Converts numpy values to built-in types supported by Arrow.
+
+        Parameters
+        ----------
+        value : object
+            Value to store
+
+        Returns
+        -------
+        object
+            Built-in value
+        """
+        if isinstance(value, np.generic):
+            return value.item()
+        if isinstance(value, np.ndarray):
+            return value.tolist()
+
+        return value
+
+    def flush(self):
+        """Writes the buffered rows to file, as one row group."""
+        if not self.buffer:
+            return
+
+        # Build a table from the buffered rows, promote the schema if needed
+        columns = [list(col) for col in zip(*self.buffer)]
+        table = pa.table(dict(zip(self.result_keys, columns)))
+        schema = table.schema
+        if self.schema is not None:
+            schema = pa.unify_schemas(
+                    [self.schema, table.schema], promote_options='permissive')
+            if schema != self.schema or self.out_file is None:
+                self.reopen(schema)
+            table = table.cast(schema)
+
+        # Write it to file
+        self.schema = schema
+        if self.out_file is None:
+            self.out_file = pq.ParquetWriter(self.file_name, self.schema)
+
+        self.out_file.write_table(table)
+        self.buffer = []
+
+    def reopen(self, schema):
+        """Reopens the output file, rewrites the rows already stored.
+
+        This is used to widen the schema of the file, or to keep writing to
+        a file which was closed (Parquet files cannot be appended).
+
+        Parameters
+        ----------
+        schema : pyarrow.Schema
+            Schema of the file, to which the current schema can be safely cast
+        """
+        # Rewrite the existing row groups one by one to a temporary file
+        if self.out_file is not None:
+            self.out_file.close()
+        tmp_name = self.file_name + '.tmp'
+        in_file = pq.ParquetFile(self.file_name)
+        self.out_file = pq.ParquetWriter(tmp_name, schema)
+        for i in range(in_file.num_row_groups):
+            self.out_file.write_table(in_file.read_row_group(i).cast(schema))
+
+        # Replace the original file, keep appending to the new one
+        in_file.close()
+        os.replace(tmp_name, self.file_name)
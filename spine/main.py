@@ -8,28 +8,46 @@ scripts, writers and profilers.
 
 import os
 import glob
+from copy import deepcopy
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 
 import torch
 from torch.distributed import init_process_group, destroy_process_group
 
 from .utils.logger import logger
+from .utils.stopwatch import Time
 
 from .driver import Driver
+from .io.write import BackgroundWriter, merge_hdf5, merge_csv, merge_parquet
 
 
-def run(cfg):
+def run(cfg, num_procs=None):
     """Execute a model in one or more processes.
 
     Parameters
     ----------
     cfg : dict
         Full driver/trainer configuration
+    num_procs : int, optional
+        If larger than 1, split the entries between this many CPU processes,
+        each of which writes its own output shard
     """
     # Process the configuration to set up the driver world
     distributed, world_size = process_world(**cfg)
 
     # Launch the training/inference process
-    if not distributed:
+    if num_procs is not None and num_procs > 1:
+        # Make sure that this is a CPU inference process
+        assert 'train' not in cfg['base'], (
+                "Can only split inference processes between CPU processes.")
+        assert not distributed and world_size == 0, (
+                "Can only split processes which run on CPU.")
+
+        # Run one process per shard of the entries
+        run_sharded(cfg, num_procs)
+
+    elif not distributed:
         # Run a single process
         run_single(cfg)
 
@@ -94,7 +112,134 @@ def train_single(rank, cfg, distributed=False, world_size=None):
     driver.run()
 
 
-def inference_single(cfg):
+def run_sharded(cfg, num_procs):
+    """Execute a model in inference mode in multiple CPU processes.
+
+    The selected entries are split into `num_procs` contiguous shards, each
+    of which is processed by its own driver, in its own process. If the
+    driver writes an HDF5 file, each process writes its own shard of the
+    output (`<output>_rank<i>.h5`) and the shards are merged at the end.
+    Similarly, each process prefixes the output files of the analysis
+    scripts with its rank, and the files of each script are merged at the end.
+
+    Parameters
+    ----------
+    cfg : dict
+        Full driver configuration
+    num_procs : int
+        Number of processes to split the entries between
+    """
+    # Give each process its own output file
+    writer = cfg['io'].get('writer')
+    shard_paths, file_name = None, None
+    if writer is not None and writer.get('name', 'hdf5') == 'hdf5':
+        file_name = writer.get('file_name', 'output.h5')
+        stem, ext = os.path.splitext(file_name)
+        shard_paths = [f'{stem}_rank{i}{ext}' for i in range(num_procs)]
+
+    # Give each process its own analysis output files
+    ana = cfg.get('ana')
+    if ana is not None:
+        for key, ana_cfg in ana.items():
+            assert not ana_cfg.get('append', False), (
+                    f"Cannot append to the output files of the analysis "
+                    f"script `{key}` when splitting entries between processes.")
+
+    # Run the processes, collect the time spent in each of their stages
+    ctx = torch.multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(num_procs, mp_context=ctx) as executor:
+        futures = []
+        for i in range(num_procs):
+            cfg_i = deepcopy(cfg)
+            if shard_paths is not None:
+                cfg_i['io']['writer']['file_name'] = shard_paths[i]
+            if ana is not None:
+                for ana_cfg in cfg_i['ana'].values():
+                    ana_cfg['output_prefix'] = get_shard_prefix(
+                            ana_cfg.get('output_prefix'), i)
+            futures.append(executor.submit(
+                inference_single, cfg_i, shard_id=i, num_shards=num_procs))
+
+        times = [future.result() for future in futures]
+
+    # Log the combined time summary
+    log_shard_times(times)
+
+    # Merge the output shards
+    if shard_paths is not None:
+        overwrite = writer.get('overwrite', False)
+        num_events = merge_hdf5(shard_paths, file_name, overwrite)
+        logger.info("Merged %d output shards (%d events) into %s",
+                    num_procs, num_events, file_name)
+        for path in shard_paths:
+            os.remove(path)
+
+    # Merge the analysis output shards
+    if ana is not None:
+        for ana_cfg in ana.values():
+            merge_ana_shards(num_procs, **ana_cfg)
+
+
+def get_shard_prefix(output_prefix, shard_id):
+    """Prefix of the analysis output files of one shard.
+
+    Parameters
+    ----------
+    output_prefix : str
+        Prefix of the analysis output files
+    shard_id : int
+        Index of the shard
+
+    Returns
+    -------
+    str
+        Prefix of the analysis output files of the shard
+    """
+    if output_prefix is None:
+        return f'rank{shard_id}'
+
+    return f'{output_prefix}_rank{shard_id}'
+
+
+def merge_ana_shards(num_shards, output_prefix=None, output_format='csv',
+                     overwrite=False, **kwargs):
+    """Merges the output files written by an analysis script in each shard.
+
+    Parameters
+    ----------
+    num_shards : int
+        Number of shards the entries were split into
+    output_prefix : str, optional
+        Prefix of the analysis output files
+    output_format : str, default 'csv'
+        Format of the output files ('csv' or 'parquet')
+    overwrite : bool, default False
+        If `True`, overwrite the merged files if they already exist
+    **kwargs : dict, optional
+        Other analysis script parameters (unused)
+    """
+    # Group the files written by each shard by name, in shard order. A shard
+    # which did not process any entry may not have written any file.
+    file_paths = defaultdict(list)
+    for i in range(num_shards):
+        prefix = get_shard_prefix(output_prefix, i)
+        for path in sorted(glob.glob(f'{prefix}_*.{output_format}')):
+            name = path[len(prefix) + 1:]
+            if output_prefix is not None:
+                name = f'{output_prefix}_{name}'
+            file_paths[name].append(path)
+
+    # Merge the files, remove the shards
+    merge = merge_csv if output_format == 'csv' else merge_parquet
+    for file_name, paths in file_paths.items():
+        num_rows = merge(paths, file_name, overwrite)
+        logger.info("Merged %d analysis output shards (%d rows) into %s",
+                    len(paths), num_rows, file_name)
+        for path in paths:
+            os.remove(path)
+
+
+def inference_single(cfg, shard_id=None, num_shards=None):
     """
     Execute a model in inference mode in a single process
 
@@ -102,9 +247,21 @@ def inference_single(cfg):
     ----------
     cfg : dict
         Full driver configuration
+    shard_id : int, optional
+        Index of the shard of entries to process
+    num_shards : int, optional
+        Number of shards the entries are split into
+
+    Returns
+    -------
+    Dict[str, Time]
+        Total execution time of each stage of the driver
     """
-    # Prepare the driver
+    # Prepare the driver. If it processes a shard, share the CPUs
     driver = Driver(cfg)
+    if num_shards is not None:
+        torch.set_num_threads(max(os.cpu_count()//num_shards, 1))
+        driver.apply_shard(shard_id, num_shards)
 
     # Find the set of weights to run the inference on
     preloaded, weights = False, []
@@ -126,6 +283,38 @@ def inference_single(cfg):
 
         driver.run()
 
+    # Collect the time spent in each stage, including the background writer
+    times = {key: watch.time_sum for key, watch in driver.watch.items()
+             if watch.stop is not None}
+    if isinstance(driver.writer, BackgroundWriter):
+        times['write'] = driver.writer.time_sum
+
+    return times
+
+
+def log_shard_times(times):
+    """Logs the time spent in each stage of the driver by each process
+    and by all processes combined.
+
+    Parameters
+    ----------
+    times : List[Dict[str, Time]]
+        Total execution time of each stage, one dictionary per process
+    """
+    keys = list(dict.fromkeys(k for t in times for k in t))
+    width = max(len(k) for k in keys + ['stage'])
+    header = ''.join(f'{f"rank{i}":>10}' for i in range(len(times)))
+    lines = [f"{'stage':<{width}}{header}{'total cpu':>12}{'max wall':>10}"]
+    for key in keys:
+        values = [t.get(key, Time(0., 0.)) for t in times]
+        walls = ''.join(f'{v.wall:>10.2f}' for v in values)
+        cpu = sum(v.cpu for v in values)
+        wall = max(v.wall for v in values)
+        lines.append(f'{key:<{width}}{walls}{cpu:>12.2f}{wall:>10.2f}')
+
+    logger.info("Time spent in each stage per process (s):\n%s",
+                '\n'.join(lines))
+
 
 def process_world(base, **kwargs):
     """Check on the number of available GPUs and what has been requested.
@@ -27,6 +27,7 @@ from spine.utils.ghost import (
         compute_rescaled_charge_batch, adapt_labels_batch)
 from spine.utils.gnn.cluster import (
         form_clusters_batch, get_cluster_label_batch)
+from spine.utils.gnn.cache import ClusterFeatureCache
 from spine.utils.gnn.evaluation import primary_assignment_batch
 
 
@@ -254,8 +255,9 @@ class FullChain(torch.nn.Module):
         -------
         TODO
         """
-        # Initialize the full chain output dictionary
+        # Initialize the full chain output dictionary and the feature cache
         self.result = {}
+        self.feature_cache = None
 
         # Run the deghosting step
         data, sources = self.run_deghosting(data, sources, seg_label, clust_label)
@@ -942,6 +944,10 @@ class FullChain(torch.nn.Module):
         if coord_label is not None:
             grappa_input['coord_label'] = coord_label
 
+        # Provide the fragment statistics cache, if requested
+        if self.cache_features and 'fragment_clusts' in self.result:
+            grappa_input['cache'] = self.get_feature_cache(data)
+
         # Get the particle end points, if requested
         if (hasattr(model.node_encoder, 'add_points') and
             model.node_encoder.add_points):
@@ -979,6 +985,29 @@ class FullChain(torch.nn.Module):
 
         return grappa_input
 
+    def get_feature_cache(self, data):
+        """Returns the cache of the fragment statistics of the current batch.
+
+        The cache is built the first time it is requested in a forward pass.
+        It is shared between the GrapPA stages, such that the features of the
+        particles are derived from those of the fragments they are made of.
+
+        Parameters
+        ----------
+        data : TensorBatch
+            (N, 1 + D + N_f) tensor of voxel/value pairs
+
+        Returns
+        -------
+        ClusterFeatureCache
+            Cache of the fragment statistics
+        """
+        if self.feature_cache is None:
+            self.feature_cache = ClusterFeatureCache(
+                    data.to_numpy().tensor, self.result['fragment_clusts'])
+
+        return self.feature_cache
+
     def build_groups(self, clusts, clust_shapes, group_pred, primary_mask=None,
                      aggregate_shapes=False, shape_use_primary=False,
                      retain_primaries=False):
@@ -1291,13 +1320,17 @@ class FullChainLoss(torch.nn.Module):
             self.result.update({f'{prefix}_{k}':v for k, v in result.items()})
 
 
-def process_chain_config(self, dump_config=False, **parameters):
+def process_chain_config(self, dump_config=False, cache_features=True,
+                         **parameters):
     """Process the full chain configuration and dump it.
 
     Parameters
     ----------
     dump_config : bool, default False
         Whether to dump the chain configuration in the log file or not
+    cache_features : bool, default True
+        Whether to cache the fragment statistics, such that the features of
+        the particles are derived from them in the GrapPA stages
     **parameters : dict
         Dictionary of chain configuration parameters
     """
@@ -1312,6 +1345,7 @@ def process_chain_config(self, dump_config=False, **parameters):
                 f"The {module} mode should be one of {valid_modes}. "
                 f"Received '{parameters[module]}' instead.")
         setattr(self, module, parameters[module])
+    self.cache_features = cache_features
 
     # Do some logic checks on the chain parameters
     assert not self.charge_rescaling or self.deghosting, (
@@ -262,7 +262,7 @@ class GrapPA(torch.nn.Module):
                 shapes=self.node_type, min_size=self.min_size, **kwargs)
 
     def forward(self, data, coord_label=None, clusts=None, shapes=None,
-                groups=None, points=None, extra=None):
+                groups=None, points=None, extra=None, cache=None):
         """Prepares particle clusters and feed them to the GNN model.
 
         Parameters
@@ -287,6 +287,9 @@ class GrapPA(torch.nn.Module):
             (C, 3/6) Tensor of start (and end) points
         extra : TensorBatch, optional
             (C, N_f) Batch of features to append to the existing node features
+        cache : ClusterFeatureCache, optional
+            Cache of cluster statistics of this batch, used to derive the
+            geometric features of clusters made of cached clusters
 
         Returns
         -------
@@ -341,14 +344,14 @@ class GrapPA(torch.nn.Module):
 
         # Initialize the input graph
         edge_index, dist_mat, closest_index = self.graph_constructor(
-                data_np, clusts, shapes, groups)
+                data_np, clusts, shapes, groups, cache)
 
         result['edge_index'] = edge_index
 
         # Fetch the node features
         node_features = self.node_encoder(
                 data, clusts, coord_label=coord_label,
-                points=points, extra=extra)
+                points=points, extra=extra, cache=cache)
 
         if isinstance(node_features, tuple):
             # If the output of the node encoder is a tuple, separate points
@@ -9,15 +9,18 @@ from spine.utils.globals import (
         SHOWR_SHP, TRACK_SHP, MICHL_SHP, DELTA_SHP, COORD_COLS, PPN_SHAPE_COL,
         COORD_START_COLS, COORD_END_COLS)
 from spine.utils.ppn import PPNPredictor
+from spine.utils.dbscan import LatticeDBSCAN
 from spine.utils.point_break_clustering import PointBreakClusterer
 
 
 class DBSCAN(torch.nn.Module):
     """Uses DBSCAN to find locally-dense particle fragments.
 
-    It uses sklearn's DBSCAN implementation to fragment each of the particle
-    shapes into dense instances. Runs DBSCAN on each requested semantic class
-    separately, in one of three ways:
+    It uses sklearn's DBSCAN implementation (or, for voxels with integer
+    coordinates, the equivalent :class:`LatticeDBSCAN`, which processes the
+    whole batch at once) to fragment each of the particle shapes into dense
+    instances. Runs DBSCAN on each requested semantic class separately, in
+    one of three ways:
     - Run pure DBSCAN on all the voxels in that class
     - Runs DBSCAN on PPN point-masked voxels and then associates the 
       leftovers based on proximity to existing instances.
@@ -30,7 +33,7 @@ class DBSCAN(torch.nn.Module):
                  break_shapes=[TRACK_SHP], break_mask_radius=5.0,
                  break_track_method='masked_dbscan', 
                  use_label_break_points=False, track_include_delta=False,
-                 ppn_predictor={}):
+                 algorithm='auto', ppn_predictor={}):
         """Initialize the DBSCAN clustering algorithm.
 
         Parameters
@@ -59,6 +62,10 @@ class DBSCAN(torch.nn.Module):
         track_include_delta : bool, default False
             If `True`, include delta points along with track point when
             running DBSCAN on track points (limits artificial track breaks)
+        algorithm : str, default 'auto'
+            DBSCAN implementation, one of 'sklearn', 'lattice' (voxels with
+            integer coordinates only) or 'auto' (lattice, if the coordinates
+            of the input are integer)
         ppn_predictor : cfg, optional
             PPN post-processing configuration
         """
@@ -75,6 +82,7 @@ class DBSCAN(torch.nn.Module):
         self.break_mask_radius = break_mask_radius
         self.break_track_method = break_track_method
         self.track_include_delta = track_include_delta
+        self.algorithm = algorithm
 
         # If the constants are provided as scalars, turn them into lists
         assert not np.isscalar(shapes), (
@@ -98,14 +106,29 @@ class DBSCAN(torch.nn.Module):
                     "must provide a PPN predictor configuration.")
             self.ppn_predictor = PPNPredictor(**ppn_predictor)
 
-        # Initialize one clustering algorithm per class
-        self.clusterers = []
+        # Initialize one clustering algorithm per class. If possible, the
+        # classes which are not broken up are clustered on the lattice
+        assert algorithm in ['auto', 'sklearn', 'lattice'], (
+                f"DBSCAN algorithm not recognized: {algorithm}. Should be "
+                 "one of 'auto', 'sklearn' or 'lattice'.")
+        self.clusterers, self.lattices = [], []
         for k, c in enumerate(shapes):
+            lattice = None
             if c not in break_shapes:
                 dbscan = sklearn_dbscan(
                         eps=self.eps[k], min_samples=self.min_samples[k],
                         metric=self.metric[k])
-                clusterer = lambda x, _: dbscan.fit(x).labels_
+                clusterer = lambda x, _, dbscan=dbscan: dbscan.fit(x).labels_
+                if (algorithm != 'sklearn' and
+                    self.metric[k] in LatticeDBSCAN.metrics):
+                    lattice = LatticeDBSCAN(
+                            eps=self.eps[k], min_samples=self.min_samples[k],
+                            metric=self.metric[k])
+
+                assert algorithm != 'lattice' or lattice is not None, (
+                        "The lattice DBSCAN does not support the "
+                        f"{self.metric[k]} metric.")
+
             else:
                 method = break_track_method
                 if c != TRACK_SHP:
@@ -113,9 +136,11 @@ class DBSCAN(torch.nn.Module):
                 clusterer = PointBreakClusterer(
                         eps=self.eps[k], min_samples=self.min_samples[k],
                         metric=self.metric[k], method=method,
-                        mask_radius=self.break_mask_radius[k])
+                        mask_radius=self.break_mask_radius[k],
+                        algorithm=algorithm)
 
             self.clusterers.append(clusterer)
+            self.lattices.append(lattice)
 
     def forward(self, data, seg_pred, coord_label=None, **ppn_result):
         """Pass a batch of data through DBSCAN to form space clusters.
@@ -162,10 +187,15 @@ class DBSCAN(torch.nn.Module):
         # Bring everything to numpy (DBSCAN cannot run on tensors)
         data_np = data.to_numpy()
         seg_pred_np = seg_pred.to_numpy()
+        points_b = None
         if points is not None:
             points_np = points.to_numpy()
             point_shapes_np = point_shapes.to_numpy()
 
+        # Cluster the classes which can be clustered on the lattice, over
+        # the whole batch at once (entries are kept apart)
+        batch_labels = self.get_lattice_labels(data_np, seg_pred_np)
+
         # Loop over the entries in the batch
         offsets = data.edges[:-1]
         clusts, shapes, counts, single_counts = [], [], [], []
@@ -193,9 +223,12 @@ class DBSCAN(torch.nn.Module):
                 if not len(shape_index):
                     continue
 
-                # Run clustering
-                voxels_b_s = voxels_b[shape_index]
-                labels = self.clusterers[k](voxels_b_s, points_b)
+                # Run clustering, if it was not already done
+                if batch_labels[k] is not None:
+                    labels = batch_labels[k][int(offsets[b]) + shape_index]
+                else:
+                    voxels_b_s = voxels_b[shape_index]
+                    labels = self.clusterers[k](voxels_b_s, points_b)
 
                 # If delta points were added to track points, remove them
                 if s == TRACK_SHP and break_class and self.track_include_delta:
@@ -203,10 +236,11 @@ class DBSCAN(torch.nn.Module):
 
                 # Build clusters for this class
                 clusts_b_s = []
-                for c in np.unique(labels):
-                    clust = np.where(labels == c)[0]
+                perm = np.argsort(labels, kind='stable')
+                uniques, starts = np.unique(labels[perm], return_index=True)
+                for c, clust in zip(uniques, np.split(perm, starts[1:])):
                     if c > -1 and len(clust) > self.min_size[k]:
-                        clusts_b_s.append(int(offsets[b]) + clust)
+                        clusts_b_s.append(int(offsets[b]) + shape_index[clust])
                         counts_b.append(len(clust))
  
                 clusts_b.extend(clusts_b_s)
@@ -229,3 +263,39 @@ class DBSCAN(torch.nn.Module):
             shapes = TensorBatch(np.empty(0, dtype=np.int64), counts)
 
         return index, shapes
+
+    def get_lattice_labels(self, data, seg_pred):
+        """Clusters each class which is not broken up on the lattice, over
+        the whole batch at once.
+
+        Parameters
+        ----------
+        data : TensorBatch
+            (N, 1 + D + N_f) Tensor of voxel/value pairs
+        seg_pred : TensorBatch
+            (N) Segmentation value for each data point
+
+        Returns
+        -------
+        List[np.ndarray]
+            (N) Cluster label of each voxel in the batch, for each class
+            (`None` if the class cannot be clustered on the lattice)
+        """
+        # Check whether the voxel coordinates live on a lattice
+        voxels = data.tensor[:, COORD_COLS]
+        batch_labels = [None]*len(self.shapes)
+        if (self.algorithm == 'sklearn' or
+            (self.algorithm == 'auto' and not LatticeDBSCAN.is_lattice(voxels))):
+            return batch_labels
+
+        # Loop over the classes, cluster each of them (entries kept apart)
+        batch_ids = np.repeat(np.arange(data.batch_size), data.counts)
+        for k, s in enumerate(self.shapes):
+            if self.lattices[k] is not None:
+                index = np.where(seg_pred.tensor == s)[0]
+                labels = np.full(len(voxels), -1, dtype=np.int64)
+                labels[index] = self.lattices[k].fit_predict(
+                        voxels[index], batch_ids[index])
+                batch_labels[k] = labels
+
+        return batch_labels
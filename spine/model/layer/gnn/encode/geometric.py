@@ -94,7 +94,7 @@ class ClustGeoNodeEncoder(torch.nn.Module):
                 "If directions or dE/dx is requested, must also add points")
 
     def forward(self, data, clusts, coord_label=None,
-                points=None, extra=None, **kwargs):
+                points=None, extra=None, cache=None, **kwargs):
         """Generate geometric cluster node features for one batch of data.
 
         Parameters
@@ -109,6 +109,9 @@ class ClustGeoNodeEncoder(torch.nn.Module):
             (C, 6) Set of start/end points for each input cluster
         extra : TensorBatch
             (C, 1/2/3) Set of mean/rms values in the cluster and/or shape
+        cache : ClusterFeatureCache, optional
+            Cache of cluster statistics of this batch, used to derive the
+            base features of clusters made of cached clusters
         **kwargs : dict, optional
             Additional objects no used by this encoder
 
@@ -141,7 +144,12 @@ class ClustGeoNodeEncoder(torch.nn.Module):
             add_value, add_shape = False, False
 
         # Extract the base geometric features
-        if self.use_numpy:
+        if self.use_numpy and cache is not None:
+            # If a cache is provided, derive the features from its statistics
+            feats = torch.as_tensor(
+                    cache.get_features(clusts, add_value, add_shape),
+                    dtype=data.dtype, device=data.device)
+        elif self.use_numpy:
             # If numpy is to be used, pass it through the Numba function
             feats = get_cluster_features_batch(
                     data, clusts, add_value, add_shape).tensor
@@ -323,7 +331,7 @@ class ClustGeoEdgeEncoder(torch.nn.Module):
             (C) Indexes that make up each cluster
         edge_index : EdgeIndexBatch
             Incidence map between clusters
-        closest_index : Union[np.ndarray, torch.Tensor], optional
+        closest_index : BlockMatrix, optional
             (C, C) : Combined index of the closest pair of voxels per
             pair of clusters
         **kwargs : dict, optional
@@ -375,7 +383,7 @@ class ClustGeoEdgeEncoder(torch.nn.Module):
             (C) Indexes that make up each cluster
         edge_index : EdgeIndexBatch
             Incidence map between clusters
-        closest_index : Union[np.ndarray, torch.Tensor], optional
+        closest_index : BlockMatrix, optional
             (C, C) : Combined index of the closest pair of voxels per
             pair of clusters
         """
@@ -383,8 +391,12 @@ class ClustGeoEdgeEncoder(torch.nn.Module):
         voxels = data.tensor[:, COORD_COLS]
 
         # Here is a torch-based implementation of cluster_edge_features
+        index = edge_index.directed_index_t
+        if closest_index is not None:
+            closest_index = closest_index[index[:, 0], index[:, 1]]
+
         feats = []
-        for e in edge_index.directed_index_t:
+        for k, e in enumerate(index):
 
             # Get the voxels in the clusters connected by the edge
             x1 = voxels[clusts.index_list[e[0]]]
@@ -395,7 +407,7 @@ class ClustGeoEdgeEncoder(torch.nn.Module):
                 d12 = local_cdist(x1, x2)
                 imin = torch.argmin(d12)
             else:
-                imin = closest_index[e[0], e[1]]
+                imin = closest_index[k]
 
             i1, i2 = imin//len(x2), imin%len(x2)
             v1 = x1[i1,:] # closest point in c1
@@ -8,7 +8,9 @@ import numpy as np
 from spine.data import EdgeIndexBatch
 
 from spine.utils.globals import COORD_COLS
-from spine.utils.gnn.network import inter_cluster_distance
+from spine.utils.gnn.block import SparseBlockMatrix
+from spine.utils.gnn.network import (
+        inter_cluster_distance, inter_cluster_distance_sparse)
 
 
 class GraphBase:
@@ -67,11 +69,16 @@ class GraphBase:
         self.compute_dist = (max_length is not None or
                              self.name in ['mst', 'knn'])
 
+        # If the generator does not need every distance, only compute the
+        # distances between clusters which can be connected by an edge
+        self.prune_dist = (max_length is not None and dist_method == 'voxel'
+                           and self.name not in ['mst', 'knn'])
+
         # If this is a loop graph, simply set as undirected
         assert self.name != 'loop' or self.directed, (
                 "For loop graphs, set as directed (no need for reciprocal)")
 
-    def __call__(self, data, clusts, classes=None, groups=None):
+    def __call__(self, data, clusts, classes=None, groups=None, cache=None):
         """Filters input to keep only what is needed to generate a graph.
 
         Parameters
@@ -84,6 +91,8 @@ class GraphBase:
             (C) List of cluster semantic class used to define the max length
         groups : TensorBatch, optional
             (C) List of cluster groups which should not be mixed
+        cache : ClusterFeatureCache, optional
+            Cache of cluster statistics of this batch
 
         Returns
         -------
@@ -92,7 +101,11 @@ class GraphBase:
         """
         # Generate the inter-cluster distsnce matrix, if needed
         dist_mat, closest_index = None, None
-        if self.compute_dist:
+        if self.prune_dist:
+            dist_mat, closest_index = self.get_pruned_distances(
+                    data, clusts, cache)
+
+        elif self.compute_dist:
             dist_mat, closest_index = inter_cluster_distance(
                     data.tensor[:, COORD_COLS], clusts.index_list,
                     clusts.counts, method=self.dist_method,
@@ -144,6 +157,63 @@ class GraphBase:
 
         return edge_index, dist_mat, closest_index
 
+    def get_pruned_distances(self, data, clusts, cache=None):
+        """Computes the inter-cluster distances of the pairs of clusters
+        which are closer than the largest edge length cut.
+
+        Only the candidate pairs are stored, the distances of the other
+        pairs are implicitly set to infinity. If a cache of cluster statistics
+        is provided, the bounding boxes used to select the candidate pairs are
+        fetched from it.
+
+        Parameters
+        ----------
+        data : TensorBatch
+            (N, 1 + D + N_f) Tensor of voxel/value pairs
+        clusts : IndexBatch
+            (C) Cluster indexes
+        cache : ClusterFeatureCache, optional
+            Cache of cluster statistics of this batch
+
+        Returns
+        -------
+        SparseBlockMatrix
+            (C, C) Block-diagonal matrix of pair-wise cluster distances
+        SparseBlockMatrix
+            (C, C) Block-diagonal matrix of pair-wise closest voxel pair
+        """
+        # Fetch the bounding boxes of the clusters, if they are cached
+        lower, upper = None, None
+        if cache is not None:
+            lower, upper = cache.get_bounding_boxes(clusts)
+
+        # Compute the distances between the clusters close enough to connect
+        pairs, dists, index = inter_cluster_distance_sparse(
+                data.tensor[:, COORD_COLS], clusts.index_list, clusts.counts,
+                max_length=np.max(self.max_length),
+                algorithm=self.dist_algorithm, lower=lower, upper=upper)
+
+        # Store the matrices used to restrict and encode the edges sparsely,
+        # such that memory only scales with the number of candidate pairs.
+        # The closest index of the reciprocal pair (j, i) is `jj*len(i) + ii`
+        sizes = clusts.single_counts
+        ii, jj = index//sizes[pairs[1]], index%sizes[pairs[1]]
+
+        diag = np.arange(len(clusts.index_list))
+        dist_mat = SparseBlockMatrix(
+                np.concatenate([diag, pairs[0], pairs[1]]),
+                np.concatenate([diag, pairs[1], pairs[0]]),
+                np.concatenate([np.zeros(len(diag), dtype=dists.dtype),
+                                dists, dists]),
+                clusts.counts, fill_value=np.inf)
+        closest_index = SparseBlockMatrix(
+                np.concatenate([pairs[0], pairs[1]]),
+                np.concatenate([pairs[1], pairs[0]]),
+                np.concatenate([index, jj*sizes[pairs[0]] + ii]),
+                clusts.counts, fill_value=0)
+
+        return dist_mat, closest_index
+
     def generate(self):
         """This function must be overridden in the constructor definition."""
         raise NotImplementedError("Must define the `generate` function")
@@ -161,8 +231,8 @@ class GraphBase:
             (2, E) Tensor of edges
         edge_counts : np.ndarray
             (B) : Number of edges in each entry of the batch
-        dist_mat : np.ndarray
-            (C, C) Tensor of pair-wise cluster distances
+        dist_mat : Union[BlockMatrix, SparseBlockMatrix]
+            (C, C) Block-diagonal matrix of pair-wise cluster distances
         classes : TensorBatch, optional
             (C) List of class for each cluster in the graph
 
@@ -3,6 +3,8 @@
 import numpy as np
 import numba as nb
 
+from spine.utils.gnn.block import SparseBlockMatrix
+
 from .base import GraphBase
 
 __all__ = ['CompleteGraph']
@@ -18,13 +20,19 @@ class CompleteGraph(GraphBase):
     """
     name = 'complete'
 
-    def generate(self, clusts, **kwargs):
+    def generate(self, clusts, dist_mat=None, **kwargs):
         """Generates a complete graph on a set of batched nodes.
 
+        If the distances were pruned, only the pairs of nodes stored in the
+        sparse distance matrix can be connected, so the edges are built from
+        those pairs rather than from every pair in each entry.
+
         Parameters
         ----------
         clusts : IndexBatch
             (C) Cluster indexes
+        dist_mat : Union[BlockMatrix, SparseBlockMatrix], optional
+            (C, C) Block-diagonal matrix of pair-wise cluster distances
         **kwargs : dict, optional
             Unused graph generation arguments
 
@@ -35,6 +43,16 @@ class CompleteGraph(GraphBase):
         np.ndarray
             (B) Number of edges in each entry of the batch
         """
+        if isinstance(dist_mat, SparseBlockMatrix):
+            # The stored pairs are ordered by entry, then row, then column
+            mask = dist_mat.rows < dist_mat.cols
+            edge_index = np.vstack([dist_mat.rows[mask], dist_mat.cols[mask]])
+            edge_counts = np.bincount(
+                    dist_mat.batch_ids[edge_index[0]],
+                    minlength=len(clusts.counts))
+
+            return edge_index, edge_counts
+
         return self._generate(clusts.counts)
 
     @staticmethod
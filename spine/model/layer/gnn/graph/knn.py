@@ -3,8 +3,6 @@
 import numpy as np
 import numba as nb
 
-import spine.utils.numba_local as nbl
-
 from .base import GraphBase
 
 __all__ = ['KNNGraph']
@@ -48,8 +46,9 @@ class KNNGraph(GraphBase):
         ----------
         clusts : IndexBatch
             (C) Cluster indexes
-        dist_mat : Union[np.ndarray, torch.Tensor]
-            (C, C) Matrix of pair-wise distances between clusters in the batch
+        dist_mat : BlockMatrix
+            (C, C) Block-diagonal matrix of pair-wise distances between
+            clusters in each entry of the batch
         **kwargs : dict, optional
             Unused graph generation arguments
 
@@ -57,29 +56,37 @@ class KNNGraph(GraphBase):
         -------
         np.ndarray
             (2, E) Tensor of edges
+        np.ndarray
+            (B) Number of edges in each entry of the batch
         """
         return self._generate(
-                clusts.batch_ids, self.k, dist_mat, self.directed)
+                dist_mat.data, dist_mat.counts, self.k, self.directed)
 
     @staticmethod
     @nb.njit(cache=True)
-    def _generate(batch_ids: nb.int64[:],
+    def _generate(dists: nb.float32[:],
+                  counts: nb.int64[:],
                   k: nb.int64,
-                  dist_mat: nb.float64[:,:],
-                  directed: bool = False) -> nb.int64[:,:]:
-        # Use the available distance matrix to build a kNN graph
+                  directed: bool = False) -> (nb.int64[:,:], nb.int64[:]):
+        # Use the available distance matrix blocks to build a kNN graph
         ret = np.empty((0, 2), dtype=np.int64)
-        for b in np.unique(batch_ids):
-            clust_ids = np.where(batch_ids == b)[0]
-            if len(clust_ids) > 1:
-                subk = min(k+1, len(clust_ids))
-                submat = nbl.submatrix(dist_mat, clust_ids, clust_ids)
+        edge_counts = np.zeros(len(counts), dtype=np.int64)
+        offset, block_offset = 0, 0
+        for b in range(len(counts)):
+            c = counts[b]
+            if c > 1:
+                subk = min(k+1, c)
+                submat = dists[block_offset:block_offset + c*c].reshape(c, c)
                 for i in range(len(submat)):
                     idxs = np.argsort(submat[i])[1:subk]
                     edges = np.empty((subk-1,2), dtype=np.int64)
                     for j, idx in enumerate(np.sort(idxs)):
-                        edges[j] = [clust_ids[i], clust_ids[idx]]
+                        edges[j] = [offset + i, offset + idx]
                     if len(edges):
                         ret = np.vstack((ret, edges))
+                        edge_counts[b] += len(edges)
+
+            offset += c
+            block_offset += c*c
 
-        return ret.T
+        return ret.T, edge_counts
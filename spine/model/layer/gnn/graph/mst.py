@@ -5,8 +5,6 @@ import numba as nb
 
 from scipy.sparse.csgraph import minimum_spanning_tree
 
-import spine.utils.numba_local as nbl
-
 from .base import GraphBase
 
 __all__ = ['MSTGraph']
@@ -32,8 +30,9 @@ class MSTGraph(GraphBase):
         ----------
         clusts : IndexBatch
             (C) Cluster indexes
-        dist_mat : Union[np.ndarray, torch.Tensor]
-            (C, C) Matrix of pair-wise distances between clusters in the batch
+        dist_mat : BlockMatrix
+            (C, C) Block-diagonal matrix of pair-wise distances between
+            clusters in each entry of the batch
         **kwargs : dict, optional
             Unused graph generation arguments
 
@@ -41,28 +40,35 @@ class MSTGraph(GraphBase):
         -------
         np.ndarray
             (2, E) Tensor of edges
+        np.ndarray
+            (B) Number of edges in each entry of the batch
         """
-        return self._generate(clusts.batch_ids, dist_mat, self.directed)
+        return self._generate(dist_mat.data, dist_mat.counts, self.directed)
 
     @staticmethod
     @nb.njit(cache=True)
-    def _generate(batch_ids: nb.int64[:],
-                  dist_mat: nb.float64[:,:],
-                  directed: bool = False) -> nb.int64[:,:]:
+    def _generate(dists: nb.float32[:],
+                  counts: nb.int64[:],
+                  directed: bool = False) -> (nb.int64[:,:], nb.int64[:]):
         # For each batch, find the list of edges, append it
-        edge_list = []
-        num_edges = 0
         ret = np.empty((0, 2), dtype=np.int64)
-        for b in np.unique(batch_ids):
-            clust_ids = np.where(batch_ids == b)[0]
-            if len(clust_ids) > 1:
-                submat = np.triu(nbl.submatrix(dist_mat, clust_ids, clust_ids))
+        edge_counts = np.zeros(len(counts), dtype=np.int64)
+        offset, block_offset = 0, 0
+        for b in range(len(counts)):
+            c = counts[b]
+            if c > 1:
+                submat = np.triu(
+                        dists[block_offset:block_offset + c*c].reshape(c, c))
                 # Suboptimal. Ideally want to reimplement in Numba, tall order.
                 with nb.objmode(mst_mat = 'float32[:,:]'): 
                     mst_mat = minimum_spanning_tree(submat)
                     mst_mat = mst_mat.toarray().astype(np.float32)
                 edges = np.where(mst_mat > 0.)
-                edges = np.vstack((clust_ids[edges[0]],clust_ids[edges[1]])).T
+                edges = offset + np.vstack((edges[0], edges[1])).T
                 ret   = np.vstack((ret, edges))
+                edge_counts[b] = len(edges)
+
+            offset += c
+            block_offset += c*c
 
-        return ret.T
+        return ret.T, edge_counts
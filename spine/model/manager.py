@@ -14,6 +14,7 @@ from spine.utils.train import optim_factory, lr_sched_factory
 from spine.utils.logger import logger
 
 from .factories import model_factory
+from .transfer import DataStager
 from .experimental.bayes.calibration import (
         calibrator_factory, calibrator_loss_factory)
 
@@ -25,7 +26,7 @@ class ModelManager:
                  weight_path=None, calibration=None, train=None,
                  save_step=None, optimizer=None, restore_optimizer=False,
                  lr_scheduler=None, to_numpy=False, time_dependent_loss=False,
-                 dtype='float32', distributed=False, rank=None,
+                 transfer=None, dtype='float32', distributed=False, rank=None,
                  detect_anomaly=False, find_unused_parameters=False):
         """Process the model configuration.
 
@@ -47,6 +48,9 @@ class ModelManager:
             Cast model output to numpy ndarray
         time_dependant_loss : bool, default False
             Handles time-dependant loss, such as KL divergence annealing
+        transfer : dict, optional
+            Configuration of the stage which moves the input data to the
+            model device (pinned memory, asynchronous copies, prefetching)
         train : dict, default None
             Training regimen configuration
         dtype : str, default 'float32'
@@ -72,7 +76,7 @@ class ModelManager:
 
         # Initialize the timers and the configuration dictionary
         self.watch = StopwatchManager()
-        self.watch.initialize('forward')
+        self.watch.initialize(['forward', 'transfer'])
         if train:
             self.watch.initialize(['backward', 'save'])
 
@@ -137,6 +141,27 @@ class ModelManager:
                 "Must specify `loss_input` as a dictionary mapping loss "
                 "input keys onto data loader product keys.")
 
+        # Initialize the stage which moves the input data to the model device.
+        # If requested, it stages the next batch ahead of the forward pass
+        keys = list(network_input.values())
+        if loss_input is not None:
+            keys += [k for k in loss_input.values() if k not in keys]
+        transfer = transfer if transfer is not None else {}
+        self.stager = DataStager(
+                keys, device=rank, dtype=self.dtype, **transfer)
+
+    @property
+    def prefetch(self):
+        """Whether the input data of the next batch should be moved to the
+        model device while the current batch is processed.
+
+        Returns
+        -------
+        bool
+            `True` if the input data should be prefetched
+        """
+        return self.stager.prefetch
+
     def initialize_train(self, optimizer, weight_prefix='snapshot',
                          restore_optimizer=False, save_step=-1,
                          lr_scheduler=None):
@@ -424,6 +449,12 @@ class ModelManager:
         loss_dict : dict
             Labels to be used in the loss computation
         """
+        # Move the tensor batches to the model device (reuse the copies
+        # which were made ahead of time, if the data was prefetched)
+        self.watch.start('transfer')
+        staged = self.stager.get(data)
+        self.watch.stop('transfer')
+
         # Fetch the requested data products
         input_dict, loss_dict = {}, {}
         with torch.set_grad_enabled(self.train):
@@ -434,11 +465,7 @@ class ModelManager:
                         f"Must provide `{name}` in the dataloader schema to "
                          "input into the model forward.")
 
-                value = data[name]
-                if isinstance(value, TensorBatch):
-                    value = data[name].to_tensor(
-                            device=self.rank, dtype=self.dtype)
-                input_dict[param] = value
+                input_dict[param] = staged.get(name, data[name])
 
             # Load the data products for the loss function
             loss_dict = {}
@@ -448,11 +475,7 @@ class ModelManager:
                             f"Must provide `{name}` in the dataloader schema "
                              "to input into the loss function.")
 
-                    value = data[name]
-                    if isinstance(value, TensorBatch):
-                        value = data[name].to_tensor(
-                            device=self.rank, dtype=self.dtype)
-                    loss_dict[param] = value
+                    loss_dict[param] = staged.get(name, data[name])
 
         return input_dict, loss_dict
 
@@ -0,0 +1,323 @@
+"""Module with classes which move the model input data to its device.
+
+The collated input of a model is a dictionary of batched NumPy arrays. Before
+the model forward, each of them must be materialized as a tensor on the model
+device. This module allows to do so ahead of time: the tensors of the next
+batch are pinned and copied asynchronously on a side CUDA stream (or simply
+cast to tensors in a background thread, if running on CPU), while the model
+processes the current batch.
+"""
+
+import queue
+import threading
+
+import torch
+
+from spine.data import TensorBatch
+from spine.utils.stopwatch import StopwatchManager, Time
+
+__all__ = ['DataStager', 'StagedIterator']
+
+
+class DataStager:
+    """Moves the tensor batches of the model input to the model device.
+
+    When running on GPU, the NumPy buffers are copied to page-locked (pinned)
+    memory, from which they are copied to the device asynchronously on a
+    dedicated CUDA stream. The main stream only waits for the copies to be
+    done when the batch is consumed.
+
+    This is enabled from the model configuration block:
+
+    .. code-block:: yaml
+
+        model:
+          ...
+          transfer:
+            non_blocking: true
+            prefetch: true
+
+    Attributes
+    ----------
+    keys : List[str]
+        List of data product keys to move to the device
+    device : Union[int, str]
+        Device on which to move the tensors
+    dtype : torch.dtype
+        Data type of the tensors
+    non_blocking : bool
+        Whether to pin the host memory and copy asynchronously
+    prefetch : bool
+        Whether to stage the next batch while the current one is processed
+    """
+
+    def __init__(self, keys, device=None, dtype=None, non_blocking=False,
+                 prefetch=False, queue_size=1):
+        """Initialize the data stager.
+
+        Parameters
+        ----------
+        keys : List[str]
+            List of data product keys to move to the device
+        device : Union[int, str], optional
+            Device on which to move the tensors (CPU if not specified)
+        dtype : torch.dtype, optional
+            Data type of the tensors
+        non_blocking : bool, default False
+            Whether to pin the host memory and copy asynchronously. Only
+            relevant when the device is a GPU
+        prefetch : bool, default False
+            Whether to stage the next batch while the current one is processed
+        queue_size : int, default 1
+            Number of batches to stage ahead of time, when prefetching
+        """
+        # Check that the queue size is sensible
+        assert queue_size > 0, (
+                "The `queue_size` must be a positive non-zero integer.")
+
+        # Store the parameters
+        self.keys = keys
+        self.device = device
+        self.dtype = dtype
+        self.prefetch = prefetch
+        self.queue_size = queue_size
+
+        # Asynchronous copies are only relevant for GPU devices
+        self.stream = None
+        self.non_blocking = (non_blocking and device is not None and
+                             torch.device(device).type == 'cuda')
+        if self.non_blocking:
+            self.stream = torch.cuda.Stream(device=device)
+
+        # Batch staged ahead of time, waiting to be consumed
+        self.pending = None
+
+    def stage(self, data):
+        """Moves the relevant data products of one batch to the device.
+
+        Parameters
+        ----------
+        data : dict
+            Dictionary of data products
+
+        Returns
+        -------
+        dict
+            Dictionary of the relevant data products, moved to the device
+        torch.cuda.Event
+            Event recorded once all the copies are queued (`None` on CPU)
+        """
+        # If the copies are synchronous, simply cast the data to tensors
+        keys = [k for k in self.keys if isinstance(data.get(k), TensorBatch)]
+        if not self.non_blocking:
+            staged = {k: data[k].to_tensor(
+                dtype=self.dtype, device=self.device) for k in keys}
+
+            return staged, None
+
+        # Otherwise, queue the copies on the side stream, record an event
+        with torch.cuda.stream(self.stream):
+            staged = {k: data[k].to_tensor(
+                dtype=self.dtype, device=self.device,
+                non_blocking=True) for k in keys}
+
+        return staged, self.stream.record_event()
+
+    def wait(self, staged, event):
+        """Makes the current stream wait for the copies of a batch.
+
+        The tensors produced on the side stream are also marked as used by
+        the current stream, so that their memory is not reused by the side
+        stream before the current stream is done with them.
+
+        Parameters
+        ----------
+        staged : dict
+            Dictionary of data products moved to the device
+        event : torch.cuda.Event
+            Event recorded once all the copies of the batch were queued
+        """
+        if event is None:
+            return
+
+        stream = torch.cuda.current_stream(self.device)
+        stream.wait_event(event)
+        for value in staged.values():
+            value.data.record_stream(stream)
+            value.counts.record_stream(stream)
+
+    def get(self, data):
+        """Returns the relevant data products of one batch on the device.
+
+        If the batch was staged ahead of time by a :class:`StagedIterator`,
+        its copies are reused, otherwise the batch is staged on the spot.
+
+        Parameters
+        ----------
+        data : dict
+            Dictionary of data products
+
+        Returns
+        -------
+        dict
+            Dictionary of the relevant data products, moved to the device
+        """
+        if self.pending is not None and self.pending[0] is data:
+            _, staged, event = self.pending
+        else:
+            staged, event = self.stage(data)
+        self.pending = None
+
+        self.wait(staged, event)
+
+        return staged
+
+    def iterate(self, iterator):
+        """Wraps an iterator over batches of data so that the next batches
+        are staged in the background while the current one is processed.
+
+        Parameters
+        ----------
+        iterator : Iterator[dict]
+            Iterator over batches of data
+
+        Returns
+        -------
+        StagedIterator
+            Iterator over batches of data moved to the device
+        """
+        return StagedIterator(self, iterator, self.queue_size)
+
+
+class StagedIterator:
+    """Iterator which fetches and stages batches of data in a background
+    thread, at most `queue_size` batches ahead of the consumer.
+
+    Any exception raised while fetching or staging a batch is re-raised in
+    the calling thread when that batch is requested.
+
+    Attributes
+    ----------
+    stager : DataStager
+        Data stager
+    iterator : Iterator[dict]
+        Underlying iterator over batches of data
+    """
+
+    def __init__(self, stager, iterator, queue_size=1):
+        """Initializes the queue and starts the staging thread.
+
+        Parameters
+        ----------
+        stager : DataStager
+            Data stager
+        iterator : Iterator[dict]
+            Underlying iterator over batches of data
+        queue_size : int, default 1
+            Maximum number of staged batches waiting to be consumed
+        """
+        # Store the stager and the iterator, initialize the queue
+        self.stager = stager
+        self.iterator = iterator
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.stop_event = threading.Event()
+        self.done = False
+
+        # Initialize the timers. The stage time is only updated by the thread
+        # once a batch is staged, so that it can be read at any time
+        self.watch = StopwatchManager()
+        self.watch.initialize('stage')
+        self.lock = threading.Lock()
+        self._time = Time(0., 0.)
+        self._time_sum = Time(0., 0.)
+
+        # Start the staging thread
+        self.thread = threading.Thread(
+                target=self.work, name='spine_stager', daemon=True)
+        self.thread.start()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        """Returns the next batch, the device copies of which are handed to
+        the stager, to be fetched by the model.
+
+        Returns
+        -------
+        dict
+            Dictionary of data products
+        """
+        if self.done:
+            raise StopIteration
+
+        item = self.queue.get()
+        if isinstance(item, BaseException):
+            self.done = True
+            if isinstance(item, StopIteration):
+                raise StopIteration
+            raise RuntimeError("Failed to stage a batch of data.") from item
+
+        self.stager.pending = item
+
+        return item[0]
+
+    @property
+    def time(self):
+        """Time taken to fetch and stage the last batch.
+
+        Returns
+        -------
+        Time
+            Execution time of the last staging
+        """
+        with self.lock:
+            return self._time.copy()
+
+    @property
+    def time_sum(self):
+        """Time taken to fetch and stage all the batches so far.
+
+        Returns
+        -------
+        Time
+            Execution time of all stagings so far
+        """
+        with self.lock:
+            return self._time_sum.copy()
+
+    def work(self):
+        """Fetches and stages batches until the underlying iterator is
+        exhausted, an exception is raised or the iterator is closed.
+        """
+        while not self.stop_event.is_set():
+            self.watch.start('stage')
+            try:
+                data = next(self.iterator)
+                item = (data, *self.stager.stage(data))
+            except BaseException as err: # pylint: disable=W0718
+                item = err
+            self.watch.stop('stage')
+
+            with self.lock:
+                self._time = self.watch.time('stage').copy()
+                self._time_sum = self.watch.time_sum('stage').copy()
+
+            # Wait for a free slot, unless the iterator gets closed
+            while not self.stop_event.is_set():
+                try:
+                    self.queue.put(item, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+
+            if isinstance(item, BaseException):
+                return
+
+    def close(self):
+        """Stops the staging thread and drops the staged batches."""
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.done = True
@@ -45,6 +45,21 @@ class PostManager:
             self.modules[k] = post_processor_factory(
                     k, cfg[k], parent_path=parent_path)
 
+    @property
+    def keys(self):
+        """Set of data products used by the post-processors.
+
+        Returns
+        -------
+        Set[str]
+            Set of data product keys
+        """
+        keys = set()
+        for module in self.modules.values():
+            keys.update(module.keys)
+
+        return keys
+
     def __call__(self, data):
         """Pass one batch of data through the post-processors.
 
@@ -1,7 +1,9 @@
 """Simple wrapper for sklearn's DBSCAN to turn its label output into
-a list of clusters in the form of a point index list."""
+a list of clusters in the form of a point index list, and a DBSCAN
+implementation dedicated to points on an integer lattice."""
 
 import numpy as np
+import numba as nb
 from typing import List
 from sklearn.cluster import DBSCAN
 
@@ -38,3 +40,263 @@ def dbscan_points(coordinates, eps=1.999, min_samples=1, metric='euclidean'):
             clusters.append(np.where(labels == c)[0])
 
     return clusters
+
+
+class LatticeDBSCAN:
+    """DBSCAN clustering of points which live on an integer lattice (voxels).
+
+    Two voxels can only be neighbors if their coordinates differ by one of a
+    fixed set of integer offsets (the stencil, e.g. the 26 surrounding cells
+    for `eps=1.8`). Each voxel coordinate is linearized into an integer key,
+    stored in a hash table, and the neighbors of a voxel are found by looking
+    up the keys of its stencil. Connected core voxels are merged using
+    union-find. This is linear in the number of voxels, rather than quadratic.
+
+    Voxels can be split into independent groups (e.g. entries of a batch,
+    semantic classes), such that a whole batch is clustered in one pass.
+
+    The output labels are identical to those of sklearn's DBSCAN run on each
+    group separately, up to an order-preserving relabeling (a constant offset
+    if the groups are contiguous):
+    - Clusters are numbered in order of their first core voxel;
+    - Border voxels go to the first cluster which reaches them;
+    - Noise voxels are labeled -1.
+    """
+
+    metrics = ('euclidean', 'chebyshev', 'cityblock')
+
+    def __init__(self, eps=1.8, min_samples=1, metric='euclidean'):
+        """Initialize the lattice clustering algorithm.
+
+        Parameters
+        ----------
+        eps : float, default 1.8
+            The maximum distance between two samples for one to be considered
+            as in the neighborhood of the other.
+        min_samples : int, default 1
+            The number of samples (or total weight) in a neighborhood for a
+            point to be considered as a core point.
+        metric : str, default 'euclidean'
+            Metric used to compute the distance between voxels
+        """
+        # Check that the metric is supported
+        assert metric in self.metrics, (
+                f"Metric not supported by the lattice DBSCAN: {metric}. "
+                f"Should be one of {self.metrics}.")
+
+        # Store the attributes
+        self.eps = eps
+        self.min_samples = min_samples
+        self.metric = metric
+
+        # Build the list of offsets to the neighbors of a voxel
+        reach = int(np.floor(eps))
+        axis = np.arange(-reach, reach + 1)
+        offsets = np.stack(np.meshgrid(axis, axis, axis, indexing='ij'),
+                           axis=-1).reshape(-1, 3)
+        if metric == 'euclidean':
+            dists = np.sqrt(np.sum(offsets**2, axis=1))
+        elif metric == 'chebyshev':
+            dists = np.max(np.abs(offsets), axis=1)
+        else:
+            dists = np.sum(np.abs(offsets), axis=1)
+
+        self.offsets = offsets[(dists <= eps) & (dists > 0)]
+        self.reach = reach
+
+    @staticmethod
+    def is_lattice(voxels):
+        """Checks whether a set of coordinates lives on an integer lattice.
+
+        Parameters
+        ----------
+        voxels : np.ndarray
+            (N, 3) Set of point coordinates
+
+        Returns
+        -------
+        bool
+            `True` if all the coordinates are integer
+        """
+        return bool(np.all(voxels == np.round(voxels)))
+
+    def fit_predict(self, voxels, groups=None):
+        """Clusters a set of voxels.
+
+        Parameters
+        ----------
+        voxels : np.ndarray
+            (N, 3) Set of voxel coordinates
+        groups : np.ndarray, optional
+            (N) Non-negative group ID of each voxel. Voxels from separate
+            groups are never clustered together
+
+        Returns
+        -------
+        np.ndarray
+            (N) Array of cluster labels for each voxel in the input
+        """
+        # If there are no voxels, nothing to do
+        if not len(voxels):
+            return np.empty(0, dtype=np.int64)
+
+        # Linearize the voxel coordinates, padded to fit the neighbors
+        assert voxels.shape[1] == 3, "Only supports 3D voxel sets."
+        assert self.is_lattice(voxels), (
+                "The lattice DBSCAN only supports integer coordinates.")
+        coords = voxels.astype(np.int64)
+        coords = coords - np.min(coords, axis=0) + self.reach
+        extent = np.max(coords, axis=0) + self.reach + 1
+
+        num_groups = 1
+        if groups is not None:
+            groups = np.asarray(groups, dtype=np.int64)
+            assert len(groups) == len(voxels) and np.all(groups > -1), (
+                    "Must provide one non-negative group ID per voxel.")
+            num_groups = np.max(groups) + 1
+
+        assert num_groups*np.prod(extent.astype(float)) < 2**62, (
+                "The voxel coordinates span too large of a range.")
+
+        strides = np.array([extent[1]*extent[2], extent[2], 1])
+        keys = coords @ strides
+        if groups is not None:
+            keys += groups*np.prod(extent)
+
+        # Cluster
+        return _lattice_dbscan(keys, self.offsets @ strides, self.min_samples)
+
+    def fit(self, voxels, groups=None):
+        """Clusters a set of voxels, sklearn-style.
+
+        Parameters
+        ----------
+        voxels : np.ndarray
+            (N, 3) Set of voxel coordinates
+        groups : np.ndarray, optional
+            (N) Non-negative group ID of each voxel
+
+        Returns
+        -------
+        LatticeDBSCAN
+            Fitted object, with the `labels_` attribute set
+        """
+        self.labels_ = self.fit_predict(voxels, groups)
+
+        return self
+
+
+@nb.njit(cache=True)
+def _lattice_dbscan(keys: nb.int64[:],
+                    deltas: nb.int64[:],
+                    min_samples: nb.int64) -> nb.int64[:]:
+
+    # Build the hash table of keys. Duplicated voxels point to the first one
+    num_voxels = len(keys)
+    size, bits = 1, 0
+    while size < 2*num_voxels:
+        size *= 2
+        bits += 1
+
+    table_keys = np.full(size, -1, dtype=np.int64)
+    table_index = np.empty(size, dtype=np.int64)
+    table_mult = np.zeros(size, dtype=np.int64)
+    slots = np.empty(num_voxels, dtype=np.int64)
+    for i in range(num_voxels):
+        s = _hash_slot(table_keys, keys[i], bits)
+        if table_keys[s] < 0:
+            table_keys[s] = keys[i]
+            table_index[s] = i
+        table_mult[s] += 1
+        slots[i] = s
+
+    # Identify core voxels (the voxel and its duplicates count as neighbors)
+    core = np.ones(num_voxels, dtype=np.bool_)
+    if min_samples > 1:
+        for i in range(num_voxels):
+            count = table_mult[slots[i]]
+            for d in deltas:
+                s = _hash_slot(table_keys, keys[i] + d, bits)
+                if table_keys[s] > -1:
+                    count += table_mult[s]
+            core[i] = count >= min_samples
+
+    # Merge neighboring core voxels (half of the stencil is enough)
+    parent = np.arange(num_voxels)
+    for i in range(num_voxels):
+        if not core[i]:
+            continue
+
+        j = table_index[slots[i]]
+        if j != i:
+            _union(parent, i, j)
+            continue
+
+        for d in deltas:
+            if d > 0:
+                s = _hash_slot(table_keys, keys[i] + d, bits)
+                if table_keys[s] > -1 and core[table_index[s]]:
+                    _union(parent, i, table_index[s])
+
+    # Label the clusters in order of their first core voxel
+    labels = np.full(num_voxels, -1, dtype=np.int64)
+    root_labels = np.full(num_voxels, -1, dtype=np.int64)
+    num_clusts = 0
+    for i in range(num_voxels):
+        if core[i]:
+            r = _find(parent, i)
+            if root_labels[r] < 0:
+                root_labels[r] = num_clusts
+                num_clusts += 1
+            labels[i] = root_labels[r]
+
+    # Assign border voxels to the first cluster which reaches them
+    if min_samples > 1:
+        for i in range(num_voxels):
+            if core[i]:
+                continue
+            for d in deltas:
+                s = _hash_slot(table_keys, keys[i] + d, bits)
+                if table_keys[s] > -1 and core[table_index[s]]:
+                    l = labels[table_index[s]]
+                    if labels[i] < 0 or l < labels[i]:
+                        labels[i] = l
+
+    return labels
+
+@nb.njit(cache=True)
+def _hash_slot(table_keys: nb.int64[:],
+               key: nb.int64,
+               bits: nb.int64) -> nb.int64:
+
+    # Fibonacci hashing, linear probing until the key or an empty slot
+    mask = len(table_keys) - 1
+    h = (np.uint64(key)*np.uint64(11400714819323198485)) >> np.uint64(64 - bits)
+    s = np.int64(h) & mask
+    while table_keys[s] > -1 and table_keys[s] != key:
+        s = (s + 1) & mask
+
+    return s
+
+@nb.njit(cache=True)
+def _find(parent: nb.int64[:],
+          i: nb.int64) -> nb.int64:
+
+    # Find the root of a tree, halve the path on the way
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+
+    return i
+
+@nb.njit(cache=True)
+def _union(parent: nb.int64[:],
+           i: nb.int64,
+           j: nb.int64) -> None:
+
+    # Merge two trees, the root is the lowest index of the two
+    ri, rj = _find(parent, i), _find(parent, j)
+    if ri < rj:
+        parent[rj] = ri
+    elif rj < ri:
+        parent[ri] = rj
@@ -95,19 +95,23 @@ def numbafy(cast_args=[], list_args=[], keep_torch=False, ref_arg=None):
         Wrapped function which ensures input type compatibility with numba
     """
     def outer(fn):
+        # Inspect the signature of the function once, at decoration time
+        params = inspect.signature(fn).parameters
+        keys = list(params.keys())
+        defaults = {key: val.default for key, val in params.items()
+                    if val.default is not inspect.Parameter.empty}
+
         @wraps(fn)
         def inner(*args, **kwargs):
             # Convert the positional arguments in args into
             # key:value pairs in kwargs
-            keys = list(inspect.signature(fn).parameters.keys())
             for i, val in enumerate(args):
                 kwargs[keys[i]] = val
 
             # Extract the default values for the remaining parameters
-            for key, val in inspect.signature(fn).parameters.items():
-                if (key not in kwargs and 
-                    val.default != inspect.Parameter.empty):
-                    kwargs[key] = val.default
+            for key, val in defaults.items():
+                if key not in kwargs:
+                    kwargs[key] = val
 
             # If a torch output is request, register the input dtype and
             # device location
@@ -135,7 +139,8 @@ def numbafy(cast_args=[], list_args=[], keep_torch=False, ref_arg=None):
                 assert arg in kwargs, (
                         f"Argument `{arg}` appears in `list_args` but does "
                          "not appear in the function arguments.")
-                kwargs[arg] = nb.typed.List(kwargs[arg])
+                if not isinstance(kwargs[arg], nb.typed.List):
+                    kwargs[arg] = nb.typed.List(kwargs[arg])
 
             # Get the output
             ret = fn(**kwargs)
@@ -380,24 +380,33 @@ class Geometry:
         Returns
         -------
         np.ndarray
-            (N) List of module indexes, one per input point
+            (N) List of module indexes, one per input point (-1 if the point
+            sits exactly on the boundary between two modules)
         """
-        module_ids = np.empty(len(points), dtype = np.int32)
-        for module_id, c in enumerate(self.centers):
-            # Find out the boundaries of the volume closest to this module
-            dists = self.centers - c
-            lower_pad = np.zeros(dists.shape)
-            upper_pad = np.zeros(dists.shape)
-            lower_pad[dists >= 0], upper_pad[dists <= 0] = np.inf, np.inf
-            lower = c + np.max(dists - lower_pad, axis=0) / 2
-            upper = c + np.min(dists + upper_pad, axis=0) / 2
-
-            # Assign all points within those boundaries to this module
-            mask = np.all(points > lower, axis = 1) \
-                    & np.all(points < upper, axis = 1)
-            module_ids[mask] = module_id
-
-        return module_ids
+        # The regions closest to each module form a grid, bounded along each
+        # axis by the midpoints between consecutive module center coordinates.
+        # Find the grid cell each point belongs to, one axis at a time
+        shape = np.empty(3, dtype=np.int64)
+        cells = np.empty((len(self.centers), 3), dtype=np.int64)
+        cell_ids = np.zeros(len(points), dtype=np.int64)
+        valid = np.ones(len(points), dtype=bool)
+        for axis in range(3):
+            coords, cells[:, axis] = np.unique(
+                    self.centers[:, axis], return_inverse=True)
+            bounds = coords[:-1] + np.diff(coords)/2
+            cell = np.searchsorted(bounds, points[:, axis])
+            if len(bounds):
+                valid &= bounds[np.minimum(cell, len(bounds) - 1)] \
+                        != points[:, axis]
+            shape[axis] = len(coords)
+            cell_ids = cell_ids*shape[axis] + cell
+
+        # Map each grid cell onto its module, if any
+        cell_map = np.full(np.prod(shape), -1, dtype=np.int32)
+        cell_map[np.ravel_multi_index(cells.T, shape)] = np.arange(
+                len(self.centers), dtype=np.int32)
+
+        return np.where(valid, cell_map[cell_ids], -1).astype(np.int32)
 
     def get_closest_module_indexes(self, points):
         """For each module, get the list of points that live closer to it
@@ -413,13 +422,33 @@ class Geometry:
         List[np.ndarray]
             List of index of points that belong to each module
         """
-        # For each module, append the list of point indices associated with it
-        module_ids = self.get_closest_module(points)
-        module_indexes = []
-        for m in range(self.num_modules):
-            module_indexes.append(np.where(module_ids == m)[0])
+        return self.get_module_indexes(self.get_closest_module(points))
 
-        return module_indexes
+    def get_module_indexes(self, module_ids):
+        """Groups the points by module ID.
+
+        The points are ordered by module ID in a single stable sort, such that
+        the index of each module remains ordered.
+
+        Parameters
+        ----------
+        module_ids : np.ndarray
+            (N) Module ID of each point (-1 if the point belongs to no module)
+
+        Returns
+        -------
+        List[np.ndarray]
+            List of index of points that belong to each module
+        """
+        # Shift the IDs by one such that unassigned points are sorted first.
+        # Cast them to the smallest integer type that fits, for which numpy
+        # uses a radix sort
+        module_ids = (module_ids + 1).astype(
+                np.min_scalar_type(self.num_modules + 1))
+        perm = np.argsort(module_ids, kind='stable')
+        counts = np.bincount(module_ids, minlength=self.num_modules + 1)
+
+        return np.split(perm[counts[0]:], np.cumsum(counts[1:-1]))
 
     def get_tpc_offsets(self, points, module_id, tpc_id):
         """Compute how far each point is from a TPC volume.
@@ -527,7 +556,36 @@ class Geometry:
         List[np.ndarray]
             List of index of points that belong to each module
         """
+        # Shift the points, group them by module ID
+        points, module_ids = self.migrate(points, target_id, sources, meta)
+
+        return points, self.get_module_indexes(module_ids)
+
+    def migrate(self, points, target_id, sources=None, meta=None):
+        """Migrate all points to a target module, return their module ID.
 
+        The points are all shifted at once, by gathering the offset of the
+        module they belong to.
+
+        Parameters
+        ----------
+        points : np.ndarray
+            (N, 3) Set of point coordinates
+        target_id : int
+            Module ID to which to move the point cloud
+        sources : np.ndarray, optional
+            (N, 2) Array of [module ID, tpc ID] pairs, one per voxel
+        meta : Meta, optional
+            Meta information about the voxelized image. If provided, the
+            points are assumed to be provided in voxel coordinates.
+
+        Returns
+        -------
+        np.ndarray
+            (N, 3) Shifted set of points
+        np.ndarray
+            (N) Module ID of each point (-1 if it belongs to no module)
+        """
         # Check that the target ID exists
         assert target_id > -1 and target_id < len(self.modules), (
                 "Target ID should be in [0, N_modules[")
@@ -536,9 +594,8 @@ class Geometry:
         convert = False
         if sources is not None:
             # If provided, simply use that
-            module_indexes = []
-            for m in range(self.num_modules):
-                module_indexes.append(np.where(sources[:, 0] == m)[0])
+            module_ids = sources[:, 0].astype(np.int32)
+            module_ids[module_ids >= self.num_modules] = -1
 
         else:
             # If the points are expressed in pixel coordinates, translate
@@ -547,23 +604,19 @@ class Geometry:
                 points = meta.to_cm(points, center=True)
 
             # If not provided, find module each point belongs to by proximity
-            module_indexes = self.get_closest_module_indexes(points)
-
-        # Now shifts all points that are not in the target
-        for module_id, module_index in enumerate(module_indexes):
-            # If this is the target module, nothing to do here
-            if module_id == target_id:
-                continue
+            module_ids = self.get_closest_module(points)
 
-            # Shift the coordinates
-            points[module_index] = self.translate(
-                    points[module_index], module_id, target_id)
+        # Shift all the points by the offset between their module and the
+        # target module (points which belong to no module are not moved)
+        offsets = np.zeros((self.num_modules + 1, 3))
+        offsets[:-1] = self.centers[target_id] - self.centers
+        points = (points + offsets[module_ids]).astype(points.dtype, copy=False)
 
         # Bring the coordinates back to pixels, if they were shifted
         if convert:
             points = meta.to_px(points, floor=True)
 
-        return points, module_indexes
+        return points, module_ids
 
     def check_containment(self, points, sources=None,
                           allow_multi_module=False, summarize=True):
@@ -0,0 +1,345 @@
+"""Module with a class which stores a block-diagonal matrix block by block.
+
+The nodes of a batched graph only ever interact with the nodes of the same
+entry, such that pair-wise quantities (e.g. inter-cluster distances) only need
+to be known within the (C_b, C_b) block of each entry. Rather than storing a
+(C, C) matrix spanning the whole batch, the blocks are flattened and stored
+one after the other in a single array, which takes sum(C_b^2) elements.
+
+When only a few elements of each block are meaningful (e.g. the distances
+between clusters close enough to be connected), the blocks are stored sparsely
+instead: only the listed elements are kept and every other element of the
+blocks takes a single fill value.
+"""
+
+import numpy as np
+
+__all__ = ['BlockMatrix', 'SparseBlockMatrix']
+
+
+class BlockMatrix:
+    """Block-diagonal matrix, with one square block per entry in a batch.
+
+    Attributes
+    ----------
+    data : np.ndarray
+        (sum(C_b^2)) Flattened blocks, concatenated
+    counts : np.ndarray
+        (B) Size of each block (number of nodes in each entry)
+    offsets : np.ndarray
+        (B) Index of the first node of each block
+    block_offsets : np.ndarray
+        (B) Position of the first element of each block in `data`
+    batch_ids : np.ndarray
+        (C) Block to which each node belongs
+    """
+
+    def __init__(self, data, counts):
+        """Initialize the matrix from its flattened blocks.
+
+        Parameters
+        ----------
+        data : np.ndarray
+            (sum(C_b^2)) Flattened blocks, concatenated
+        counts : np.ndarray
+            (B) Size of each block (number of nodes in each entry)
+        """
+        # Check that the blocks add up
+        counts = np.asarray(counts, dtype=np.int64)
+        assert len(data) == np.sum(counts**2), (
+                "The number of elements does not match the block sizes.")
+
+        # Store the attributes
+        self.data = data
+        self.counts = counts
+        self.offsets = np.cumsum(counts) - counts
+        self.block_offsets = np.cumsum(counts**2) - counts**2
+        self.batch_ids = np.repeat(np.arange(len(counts)), counts)
+
+    @classmethod
+    def full(cls, counts, fill_value, dtype=None):
+        """Builds a matrix with every element set to the same value.
+
+        Parameters
+        ----------
+        counts : np.ndarray
+            (B) Size of each block (number of nodes in each entry)
+        fill_value : Union[int, float]
+            Value of every element of the matrix
+        dtype : type, optional
+            Data type of the elements of the matrix
+
+        Returns
+        -------
+        BlockMatrix
+            Block-diagonal matrix
+        """
+        counts = np.asarray(counts, dtype=np.int64)
+        data = np.full(np.sum(counts**2), fill_value, dtype=dtype)
+
+        return cls(data, counts)
+
+    @property
+    def shape(self):
+        """Shape of the equivalent dense matrix.
+
+        Returns
+        -------
+        Tuple[int]
+            (C, C) Shape of the matrix
+        """
+        num_nodes = len(self.batch_ids)
+
+        return (num_nodes, num_nodes)
+
+    @property
+    def dtype(self):
+        """Data type of the elements of the matrix.
+
+        Returns
+        -------
+        np.dtype
+            Data type
+        """
+        return self.data.dtype
+
+    def block(self, batch_id):
+        """Returns the block of one entry of the batch.
+
+        Parameters
+        ----------
+        batch_id : int
+            Entry index
+
+        Returns
+        -------
+        np.ndarray
+            (C_b, C_b) View of the block
+        """
+        start, count = self.block_offsets[batch_id], self.counts[batch_id]
+
+        return self.data[start:start + count**2].reshape(count, count)
+
+    def flat_index(self, rows, cols):
+        """Converts a list of (row, column) pairs of node indexes into
+        positions in the flattened blocks.
+
+        Both nodes of each pair must belong to the same entry.
+
+        Parameters
+        ----------
+        rows : Union[int, np.ndarray]
+            Row node index(es)
+        cols : Union[int, np.ndarray]
+            Column node index(es)
+
+        Returns
+        -------
+        Union[int, np.ndarray]
+            Position(s) in the flattened blocks
+        """
+        batch_ids = self.batch_ids[rows]
+        assert np.all(batch_ids == self.batch_ids[cols]), (
+                "Only elements of the diagonal blocks can be accessed.")
+
+        offsets = self.offsets[batch_ids]
+        return (self.block_offsets[batch_ids] +
+                (rows - offsets)*self.counts[batch_ids] + (cols - offsets))
+
+    def __getitem__(self, index):
+        """Returns the elements corresponding to (row, column) pairs.
+
+        Parameters
+        ----------
+        index : Tuple[Union[int, np.ndarray]]
+            (row(s), column(s)) node indexes
+
+        Returns
+        -------
+        Union[object, np.ndarray]
+            Element(s) of the matrix
+        """
+        return self.data[self.flat_index(*index)]
+
+    def __setitem__(self, index, value):
+        """Sets the elements corresponding to (row, column) pairs.
+
+        Parameters
+        ----------
+        index : Tuple[Union[int, np.ndarray]]
+            (row(s), column(s)) node indexes
+        value : Union[object, np.ndarray]
+            Element(s) of the matrix
+        """
+        self.data[self.flat_index(*index)] = value
+
+    def to_dense(self, fill_value=0):
+        """Converts the matrix to a dense (C, C) matrix.
+
+        Parameters
+        ----------
+        fill_value : Union[int, float], default 0
+            Value of the elements outside of the diagonal blocks
+
+        Returns
+        -------
+        np.ndarray
+            (C, C) Dense matrix
+        """
+        dense = np.full(self.shape, fill_value, dtype=self.dtype)
+        for b, (offset, count) in enumerate(zip(self.offsets, self.counts)):
+            dense[offset:offset + count, offset:offset + count] = self.block(b)
+
+        return dense
+
+
+class SparseBlockMatrix(BlockMatrix):
+    """Block-diagonal matrix which only stores a subset of its elements.
+
+    The elements are ordered as in the flattened blocks of a
+    :class:`BlockMatrix`, i.e. by entry, then row, then column. Every element
+    of the blocks which is not stored takes the value `fill_value`.
+
+    Attributes
+    ----------
+    data : np.ndarray
+        (M) Values of the stored elements
+    rows : np.ndarray
+        (M) Row node index of the stored elements
+    cols : np.ndarray
+        (M) Column node index of the stored elements
+    index : np.ndarray
+        (M) Position of the stored elements in the flattened blocks
+    fill_value : Union[int, float]
+        Value of the elements of the blocks which are not stored
+    """
+
+    def __init__(self, rows, cols, data, counts, fill_value=0):
+        """Initialize the matrix from a list of (row, column, value) elements.
+
+        Parameters
+        ----------
+        rows : np.ndarray
+            (M) Row node index of the stored elements
+        cols : np.ndarray
+            (M) Column node index of the stored elements
+        data : np.ndarray
+            (M) Values of the stored elements
+        counts : np.ndarray
+            (B) Size of each block (number of nodes in each entry)
+        fill_value : Union[int, float], default 0
+            Value of the elements of the blocks which are not stored
+        """
+        # Store the block layout
+        counts = np.asarray(counts, dtype=np.int64)
+        self.counts = counts
+        self.offsets = np.cumsum(counts) - counts
+        self.block_offsets = np.cumsum(counts**2) - counts**2
+        self.batch_ids = np.repeat(np.arange(len(counts)), counts)
+
+        # Order the stored elements as in the flattened blocks
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        index = self.flat_index(rows, cols)
+        perm = np.argsort(index, kind='stable')
+        assert len(index) == 0 or np.all(np.diff(index[perm]) > 0), (
+                "Each element of the matrix can only be stored once.")
+
+        self.rows, self.cols = rows[perm], cols[perm]
+        self.index = index[perm]
+        self.data = np.asarray(data)[perm]
+        self.fill_value = fill_value
+
+    @classmethod
+    def full(cls, counts, fill_value, dtype=None):
+        """Builds a matrix with every element set to the same value.
+
+        Parameters
+        ----------
+        counts : np.ndarray
+            (B) Size of each block (number of nodes in each entry)
+        fill_value : Union[int, float]
+            Value of every element of the matrix
+        dtype : type, optional
+            Data type of the elements of the matrix
+
+        Returns
+        -------
+        SparseBlockMatrix
+            Block-diagonal matrix with no stored element
+        """
+        empty = np.empty(0, dtype=np.int64)
+
+        return cls(empty, empty, np.empty(0, dtype=dtype), counts, fill_value)
+
+    def block(self, batch_id):
+        """Returns the block of one entry of the batch.
+
+        Parameters
+        ----------
+        batch_id : int
+            Entry index
+
+        Returns
+        -------
+        np.ndarray
+            (C_b, C_b) Dense copy of the block
+        """
+        offset, count = self.offsets[batch_id], self.counts[batch_id]
+        block = np.full((count, count), self.fill_value, dtype=self.dtype)
+        mask = self.batch_ids[self.rows] == batch_id
+        block[self.rows[mask] - offset, self.cols[mask] - offset] = (
+                self.data[mask])
+
+        return block
+
+    def __getitem__(self, index):
+        """Returns the elements corresponding to (row, column) pairs.
+
+        Parameters
+        ----------
+        index : Tuple[Union[int, np.ndarray]]
+            (row(s), column(s)) node indexes
+
+        Returns
+        -------
+        Union[object, np.ndarray]
+            Element(s) of the matrix
+        """
+        # Find the requested elements among the stored elements
+        flat_index = self.flat_index(*index)
+        values = np.full(np.shape(flat_index), self.fill_value,
+                         dtype=self.dtype)
+        if len(self.index):
+            pos = np.minimum(np.searchsorted(self.index, flat_index),
+                             len(self.index) - 1)
+            found = self.index[pos] == flat_index
+            values[found] = self.data[pos[found]]
+
+        return values[()]
+
+    def __setitem__(self, index, value):
+        """Elements cannot be added to a sparse matrix after it is built."""
+        raise NotImplementedError(
+                "The elements of a sparse block matrix cannot be modified.")
+
+    def to_dense(self, fill_value=0):
+        """Converts the matrix to a dense (C, C) matrix.
+
+        Parameters
+        ----------
+        fill_value : Union[int, float], default 0
+            Value of the elements outside of the diagonal blocks
+
+        Returns
+        -------
+        np.ndarray
+            (C, C) Dense matrix
+        """
+        dense = np.full(self.shape, fill_value, dtype=self.dtype)
+        for offset, count in zip(self.offsets, self.counts):
+            dense[offset:offset + count, offset:offset + count] = (
+                    self.fill_value)
+        dense[self.rows, self.cols] = self.data
+
+        return dense
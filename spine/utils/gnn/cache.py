@@ -0,0 +1,283 @@
+"""Module with a class which caches the statistics of clusters in a batch.
+
+The successive aggregation stages of the reconstruction chain build clusters
+which are unions of the clusters of the previous stage (e.g. particles are
+made of fragments). The geometric features of a cluster (center, covariance,
+principal axis, value moments, bounding box) follow from a set of statistics
+which can be merged across disjoint clusters. Rather than re-scanning the
+voxels of each union at every stage, the statistics of the base clusters are
+computed once and the statistics of any union of base clusters are derived
+from them, keyed by the set of base clusters it is made of.
+"""
+
+import numpy as np
+import numba as nb
+
+from .cluster import (
+        get_cluster_csr, get_cluster_moments, merge_cluster_moments,
+        get_cluster_features_moments, get_cluster_features_extended)
+
+__all__ = ['ClusterFeatureCache']
+
+
+class ClusterFeatureCache:
+    """Cache of the mergeable statistics of the clusters of a batch.
+
+    The statistics of each cluster are stored in a row of the `moments`
+    array (see :func:`get_cluster_moments` for the layout). The first rows
+    correspond to the base clusters, the following ones to the unions of base
+    clusters requested so far. The clusters are assumed not to contain
+    duplicate voxels.
+
+    Attributes
+    ----------
+    data : np.ndarray
+        (N, 1 + D + N_f) Tensor of voxel/value pairs
+    moments : np.ndarray
+        (K, 21) Statistics of each cached cluster
+    base_ids : np.ndarray
+        (N) Index of the base cluster each voxel belongs to (-1 if none)
+    keys : Dict[Tuple[int], int]
+        Maps the set of base clusters which make up each cached cluster onto
+        the row of its statistics
+    """
+
+    def __init__(self, data, clusts):
+        """Computes the statistics of the base clusters from their voxels.
+
+        Parameters
+        ----------
+        data : np.ndarray
+            (N, 1 + D + N_f) Tensor of voxel/value pairs
+        clusts : Union[List[np.ndarray], IndexBatch]
+            (C) List of base cluster indexes. The clusters must be disjoint
+        """
+        # Compute the statistics of the base clusters
+        index, edges = get_cluster_csr(clusts)
+        sizes = np.diff(edges)
+        self.data = data
+        self.moments = get_cluster_moments(data, clusts)
+
+        # Map each voxel onto the base cluster it belongs to
+        self.base_ids = np.full(len(data), -1, dtype=np.int64)
+        self.base_ids[index] = np.repeat(np.arange(len(sizes)), sizes)
+        assert np.sum(self.base_ids > -1) == len(index), (
+                "The base clusters of the cache must be disjoint.")
+
+        # Register each base cluster as a set of one
+        self.num_base = len(sizes)
+        self.keys = {(i,): i for i in range(self.num_base)}
+
+    def __len__(self):
+        """Returns the number of clusters stored in the cache.
+
+        Returns
+        -------
+        int
+            Number of cached clusters
+        """
+        return len(self.moments)
+
+    def decompose(self, index, edges):
+        """Decomposes each cluster into the base clusters it is made of.
+
+        Parameters
+        ----------
+        index : np.ndarray
+            (M) Concatenated index of the voxels of every cluster
+        edges : np.ndarray
+            (C + 1) Boundaries of each cluster in the concatenated index
+
+        Returns
+        -------
+        np.ndarray
+            (L) Concatenated list of the base clusters of every cluster
+        np.ndarray
+            (C + 1) Boundaries of each cluster in the list of base clusters
+        np.ndarray
+            (C) Whether each cluster is exactly a union of base clusters
+        """
+        # Find the sorted base clusters of each cluster, in place
+        sizes = np.diff(edges)
+        base_sizes = self.moments[:self.num_base, 0].astype(np.int64)
+        buffer, counts, valid = _decompose(
+                index, edges, self.base_ids, base_sizes)
+
+        # Compact the list of base clusters
+        comp_edges = np.zeros(len(sizes) + 1, dtype=np.int64)
+        comp_edges[1:] = np.cumsum(counts)
+        shifts = np.repeat(edges[:-1] - comp_edges[:-1], counts)
+        comp = buffer[np.arange(comp_edges[-1]) + shifts]
+
+        return comp, comp_edges, valid
+
+    def get_moments(self, clusts):
+        """Returns the statistics of a list of clusters.
+
+        The statistics of the clusters which are unions of base clusters are
+        fetched from the cache, or merged from those of their base clusters
+        and cached. The statistics of the other clusters are computed from
+        their voxels (these are not cached).
+
+        Parameters
+        ----------
+        clusts : Union[List[np.ndarray], IndexBatch]
+            (C) List of cluster indexes
+
+        Returns
+        -------
+        np.ndarray
+            (C, 21) Statistics of each cluster
+        """
+        index, edges = get_cluster_csr(clusts)
+
+        return self._get_moments(index, edges)
+
+    def _get_moments(self, index, edges):
+        """Returns the statistics of a list of clusters in CSR form.
+
+        Parameters
+        ----------
+        index : np.ndarray
+            (M) Concatenated index of the voxels of every cluster
+        edges : np.ndarray
+            (C + 1) Boundaries of each cluster in the concatenated index
+
+        Returns
+        -------
+        np.ndarray
+            (C, 21) Statistics of each cluster
+        """
+        # Decompose the clusters into base clusters
+        comp, comp_edges, valid = self.decompose(index, edges)
+
+        # Find the row of each cluster in the cache, list the missing ones
+        num_clusts = len(edges) - 1
+        rows = np.full(num_clusts, -1, dtype=np.int64)
+        groups = []
+        for i in np.where(valid)[0]:
+            key = tuple(comp[comp_edges[i]:comp_edges[i+1]])
+            if key not in self.keys:
+                self.keys[key] = len(self.moments) + len(groups)
+                groups.append(np.array(key, dtype=np.int64))
+
+            rows[i] = self.keys[key]
+
+        # Merge the statistics of the missing unions of base clusters
+        if len(groups):
+            self.moments = np.vstack(
+                    (self.moments, merge_cluster_moments(self.moments, groups)))
+
+        moments = np.empty((num_clusts, 21), dtype=self.moments.dtype)
+        moments[valid] = self.moments[rows[valid]]
+
+        # Compute the statistics of the other clusters from their voxels
+        invalid = np.where(~valid)[0]
+        if len(invalid):
+            moments[invalid] = get_cluster_moments(
+                    self.data, [index[edges[i]:edges[i+1]] for i in invalid])
+
+        return moments
+
+    def get_features(self, clusts, add_value=False, add_shape=False):
+        """Returns the geometric features of a list of clusters.
+
+        The features match those of :func:`get_cluster_features`. Apart from
+        the semantic type and the orientation of the principal axis, they are
+        all derived from the cluster statistics.
+
+        Parameters
+        ----------
+        clusts : Union[List[np.ndarray], IndexBatch]
+            (C) List of cluster indexes
+        add_value : bool, default False
+            Add mean and RMS value of pixels in the cluster
+        add_shape : bool, default False
+            Add the particle semantic type
+
+        Returns
+        -------
+        np.ndarray
+            (C, N_c) Tensor of cluster features
+        """
+        # Get the base geometric features from the statistics
+        index, edges = get_cluster_csr(clusts)
+        moments = self._get_moments(index, edges)
+        feats = [get_cluster_features_moments(self.data, clusts, moments)]
+
+        # Add the value moments, if requested
+        if add_value:
+            feats.append(moments[:, 13:14])
+            feats.append(np.sqrt(moments[:, 14:15]/moments[:, :1]))
+
+        # Add the semantic type, if requested
+        if add_shape:
+            feats.append(get_cluster_features_extended(
+                self.data, clusts, add_value=False, add_shape=True))
+
+        return np.hstack(feats).astype(self.data.dtype)
+
+    def get_bounding_boxes(self, clusts):
+        """Returns the bounding boxes of a list of clusters.
+
+        Parameters
+        ----------
+        clusts : Union[List[np.ndarray], IndexBatch]
+            (C) List of cluster indexes
+
+        Returns
+        -------
+        np.ndarray
+            (C, 3) Lower bound of the bounding box of each cluster
+        np.ndarray
+            (C, 3) Upper bound of the bounding box of each cluster
+        """
+        moments = self.get_moments(clusts)
+
+        return moments[:, 15:18], moments[:, 18:21]
+
+
+@nb.njit(parallel=True, cache=True)
+def _decompose(index: nb.int64[:],
+               edges: nb.int64[:],
+               base_ids: nb.int64[:],
+               base_sizes: nb.int64[:]) -> (
+                       nb.int64[:], nb.int64[:], nb.boolean[:]):
+
+    # Loop over the clusters (parallelize). The base clusters of each
+    # cluster are written at the start of its own segment of the buffer.
+    num_clusts = len(edges) - 1
+    buffer = np.empty(len(index), dtype=np.int64)
+    counts = np.zeros(num_clusts, dtype=np.int64)
+    valid = np.zeros(num_clusts, dtype=np.bool_)
+    for k in nb.prange(num_clusts):
+        # List the base cluster of each run of voxels, give up if a voxel
+        # does not belong to any base cluster
+        start, end = edges[k], edges[k+1]
+        num_runs, prev, covered = 0, -1, end > start
+        for i in range(start, end):
+            base_id = base_ids[index[i]]
+            if base_id < 0:
+                covered = False
+                break
+            if base_id != prev:
+                buffer[start + num_runs] = base_id
+                num_runs += 1
+                prev = base_id
+
+        if not covered:
+            continue
+
+        # The cluster is a union of base clusters if it covers them entirely
+        labels = np.unique(buffer[start:start + num_runs])
+        total = 0
+        for b in labels:
+            total += base_sizes[b]
+        if total != end - start:
+            continue
+
+        buffer[start:start + len(labels)] = labels
+        counts[k] = len(labels)
+        valid[k] = True
+
+    return buffer, counts, valid
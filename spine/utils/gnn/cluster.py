@@ -1,7 +1,11 @@
 """Module with functions that operate on collections of pixels (clusters).
 
 A cluster is typically represented as a list of row indexes pointing at the
-voxels that up the cluster out of a tensor of pixels.
+voxels that up the cluster out of a tensor of pixels. The functions which
+reduce each cluster to a set of features also accept an :class:`IndexBatch`,
+which they pass to the `numba` kernels as a compressed sparse row (CSR) index,
+i.e. a flat index of the voxels of all clusters and the boundaries of each
+cluster in it (see :func:`get_cluster_csr`).
 """
 
 import numpy as np
@@ -213,12 +217,46 @@ def get_cluster_features_batch(data, clusts, add_value=False, add_shape=False):
     TensorBatch
         (C) List of cluster dE/dx value close to the start points
     """
-    feats = get_cluster_features(
-            data.tensor, clusts.index_list, add_value, add_shape)
+    feats = get_cluster_features(data.tensor, clusts, add_value, add_shape)
 
     return TensorBatch(feats, clusts.counts)
 
 
+def get_cluster_csr(clusts):
+    """Converts a list of cluster indexes to a compressed sparse row (CSR)
+    representation, i.e. a flat index and the boundaries of each cluster in it.
+
+    Parameters
+    ----------
+    clusts : Union[List[np.ndarray], IndexBatch]
+        (C) List of cluster indexes
+
+    Returns
+    -------
+    np.ndarray
+        (N) Concatenated index of the voxels of every cluster
+    np.ndarray
+        (C + 1) Boundaries of each cluster in the concatenated index
+    """
+    # If the input is an index batch, it stores the CSR representation
+    if isinstance(clusts, IndexBatch):
+        index, edges = clusts.full_index, clusts.single_edges
+        if not clusts.is_numpy:
+            index, edges = index.cpu().numpy(), edges.cpu().numpy()
+
+        return index.astype(np.int64), edges.astype(np.int64)
+
+    # Otherwise, concatenate the list of indexes
+    edges = np.zeros(len(clusts) + 1, dtype=np.int64)
+    if not len(clusts):
+        return np.empty(0, dtype=np.int64), edges
+
+    edges[1:] = np.cumsum([len(c) for c in clusts])
+    index = np.concatenate(clusts).astype(np.int64)
+
+    return index, edges
+
+
 def form_clusters(data, min_size=-1, column=CLUST_COL, shapes=None):
     """Builds a list of indexes corresponding to each cluster in the event.
 
@@ -368,8 +406,7 @@ def _get_cluster_primary_label(data: nb.float64[:,:],
     return labels
 
 
-@numbafy(cast_args=['data'], list_args=['clusts'],
-         keep_torch=True, ref_arg='data')
+@numbafy(cast_args=['data'], keep_torch=True, ref_arg='data')
 def get_cluster_centers(data, clusts):
     """Returns the coordinate of the centroid associated with each cluster.
 
@@ -377,7 +414,7 @@ def get_cluster_centers(data, clusts):
     ----------
     data : np.ndarray
         Cluster label data tensor
-    clusts : List[np.ndarray]
+    clusts : Union[List[np.ndarray], IndexBatch]
         (C) List of cluster indexes
 
     Returns
@@ -385,24 +422,27 @@ def get_cluster_centers(data, clusts):
     np.ndarray
         (C, 3) Tensor of cluster centers
     """
-    if not len(clusts):
+    index, edges = get_cluster_csr(clusts)
+    if len(edges) < 2:
         return np.empty((0, 3), dtype=data.dtype)
 
-    return _get_cluster_centers(data, clusts)
+    return _get_cluster_centers(data, index, edges)
 
-@nb.njit(cache=True)
+@nb.njit(parallel=True, cache=True)
 def _get_cluster_centers(data: nb.float64[:,:],
-                         clusts: nb.types.List(nb.int64[:])) -> (
-                                 nb.float64[:,:]):
+                         index: nb.int64[:],
+                         edges: nb.int64[:]) -> nb.float64[:,:]:
 
-    centers = np.empty((len(clusts), 3), dtype=data.dtype)
-    for i, c in enumerate(clusts):
-        centers[i] = np.sum(data[c][:, COORD_COLS], axis=0)/len(c)
+    centers = np.zeros((len(edges) - 1, 3), dtype=data.dtype)
+    for k in nb.prange(len(edges) - 1):
+        for i in range(edges[k], edges[k+1]):
+            for d in range(3):
+                centers[k, d] += data[index[i], COORD_COLS[d]]
+        centers[k] /= edges[k+1] - edges[k]
 
     return centers
 
 
-@numbafy(cast_args=['data'], list_args=['clusts'])
 def get_cluster_sizes(data, clusts):
     """Returns the sizes of each cluster.
 
@@ -410,7 +450,7 @@ def get_cluster_sizes(data, clusts):
     ----------
     data : np.ndarray
         Cluster label data tensor
-    clusts : List[np.ndarray]
+    clusts : Union[List[np.ndarray], IndexBatch]
         (C) List of cluster indexes
 
     Returns
@@ -418,24 +458,12 @@ def get_cluster_sizes(data, clusts):
     np.ndarray
         (C) List of cluster sizes
     """
-    if not len(clusts):
-        return np.empty(0, dtype=np.int64)
+    _, edges = get_cluster_csr(clusts)
 
-    return _get_cluster_sizes(data, clusts)
+    return np.diff(edges)
 
-@nb.njit(cache=True)
-def _get_cluster_sizes(data: nb.float64[:,:],
-                       clusts: nb.types.List(nb.int64[:])) -> nb.int64[:]:
-
-    sizes = np.empty(len(clusts), dtype=np.int64)
-    for i, c in enumerate(clusts):
-        sizes[i] = len(c)
-
-    return sizes
 
-
-@numbafy(cast_args=['data'], list_args=['clusts'],
-         keep_torch=True, ref_arg='data')
+@numbafy(cast_args=['data'], keep_torch=True, ref_arg='data')
 def get_cluster_energies(data, clusts):
     """Returns the total charge/energy deposited by each cluster.
 
@@ -443,7 +471,7 @@ def get_cluster_energies(data, clusts):
     ----------
     data : np.ndarray
         Cluster label data tensor
-    clusts : List[np.ndarray]
+    clusts : Union[List[np.ndarray], IndexBatch]
         (C) List of cluster indexes
 
     Returns
@@ -451,18 +479,21 @@ def get_cluster_energies(data, clusts):
     np.ndarray
         (C) List of cluster pixel sums
     """
-    if not len(clusts):
+    index, edges = get_cluster_csr(clusts)
+    if len(edges) < 2:
         return np.empty(0, dtype=data.dtype)
 
-    return _get_cluster_energies(data, clusts)
+    return _get_cluster_energies(data, index, edges)
 
-@nb.njit(cache=True)
+@nb.njit(parallel=True, cache=True)
 def _get_cluster_energies(data: nb.float64[:,:],
-                          clusts: nb.types.List(nb.int64[:])) -> nb.float64[:]:
+                          index: nb.int64[:],
+                          edges: nb.int64[:]) -> nb.float64[:]:
 
-    energies = np.empty(len(clusts), dtype=data.dtype)
-    for i, c in enumerate(clusts):
-        energies[i] = np.sum(data[c, VALUE_COL])
+    energies = np.zeros(len(edges) - 1, dtype=data.dtype)
+    for k in nb.prange(len(edges) - 1):
+        for i in range(edges[k], edges[k+1]):
+            energies[k] += data[index[i], VALUE_COL]
 
     return energies
 
@@ -487,7 +518,7 @@ def get_cluster_features(data, clusts, add_value=False, add_shape=False):
     ----------
     data : np.ndarray
         Cluster label data tensor
-    clusts : List[np.ndarray]
+    clusts : Union[List[np.ndarray], IndexBatch]
         (C) List of cluster indexes
 
     Returns
@@ -507,8 +538,7 @@ def get_cluster_features(data, clusts, add_value=False, add_shape=False):
     return feats
 
 
-@numbafy(cast_args=['data'], list_args=['clusts'],
-         keep_torch=True, ref_arg='data')
+@numbafy(cast_args=['data'], keep_torch=True, ref_arg='data')
 def get_cluster_features_base(data, clusts):
     """Returns an array of 16 geometric features for each of cluster.
 
@@ -522,7 +552,7 @@ def get_cluster_features_base(data, clusts):
     ----------
     data : np.ndarray
         Cluster label data tensor
-    clusts : List[np.ndarray]
+    clusts : Union[List[np.ndarray], IndexBatch]
         (C) List of cluster indexes
 
     Returns
@@ -530,77 +560,241 @@ def get_cluster_features_base(data, clusts):
     np.ndarray
         (C, 16) Tensor of cluster features
     """
-    if not len(clusts):
-        return np.empty((0, 16), dtype=data.dtype) # Cannot type empty list
+    index, edges = get_cluster_csr(clusts)
+    if len(edges) < 2:
+        return np.empty((0, 16), dtype=data.dtype)
 
-    return _get_cluster_features_base(data, clusts)
+    moments = _get_cluster_moments(data, index, edges)
 
-@nb.njit(parallel=True, cache=True)
-def _get_cluster_features_base(data: nb.float64[:,:],
-                               clusts: nb.types.List(nb.int64[:])) -> (
-                                   nb.float64[:,:]):
-
-    # Loop over the clusters (parallelize). The `prange` function creates a
-    # uint64 iterator which is cast to int64 to access a list, and throws a
-    # warning. To avoid this, use a separate counter to acces clusts.
-    feats = np.empty((len(clusts), 16), dtype=data.dtype)
-    ids = np.arange(len(clusts)).astype(np.int64)
-    for k in nb.prange(len(clusts)):
-        # Get list of voxels in the cluster
-        clust = clusts[ids[k]]
-        x = data[clust][:, COORD_COLS]
+    return _get_cluster_features_moments(data, index, edges, moments)
 
-        # Get cluster center
-        center = nbl.mean(x, 0)
 
-        # Get orientation matrix
-        A = np.cov(x.T, ddof = len(x) - 1).astype(x.dtype)
+@numbafy(cast_args=['data', 'moments'], keep_torch=True, ref_arg='data')
+def get_cluster_features_moments(data, clusts, moments):
+    """Returns the 16 geometric features of each cluster (see
+    :func:`get_cluster_features_base`) given its statistics.
 
-        # Center data
-        x = x - center
+    All the features follow from the statistics of the cluster, apart from
+    the orientation of the principal axis, which is chosen to point towards
+    the maximum transverse spread and requires a single pass over the voxels.
+
+    Parameters
+    ----------
+    data : np.ndarray
+        Cluster label data tensor
+    clusts : Union[List[np.ndarray], IndexBatch]
+        (C) List of cluster indexes
+    moments : np.ndarray
+        (C, 21) Statistics of each cluster (see :func:`get_cluster_moments`)
+
+    Returns
+    -------
+    np.ndarray
+        (C, 16) Tensor of cluster features
+    """
+    index, edges = get_cluster_csr(clusts)
+    if len(edges) < 2:
+        return np.empty((0, 16), dtype=data.dtype)
+
+    return _get_cluster_features_moments(
+            data, index, edges, moments.astype(data.dtype))
+
+@nb.njit(parallel=True, cache=True)
+def _get_cluster_features_moments(data: nb.float64[:,:],
+                                  index: nb.int64[:],
+                                  edges: nb.int64[:],
+                                  moments: nb.float64[:,:]) -> (
+                                          nb.float64[:,:]):
+
+    # Loop over the clusters (parallelize). Each cluster is reduced in
+    # place from its segment of the index, without copying its voxels.
+    feats = np.zeros((len(edges) - 1, 16), dtype=data.dtype)
+    for k in nb.prange(len(edges) - 1):
+        # Get the cluster center and orientation matrix (sum of the outer
+        # products of the centered voxel coordinates)
+        center = moments[k, 1:4]
+        A = moments[k, 4:13].copy().reshape(3, 3)
 
         # Get eigenvectors, normalize orientation matrix and eigenvalues to
         # largest. If points are superimposed, i.e. if the largest eigenvalue
         # != 0, no need to keep going
+        feats[k, :3] = center
+        feats[k, 15] = moments[k, 0]
         w, v = np.linalg.eigh(A)
         if w[2] == 0.:
-            feats[k] = np.concatenate(
-                    (center, np.zeros(12), np.array([len(clust)])))
             continue
         dirwt = 1.0 - w[1] / w[2]
         B = A / w[2]
 
         # Get the principal direction, identify the direction of the spread
-        v0 = v[:,2]
-
-        # Projection all points, x, along the principal axis
-        x0 = np.dot(x, v0)
-
-        # Evaluate the distance from the points to the principal axis
-        xp0 = x - np.outer(x0, v0)
-        np0 = np.empty(len(xp0), dtype=data.dtype)
-        for i in range(len(xp0)):
-            np0[i] = np.linalg.norm(xp0[i])
+        v0 = v[:,2].copy()
+
+        # Project all points along the principal axis, evaluate their
+        # distance to the principal axis and accumulate the spread
+        sc = 0.
+        x = np.empty(3, dtype=data.dtype)
+        for i in range(edges[k], edges[k+1]):
+            x0 = 0.
+            for d in range(3):
+                x[d] = data[index[i], COORD_COLS[d]] - center[d]
+                x0 += x[d] * v0[d]
+            np0 = 0.
+            for d in range(3):
+                np0 += (x[d] - x0 * v0[d])**2
+            sc += x0 * np.sqrt(np0)
 
         # Flip the principal direction if it is not pointing towards the
         # maximum spread
-        sc = np.dot(x0, np0)
         if sc < 0:
             # Numba does not support unary `-`, have to flip manually
             v0 = np.zeros(3, dtype=data.dtype) - v0
 
-        # Weight direction
-        v0 = dirwt * v0
-
         # Append
-        feats[k] = np.concatenate(
-                (center, B.flatten(), v0, np.array([len(clust)])))
+        feats[k, 3:12] = B.flatten()
+        feats[k, 12:15] = dirwt * v0
 
     return feats
 
 
-@numbafy(cast_args=['data'], list_args=['clusts'],
-         keep_torch=True, ref_arg='data')
+@numbafy(cast_args=['data'])
+def get_cluster_moments(data, clusts):
+    """Returns an array of 21 mergeable statistics for each cluster.
+
+    The statistics of the union of disjoint clusters can be obtained from
+    those of the individual clusters without revisiting their voxels (see
+    :func:`merge_cluster_moments`). They are composed of:
+    - Voxel count (1)
+    - Center (3)
+    - Scatter matrix, i.e. sum of the outer products of the centered voxel
+      coordinates (9)
+    - Mean value (1)
+    - Sum of the squared deviations of the values from their mean (1)
+    - Lower bound of the bounding box (3)
+    - Upper bound of the bounding box (3)
+
+    Parameters
+    ----------
+    data : np.ndarray
+        Cluster label data tensor
+    clusts : Union[List[np.ndarray], IndexBatch]
+        (C) List of cluster indexes
+
+    Returns
+    -------
+    np.ndarray
+        (C, 21) Tensor of cluster statistics
+    """
+    index, edges = get_cluster_csr(clusts)
+    if len(edges) < 2:
+        return np.empty((0, 21), dtype=data.dtype)
+
+    return _get_cluster_moments(data, index, edges)
+
+@nb.njit(parallel=True, cache=True)
+def _get_cluster_moments(data: nb.float64[:,:],
+                         index: nb.int64[:],
+                         edges: nb.int64[:]) -> nb.float64[:,:]:
+
+    moments = np.zeros((len(edges) - 1, 21), dtype=data.dtype)
+    for k in nb.prange(len(edges) - 1):
+        # Get the segment of the index which makes up the cluster
+        start, end = edges[k], edges[k+1]
+        size = end - start
+        moments[k, 0] = size
+
+        # Get the center, the mean value and the bounding box
+        moments[k, 15:18] = data[index[start], COORD_COLS]
+        moments[k, 18:21] = data[index[start], COORD_COLS]
+        for i in range(start, end):
+            for d in range(3):
+                coord = data[index[i], COORD_COLS[d]]
+                moments[k, 1 + d] += coord
+                moments[k, 15 + d] = min(moments[k, 15 + d], coord)
+                moments[k, 18 + d] = max(moments[k, 18 + d], coord)
+            moments[k, 13] += data[index[i], VALUE_COL]
+        moments[k, 1:4] /= size
+        moments[k, 13] /= size
+
+        # Get the scatter matrix and the sum of squared value deviations
+        x = np.empty(3, dtype=data.dtype)
+        for i in range(start, end):
+            for d in range(3):
+                x[d] = data[index[i], COORD_COLS[d]] - moments[k, 1 + d]
+            for d in range(3):
+                for e in range(3):
+                    moments[k, 4 + 3*d + e] += x[d] * x[e]
+            moments[k, 14] += (data[index[i], VALUE_COL] - moments[k, 13])**2
+
+    return moments
+
+
+def merge_cluster_moments(moments, groups):
+    """Merges the statistics of groups of disjoint clusters into the
+    statistics of the union of each group.
+
+    The centers and scatter matrices are combined using the pair-wise
+    update formulas of Chan et al., the value moments likewise and the
+    bounding boxes by taking their envelope.
+
+    Parameters
+    ----------
+    moments : np.ndarray
+        (C, 21) Statistics of each cluster (see :func:`get_cluster_moments`)
+    groups : Union[List[np.ndarray], IndexBatch]
+        (G) List of cluster indexes which make up each group
+
+    Returns
+    -------
+    np.ndarray
+        (G, 21) Statistics of each group of clusters
+    """
+    index, edges = get_cluster_csr(groups)
+    if len(edges) < 2:
+        return np.empty((0, 21), dtype=moments.dtype)
+
+    return _merge_cluster_moments(moments, index, edges)
+
+@nb.njit(parallel=True, cache=True)
+def _merge_cluster_moments(moments: nb.float64[:,:],
+                           index: nb.int64[:],
+                           edges: nb.int64[:]) -> nb.float64[:,:]:
+
+    merged = np.zeros((len(edges) - 1, 21), dtype=moments.dtype)
+    for k in nb.prange(len(edges) - 1):
+        # Initialize the group with its first cluster
+        merged[k] = moments[index[edges[k]]]
+
+        # Add the other clusters one at a time
+        for i in range(edges[k] + 1, edges[k+1]):
+            other = moments[index[i]]
+            n_a, n_b = merged[k, 0], other[0]
+            n = n_a + n_b
+            weight = n_a * n_b / n
+
+            # Merge the centers and the scatter matrices
+            delta = other[1:4] - merged[k, 1:4]
+            for d in range(3):
+                for e in range(3):
+                    merged[k, 4 + 3*d + e] += (
+                            other[4 + 3*d + e] + weight * delta[d] * delta[e])
+            merged[k, 1:4] += delta * n_b / n
+
+            # Merge the value moments
+            delta_v = other[13] - merged[k, 13]
+            merged[k, 14] += other[14] + weight * delta_v**2
+            merged[k, 13] += delta_v * n_b / n
+
+            # Merge the bounding boxes
+            for d in range(3):
+                merged[k, 15 + d] = min(merged[k, 15 + d], other[15 + d])
+                merged[k, 18 + d] = max(merged[k, 18 + d], other[18 + d])
+
+            merged[k, 0] = n
+
+    return merged
+
+
+@numbafy(cast_args=['data'], keep_torch=True, ref_arg='data')
 def get_cluster_features_extended(data, clusts, add_value=True, add_shape=True):
     """Returns an array of 3 additional features for each of cluster.
 
@@ -615,7 +809,7 @@ def get_cluster_features_extended(data, clusts, add_value=True, add_shape=True):
     ----------
     data : np.ndarray
         Cluster label data tensor
-    clusts : List[np.ndarray]
+    clusts : Union[List[np.ndarray], IndexBatch]
         (C) List of cluster indexes
     add_value : bool, default True
         Whether to add the mean and std of the pixel values
@@ -629,21 +823,23 @@ def get_cluster_features_extended(data, clusts, add_value=True, add_shape=True):
     """
     assert add_value or add_shape, (
             "Must add either value or shape for this function to do anything")
-    if not len(clusts):
+    index, edges = get_cluster_csr(clusts)
+    if len(edges) < 2:
         return np.empty((0, add_value*2+add_shape), dtype=data.dtype)
 
-    return _get_cluster_features_extended(data, clusts, add_value, add_shape)
+    return _get_cluster_features_extended(
+            data, index, edges, add_value, add_shape)
 
 @nb.njit(parallel=True, cache=True)
 def _get_cluster_features_extended(data: nb.float64[:,:],
-                                   clusts: nb.types.List(nb.int64[:]),
+                                   index: nb.int64[:],
+                                   edges: nb.int64[:],
                                    add_value: bool = True,
                                    add_shape: bool = True) -> nb.float64[:,:]:
-    feats = np.empty((len(clusts), add_value*2+add_shape), dtype=data.dtype)
-    ids = np.arange(len(clusts)).astype(np.int64)
-    for k in nb.prange(len(clusts)):
+    feats = np.empty((len(edges) - 1, add_value*2+add_shape), dtype=data.dtype)
+    for k in nb.prange(len(edges) - 1):
         # Get cluster
-        clust = clusts[ids[k]]
+        clust = index[edges[k]:edges[k+1]]
 
         # Get mean and RMS energy in the cluster, if requested
         if add_value:
@@ -947,8 +1143,7 @@ def cluster_dedx(voxels: nb.float64[:,:],
     return np.sum(values)/np.max(dist_mat)
 
 
-@numbafy(cast_args=['data'], list_args=['clusts'],
-         keep_torch=True, ref_arg='data')
+@numbafy(cast_args=['data'], keep_torch=True, ref_arg='data')
 def get_cluster_start_points(data, clusts):
     """Estimates the start point of clusters based on their PCA and the 
     local curvature at each of the PCA extrema.
@@ -957,7 +1152,7 @@ def get_cluster_start_points(data, clusts):
     ----------
     data : np.ndarray
         Cluster label data tensor
-    clusts : List[np.ndarray]
+    clusts : Union[List[np.ndarray], IndexBatch]
         (C) List of cluster indexes
 
     Returns
@@ -965,19 +1160,26 @@ def get_cluster_start_points(data, clusts):
     np.ndarray
         (C, 3) Cluster start points
     """
-    if not len(clusts):
+    index, edges = get_cluster_csr(clusts)
+    if len(edges) < 2:
         return np.empty((0, 3), dtype=data.dtype)
 
-    return _get_cluster_start_points(data, clusts)
+    return _get_cluster_start_points(data, index, edges)
 
 @nb.njit(parallel=True, cache=True)
 def _get_cluster_start_points(data: nb.float64[:,:],
-                              clusts: nb.types.List(nb.int64[:])) -> (
-                                      nb.float64[:,:]):
+                              index: nb.int64[:],
+                              edges: nb.int64[:]) -> nb.float64[:,:]:
 
-    points = np.empty((len(clusts), 3))
-    for k in nb.prange(len(clusts)):
-        vid = cluster_end_points(data[clusts[k]][:, COORD_COLS])[-1]
+    points = np.empty((len(edges) - 1, 3), dtype=data.dtype)
+    for k in nb.prange(len(edges) - 1):
+        # A single voxel is its own start point
+        voxels = data[index[edges[k]:edges[k+1]]][:, COORD_COLS]
+        if len(voxels) < 2:
+            points[k] = voxels[0]
+            continue
+
+        points[k] = cluster_end_points(voxels)[0]
 
     return points
 
@@ -1000,10 +1202,10 @@ def cluster_end_points(voxels: nb.float64[:,:]) -> (
 
     Returns
     -------
-    int
-        Index of the start voxel
-    int
-        Index of the end voxel
+    np.ndarray
+        (3) Coordinates of the start voxel
+    np.ndarray
+        (3) Coordinates of the end voxel
     """
     # Get the axis of maximum spread
     axis = nbl.principal_components(voxels)[0]
@@ -1018,9 +1220,9 @@ def cluster_end_points(voxels: nb.float64[:,:]) -> (
 
     # Sort the voxel IDs by increasing order of curvature order
     curvs = [umbrella_curv(voxels, ids[0]), umbrella_curv(voxels, ids[1])]
-    curvs = np.array(curvs, dtype=np.int64)
+    curvs = np.array(curvs, dtype=voxels.dtype)
     ids = np.array(ids, dtype=np.int64)
-    ids[np.argsort(curvs)]
+    ids = ids[np.argsort(curvs)]
 
     # Return extrema
     return voxels[ids[0]], voxels[ids[1]]
@@ -6,11 +6,12 @@ import numba as nb
 from spine import TensorBatch
 from spine.utils.decorators import numbafy
 from spine.utils.globals import COORD_COLS
+from spine.utils.gnn.block import BlockMatrix
 import spine.utils.numba_local as nbl
 
 
 def get_cluster_edge_features_batch(data, clusts, edge_index,
-                                    closest_index=True, algorithm='brute'):
+                                    closest_index=None, algorithm='brute'):
     """Batched version of :func:`get_cluster_edge_features`.
 
     Parameters
@@ -21,7 +22,7 @@ def get_cluster_edge_features_batch(data, clusts, edge_index,
         (C) List of cluster indexes
     edge_index : EdgeIndexBatch
         (2, E) Sparse incidence matrix
-    closest_index : Union[np.ndarray, torch.Tensor], optional
+    closest_index : BlockMatrix, optional
         (C, C) : Combined index of the closest pair of voxels per edge
     algorithm : str, default 'brute'
         Method used to compute the inter-cluster distance
@@ -34,6 +35,8 @@ def get_cluster_edge_features_batch(data, clusts, edge_index,
     directed = edge_index.directed
     index = edge_index.index_t if directed else edge_index.directed_index_t
     counts = edge_index.counts if directed else edge_index.directed_counts
+    if closest_index is not None:
+        closest_index = closest_index[index[:, 0], index[:, 1]]
     feats = get_cluster_edge_features(
             data.tensor, clusts.index_list, index, closest_index, algorithm)
 
@@ -85,8 +88,8 @@ def get_cluster_edge_features(data, clusts, edge_index,
         (C) List of arrays of voxels IDs in each cluster
     edge_index : Union[np.ndarray, torch.Tensor]
         (2, E) Incidence map between voxels
-    closest_index : Union[np.ndarray, torch.Tensor], optional
-        (C, C) : Combined index of the closest pair of voxels per edge
+    closest_index : np.ndarray, optional
+        (E) : Combined index of the closest pair of voxels of each edge
     algorithm : str, default 'brute'
         Method used to compute the inter-cluster distance
 
@@ -120,10 +123,10 @@ def _get_cluster_edge_features(data: nb.float32[:,:],
 
         # Find the closest set point in each cluster
         if closest_index is not None:
-            imin = closest_index[c1, c2]
+            imin = closest_index[k]
             i1, i2 = imin//len(x2), imin%len(x2)
         else:
-            i1, j2, _ = nbl.closest_pair(x1, x2, algorithm)
+            i1, i2, _ = nbl.closest_pair(x1, x2, algorithm)
         v1 = x1[i1,:]
         v2 = x2[i2,:]
 
@@ -301,6 +304,9 @@ def inter_cluster_distance(voxels, clusts, counts=None, method='voxel',
     """Finds the inter-cluster distance between every pair of clusters within
     each batch, returned as a block-diagonal matrix.
 
+    Only the diagonal blocks are computed and stored, see
+    :class:`BlockMatrix`.
+
     Parameters
     ----------
     voxels : Union[np.ndarray, torch.Tensor]
@@ -321,10 +327,12 @@ def inter_cluster_distance(voxels, clusts, counts=None, method='voxel',
 
     Returns
     -------
-    Union[np.ndarray, torch.Tensor]
-        (C, C) Tensor of pair-wise cluster distances
-    Union[np.ndarray, torch.Tensor], optional
-        (C, C) Tensor of pair-wise closest voxel pair
+    BlockMatrix
+        (C, C) Block-diagonal matrix of pair-wise cluster distances
+    BlockMatrix, optional
+        (C, C) Block-diagonal matrix of pair-wise closest voxel pair. For a
+        pair (i, j), the index is `ii*len(clusts[j]) + jj`, with `ii` the
+        position of the voxel in cluster i and `jj` that in cluster j
     """
     # If there is no counts provided, assume all clusters are in one entry
     if counts is None:
@@ -333,36 +341,39 @@ def inter_cluster_distance(voxels, clusts, counts=None, method='voxel',
     if not return_index:
         # If there are no clusters, return empty
         if len(clusts) == 0:
-            return np.empty((0, 0), dtype=voxels.dtype)
+            return BlockMatrix(np.empty(0, dtype=voxels.dtype), counts)
 
-        return _inter_cluster_distance(
-                voxels, clusts, counts, method, algorithm)
+        return BlockMatrix(_inter_cluster_distance(
+                voxels, clusts, counts, method, algorithm), counts)
 
     else:
         # If there are no clusters, return empty
         assert method == 'voxel', "Cannot return index for centroid method."
         if len(clusts) == 0:
-            return (np.empty((0, 0), dtype=voxels.dtype),
-                    np.empty((0, 0), dtype=np.int64))
+            return (BlockMatrix(np.empty(0, dtype=voxels.dtype), counts),
+                    BlockMatrix(np.empty(0, dtype=np.int64), counts))
 
-        return _inter_cluster_distance_index(
+        dists, index = _inter_cluster_distance_index(
                 voxels, clusts, counts, algorithm)
 
+        return BlockMatrix(dists, counts), BlockMatrix(index, counts)
+
 @nb.njit(parallel=True, cache=True)
 def _inter_cluster_distance(voxels: nb.float32[:,:],
                             clusts: nb.types.List(nb.int64[:]),
                             counts: nb.int64[:],
                             method: str = 'voxel',
-                            algorithm: str = 'brute') -> nb.float32[:,:]:
+                            algorithm: str = 'brute') -> nb.float32[:]:
 
     # Loop over the upper diagonal elements of each block on the diagonal
-    dist_mat = np.zeros((len(clusts), len(clusts)), dtype=voxels.dtype)
+    dists = np.zeros(np.sum(counts**2), dtype=voxels.dtype)
     indxi, indxj = complete_graph(counts)
+    posij, posji = _block_positions(indxi, indxj, counts)
     if method == 'voxel':
         for k in nb.prange(len(indxi)):
             # Identifiy the two voxels closest to each other in each cluster
             i, j = indxi[k], indxj[k]
-            dist_mat[i, j] = dist_mat[j, i] = nbl.closest_pair(
+            dists[posij[k]] = dists[posji[k]] = nbl.closest_pair(
                     voxels[clusts[i]], voxels[clusts[j]], algorithm)[-1]
 
     elif method == 'centroid':
@@ -375,36 +386,231 @@ def _inter_cluster_distance(voxels: nb.float32[:,:],
         # Measure the distance between cluster centroids
         for k in nb.prange(len(indxi)):
             i, j = indxi[k], indxj[k]
-            dist_mat[i,j] = dist_mat[j,i] = np.sqrt(
+            dists[posij[k]] = dists[posji[k]] = np.sqrt(
                     np.sum((centroids[j]-centroids[i])**2))
     else:
         raise ValueError("Inter-cluster distance method not supported.")
 
-    return dist_mat
+    return dists
 
 @nb.njit(parallel=True, cache=True)
 def _inter_cluster_distance_index(voxels: nb.float32[:,:],
                                   clusts: nb.types.List(nb.int64[:]),
                                   counts: nb.int64[:],
                                   algorithm: str = 'brute') -> (
-                                          nb.float32[:,:], nb.int64[:,:]):
+                                          nb.float32[:], nb.int64[:]):
 
     # Loop over the upper diagonal elements of each block on the diagonal
-    dist_mat = np.zeros((len(clusts), len(clusts)), dtype=voxels.dtype)
-    closest_index = np.zeros((len(clusts), len(clusts)), dtype=nb.int64)
+    dists = np.zeros(np.sum(counts**2), dtype=voxels.dtype)
+    closest_index = np.zeros(np.sum(counts**2), dtype=np.int64)
     indxi, indxj = complete_graph(counts)
+    posij, posji = _block_positions(indxi, indxj, counts)
     for k in nb.prange(len(indxi)):
         # Identify the two voxels closest to each other in each cluster
         i, j = indxi[k], indxj[k]
         ii, jj, dist = nbl.closest_pair(
                 voxels[clusts[i]], voxels[clusts[j]], algorithm)
-        index = ii*len(clusts[j]) + jj
 
-        # Store the index and the distance in a matrix
-        closest_index[i, j] = closest_index[j, i] = index
-        dist_mat[i, j] = dist_mat[j, i] = dist
+        # Store the index and the distance of the pair, in both directions
+        closest_index[posij[k]] = ii*len(clusts[j]) + jj
+        closest_index[posji[k]] = jj*len(clusts[i]) + ii
+        dists[posij[k]] = dists[posji[k]] = dist
+
+    return dists, closest_index
+
+@nb.njit(cache=True)
+def _block_positions(indxi: nb.int64[:],
+                     indxj: nb.int64[:],
+                     counts: nb.int64[:]) -> (nb.int64[:], nb.int64[:]):
+
+    # Find the block of each node
+    batch_ids = np.empty(np.sum(counts), dtype=np.int64)
+    offsets = np.empty(len(counts), dtype=np.int64)
+    block_offsets = np.empty(len(counts), dtype=np.int64)
+    offset, block_offset = 0, 0
+    for b in range(len(counts)):
+        batch_ids[offset:offset + counts[b]] = b
+        offsets[b], block_offsets[b] = offset, block_offset
+        offset += counts[b]
+        block_offset += counts[b]**2
+
+    # Find the position of the (i, j) and (j, i) elements in the blocks
+    batch_ids = batch_ids[indxi]
+    rows, cols = indxi - offsets[batch_ids], indxj - offsets[batch_ids]
+    block_offsets, counts = block_offsets[batch_ids], counts[batch_ids]
+
+    return (block_offsets + rows*counts + cols,
+            block_offsets + cols*counts + rows)
+
+
+@numbafy(cast_args=['voxels'], list_args=['clusts'])
+def inter_cluster_distance_sparse(voxels, clusts, counts=None,
+                                  max_length=np.inf, algorithm='brute',
+                                  lower=None, upper=None):
+    """Finds the inter-cluster distance between the pairs of clusters within
+    each batch which are closer than a maximum length, returned as a sparse
+    list of cluster pairs.
+
+    The clusters of each entry are indexed once by the lower bound of their
+    bounding box along the first axis. Sweeping through this index, a pair is
+    only considered if the distance between the two bounding boxes is below
+    `max_length`. The closest pair of voxels is then only searched for among
+    the voxels of each cluster which lie within `max_length` of the bounding
+    box of the other. Both cuts are conservative: with the 'brute' algorithm,
+    the result is identical to that of :func:`inter_cluster_distance`.
+
+    Parameters
+    ----------
+    voxels : Union[np.ndarray, torch.Tensor]
+        (N, D) Tensor of voxel coordinates
+    clusts : List[np.ndarray]
+        (C) List of cluster indexes
+    counts : np.ndarray, optional
+        (B) Number of clusters in each entry of the batch
+    max_length : float, default np.inf
+        Distance above which a pair of clusters is dropped
+    algorithm : str, default 'brute'
+        Algorithm used to compute the 'voxel' distance. The 'brute' method
+        is exact but slow, 'recursive' uses a fast but approximate method.
+    lower : np.ndarray, optional
+        (C, D) Lower bound of the bounding box of each cluster, if known
+    upper : np.ndarray, optional
+        (C, D) Upper bound of the bounding box of each cluster, if known
+
+    Returns
+    -------
+    np.ndarray
+        (2, P) List of cluster pairs (i < j), sorted by (i, j)
+    np.ndarray
+        (P) Distance between the two clusters of each pair
+    np.ndarray
+        (P) Combined index of the closest pair of voxels of each pair
+    """
+    # If there is no counts provided, assume all clusters are in one entry
+    if counts is None:
+        counts = np.array([len(clusts)], dtype=np.int64)
+
+    # If there are no clusters, return empty
+    if len(clusts) == 0:
+        return (np.empty((2, 0), dtype=np.int64),
+                np.empty(0, dtype=voxels.dtype),
+                np.empty(0, dtype=np.int64))
+
+    # If the bounding boxes are not provided, compute them
+    if lower is None or upper is None:
+        lower, upper = _bounding_boxes(voxels, clusts)
+
+    return _inter_cluster_distance_sparse(
+            voxels, clusts, lower.astype(voxels.dtype),
+            upper.astype(voxels.dtype), counts, float(max_length), algorithm)
+
+@nb.njit(parallel=True, cache=True)
+def _bounding_boxes(voxels: nb.float32[:,:],
+                    clusts: nb.types.List(nb.int64[:])) -> (
+                            nb.float32[:,:], nb.float32[:,:]):
+
+    # Compute the bounding box of each cluster
+    num_clusts, dim = len(clusts), voxels.shape[1]
+    lower = np.empty((num_clusts, dim), dtype=voxels.dtype)
+    upper = np.empty((num_clusts, dim), dtype=voxels.dtype)
+    for i in nb.prange(num_clusts):
+        x = voxels[clusts[i]]
+        for d in range(dim):
+            lower[i, d] = np.min(x[:, d])
+            upper[i, d] = np.max(x[:, d])
+
+    return lower, upper
+
+@nb.njit(parallel=True, cache=True)
+def _inter_cluster_distance_sparse(voxels: nb.float32[:,:],
+                                   clusts: nb.types.List(nb.int64[:]),
+                                   lower: nb.float32[:,:],
+                                   upper: nb.float32[:,:],
+                                   counts: nb.int64[:],
+                                   max_length: nb.float64 = np.inf,
+                                   algorithm: str = 'brute') -> (
+                                           nb.int64[:,:], nb.float32[:],
+                                           nb.int64[:]):
+
+    # Find the candidate pairs in each entry
+    pairs = _bounding_box_pairs(lower, upper, counts, max_length)
+
+    # Find the closest pair of voxels of each candidate pair
+    dists = np.full(pairs.shape[1], np.inf, dtype=voxels.dtype)
+    closest_index = np.zeros(pairs.shape[1], dtype=np.int64)
+    for k in nb.prange(pairs.shape[1]):
+        # Restrict each cluster to the voxels close to the other box
+        i, j = pairs[0, k], pairs[1, k]
+        index_i = _box_index(
+                voxels[clusts[i]], lower[j], upper[j], max_length)
+        index_j = _box_index(
+                voxels[clusts[j]], lower[i], upper[i], max_length)
+        if len(index_i) == 0 or len(index_j) == 0:
+            continue
+
+        # Identify the two voxels closest to each other in each cluster
+        ii, jj, dist = nbl.closest_pair(
+                voxels[clusts[i][index_i]], voxels[clusts[j][index_j]],
+                algorithm)
+
+        dists[k] = dist
+        closest_index[k] = index_i[ii]*len(clusts[j]) + index_j[jj]
+
+    # Only keep the pairs which are close enough
+    mask = np.where(dists < max_length)[0]
+
+    return pairs[:, mask], dists[mask], closest_index[mask]
+
+@nb.njit(cache=True)
+def _bounding_box_pairs(lower: nb.float32[:,:],
+                        upper: nb.float32[:,:],
+                        counts: nb.int64[:],
+                        max_length: nb.float64) -> nb.int64[:,:]:
+
+    # Loop over the entries of the batch
+    pairs_i, pairs_j = [0], [0]
+    offset = 0
+    for b in range(len(counts)):
+        # Sort the clusters in the entry by the lower bound of their box
+        c = counts[b]
+        order = offset + np.argsort(lower[offset:offset + c, 0])
+        for a in range(c):
+            i = order[a]
+            for k in range(a + 1, c):
+                # The boxes of all following clusters are too far along x
+                j = order[k]
+                if lower[j, 0] - upper[i, 0] >= max_length:
+                    break
+
+                # Check the distance between the two boxes
+                gap = np.maximum(np.maximum(lower[j] - upper[i],
+                                            lower[i] - upper[j]), 0.)
+                if np.sqrt(np.sum(gap**2)) < max_length:
+                    pairs_i.append(min(i, j))
+                    pairs_j.append(max(i, j))
+
+        offset += c
+
+    # Sort the pairs by (i, j)
+    pairs = np.empty((2, len(pairs_i) - 1), dtype=np.int64)
+    pairs[0] = pairs_i[1:]
+    pairs[1] = pairs_j[1:]
+    perm = np.argsort(pairs[0]*len(lower) + pairs[1])
+
+    return pairs[:, perm]
+
+@nb.njit(cache=True)
+def _box_index(x: nb.float32[:,:],
+               lower: nb.float32[:],
+               upper: nb.float32[:],
+               margin: nb.float64) -> nb.int64[:]:
+
+    # Find the points which are within some margin of a box
+    mask = np.ones(len(x), dtype=np.bool_)
+    for d in range(x.shape[1]):
+        mask &= (x[:, d] >= lower[d] - margin) & (x[:, d] <= upper[d] + margin)
 
-    return dist_mat, closest_index
+    return np.where(mask)[0]
 
 
 @numbafy(cast_args=['graph'])
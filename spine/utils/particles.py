@@ -24,7 +24,7 @@ def process_particles(particles, particle_event, particle_mpv_event=None,
 
     Parameters
     ----------
-    particles : List[Particle]
+    particles : Union[List[Particle], ParticleTable]
         (P) List of true particle instances
     particle_event : larcv.EventParticle
         (P) List of true particle instances
@@ -42,6 +42,18 @@ def process_particles(particles, particle_event, particle_mpv_event=None,
      inter_primary_ids, pids) = process_particle_event(
              particle_event, particle_mpv_event, neutrino_event)
 
+    # If the particles are stored in a table, update them column-wise
+    if hasattr(particles, 'set_column'):
+        index = np.where(particles.array['id'] > -1)[0]
+        for name, values in (('interaction_id', interaction_ids),
+                             ('nu_id', nu_ids),
+                             ('group_primary', group_primary_ids),
+                             ('interaction_primary', inter_primary_ids),
+                             ('pid', pids)):
+            particles.set_column(name, np.asarray(values)[index], index)
+
+        return
+
     # Update the particles objects in place
     for i, p in enumerate(particles):
         if p.id > -1:
@@ -2,9 +2,12 @@
 
 import numpy as np
 import scipy
+import scipy.spatial
 from scipy.spatial.distance import cdist
 from sklearn.cluster import DBSCAN
 
+from .dbscan import LatticeDBSCAN
+
 __all__ = ['PointBreakClusterer']
 
 
@@ -32,8 +35,11 @@ class PointBreakClusterer:
     The latter only works on track clusters, not on EM showers.
     """
 
+    # Order of the Minkowski distance corresponding to each metric
+    minkowski_orders = {'euclidean': 2, 'chebyshev': np.inf, 'cityblock': 1}
+
     def __init__(self, method='masked_dbscan', eps=1.8, min_samples=1,
-                 metric='euclidean', mask_radius=5.0):
+                 metric='euclidean', mask_radius=5.0, algorithm='auto'):
         """Initialize the particle point-enhanced clustering algorithm.
 
         Parameters
@@ -50,6 +56,10 @@ class PointBreakClusterer:
             Metric used to compute the pair-wise distances between space points
         mask_radius : float, default 5.0
             Radius to mask around each particle point
+        algorithm : str, default 'auto'
+            DBSCAN implementation, one of 'sklearn', 'lattice' (voxels with
+            integer coordinates only, see :class:`LatticeDBSCAN`) or 'auto'
+            (lattice, if the coordinates of the input are integer)
         """
         # Store the attributes
         self.method = method
@@ -58,9 +68,21 @@ class PointBreakClusterer:
         self.metric = metric
         self.mask_radius = mask_radius
 
-        # Initialize the DBSCAN algorithm
+        # Initialize the DBSCAN algorithm(s)
+        assert algorithm in ['auto', 'sklearn', 'lattice'], (
+                f"DBSCAN algorithm not recognized: {algorithm}. Should be "
+                 "one of 'auto', 'sklearn' or 'lattice'.")
+        self.algorithm = algorithm
         self.dbscan = DBSCAN(eps=eps, min_samples=min_samples, metric=metric)
 
+        self.lattice = None
+        if algorithm != 'sklearn' and metric in LatticeDBSCAN.metrics:
+            self.lattice = LatticeDBSCAN(
+                    eps=eps, min_samples=min_samples, metric=metric)
+
+        assert algorithm != 'lattice' or self.lattice is not None, (
+                f"The lattice DBSCAN does not support the {metric} metric.")
+
     def __call__(self, voxels, points, method=None):
         """Produce instance clusters using the point-enhanced method.
 
@@ -91,6 +113,72 @@ class PointBreakClusterer:
                    f"{self.method}. Should be one of 'masked_dbscan' or "
                     "'closest_path'.")
 
+    def fit(self, voxels, groups=None):
+        """Runs DBSCAN on a set of voxels.
+
+        Parameters
+        ----------
+        voxels : np.ndarray
+            (N, 3) Set of voxel coordinates
+        groups : np.ndarray, optional
+            (N) Non-negative group ID of each voxel. Voxels from separate
+            groups are never clustered together
+
+        Returns
+        -------
+        np.ndarray
+            (N) Array of cluster assignments for each voxel in the input
+        """
+        # Use the lattice implementation, if possible
+        if self.lattice is not None and (
+                self.algorithm == 'lattice' or
+                LatticeDBSCAN.is_lattice(voxels)):
+            return self.lattice.fit_predict(voxels, groups)
+
+        # Otherwise, run sklearn's DBSCAN on each group separately
+        if groups is None:
+            return self.dbscan.fit(voxels).labels_
+
+        labels = np.full(len(voxels), -1, dtype=np.int64)
+        offset = 0
+        for g in np.unique(groups):
+            index = np.where(groups == g)[0]
+            labels_g = self.dbscan.fit(voxels[index]).labels_
+            labels[index] = np.where(labels_g > -1, offset + labels_g, -1)
+            offset += np.max(labels_g) + 1
+
+        return labels
+
+    def get_point_mask(self, voxels, points):
+        """Finds the voxels which are farther than the mask radius from
+        every particle end point.
+
+        Parameters
+        ----------
+        voxels : np.ndarray
+            (N, 3) Set of voxel coordinates
+        points : np.ndarray
+            (P, 3) Set of particle end points
+
+        Returns
+        -------
+        np.ndarray
+            (N) Boolean mask of the voxels away from all points
+        """
+        # For Minkowski metrics, query the closest point in a KD-tree
+        if self.metric in self.minkowski_orders and len(points):
+            tree = scipy.spatial.cKDTree(points)
+            dists, _ = tree.query(
+                    voxels, p=self.minkowski_orders[self.metric],
+                    distance_upper_bound=self.mask_radius + 1.)
+
+            return dists > self.mask_radius
+
+        # Otherwise, compute all the voxel-to-point distances
+        pair_mat = cdist(voxels, points, metric=self.metric)
+
+        return np.all((pair_mat > self.mask_radius), axis=1)
+
     def get_masked_dbscan_labels(self, voxels, points):
         """Produce instance clusters using the masked-DBSCAN method.
 
@@ -107,29 +195,41 @@ class PointBreakClusterer:
             (N) Array of cluster assignments for each voxel in the input
         """
         # Find voxels above a threshold distance from any particle end point
-        pair_mat = cdist(voxels, points, metric=self.metric)
-        dist_mask = np.all((pair_mat > self.mask_radius), axis=1)
-
-        # Form preliminary clusters on the entire set of voxels, loop over them
-        labels = self.dbscan.fit(voxels).labels_
-        for l in np.unique(labels):
-            # Find the list of masked and unmasked voxels in this cluster
-            group_mask    = labels == l
-            active_index  = np.where(dist_mask & group_mask)[0]
-            passive_index = np.where(~dist_mask & group_mask)[0]
-
-            if len(active_index):
-                # If there are active pixels, run DBSCAN on the masked voxels
-                labels_c = self.dbscan.fit(voxels[active_index]).labels_
-                labels[active_index] = np.max(labels) + 1 + labels_c
-
-                if len(passive_index):
-                    # For masked pixel, matched to the closest cluster
-                    dist_mat = cdist(
-                            voxels[active_index], voxels[passive_index],
-                            metric=self.metric)
-                    argmins = np.argmin(dist_mat, axis=0)
-                    labels[passive_index] = labels[active_index][argmins]
+        dist_mask = self.get_point_mask(voxels, points)
+
+        # Form preliminary clusters on the entire set of voxels
+        labels = self.fit(voxels)
+        active_index = np.where(dist_mask)[0]
+        if not len(active_index):
+            return labels
+
+        # Run DBSCAN on the unmasked voxels of all clusters at once, keeping
+        # voxels from separate preliminary clusters apart
+        group_labels = labels.copy()
+        labels_c = self.fit(voxels[active_index], labels[active_index] + 1)
+        labels[active_index] = np.where(
+                labels_c > -1, np.max(labels) + 1 + labels_c, -1)
+
+        # Match masked voxels to the closest unmasked voxel of their cluster
+        passive_index = np.where(~dist_mask)[0]
+        active_index = active_index[
+                np.argsort(group_labels[active_index], kind='stable')]
+        passive_index = passive_index[
+                np.argsort(group_labels[passive_index], kind='stable')]
+        active_groups = group_labels[active_index]
+        passive_groups = group_labels[passive_index]
+        uniques, starts = np.unique(passive_groups, return_index=True)
+        ends = np.append(starts[1:], len(passive_index))
+        for l, start, end in zip(uniques, starts, ends):
+            lower, upper = np.searchsorted(active_groups, [l, l + 1])
+            if upper > lower:
+                group_active = active_index[lower:upper]
+                group_passive = passive_index[start:end]
+                dist_mat = cdist(
+                        voxels[group_active], voxels[group_passive],
+                        metric=self.metric)
+                argmins = np.argmin(dist_mat, axis=0)
+                labels[group_passive] = labels[group_active][argmins]
 
         return labels
 
@@ -152,7 +252,7 @@ class PointBreakClusterer:
         pair_mat = cdist(voxels, points, metric=self.metric)
 
         # Form preliminary clusters on the entire set of voxels, loop over them
-        labels = self.dbscan.fit(voxels).labels_
+        labels = self.fit(voxels)
         for l in np.unique(labels):
             # Restrict voxel set and point set to those in the group
             group_mask  = labels == l
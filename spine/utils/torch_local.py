@@ -1,5 +1,6 @@
 """Simple local extensions to the current torch package."""
 
+import numpy as np
 import torch
 
 
@@ -55,3 +56,74 @@ def unique_index(x, dim=None):
     index = inverse.new_empty(unique.size(0)).scatter_(0, inverse, perm)
 
     return unique.long(), index
+
+
+class SharedArray(np.ndarray):
+    """Numpy array which lives in a shared memory segment owned by a tensor.
+
+    When pickled by the torch multiprocessing pickler (e.g. to be sent from a
+    DataLoader worker to the main process), only a handle to the shared
+    memory segment is sent, rather than a copy of the data. The array is
+    received as a regular `np.ndarray` which points to the same memory.
+
+    Views and copies of the array are regular arrays and pickle as such.
+    """
+
+    def __array_finalize__(self, obj):
+        """Views do not own the shared memory segment."""
+        self.tensor = None
+
+    def __reduce_ex__(self, protocol):
+        """Pickles the array as a handle to its shared memory segment."""
+        if self.tensor is None:
+            return np.asarray(self).__reduce_ex__(protocol)
+
+        return shared_to_numpy, (self.tensor, self.dtype.str, self.shape)
+
+    def __reduce__(self):
+        """Pickles the array as a handle to its shared memory segment."""
+        return self.__reduce_ex__(2)
+
+
+def shared_empty(shape, dtype):
+    """Allocates an uninitialized array in a shared memory segment.
+
+    Parameters
+    ----------
+    shape : Tuple[int]
+        Shape of the array
+    dtype : np.dtype
+        Data type of the array
+
+    Returns
+    -------
+    SharedArray
+        Array in shared memory
+    """
+    dtype = np.dtype(dtype)
+    num_bytes = int(np.prod(shape))*dtype.itemsize
+    tensor = torch.empty(num_bytes, dtype=torch.uint8).share_memory_()
+    array = tensor.numpy().view(dtype).reshape(shape).view(SharedArray)
+    array.tensor = tensor
+
+    return array
+
+
+def shared_to_numpy(tensor, dtype, shape):
+    """Rebuilds an array from the tensor which owns its memory.
+
+    Parameters
+    ----------
+    tensor : torch.Tensor
+        (N) Byte tensor which owns the memory
+    dtype : str
+        Data type of the array
+    shape : Tuple[int]
+        Shape of the array
+
+    Returns
+    -------
+    np.ndarray
+        Array which points to the memory of the tensor
+    """
+    return tensor.numpy().view(dtype).reshape(shape)
@@ -0,0 +1,68 @@
+"""Test that the image metadata unit conversions work as intended."""
+
+from copy import deepcopy
+
+import pytest
+
+import numpy as np
+
+from spine import Meta, Particle, ParticleTable
+
+
+@pytest.fixture(name='meta')
+def fixture_meta():
+    """Generates a 3D image metadata object.
+
+    Returns
+    -------
+    Meta
+        Metadata object
+    """
+    return Meta(lower=np.full(3, -1., dtype=np.float32),
+                upper=np.full(3, 1., dtype=np.float32),
+                size=np.full(3, 0.1, dtype=np.float32),
+                count=np.full(3, 20))
+
+
+def test_meta_inplace(meta):
+    """Tests that the in-place conversions match the copying ones."""
+    np.random.seed(seed=0)
+    coords = np.random.rand(100, 3).astype(np.float32)
+    for center in [False, True]:
+        ref = meta.to_cm(coords, center)
+        res = coords.copy()
+        assert meta.to_cm(res, center, inplace=True) is res
+        np.testing.assert_allclose(res, ref, rtol=1e-6)
+
+    for floor in [False, True]:
+        ref = meta.to_px(coords, floor)
+        res = coords.copy()
+        assert meta.to_px(res, floor, inplace=True) is res
+        np.testing.assert_allclose(res, ref, rtol=1e-5)
+
+
+@pytest.mark.parametrize('columnar', [False, True])
+def test_meta_objects(meta, columnar):
+    """Tests that the batched object conversions match the object ones."""
+    np.random.seed(seed=0)
+    particles = [Particle(id=i, position=np.random.rand(3).astype(np.float32),
+                          end_position=np.random.rand(3).astype(np.float32))
+                 for i in range(10)]
+    ref = deepcopy(particles)
+    objects = ParticleTable.from_objects(particles) if columnar else particles
+
+    # Convert to pixel, then back to cm
+    for func in ['to_px', 'to_cm']:
+        getattr(meta, f'objects_{func}')(objects)
+        for p in ref:
+            getattr(p, func)(meta)
+
+        for p_ref, p in zip(ref, objects):
+            assert p.units == p_ref.units
+            for attr in Particle._pos_attrs:
+                np.testing.assert_allclose(
+                        getattr(p, attr), getattr(p_ref, attr), rtol=1e-5)
+
+    # Objects already expressed in cm are left untouched
+    meta.objects_to_cm(objects)
+    assert all(p.units == 'cm' for p in objects)
@@ -0,0 +1,118 @@
+"""Test that the columnar object tables work as intended."""
+
+import pickle
+
+import pytest
+
+import numpy as np
+
+from spine import Meta, Particle, ParticleTable
+
+
+@pytest.fixture(name='particles')
+def fixture_particles():
+    """Generates a list of particles, with a default one at the end.
+
+    Returns
+    -------
+    List[Particle]
+        List of particle objects
+    """
+    np.random.seed(seed=0)
+    particles = []
+    for i in range(10):
+        particles.append(Particle(
+            id=i, group_id=i//2, creation_process='primary',
+            position=np.random.rand(3).astype(np.float32),
+            end_position=np.random.rand(3).astype(np.float32),
+            momentum=np.random.rand(3).astype(np.float32),
+            children_id=np.arange(i)))
+    particles.append(Particle())
+
+    return particles
+
+
+@pytest.fixture(name='meta')
+def fixture_meta():
+    """Generates a 3D image metadata object.
+
+    Returns
+    -------
+    Meta
+        Metadata object
+    """
+    return Meta(lower=np.full(3, -1., dtype=np.float32),
+                upper=np.full(3, 1., dtype=np.float32),
+                size=np.full(3, 0.1, dtype=np.float32),
+                count=np.full(3, 20))
+
+
+def test_particle_table(particles):
+    """Tests that the particles built from a table match the originals."""
+    table = ParticleTable.from_objects(particles)
+
+    assert len(table) == len(particles)
+    assert table.array['position'].shape == (len(particles), 3)
+    for p_ref, p in zip(particles, table):
+        assert isinstance(p, Particle)
+        for key, value in p_ref.as_dict().items():
+            np.testing.assert_equal(getattr(p, key), value)
+
+
+def test_particle_table_units(particles, meta):
+    """Tests the column-wise conversion of the positional attributes."""
+    table = ParticleTable.from_objects(particles)
+    built = table[0]
+    index = np.where(table.array['id'] > -1)[0]
+    table.to_px(meta, index)
+
+    # Convert the original particles one at a time
+    for i in index:
+        particles[i].to_px(meta)
+
+    # Check that the table and the objects (built or not) agree
+    assert built.units == 'px'
+    for p_ref, p in zip(particles, table):
+        assert p.units == p_ref.units
+        for attr in Particle._pos_attrs:
+            np.testing.assert_allclose(getattr(p, attr), getattr(p_ref, attr))
+
+    # Check that the rows cannot be converted twice
+    with pytest.raises(AssertionError):
+        table.to_px(meta, index)
+
+
+def test_particle_table_pickle(particles):
+    """Tests that tables keep their modifications when pickled."""
+    table = ParticleTable.from_objects(particles)
+    table[1].interaction_id = 3
+    table.set_column('nu_id', 2, np.array([0, 1]))
+
+    result = pickle.loads(pickle.dumps(table))
+    assert isinstance(result, ParticleTable)
+    assert result[1].interaction_id == 3
+    np.testing.assert_equal(result.array['nu_id'][:3], [2, 2, -1])
+
+    table.append(Particle(id=10))
+    result = pickle.loads(pickle.dumps(table))
+    assert len(result) == len(particles) + 1
+    assert result[-1].id == 10
+
+
+def test_particle_table_lazy(particles):
+    """Tests that objects are built on every path which accesses them."""
+    # Objects read through the underlying list are built on attribute access
+    table = ParticleTable.from_objects(particles)
+    raw = list.__getitem__(table, slice(0, 3))
+    assert table._num_built == 0
+    assert all(isinstance(p, Particle) for p in raw)
+    assert [p.id for p in raw] == [0, 1, 2]
+    raw[2].interaction_id = 5
+    assert table[2].interaction_id == 5 and table._num_built == 3
+
+    # Reflected concatenation and slices return built objects
+    table = ParticleTable.from_objects(particles)
+    for result in ([] + table, table[:4]):
+        assert all(type(p) is Particle for p in list.__iter__(result))
+    assert [p.id for p in [] + table] == [p.id for p in particles]
+    assert isinstance(table[:4].default, Particle)
@@ -0,0 +1,74 @@
+"""Test that the cache of parsed entries works as intended."""
+
+import os
+from dataclasses import dataclass
+
+import numpy as np
+import pytest
+
+from spine import Meta
+from spine.io.cache import ParserCache
+
+
+@dataclass
+class DummyReader:
+    """Reader with the basic attributes needed to test the cache."""
+    entry_index: np.ndarray
+
+
+class DummyDataset:
+    """Dataset which produces deterministic parsed entries."""
+
+    def __init__(self, num_entries):
+        self.reader = DummyReader(np.arange(num_entries))
+        self.meta = Meta(lower=[0., 0., 0.], upper=[10., 10., 10.],
+                         size=[1., 1., 1.])
+
+    def __len__(self):
+        return len(self.reader.entry_index)
+
+    def load(self, idx):
+        """Produces one parsed entry."""
+        rng = np.random.RandomState(seed=idx)
+        num_points = rng.randint(0, 20)
+        return {'index': idx,
+                'sparse': (rng.rand(num_points, 3), rng.rand(num_points, 2),
+                           self.meta),
+                'labels': np.arange(num_points)[::-1]}
+
+
+@pytest.mark.parametrize('num_workers', [1, 2])
+def test_parser_cache(tmp_path, num_workers):
+    """Tests storing parsed entries and loading them back."""
+    # Create a dummy input file and a cache for it
+    file_path = os.path.join(tmp_path, 'dummy.root')
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write('dummy')
+
+    schema = {'sparse': {'parser': 'sparse3d', 'sparse_event': 'dummy'}}
+    cache_dir = os.path.join(tmp_path, 'cache')
+    cache = ParserCache(cache_dir, schema, 'float32', [file_path])
+    assert len(cache) == 0
+
+    # Fill the cache, check that the entries are identical
+    dataset = DummyDataset(10)
+    cache.fill(dataset, num_workers=num_workers, max_shard_size=4)
+    assert len(cache) == len(dataset)
+    for idx in range(len(dataset)):
+        ref, entry = dataset.load(idx), cache.get(idx)
+        assert entry['index'] == ref['index']
+        for i in range(2):
+            np.testing.assert_equal(entry['sparse'][i], ref['sparse'][i])
+        np.testing.assert_equal(entry['sparse'][2].upper, ref['sparse'][2].upper)
+        np.testing.assert_equal(entry['labels'], ref['labels'])
+
+    # The arrays point to the shards and can be modified without damage
+    entry = cache.get(3)
+    assert not entry['sparse'][0].flags.owndata
+    entry['sparse'][0][:] = -1.
+    np.testing.assert_equal(
+            cache.get(3)['sparse'][0], dataset.load(3)['sparse'][0])
+
+    # The cache is found again as long as the parameters do not change
+    assert len(ParserCache(cache_dir, schema, 'float32', [file_path])) == 10
+    assert len(ParserCache(cache_dir, schema, 'float64', [file_path])) == 0
@@ -2,6 +2,7 @@
 
 import numpy as np
 import pytest
+from torch.utils.data import DataLoader
 
 from spine import Meta
 from spine.io.collate import CollateAll
@@ -98,6 +99,25 @@ def test_collate_sparse(split, detector, batch_sparse):
         assert len(result[k]) == len(batch_sparse)*(2**split)
 
 
+def test_collate_shared_memory(batch_sparse):
+    """Tests that batches collated in shared memory by DataLoader workers
+    match the batches collated in the main process."""
+    # Collate the batch in the main process
+    result = CollateAll()(batch_sparse)
+
+    # Collate the same batch in a worker process, in shared memory
+    loader = DataLoader(
+            batch_sparse, batch_size=len(batch_sparse), shuffle=False,
+            num_workers=1, collate_fn=CollateAll(shared_memory=True))
+    shared = next(iter(loader))
+
+    # Check that the batches are identical
+    for k in batch_sparse[0]:
+        np.testing.assert_equal(shared[k].data, result[k].data)
+        np.testing.assert_equal(shared[k].counts, result[k].counts)
+        assert shared[k].data.dtype == batch_sparse[0][k][1].dtype
+
+
 def test_collate_edge_index(batch_edge_index):
     """Tests the collation of edge indexes."""
     # Initialize the collation class
@@ -147,3 +167,28 @@ def test_collate_list():
     # Check that the input is intact
     for i, data in enumerate(batch_list):
         assert data['list'] == result['list'][i]
+
+
+def test_collate_split_source(batch_sparse):
+    """Tests that feature tensors are split by module using their sources."""
+    # Give each row of the first sparse tensor a random module source
+    np.random.seed(seed=0)
+    batch = []
+    for sample in batch_sparse:
+        features = sample['sparse_0'][1]
+        sources = np.random.randint(0, 2, size=(len(features), 2))
+        batch.append({'features': features, 'sources': sources})
+
+    # Collate the features, split by source module
+    collate_fn = CollateAll(
+            split=True, detector='icarus', source={'features': 'sources'})
+    result = collate_fn(batch)['features']
+
+    # Check that each [batch, module] block contains the rows of that
+    # module, in their original order
+    assert len(result) == 2*len(batch)
+    for s, sample in enumerate(batch):
+        for m in range(2):
+            index = np.where(sample['sources'][:, 0] == m)[0]
+            np.testing.assert_equal(
+                    result[2*s + m], sample['features'][index])
@@ -55,6 +55,14 @@ def test_larcv_dataset(larcv_data):
         assert 'index' in entry
         assert entry['index'] == i
 
+    # Check that the dataset provides the number of rows of each product
+    for key in tree_keys:
+        sizes = dataset.get_sizes(key)
+        assert len(sizes) == len(dataset)
+        for i, size in enumerate(sizes):
+            value = dataset[i][key]
+            assert size == len(value[0] if isinstance(value, tuple) else value)
+
     # Check that the data keys are as expected
     for key in tree_keys:
         assert key in dataset.data_keys()
@@ -0,0 +1,54 @@
+"""Test that the cluster data clean up works as intended."""
+
+import pytest
+
+import numpy as np
+import numba as nb
+
+from spine import Meta
+from spine.utils.globals import SHAPE_COL, SHAPE_PREC
+from spine.io.parse.clean_data import (
+        clean_sparse_data, filter_duplicate_voxels_ref, filter_voxels_ref)
+
+
+@pytest.mark.parametrize('num_voxels', [0, 1, 100, 1000])
+@pytest.mark.parametrize('use_meta', [False, True])
+def test_clean_sparse_data(num_voxels, use_meta):
+    """Tests that the key-based clean up matches the sequential scans of
+    lexicographically sorted voxels."""
+    # Generate a reference image and a set of cluster voxels which contains
+    # duplicates, in random order
+    np.random.seed(seed=0)
+    count = 20
+    ids = np.random.choice(count**3, size=num_voxels, replace=False)
+    sparse_voxels = np.stack(np.unravel_index(
+        ids, (count, count, count)), axis=1).astype(np.int32)
+    extra = sparse_voxels[np.random.randint(0, max(num_voxels, 1),
+                                            size=num_voxels//2)]
+    cluster_voxels = np.vstack([sparse_voxels, extra])
+    cluster_voxels = cluster_voxels[np.random.permutation(len(cluster_voxels))]
+    cluster_data = np.column_stack([
+        np.random.rand(len(cluster_voxels)),
+        np.random.choice(SHAPE_PREC, size=len(cluster_voxels))])
+
+    # Clean up the cluster data
+    meta = None
+    if use_meta:
+        meta = Meta(lower=np.zeros(3), upper=np.full(3, count),
+                    size=np.ones(3), count=np.full(3, count))
+    voxels, data = clean_sparse_data(
+            cluster_voxels, cluster_data, sparse_voxels, meta)
+
+    # Clean up the cluster data using sequential scans
+    perm = np.lexsort(cluster_voxels.T)
+    ref_voxels, ref_data = cluster_voxels[perm], cluster_data[perm]
+    index = np.where(filter_duplicate_voxels_ref(
+        ref_voxels, ref_data[:, SHAPE_COL], nb.typed.List(SHAPE_PREC)))[0]
+    ref_voxels, ref_data = ref_voxels[index], ref_data[index]
+    index = np.where(filter_voxels_ref(
+        ref_voxels, sparse_voxels[np.lexsort(sparse_voxels.T)]))[0]
+
+    # Check that both methods agree
+    assert len(voxels) == num_voxels
+    np.testing.assert_array_equal(voxels, ref_voxels[index])
+    np.testing.assert_array_equal(data, ref_data[index])
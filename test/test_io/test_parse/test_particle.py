@@ -2,9 +2,10 @@
 
 import pytest
 
+import numpy as np
 from larcv import larcv
 
-from spine import Meta, Particle, Neutrino
+from spine import Meta, Particle, Neutrino, ParticleTable
 from spine.io.parse.particle import *
 
 
@@ -41,6 +42,34 @@ def test_parse_particles(particle_event, neutrino_event, sparse3d_event, asis,
         assert isinstance(result.default, Particle)
 
 
+@pytest.mark.parametrize(
+        'pixel_coordinates, post_process', [(False, False), (True, True)])
+@pytest.mark.parametrize('particle_event', [0, 1, 20], indirect=True)
+@pytest.mark.parametrize('neutrino_event', [0, 2], indirect=True)
+@pytest.mark.filterwarnings('ignore::UserWarning')
+def test_parse_particles_columnar(particle_event, neutrino_event,
+                                  sparse3d_event, pixel_coordinates,
+                                  post_process):
+    """Tests that the particle table matches the list of particle objects."""
+    # Parse the data into a list and into a table
+    kwargs = {'particle_event': particle_event,
+              'neutrino_event': neutrino_event, 'sparse_event': sparse3d_event}
+    results = []
+    for columnar in [False, True]:
+        parser = ParticleParser(
+                **kwargs, pixel_coordinates=pixel_coordinates,
+                post_process=post_process, columnar=columnar)
+        results.append(parser.process(**kwargs))
+
+    # Check that the particles built from the table match the objects
+    ref, result = results
+    assert isinstance(result, ParticleTable)
+    assert len(result) == len(ref)
+    for p_ref, p in zip(ref, result):
+        for key, value in p_ref.as_dict().items():
+            np.testing.assert_equal(getattr(p, key), value)
+
+
 @pytest.mark.parametrize(
         'asis, pixel_coordinates',
         [(True, False), (False, False), (False, True)])
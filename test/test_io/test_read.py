@@ -1,12 +1,18 @@
 """Test that the reader classes work as intended."""
 
+import os
+import copy
+import pickle
 import pytest
 
 import numpy as np
 import ROOT
 import h5py
 
+from spine.data import ObjectList, Particle, RunInfo
 from spine.io.read import *
+from spine.io.read.run_index import RunEventIndex
+from spine.io.write import HDF5Writer
 
 
 def test_larcv_reader(larcv_data):
@@ -160,3 +166,298 @@ def test_hdf5_reader(hdf5_data):
     # Try to restrict the number of files to be loaded
     reader = HDF5Reader([hdf5_data, hdf5_data], limit_num_files=1)
     assert reader.num_entries == num_entries
+
+
+def test_hdf5_reader_batch(tmp_path):
+    """Tests the batched loading of an HDF5 file with a pool of handles."""
+    # Write a small dummy file
+    file_path = os.path.join(tmp_path, 'dummy.h5')
+    writer = HDF5Writer(file_path)
+    np.random.seed(seed=0)
+    for b in range(3):
+        sizes = np.random.randint(0, 5, size=4)
+        writer({
+            'index': np.arange(4*b, 4*(b + 1)),
+            'data': [np.random.rand(s, 5) for s in sizes],
+            'particles': [ObjectList(
+                [Particle(id=i) for i in range(s)], Particle()) for s in sizes],
+            'clusts': [[np.arange(s + 1), np.arange(2)] for s in sizes]
+        })
+
+    # Load every entry with and without the pool of open handles
+    reader = HDF5Reader(file_path)
+    pool_reader = HDF5Reader(
+            [file_path, file_path], keep_open=True, max_open_files=1)
+    assert len(pool_reader) == 2*len(reader)
+
+    indices = [13, 2, 2, 5, 0, 20]
+    batch = pool_reader.get_batch(indices)
+    for i, idx in enumerate(indices):
+        entry = reader[idx%len(reader)]
+        assert entry['index'] == batch[i]['index']
+        for key in ['data', 'clusts']:
+            assert len(entry[key]) == len(batch[i][key])
+            for ref, val in zip(entry[key], batch[i][key]):
+                np.testing.assert_equal(ref, val)
+        assert len(entry['particles']) == len(batch[i]['particles'])
+
+    # The pool must not hold more handles than requested
+    assert len(pool_reader._handles) == 1
+    pool_reader.close()
+
+
+@pytest.mark.parametrize('build_classes', [True, False])
+def test_hdf5_reader_objects(tmp_path, build_classes):
+    """Tests the lazy loading of objects stored in an HDF5 file."""
+    # Write a small dummy file
+    file_path = os.path.join(tmp_path, 'dummy.h5')
+    particles = [Particle(
+        id=i, pid=i%5, interaction_primary=i%2, position=np.full(3, i),
+        children_id=np.arange(i)) for i in range(6)]
+    writer = HDF5Writer(file_path)
+    writer({
+        'index': np.arange(2),
+        'particles': [ObjectList(particles, Particle()),
+                      ObjectList([], Particle())]
+    })
+    writer.close()
+
+    # Load the objects back
+    reader = HDF5Reader(file_path, build_classes=build_classes)
+    loaded, empty = reader[0]['particles'], reader[1]['particles']
+    assert len(loaded) == len(particles) and len(empty) == 0
+    if build_classes:
+        # Objects are only built when they are accessed
+        assert loaded[2].id == 2 and loaded._num_built == 1
+        assert [p.id for p in loaded[-2:]] == [4, 5]
+        assert isinstance(loaded[-2:], ObjectList)
+        assert isinstance(loaded[-2:].default, Particle)
+
+        # Copies of a partially built list hold the objects, not placeholders
+        for dup in (pickle.loads(pickle.dumps(loaded)), copy.copy(loaded)):
+            assert isinstance(dup.default, Particle)
+            assert [p.id for p in list.__iter__(dup)] == list(range(6))
+        for ref, obj in zip(particles, loaded):
+            for key, value in ref.as_dict().items():
+                np.testing.assert_equal(value, getattr(obj, key))
+        assert loaded.materialized
+        assert isinstance(empty.default, Particle)
+
+    else:
+        # Attributes are stored column-wise in a structured array
+        np.testing.assert_equal(loaded['id'], np.arange(len(particles)))
+        np.testing.assert_equal(loaded['position'][:, 0], loaded['id'])
+        for ref, children_id in zip(particles, loaded['children_id']):
+            np.testing.assert_equal(ref.children_id, children_id)
+
+
+@pytest.mark.parametrize('keep_open', [False, True])
+def test_hdf5_reader_lazy(tmp_path, keep_open):
+    """Tests the lazy loading of tensors stored in an HDF5 file."""
+    # Write a small dummy file
+    file_path = os.path.join(tmp_path, 'dummy.h5')
+    writer = HDF5Writer(file_path)
+    np.random.seed(seed=0)
+    writer({
+        'index': np.arange(3),
+        'data': [np.random.rand(s, 5) for s in [0, 4, 7]]
+    })
+    writer.close()
+
+    # Check that the lazy proxies behave as the arrays they point to
+    reader = HDF5Reader(file_path)
+    lazy_reader = HDF5Reader(file_path, lazy_keys=['data'], keep_open=keep_open)
+    keys = [slice(None), (slice(None), [1, 2, 3]), (slice(1, 3), 4),
+            (slice(None, None, -1), slice(0, 2)), np.array([0, 2])]
+    for entry in range(len(reader)):
+        ref, lazy = reader[entry]['data'], lazy_reader[entry]['data']
+        assert lazy.shape == ref.shape and not lazy.materialized
+        for key in keys:
+            if len(ref) > 2:
+                np.testing.assert_equal(lazy[key], ref[key])
+
+        np.testing.assert_equal(lazy + 1., ref + 1.)
+        np.testing.assert_equal(np.asarray(lazy), ref)
+        assert lazy.materialized
+
+    lazy_reader.close()
+
+
+def test_hdf5_reader_projection(tmp_path):
+    """Tests the key projection and the event filter of the HDF5 reader."""
+    # Write a small dummy file
+    file_path = os.path.join(tmp_path, 'dummy.h5')
+    writer = HDF5Writer(file_path)
+    writer({
+        'index': np.arange(6),
+        'run_info': [RunInfo(run=1, subrun=0, event=i) for i in range(6)],
+        'data': [np.random.rand(i, 5) for i in range(6)],
+        'particles': [ObjectList([Particle()]*i, Particle()) for i in range(6)]
+    })
+    writer.close()
+
+    # Check that only the requested keys are loaded
+    reader = HDF5Reader(file_path, keys=['data'])
+    assert set(reader[0].keys()) == {'index', 'file_index', 'data'}
+    reader = HDF5Reader(file_path, skip_keys=['data', 'particles'])
+    assert set(reader[0].keys()) == {'index', 'file_index', 'run_info'}
+
+    # Check that only the entries which pass the event filter are loaded
+    reader = HDF5Reader(
+            file_path, event_filter='(event > 1) & (index % 2 == 0)')
+    assert len(reader) == 2
+    assert [reader[i]['run_info'].event for i in range(2)] == [2, 4]
+    assert [len(reader[i]['particles']) for i in range(2)] == [2, 4]
+
+
+def test_run_event_index():
+    """Tests the sorted (run, event) index against a dictionary."""
+    np.random.seed(seed=0)
+    run_info = np.column_stack([np.random.randint(-2, 3, size=1000),
+                                np.random.randint(0, 2**32, size=1000)])
+    run_info[-10:] = run_info[:10]
+    index = RunEventIndex(run_info)
+    run_map = {tuple(v):i for i, v in enumerate(run_info)}
+
+    assert len(index) == len(run_map)
+    assert index.num_duplicates == 10
+    for (run, event), idx in run_map.items():
+        assert (run, event) in index
+        assert index[(run, event)] == idx
+
+    np.testing.assert_equal(
+            index.index(run_info[:, 0], run_info[:, 1]),
+            [run_map[tuple(v)] for v in run_info])
+    np.testing.assert_equal(index.find([0, 5], [2**32 - 1, 0]), [-1, -1])
+    with pytest.raises(AssertionError):
+        index.index(5, 0)
+
+    # Check that negative event numbers (e.g. defaults) can be indexed
+    run_info[:, 1] //= 2
+    run_info[:10] = -1
+    index = RunEventIndex(run_info[:500])
+    assert index[(-1, -1)] == 9 and index.num_duplicates == 9
+    np.testing.assert_equal(
+            index.find(run_info[10:500, 0], run_info[10:500, 1]),
+            np.arange(10, 500))
+    np.testing.assert_equal(index.find([0, -1], [2**32 - 1, 0]), [-1, -1])
+
+
+def test_hdf5_reader_run_event(tmp_path):
+    """Tests the (run, event) lookups and filters of the HDF5 reader."""
+    # Write a small dummy file
+    file_path = os.path.join(tmp_path, 'dummy.h5')
+    writer = HDF5Writer(file_path)
+    writer({
+        'index': np.arange(6),
+        'run_info': [RunInfo(run=i%2, subrun=0, event=i) for i in range(6)],
+    })
+    writer.close()
+
+    # Check that entries can be fetched by (run, event) pair
+    reader = HDF5Reader(file_path, create_run_map=True)
+    assert reader.get_run_event(1, 3)['index'] == 3
+    with pytest.raises(AssertionError):
+        reader.get_run_event(0, 3)
+
+    # Check that the index follows the entry selection
+    reader.process_entry_list(run_event_list=[[1, 5], [0, 2]])
+    assert [reader[i]['index'] for i in range(2)] == [5, 2]
+    assert reader.get_run_event_index(0, 2) == 1
+
+    reader.process_entry_list(skip_run_event_list=[[0, 0], [1, 5]])
+    assert [reader[i]['index'] for i in range(4)] == [1, 2, 3, 4]
+    assert reader.get_run_event_index(1, 3) == 2
+
+    # Check that the index follows the sharding of the entries
+    reader.apply_shard(1, 3)
+    assert len(reader) == 1
+    assert reader[0]['index'] == 3
+    assert reader.get_run_event_index(1, 3) == 0
+
+
+def test_larcv_index_cache(tmp_path, monkeypatch):
+    """Tests that the cached scans of LArCV files are reused and invalidated
+    when the files change."""
+    from spine.io.read import larcv_index
+
+    # Replace the file scan with a counter of the number of scans
+    scanned = []
+    def scan_file(file_path, run_info_key=None):
+        scanned.append(file_path)
+        num_entries = os.path.getsize(file_path)
+        run_info = np.zeros((num_entries, 3), dtype=np.int64)
+        run_info[:, 2] = np.arange(num_entries)
+        return {'counts': {'dummy': num_entries}, 'run_info': run_info}
+
+    monkeypatch.setattr(larcv_index, 'scan_file', scan_file)
+
+    # Create a few dummy files
+    file_paths = [os.path.join(tmp_path, f'dummy_{i}.root') for i in range(3)]
+    for i, file_path in enumerate(file_paths):
+        with open(file_path, 'w', encoding='utf-8') as f:
+            f.write('x'*(i + 1))
+
+    # The first call scans every file, the second only loads the cache
+    cache_dir = os.path.join(tmp_path, 'cache')
+    for _ in range(2):
+        index = larcv_index.get_file_index(
+                file_paths, 'dummy', cache_dir, num_workers=1)
+        assert [info['counts']['dummy'] for info in index] == [1, 2, 3]
+        np.testing.assert_equal(index[2]['run_info'][:, 2], np.arange(3))
+    assert len(scanned) == 3
+
+    # Modifying a file invalidates its cached scan only
+    with open(file_paths[1], 'a', encoding='utf-8') as f:
+        f.write('x')
+    index = larcv_index.get_file_index(
+            file_paths, 'dummy', cache_dir, num_workers=1)
+    assert index[1]['counts']['dummy'] == 3
+    assert scanned[3:] == [file_paths[1]]
+
+
+@pytest.mark.parametrize('num_workers', [1, 2])
+def test_prefetch_reader(tmp_path, num_workers):
+    """Tests that reading entries ahead does not change their content."""
+    # Write a small dummy file
+    file_path = os.path.join(tmp_path, 'dummy.h5')
+    writer = HDF5Writer(file_path)
+    np.random.seed(seed=0)
+    for b in range(4):
+        writer({
+            'index': np.arange(4*b, 4*(b + 1)),
+            'data': [np.random.rand(s, 5)
+                     for s in np.random.randint(0, 5, size=4)]
+        })
+
+    reader = HDF5Reader(file_path)
+    prefetch = PrefetchReader(
+            HDF5Reader(file_path), num_prefetch=3, num_workers=num_workers)
+    assert len(prefetch) == len(reader)
+
+    # Sequential access reads the next entries ahead
+    for idx in range(len(reader)):
+        entry = prefetch[idx]
+        assert entry['index'] == reader[idx]['index']
+        np.testing.assert_equal(entry['data'], reader[idx]['data'])
+        assert prefetch.num_pending <= 3
+        if idx < len(reader) - 1:
+            assert idx + 1 in prefetch.pending
+
+    # Random access only reads ahead the scheduled entries
+    order = np.random.permutation(len(reader))
+    prefetch.schedule(order)
+    for idx in order:
+        assert prefetch.num_pending == min(3, len(order) - prefetch.cursor)
+        np.testing.assert_equal(prefetch[idx]['data'], reader[idx]['data'])
+
+    prefetch[len(reader) - 1]
+    assert prefetch.num_pending == 0
+
+    # Changing the entry list drops the read-ahead buffer
+    prefetch[0]
+    prefetch[1]
+    prefetch.process_entry_list(entry_list=[3, 7])
+    assert prefetch.num_pending == 0
+    assert len(prefetch) == 2
+    assert prefetch[1]['index'] == 7
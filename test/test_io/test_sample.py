@@ -4,9 +4,10 @@ import pytest
 from dataclasses import dataclass
 
 import numpy as np
+from torch.utils.data import DataLoader
 
 from spine.io.sample import *
-from spine.io.sample import DistributedProxySampler
+from spine.io.sample import DistributedProxySampler, set_loader_epoch
 
 
 @dataclass
@@ -140,3 +141,88 @@ def test_bootstrap_sampler(dataset, batch_size, seed):
 
             # Make the distributed sampler has half the entries
             assert len(dist_sampler) == len(sampler)/2
+
+
+@pytest.mark.parametrize('dataset', [12, 37], indirect=True)
+@pytest.mark.parametrize('max_size', [None, 100])
+@pytest.mark.parametrize('drop_last', [False, True])
+def test_bucket_sampler(tmp_path, dataset, max_size, drop_last):
+    """Tests the size-aware bucketing batch sampler."""
+    # Store a dummy size index
+    np.random.seed(seed=0)
+    sizes = np.random.randint(1, 100, size=len(dataset))
+    size_file = str(tmp_path / 'sizes.npy')
+    np.save(size_file, sizes)
+
+    # Initialize the sampler
+    batch_size = 4
+    sampler = BucketBatchSampler(
+            dataset, batch_size, seed=8, drop_last=drop_last,
+            max_size=max_size, size_file=size_file, num_buckets=3)
+
+    # Check that the batches respect the budgets and cover the dataset
+    batches = list(sampler)
+    assert len(batches) == len(sampler)
+    for batch in batches:
+        assert 0 < len(batch) <= batch_size
+        assert max_size is None or np.sum(sizes[batch]) <= max_size
+    samples = np.concatenate(batches)
+    assert len(np.unique(samples)) == len(samples)
+    if not drop_last:
+        assert len(samples) == len(dataset)
+
+    # Check that the sampling is reproducible and that the length is stable
+    other = BucketBatchSampler(
+            dataset, batch_size, seed=8, drop_last=drop_last,
+            max_size=max_size, size_file=size_file, num_buckets=3)
+    assert list(other) == batches
+    assert len(list(sampler)) == len(batches)
+
+    # Check that the sizes can be provided by the dataset instead
+    dataset.get_sizes = lambda key: sizes
+    other = BucketBatchSampler(
+            dataset, batch_size, seed=8, drop_last=drop_last,
+            max_size=max_size, size_key='data', num_buckets=3)
+    assert list(other) == batches
+
+    # Make sure that the sampler works in a distributed context
+    dist_batches = []
+    for rank in (0, 1):
+        dist_sampler = DistributedProxySampler(
+                other, num_replicas=2, rank=rank)
+        dist_batches.append(list(dist_sampler))
+        assert len(dist_batches[-1]) == len(dist_sampler)
+    assert len(dist_batches[0]) == len(dist_batches[1])
+
+
+@pytest.mark.parametrize('dataset', [37], indirect=True)
+def test_bucket_sampler_epochs(dataset):
+    """Tests a distributed bucket sampler used by a loader over epochs."""
+    # Initialize one loader per replica, each with its own sampler
+    np.random.seed(seed=0)
+    sizes = np.random.randint(1, 100, size=len(dataset))
+    dataset.get_sizes = lambda key: sizes
+    loaders = []
+    for rank in (0, 1):
+        sampler = BucketBatchSampler(
+                dataset, 4, seed=8, max_size=200, size_key='data',
+                num_buckets=3)
+        loaders.append(DataLoader(
+                np.arange(len(dataset)), collate_fn=np.array,
+                batch_sampler=DistributedProxySampler(sampler, 2, rank)))
+
+    # Loop over a few epochs, check that the replicas cover the dataset
+    epoch_entries = []
+    for epoch in range(3):
+        entries = []
+        for loader in loaders:
+            set_loader_epoch(loader, epoch)
+            assert loader.batch_sampler.epoch == epoch
+            for batch in loader:
+                assert np.sum(sizes[batch]) <= 200
+                entries.extend(batch.tolist())
+
+        assert np.all(np.isin(np.arange(len(dataset)), entries))
+        epoch_entries.append(entries)
+
+    assert epoch_entries[0] != epoch_entries[1]
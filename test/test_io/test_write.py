@@ -1,6 +1,7 @@
 """Test that the writer classes work as intended."""
 
 import os
+import threading
 import pytest
 
 import numpy as np
@@ -8,7 +9,9 @@ import h5py
 
 from spine.data import (
         ObjectList, Particle, Neutrino, Meta, Flash, CRTHit, RunInfo, Trigger)
+from spine.io.read import HDF5Reader
 from spine.io.write import *
+from spine.io.write import merge
 
 
 @pytest.fixture(name='hdf5_output')
@@ -117,6 +120,241 @@ def test_hdf5_writer(hdf5_output, tensor_list, index_list, edge_index_list):
     writer(data)
 
 
+@pytest.mark.parametrize('buffer_size', [1, 3])
+@pytest.mark.parametrize('compression', [None, 'gzip', 'lzf'])
+def test_hdf5_writer_buffered(hdf5_output, buffer_size, compression):
+    """Tests the buffered HDF5 writer with compression."""
+    # Initialize the writer
+    writer = HDF5Writer(
+            hdf5_output, buffer_size=buffer_size, chunks=16,
+            compression=compression)
+
+    # Write a few batches of output
+    np.random.seed(seed=0)
+    num_batches, batch_size = 4, 2
+    for b in range(num_batches):
+        sizes = np.random.randint(0, 10, size=batch_size)
+        data = {
+                'index': np.arange(b*batch_size, (b + 1)*batch_size),
+                'dummy_tensor': [np.random.rand(s, 5) for s in sizes],
+                'dummy_particles': generate_object_list(Particle, sizes)
+        }
+        writer(data)
+
+        # Events are only written out once the buffer is full
+        with h5py.File(hdf5_output, 'r') as out_file:
+            num_written = len(out_file['events'])
+        num_expected = (b + 1)*batch_size
+        if buffer_size > batch_size:
+            num_expected -= num_expected%(2*batch_size)
+        assert num_written == num_expected
+
+    # Make sure the remaining events are written when closing the file
+    writer.close()
+    with h5py.File(hdf5_output, 'r') as out_file:
+        assert len(out_file['events']) == num_batches*batch_size
+        assert out_file['dummy_tensor'].compression == compression
+
+
+def test_background_writer(hdf5_output):
+    """Tests the writer running in a background thread."""
+    # Initialize the writer, write a few batches of output
+    writer = BackgroundWriter(HDF5Writer(hdf5_output), queue_size=2)
+    num_batches, batch_size = 10, 2
+    for b in range(num_batches):
+        data = {
+                'index': np.arange(b*batch_size, (b + 1)*batch_size),
+                'dummy_tensor': [np.full((b, 3), b) for _ in range(batch_size)]
+        }
+        writer(data)
+        assert writer.queue_depth <= 2
+
+    # Once flushed, all the events must be written in order
+    writer.flush()
+    assert writer.queue_depth == 0
+    assert writer.time_sum.wall > 0.
+    with h5py.File(hdf5_output, 'r') as out_file:
+        np.testing.assert_equal(
+                out_file['index'][:], np.arange(num_batches*batch_size))
+    writer.close()
+
+    # A closed writer restarts its thread when more data is submitted
+    num_events = num_batches*batch_size
+    writer({'index': np.arange(num_events, num_events + batch_size),
+            'dummy_tensor': [np.empty((0, 3)) for _ in range(batch_size)]})
+    writer.close()
+    with h5py.File(hdf5_output, 'r') as out_file:
+        assert len(out_file['events']) == num_events + batch_size
+
+    # Errors raised in the writing thread must be raised on the next call,
+    # and the failure must stick: the batches queued after it are not written
+    release, written = threading.Event(), []
+    def fail_first(data, cfg):
+        release.wait()
+        if data['index'] == 0:
+            raise KeyError('missing')
+        written.append(data['index'])
+
+    writer = BackgroundWriter(fail_first, queue_size=4)
+    for i in range(3):
+        writer({'index': i})
+    release.set()
+    with pytest.raises(RuntimeError):
+        writer.flush()
+    with pytest.raises(RuntimeError):
+        writer({'index': 3})
+    with pytest.raises(RuntimeError):
+        writer.close()
+    assert not written
+
+
+def test_merge_hdf5(tmp_path, monkeypatch):
+    """Tests the concatenation of HDF5 files produced by the writer."""
+    # Copy the datasets in small blocks to exercise the chunked copy
+    monkeypatch.setattr(merge, 'CHUNK_BYTES', 64)
+
+    # Write a few shards of output
+    np.random.seed(seed=0)
+    file_paths = []
+    for f in range(3):
+        file_path = os.path.join(tmp_path, f'output_rank{f}.h5')
+        writer = HDF5Writer(file_path)
+        for b in range(2):
+            sizes = np.random.randint(0, 5, size=2)
+            writer({
+                'index': np.arange(4*f + 2*b, 4*f + 2*(b + 1)),
+                'dummy_tensor': [np.random.rand(s, 5) for s in sizes],
+                'dummy_particles': generate_object_list(Particle, sizes),
+                'dummy_index': [[np.arange(s), np.arange(2)] for s in sizes],
+                'dummy_jagged': [[np.random.rand(s, 2), np.random.rand(s, 3)]
+                                 for s in sizes]
+            }, cfg={'shard': f})
+        writer.close()
+        file_paths.append(file_path)
+
+    # Merge them, check that the merged file matches the shards
+    merged_path = os.path.join(tmp_path, 'output.h5')
+    assert merge_hdf5(file_paths, merged_path) == 12
+    with pytest.raises(AssertionError):
+        merge_hdf5(file_paths, merged_path)
+
+    reader = HDF5Reader(merged_path)
+    ref_reader = HDF5Reader(file_paths)
+    assert len(reader) == len(ref_reader)
+    for i in range(len(reader)):
+        entry, ref = reader[i], ref_reader[i]
+        assert entry['index'] == i
+        np.testing.assert_equal(entry['dummy_tensor'], ref['dummy_tensor'])
+        assert len(entry['dummy_particles']) == len(ref['dummy_particles'])
+        for key in ['dummy_index', 'dummy_jagged']:
+            assert len(entry[key]) == len(ref[key])
+            for val, ref_val in zip(entry[key], ref[key]):
+                np.testing.assert_equal(val, ref_val)
+
+
+@pytest.mark.parametrize('output_format', ['csv', 'parquet'])
+def test_merge_rows(tmp_path, output_format):
+    """Tests the concatenation of CSV/Parquet files produced by the writers."""
+    # Write a few shards of output, with a column which changes type
+    if output_format == 'parquet':
+        pq = pytest.importorskip('pyarrow.parquet')
+    writer_cls = CSVWriter if output_format == 'csv' else ParquetWriter
+    merge = merge_csv if output_format == 'csv' else merge_parquet
+    file_paths = []
+    for f in range(3):
+        file_path = os.path.join(tmp_path, f'rank{f}_output.{output_format}')
+        writer = writer_cls(file_path)
+        for i in range(2*f, 2*(f + 1)):
+            writer.append({'index': i, 'value': i if f < 2 else i + 0.5})
+        writer.close()
+        file_paths.append(file_path)
+
+    # Merge them, check that the rows are in order
+    merged_path = os.path.join(tmp_path, f'output.{output_format}')
+    assert merge(file_paths, merged_path) == 6
+    with pytest.raises(AssertionError):
+        merge(file_paths, merged_path)
+
+    values = [0, 1, 2, 3, 4.5, 5.5]
+    if output_format == 'csv':
+        with open(merged_path, 'r', encoding='utf-8') as in_file:
+            lines = in_file.read().splitlines()
+        assert lines == ['index,value'] + [
+                f'{i},{v}' for i, v in enumerate(values)]
+    else:
+        table = pq.read_table(merged_path)
+        assert table.column('index').to_pylist() == list(range(6))
+        assert table.column('value').to_pylist() == values
+
+
+@pytest.mark.parametrize('buffer_size', [1, 3])
+def test_csv_writer(tmp_path, buffer_size):
+    """Tests the buffered CSV writer."""
+    # Write a few rows, check that they are only written once the buffer is full
+    file_name = os.path.join(tmp_path, 'dummy.csv')
+    writer = CSVWriter(file_name, buffer_size=buffer_size, accept_missing=True)
+    for i in range(5):
+        writer.append({'index': i, 'value': 0.5*i, 'name': f'entry_{i}'})
+        assert len(writer.buffer) == (i + 1)%buffer_size
+
+    writer.append({'index': 5, 'value': 2.5})
+    writer.close()
+
+    # Check the content of the file
+    with open(file_name, 'r', encoding='utf-8') as in_file:
+        lines = in_file.read().splitlines()
+    assert lines[0] == 'index,value,name'
+    assert lines[1:] == [f'{i},{0.5*i},entry_{i}' for i in range(5)] + [
+            '5,2.5,-1']
+
+    # Append to the existing file
+    writer = CSVWriter(file_name, overwrite=True, append=True)
+    assert writer.result_keys == ['index', 'value', 'name']
+    writer.append({'index': 6, 'value': 3., 'name': 'entry_6'})
+    writer.close()
+    with open(file_name, 'r', encoding='utf-8') as in_file:
+        assert len(in_file.read().splitlines()) == 8
+
+
+def test_parquet_writer(tmp_path):
+    """Tests the Parquet writer."""
+    pq = pytest.importorskip('pyarrow.parquet')
+
+    # Write a few rows over multiple row groups
+    file_name = os.path.join(tmp_path, 'dummy.parquet')
+    writer = ParquetWriter(file_name, buffer_size=2)
+    for i in range(5):
+        writer.append({'index': np.int64(i), 'value': np.float32(0.5*i)})
+    writer.close()
+
+    # Check that the schema is stable and the content preserved
+    table = pq.read_table(file_name)
+    assert table.column_names == ['index', 'value']
+    assert table.column('index').to_pylist() == list(range(5))
+    assert table.column('value').to_pylist() == [0.5*i for i in range(5)]
+
+    # Check that the schema is promoted rather than truncated, missing
+    # values are stored as nulls
+    writer = ParquetWriter(
+            file_name, overwrite=True, accept_missing=True, buffer_size=2)
+    values = [-1, 2, 0.5, 1.5, 3]
+    for i, value in enumerate(values):
+        row = {'value': value, 'name': f'entry_{i}'}
+        writer.append(row if i != 1 else {'value': value})
+    writer.close()
+
+    table = pq.read_table(file_name)
+    assert pq.ParquetFile(file_name).num_row_groups == 3
+    assert table.column('value').to_pylist() == values
+    assert table.column('name').to_pylist() == [
+            f'entry_{i}' if i != 1 else None for i in range(5)]
+
+    # Check that a closed file can be written to again without losing rows
+    writer.append({'value': 4, 'name': 'entry_5'})
+    writer.close()
+    assert pq.read_table(file_name).column('value').to_pylist() == values + [4]
+
+
 def generate_object_list(cls, sizes):
     """Generates a dummy list of lists of objects of the request class.
 
@@ -0,0 +1,78 @@
+"""Test that the model input staging works as intended."""
+
+import pytest
+
+import numpy as np
+import torch
+
+from spine.data import TensorBatch
+from spine.model.transfer import DataStager
+
+
+def generate_batches(num_batches):
+    """Generates batches of data with one tensor batch and one other product.
+
+    Parameters
+    ----------
+    num_batches : int
+        Number of batches to generate
+
+    Yields
+    ------
+    dict
+        Dictionary of data products
+    """
+    for i in range(num_batches):
+        data = np.random.rand(10, 5)
+        yield {'input': TensorBatch(data, [4, 6]), 'index': i}
+
+
+@pytest.mark.parametrize('prefetch', [False, True])
+def test_data_stager(prefetch):
+    """Tests that the staged batches match the synchronously cast ones."""
+    np.random.seed(seed=0)
+    stager = DataStager(['input', 'missing'], dtype=torch.float32,
+                        prefetch=prefetch)
+    iterator = generate_batches(5)
+    if prefetch:
+        iterator = stager.iterate(iterator)
+
+    indexes = []
+    for data in iterator:
+        # The batch itself is left untouched
+        assert data['input'].is_numpy
+        indexes.append(data['index'])
+
+        staged = stager.get(data)
+        assert list(staged.keys()) == ['input']
+        ref = data['input'].to_tensor(dtype=torch.float32)
+        assert not staged['input'].is_numpy
+        assert torch.equal(staged['input'].data, ref.data)
+        assert torch.equal(staged['input'].counts, ref.counts)
+
+    assert indexes == list(range(5))
+
+
+def test_staged_iterator_error():
+    """Tests that the errors raised in the staging thread are propagated."""
+    def generate():
+        yield from generate_batches(1)
+        raise ValueError("Failed to load")
+
+    iterator = DataStager(['input'], prefetch=True).iterate(generate())
+    next(iterator)
+    with pytest.raises(RuntimeError):
+        next(iterator)
+    with pytest.raises(StopIteration):
+        next(iterator)
+
+
+def test_staged_iterator_close():
+    """Tests that the staging thread can be stopped at any time."""
+    iterator = DataStager(['input'], prefetch=True).iterate(
+            generate_batches(10))
+    next(iterator)
+    iterator.close()
+    assert iterator.thread is None
+    with pytest.raises(StopIteration):
+        next(iterator)
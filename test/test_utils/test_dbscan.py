@@ -0,0 +1,106 @@
+"""Test that the lattice DBSCAN matches sklearn's implementation."""
+
+import pytest
+
+import numpy as np
+from sklearn.cluster import DBSCAN as sklearn_dbscan
+
+from spine.data import TensorBatch
+from spine.utils.dbscan import LatticeDBSCAN
+from spine.utils.point_break_clustering import PointBreakClusterer
+from spine.model.layer.common.dbscan import DBSCAN
+
+
+def canonical(labels):
+    """Relabels clusters in order of first appearance, keeps noise as -1.
+
+    Parameters
+    ----------
+    labels : np.ndarray
+        (N) Cluster labels
+
+    Returns
+    -------
+    np.ndarray
+        (N) Canonical cluster labels
+    """
+    result = np.full(len(labels), -1, dtype=np.int64)
+    valid = labels > -1
+    _, first, inverse = np.unique(
+            labels[valid], return_index=True, return_inverse=True)
+    result[valid] = np.argsort(np.argsort(first))[inverse]
+
+    return result
+
+
+@pytest.fixture(name='voxels')
+def fixture_voxels():
+    """Generates a sparse set of voxels with integer coordinates.
+
+    Returns
+    -------
+    np.ndarray
+        (N, 3) Voxel coordinates
+    """
+    np.random.seed(seed=0)
+    return np.random.randint(0, 25, size=(2000, 3)).astype(np.float32)
+
+
+@pytest.mark.parametrize('metric', ['euclidean', 'chebyshev', 'cityblock'])
+@pytest.mark.parametrize('eps', [1., 1.8, 2.5])
+@pytest.mark.parametrize('min_samples', [1, 4])
+def test_lattice_dbscan(voxels, metric, eps, min_samples):
+    """Tests that the labels match those of sklearn, one to one."""
+    ref = sklearn_dbscan(
+            eps=eps, min_samples=min_samples, metric=metric).fit(voxels)
+    labels = LatticeDBSCAN(eps, min_samples, metric).fit_predict(voxels)
+
+    np.testing.assert_equal(labels, ref.labels_)
+
+
+def test_lattice_dbscan_groups(voxels):
+    """Tests that voxels from separate groups are clustered separately."""
+    groups = np.random.randint(0, 3, size=len(voxels))
+    labels = LatticeDBSCAN(min_samples=2).fit_predict(voxels, groups)
+
+    for g in range(3):
+        index = np.where(groups == g)[0]
+        ref = sklearn_dbscan(eps=1.8, min_samples=2).fit(voxels[index])
+        np.testing.assert_equal(canonical(labels[index]), ref.labels_)
+
+    # Clusters cannot span several groups
+    for c in np.unique(labels[labels > -1]):
+        assert len(np.unique(groups[labels == c])) == 1
+
+
+@pytest.mark.parametrize('method', ['masked_dbscan', 'closest_path'])
+def test_point_break_lattice(voxels, method):
+    """Tests that the point-break clustering is unchanged on the lattice."""
+    points = voxels[np.random.choice(len(voxels), 20, replace=False)]
+    ref = PointBreakClusterer(method=method, algorithm='sklearn')
+    lattice = PointBreakClusterer(method=method, algorithm='lattice')
+
+    np.testing.assert_equal(
+            canonical(lattice(voxels, points)),
+            canonical(ref(voxels, points)))
+
+
+def test_dbscan_lattice(voxels):
+    """Tests that clustering the batch at once yields the same fragments."""
+    # Build a batch of two entries with a few semantic classes
+    batch_ids = np.repeat([0, 1], [1200, 800])
+    data = TensorBatch(np.hstack(
+        [batch_ids[:, None], voxels, np.ones((len(voxels), 1))]), [1200, 800])
+    seg_pred = TensorBatch(np.random.randint(0, 4, len(voxels)), [1200, 800])
+
+    results = []
+    for algorithm in ['sklearn', 'lattice']:
+        dbscan = DBSCAN(min_size=0, break_shapes=[], algorithm=algorithm)
+        results.append(dbscan(data, seg_pred))
+
+    (ref_clusts, ref_shapes), (clusts, shapes) = results
+    np.testing.assert_equal(clusts.counts, ref_clusts.counts)
+    np.testing.assert_equal(shapes.tensor, ref_shapes.tensor)
+    for ref_clust, clust in zip(ref_clusts.index_list, clusts.index_list):
+        np.testing.assert_equal(clust, ref_clust)
+        assert (seg_pred.tensor[clust] == seg_pred.tensor[clust[0]]).all()
@@ -0,0 +1,108 @@
+"""Test that the cluster statistics cache works as intended."""
+
+import pytest
+
+import numpy as np
+
+from spine.data import TensorBatch, IndexBatch
+from spine.utils.globals import COORD_COLS, VALUE_COL, SHAPE_COL
+from spine.utils.gnn.cache import ClusterFeatureCache
+from spine.utils.gnn.cluster import (
+        get_cluster_moments, merge_cluster_moments, get_cluster_features)
+from spine.model.layer.gnn.graph import CompleteGraph
+
+
+@pytest.fixture(name='data')
+def fixture_data():
+    """Generates a set of random voxels, values and shapes.
+
+    Returns
+    -------
+    np.ndarray
+        (N, 1 + D + N_f) Tensor of voxel/value pairs
+    """
+    np.random.seed(seed=0)
+    data = np.zeros((500, 6 + max(COORD_COLS)), dtype=np.float64)
+    data[:, COORD_COLS] = np.random.rand(500, 3)*100
+    data[:, VALUE_COL] = np.random.rand(500)
+    data[:, SHAPE_COL] = np.random.randint(0, 5, size=500)
+
+    return data
+
+
+@pytest.fixture(name='fragments')
+def fixture_fragments():
+    """Partitions the voxels into random fragments (some voxels left out).
+
+    Returns
+    -------
+    List[np.ndarray]
+        (C) List of fragment indexes
+    """
+    np.random.seed(seed=1)
+    labels = np.random.randint(-1, 40, size=500)
+
+    return [np.where(labels == c)[0] for c in range(40)]
+
+
+def test_merge_cluster_moments(data, fragments):
+    """Tests that merged statistics match those computed from voxels."""
+    moments = get_cluster_moments(data, fragments)
+    groups = [np.arange(0, 10), np.array([12, 3, 30]), np.array([5])]
+    merged = merge_cluster_moments(moments, groups)
+    unions = [np.concatenate([fragments[i] for i in g]) for g in groups]
+    np.testing.assert_allclose(
+            merged, get_cluster_moments(data, unions), atol=1e-9)
+
+
+def test_cluster_feature_cache(data, fragments):
+    """Tests that the cached features match those computed from voxels."""
+    cache = ClusterFeatureCache(data, fragments)
+    assert len(cache) == len(fragments)
+
+    # Check the features of the fragments themselves
+    np.testing.assert_allclose(
+            cache.get_features(fragments, add_value=True, add_shape=True),
+            get_cluster_features(data, fragments, True, True), atol=1e-9)
+
+    # Build particles out of fragments, in arbitrary order
+    particles = [np.concatenate([fragments[i] for i in g]) for g in
+                 ([3, 1, 2], [10, 5], [7], np.arange(20, 40))]
+    feats = cache.get_features(particles, add_value=True)
+    np.testing.assert_allclose(
+            feats, get_cluster_features(data, particles, True), atol=1e-9)
+    assert len(cache) == len(fragments) + 3
+
+    # Requesting the same particles again does not grow the cache
+    cache.get_features(particles[::-1])
+    assert len(cache) == len(fragments) + 3
+
+    # Clusters which are not unions of fragments are computed from voxels
+    others = [fragments[0][:-1], np.concatenate((fragments[1], fragments[1])),
+              np.where(np.isin(np.arange(500), np.concatenate(fragments),
+                               invert=True))[0]]
+    feats = cache.get_features(others)
+    np.testing.assert_allclose(
+            feats, get_cluster_features(data, others), atol=1e-9)
+    assert len(cache) == len(fragments) + 3
+
+    # Check the bounding boxes
+    lower, upper = cache.get_bounding_boxes(particles)
+    for i, p in enumerate(particles):
+        np.testing.assert_equal(lower[i], data[p][:, COORD_COLS].min(axis=0))
+        np.testing.assert_equal(upper[i], data[p][:, COORD_COLS].max(axis=0))
+
+
+def test_cluster_feature_cache_graph(data, fragments):
+    """Tests that the cached bounding boxes do not change the graph."""
+    cache = ClusterFeatureCache(data, fragments)
+    data = TensorBatch(data, counts=[len(data)])
+    clusts = IndexBatch(fragments, [0], [len(fragments)],
+                        [len(c) for c in fragments])
+
+    graph = CompleteGraph(max_length=20.)
+    edge_index, dist_mat, _ = graph(data, clusts)
+    edge_index_c, dist_mat_c, _ = graph(data, clusts, cache=cache)
+
+    np.testing.assert_equal(edge_index_c.index, edge_index.index)
+    np.testing.assert_equal(dist_mat_c.data, dist_mat.data)
@@ -0,0 +1,131 @@
+"""Test that the cluster feature functions work as intended."""
+
+import pytest
+
+import numpy as np
+
+from spine import IndexBatch
+from spine.utils.globals import COORD_COLS, VALUE_COL, SHAPE_COL
+from spine.utils.gnn.cluster import (
+        get_cluster_csr, get_cluster_sizes, get_cluster_centers,
+        get_cluster_energies, get_cluster_features_base,
+        get_cluster_features_extended, get_cluster_start_points,
+        get_cluster_features_batch, form_clusters_batch)
+from spine.data import TensorBatch
+
+
+@pytest.fixture(name='data')
+def fixture_data():
+    """Generates a batch of two entries of labeled random voxels.
+
+    Returns
+    -------
+    TensorBatch
+        Batch of cluster label data tensors
+    """
+    np.random.seed(seed=0)
+    tensors, counts = [], [300, 200]
+    for b, count in enumerate(counts):
+        tensor = np.zeros((count, 7 + max(COORD_COLS)), dtype=np.float64)
+        tensor[:, 0] = b
+        tensor[:, COORD_COLS] = np.random.randint(0, 50, size=(count, 3))
+        tensor[:, VALUE_COL] = np.random.rand(count)
+        tensor[:, SHAPE_COL] = np.random.randint(0, 5, size=count)
+        tensor[:, SHAPE_COL + 1] = np.random.randint(-1, 20, size=count)
+        tensors.append(tensor)
+
+    return TensorBatch(np.vstack(tensors), counts)
+
+
+@pytest.fixture(name='clusts')
+def fixture_clusts(data):
+    """Builds the clusters of the batch of voxels, including single voxels.
+
+    Returns
+    -------
+    IndexBatch
+        Batch of cluster indexes
+    """
+    return form_clusters_batch(data, column=SHAPE_COL + 1)
+
+
+def reference_features(voxels):
+    """Per-cluster reference implementation of the base features."""
+    center = voxels.mean(axis=0)
+    x = voxels - center
+    A = x.T @ x
+    w, v = np.linalg.eigh(A)
+    if w[2] == 0.:
+        return np.concatenate((center, np.zeros(12), [len(voxels)]))
+
+    v0 = v[:, 2]
+    x0 = x @ v0
+    np0 = np.linalg.norm(x - np.outer(x0, v0), axis=1)
+    if np.dot(x0, np0) < 0:
+        v0 = -v0
+
+    return np.concatenate(
+            (center, (A/w[2]).flatten(), (1. - w[1]/w[2])*v0, [len(voxels)]))
+
+
+def test_cluster_csr(clusts):
+    """Tests that the CSR representation matches the list of indexes."""
+    for source in (clusts, list(clusts.index_list)):
+        index, edges = get_cluster_csr(source)
+        assert len(edges) == len(clusts.index_list) + 1
+        for i, c in enumerate(clusts.index_list):
+            np.testing.assert_equal(index[edges[i]:edges[i+1]], c)
+
+    index, edges = get_cluster_csr([])
+    assert len(index) == 0 and np.all(edges == [0])
+
+
+def test_cluster_reductions(data, clusts):
+    """Tests the segment-reduced cluster features against a per-cluster
+    computation, with both an index batch and a list of indexes."""
+    tensor = data.tensor
+    index_list = clusts.index_list
+    for source in (clusts, list(index_list)):
+        sizes = get_cluster_sizes(tensor, source)
+        centers = get_cluster_centers(tensor, source)
+        energies = get_cluster_energies(tensor, source)
+        feats = get_cluster_features_base(tensor, source)
+        feats_ext = get_cluster_features_extended(tensor, source)
+        for i, c in enumerate(index_list):
+            voxels = tensor[c][:, COORD_COLS]
+            assert sizes[i] == len(c)
+            np.testing.assert_allclose(centers[i], voxels.mean(axis=0))
+            np.testing.assert_allclose(
+                    energies[i], tensor[c, VALUE_COL].sum())
+            np.testing.assert_allclose(
+                    feats[i], reference_features(voxels), atol=1e-9)
+            np.testing.assert_allclose(
+                    feats_ext[i, :2], [tensor[c, VALUE_COL].mean(),
+                                       tensor[c, VALUE_COL].std()])
+
+    # Check the empty list of clusters
+    assert get_cluster_features_base(tensor, []).shape == (0, 16)
+    assert get_cluster_sizes(tensor, []).shape == (0,)
+
+    # Check the batched wrapper
+    feats_batch = get_cluster_features_batch(data, clusts, add_value=True)
+    assert feats_batch.tensor.shape == (len(index_list), 18)
+    np.testing.assert_equal(feats_batch.counts, clusts.counts)
+
+
+def test_cluster_start_points(data, clusts):
+    """Tests that the start points are one of the ends of each cluster."""
+    tensor = data.tensor
+    points = get_cluster_start_points(tensor, clusts)
+    for i, c in enumerate(clusts.index_list):
+        voxels = tensor[c][:, COORD_COLS]
+        if len(c) < 2:
+            np.testing.assert_equal(points[i], voxels[0])
+            continue
+
+        # The start point must be one of the extrema along the principal axis
+        x = voxels - voxels.mean(axis=0)
+        axis = np.linalg.eigh(x.T @ x)[1][:, 2]
+        coords = voxels @ axis
+        extrema = voxels[[np.argmin(coords), np.argmax(coords)]]
+        assert np.any(np.all(np.isclose(points[i], extrema), axis=1))
@@ -0,0 +1,184 @@
+"""Test that the inter-cluster distances are computed properly."""
+
+import pytest
+
+import numpy as np
+
+from spine.data import TensorBatch, IndexBatch
+from spine.utils.gnn.block import BlockMatrix, SparseBlockMatrix
+from spine.utils.gnn.network import (
+        inter_cluster_distance, inter_cluster_distance_sparse)
+from spine.model.layer.gnn.graph import CompleteGraph, MSTGraph, KNNGraph
+
+
+@pytest.fixture(name='clusters')
+def fixture_clusters():
+    """Generates a batch of blobs of points scattered in space.
+
+    Returns
+    -------
+    TensorBatch
+        (N, 4) Batch of (batch ID, x, y, z) point coordinates
+    IndexBatch
+        (C) Batch of cluster indexes
+    """
+    # Set the random seed so that there are no surprises
+    np.random.seed(seed=0)
+
+    # Generate a few entries, each with a handful of blobs
+    tensors, clusts, counts, offsets = [], [], [], []
+    offset = 0
+    for b, num_clusts in enumerate([10, 0, 1, 25]):
+        offsets.append(offset)
+        points = []
+        for _ in range(num_clusts):
+            size = np.random.randint(1, 20)
+            center = np.random.uniform(0, 100, size=3)
+            blob = center + np.random.normal(0, 2, size=(size, 3))
+            clusts.append(offset + sum(len(p) for p in points) + np.arange(size))
+            points.append(np.hstack([np.full((size, 1), b), blob]))
+
+        tensor = np.vstack(points) if num_clusts else np.empty((0, 4))
+        tensors.append(tensor.astype(np.float32))
+        counts.append(num_clusts)
+        offset += len(tensor)
+
+    data = TensorBatch.from_list(tensors)
+    clusts = IndexBatch(clusts, offsets, counts, [len(c) for c in clusts])
+
+    return data, clusts
+
+
+def test_block_matrix():
+    """Tests the element access of a block-diagonal matrix."""
+    counts = np.array([2, 0, 3])
+    matrix = BlockMatrix(np.arange(13), counts)
+    dense = matrix.to_dense(-1)
+
+    assert matrix.shape == (5, 5)
+    np.testing.assert_equal(dense[:2, :2], [[0, 1], [2, 3]])
+    np.testing.assert_equal(dense[2:, 2:], np.arange(4, 13).reshape(3, 3))
+    assert (dense[:2, 2:] == -1).all() and (dense[2:, :2] == -1).all()
+
+    rows, cols = np.array([0, 1, 4, 2]), np.array([1, 1, 2, 3])
+    np.testing.assert_equal(matrix[rows, cols], dense[rows, cols])
+    matrix[rows, cols] = -2
+    assert (matrix.to_dense()[rows, cols] == -2).all()
+
+    # Elements outside of the blocks cannot be accessed
+    with pytest.raises(AssertionError):
+        matrix[0, 2]
+
+
+def test_sparse_block_matrix():
+    """Tests the element access of a sparse block-diagonal matrix."""
+    counts = np.array([2, 0, 3])
+    rows, cols = np.array([4, 0, 2, 3]), np.array([2, 1, 2, 4])
+    matrix = SparseBlockMatrix(rows, cols, np.arange(4.), counts, np.inf)
+    dense = matrix.to_dense(-1)
+
+    # The stored elements are ordered as in the flattened blocks
+    np.testing.assert_equal(matrix.rows, [0, 2, 3, 4])
+    np.testing.assert_equal(matrix.data, [1., 2., 3., 0.])
+    assert (dense[:2, 2:] == -1).all() and (dense[2:, :2] == -1).all()
+    np.testing.assert_equal(dense[rows, cols], np.arange(4.))
+    assert np.isinf(dense[2:, 2:]).sum() == 9 - 3
+
+    # Elements which are not stored take the fill value
+    all_rows, all_cols = np.indices(matrix.shape).reshape(2, -1)
+    mask = matrix.batch_ids[all_rows] == matrix.batch_ids[all_cols]
+    np.testing.assert_equal(
+            matrix[all_rows[mask], all_cols[mask]],
+            dense[all_rows[mask], all_cols[mask]])
+    assert matrix[4, 2] == 0. and np.isinf(matrix[2, 4])
+    np.testing.assert_equal(matrix.block(2), dense[2:, 2:])
+
+    # Empty matrices only return the fill value
+    empty = SparseBlockMatrix.full(counts, np.inf, dtype=np.float32)
+    assert np.isinf(empty[[0, 1], [1, 0]]).all()
+
+    # Elements cannot be modified or accessed outside of the blocks
+    with pytest.raises(NotImplementedError):
+        matrix[0, 0] = 1.
+    with pytest.raises(AssertionError):
+        matrix[0, 2]
+
+
+def test_inter_cluster_distance(clusters):
+    """Tests that the distance blocks match the distances of each pair."""
+    data, clusts = clusters
+    voxels = data.tensor[:, 1:]
+    dist_mat, closest_index = inter_cluster_distance(
+            voxels, clusts.index_list, clusts.counts, return_index=True)
+
+    assert len(dist_mat.data) == np.sum(clusts.counts**2)
+    for b in range(clusts.batch_size):
+        for i in range(clusts.edges[b], clusts.edges[b + 1]):
+            for j in range(clusts.edges[b], clusts.edges[b + 1]):
+                # Check that the closest index points to the closest pair
+                x1 = voxels[clusts.index_list[i]]
+                x2 = voxels[clusts.index_list[j]]
+                dists = np.linalg.norm(x1[:, None] - x2[None, :], axis=-1)
+                ii, jj = divmod(closest_index[i, j], len(x2))
+                np.testing.assert_allclose(dist_mat[i, j], dists.min(),
+                                           rtol=1e-5, atol=1e-5)
+                np.testing.assert_allclose(dists[ii, jj], dists.min(),
+                                           rtol=1e-5, atol=1e-5)
+
+
+@pytest.mark.parametrize('max_length', [np.inf, 20., 5.])
+def test_inter_cluster_distance_sparse(clusters, max_length):
+    """Tests that the pruned distances match those of the dense matrix."""
+    data, clusts = clusters
+    voxels = data.tensor[:, 1:]
+    dist_mat, closest_index = inter_cluster_distance(
+            voxels, clusts.index_list, clusts.counts, return_index=True)
+    pairs, dists, index = inter_cluster_distance_sparse(
+            voxels, clusts.index_list, clusts.counts, max_length=max_length)
+
+    # Check that the right pairs of clusters are kept
+    ref_pairs = np.vstack(np.where(np.triu(
+        dist_mat.to_dense(np.inf) < max_length, k=1)))
+    np.testing.assert_equal(pairs, ref_pairs)
+
+    # Check that the distances and closest pairs agree
+    np.testing.assert_equal(dists, dist_mat[pairs[0], pairs[1]])
+    np.testing.assert_equal(index, closest_index[pairs[0], pairs[1]])
+
+
+def test_complete_graph_pruned(clusters):
+    """Tests that pruning the distances does not change the graph."""
+    data, clusts = clusters
+    graph = CompleteGraph(max_length=10.)
+    edge_index, _, closest_index = graph(data, clusts)
+
+    graph.prune_dist = False
+    ref_edge_index, _, ref_closest_index = graph(data, clusts)
+
+    np.testing.assert_equal(edge_index.index, ref_edge_index.index)
+    np.testing.assert_equal(edge_index.counts, ref_edge_index.counts)
+    np.testing.assert_equal(
+            closest_index[tuple(edge_index.index)],
+            ref_closest_index[tuple(edge_index.index)])
+
+    # The pruned distances are only stored for the candidate pairs
+    assert isinstance(closest_index, SparseBlockMatrix)
+    assert len(closest_index.data) < np.sum(clusts.counts**2)
+
+
+@pytest.mark.parametrize('graph_class', [MSTGraph, KNNGraph])
+def test_distance_graphs(clusters, graph_class):
+    """Tests that the graphs built from distances stay within entries."""
+    data, clusts = clusters
+    kwargs = {'k': 3} if graph_class is KNNGraph else {}
+    edge_index, _, _ = graph_class(**kwargs)(data, clusts)
+
+    batch_ids = clusts.batch_ids
+    index = edge_index.index
+    assert (batch_ids[index[0]] == batch_ids[index[1]]).all()
+    np.testing.assert_equal(
+            edge_index.counts,
+            np.bincount(batch_ids[index[0]], minlength=clusts.batch_size))
+    if graph_class is MSTGraph:
+        np.testing.assert_equal(
+                edge_index.counts, 2*np.maximum(clusts.counts - 1, 0))